@@ -31,6 +31,9 @@ from nab.detectors.base import AnomalyDetector
 from nupic.bindings.algorithms import SpatialPooler
 from htmresearch_core.experimental import ExtendedTemporalMemory
 
+from htmresearch.algorithms.anomaly_detection.multi_stream_engine import (
+  computeRawAnomalyScore)
+
 
 class DistalTimestamps1CellPerColumnDetector(AnomalyDetector):
   """The 'numenta' detector, with the following changes:
@@ -54,6 +57,7 @@ class DistalTimestamps1CellPerColumnDetector(AnomalyDetector):
     self.sp = None
     self.spOutput = None
     self.etm = None
+    self.predictedColumns = None
     self.anomalyLikelihood = None
 
 
@@ -112,6 +116,7 @@ class DistalTimestamps1CellPerColumnDetector(AnomalyDetector):
       "seed": 1960,
       "checkInputs": False,
     })
+    self.predictedColumns = np.zeros(2048, dtype="bool")
 
     learningPeriod = math.floor(self.probationaryPeriod / 2.0)
     self.anomalyLikelihood = anomaly_likelihood.AnomalyLikelihood(
@@ -135,12 +140,9 @@ class DistalTimestamps1CellPerColumnDetector(AnomalyDetector):
     self.sp.compute(self.encodedValue, True, self.spOutput)
 
     activeColumns = self.spOutput.nonzero()[0]
-    activeColumnsSet = set(activeColumns.tolist())
-    prevPredictedColumns = set(self.etm.columnForCell(cell)
-                               for cell in self.etm.getPredictiveCells())
-
-    rawScore = (len(activeColumnsSet - prevPredictedColumns) /
-                float(len(activeColumns)))
+    rawScore = computeRawAnomalyScore(activeColumns,
+                                      self.etm.getPredictiveCells(),
+                                      1, self.predictedColumns)
     anomalyScore = self.anomalyLikelihood.anomalyProbability(
       inputData["value"], rawScore, inputData["timestamp"])
     logScore = self.anomalyLikelihood.computeLogLikelihood(anomalyScore)
@@ -0,0 +1,522 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Anomaly detection on many data streams in one host.
+
+A NumentaTMModel is the model of the 'numentaTMLowLevel' NAB detector for one
+stream, without the NAB dependency. It encodes into one preallocated input
+buffer and computes the raw anomaly score with array operations.
+
+A MultiStreamEngine keeps one model per stream. The streams are sharded
+across worker processes by a hash of their id, so the records of a stream
+are always handled in order by the same process, and each stream's model can
+be checkpointed and restored.
+"""
+
+import cPickle as pickle
+import json
+import math
+import multiprocessing
+import os
+import zlib
+
+from collections import OrderedDict
+
+import numpy as np
+
+from nupic.algorithms import anomaly_likelihood
+from nupic.encoders.date import DateEncoder
+from nupic.encoders.random_distributed_scalar import (
+  RandomDistributedScalarEncoder)
+
+from nupic.bindings.algorithms import SpatialPooler, TemporalMemory
+
+
+
+def computeRawAnomalyScore(activeColumns, predictiveCells, cellsPerColumn,
+                           predictedColumns):
+  """
+  The fraction of active columns that had no predictive cells.
+
+  @param activeColumns (numpy array) Indices of the active columns.
+  @param predictiveCells (numpy array) Indices of the cells that were
+  predictive before the columns became active.
+  @param cellsPerColumn (int)
+  @param predictedColumns (numpy bool array) One flag per column, overwritten
+  with the columns that contain a predictive cell.
+
+  @return (float)
+  """
+  if len(activeColumns) == 0:
+    return 0.0
+
+  predictedColumns[:] = False
+  predictedColumns[np.asarray(predictiveCells) // cellsPerColumn] = True
+  numPredicted = np.count_nonzero(predictedColumns[activeColumns])
+  return (len(activeColumns) - numPredicted) / float(len(activeColumns))
+
+
+
+class NumentaTMModel(object):
+  """
+  The SP + TM model of the 'numentaTM' detector for one data stream.
+  """
+
+  def __init__(self, inputMin, inputMax, probationaryPeriod,
+               useLikelihood=True):
+    """
+    @param inputMin (float) Minimum value of the stream, used to choose the
+    resolution of the scalar encoder.
+    @param inputMax (float) Maximum value of the stream.
+    @param probationaryPeriod (int) Number of records the anomaly likelihood
+    learns from before it gives scores.
+    @param useLikelihood (bool) If False, the anomaly score is the raw score.
+    """
+    self.useLikelihood = useLikelihood
+
+    # Initialize the RDSE with a resolution; calculated from the data min and
+    # max, the resolution is specific to the data stream.
+    rangePadding = abs(inputMax - inputMin) * 0.2
+    minVal = inputMin - rangePadding
+    maxVal = (inputMax + rangePadding
+              if inputMin != inputMax
+              else inputMin + 1)
+    numBuckets = 130.0
+    resolution = max(0.001, (maxVal - minVal) / numBuckets)
+    self.valueEncoder = RandomDistributedScalarEncoder(resolution, seed=42)
+    self.timestampEncoder = DateEncoder(timeOfDay=(21, 9.49, ))
+
+    # The timestamp and the value are encoded into views of the SP input.
+    timestampWidth = self.timestampEncoder.getWidth()
+    inputWidth = timestampWidth + self.valueEncoder.getWidth()
+    self.encodedInput = np.zeros(inputWidth, dtype=np.uint32)
+    self.encodedTimestamp = self.encodedInput[:timestampWidth]
+    self.encodedValue = self.encodedInput[timestampWidth:]
+
+    self.sp = SpatialPooler(**{
+      "globalInhibition": True,
+      "columnDimensions": [2048],
+      "inputDimensions": [inputWidth],
+      "potentialRadius": inputWidth,
+      "numActiveColumnsPerInhArea": 40,
+      "seed": 1956,
+      "potentialPct": 0.8,
+      "boostStrength": 0.0,
+      "synPermActiveInc": 0.003,
+      "synPermConnected": 0.2,
+      "synPermInactiveDec": 0.0005,
+    })
+    self.spOutput = np.zeros(2048, dtype=np.uint32)
+
+    self.tm = TemporalMemory(**{
+      "activationThreshold": 20,
+      "cellsPerColumn": 32,
+      "columnDimensions": (2048,),
+      "initialPermanence": 0.24,
+      "maxSegmentsPerCell": 128,
+      "maxSynapsesPerSegment": 128,
+      "minThreshold": 13,
+      "maxNewSynapseCount": 31,
+      "permanenceDecrement": 0.008,
+      "permanenceIncrement": 0.04,
+      "seed": 1960,
+    })
+    self.cellsPerColumn = 32
+    self.predictedColumns = np.zeros(2048, dtype="bool")
+
+    if self.useLikelihood:
+      learningPeriod = int(math.floor(probationaryPeriod / 2.0))
+      self.anomalyLikelihood = anomaly_likelihood.AnomalyLikelihood(
+        learningPeriod=learningPeriod,
+        estimationSamples=probationaryPeriod - learningPeriod,
+        reestimationPeriod=100
+      )
+    else:
+      self.anomalyLikelihood = None
+
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    # The encoder views are recreated from the input buffer.
+    del state["encodedTimestamp"]
+    del state["encodedValue"]
+    return state
+
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    timestampWidth = self.timestampEncoder.getWidth()
+    self.encodedTimestamp = self.encodedInput[:timestampWidth]
+    self.encodedValue = self.encodedInput[timestampWidth:]
+
+
+  def handleRecord(self, timestamp, value):
+    """
+    @param timestamp (datetime)
+    @param value (float)
+
+    @return (tuple) The anomaly score and the raw anomaly score.
+    """
+    self.valueEncoder.encodeIntoArray(value, self.encodedValue)
+    self.timestampEncoder.encodeIntoArray(timestamp, self.encodedTimestamp)
+
+    self.sp.compute(self.encodedInput, True, self.spOutput)
+
+    # The columns with predictive cells are the columns that were predicted
+    # at the previous timestep, so they're read before the TM is computed.
+    activeColumns = self.spOutput.nonzero()[0].astype("uint32")
+    rawScore = computeRawAnomalyScore(activeColumns,
+                                      self.tm.getPredictiveCells(),
+                                      self.cellsPerColumn,
+                                      self.predictedColumns)
+
+    self.tm.compute(activeColumns)
+
+    if self.useLikelihood:
+      # Compute the log-likelihood score
+      anomalyScore = self.anomalyLikelihood.anomalyProbability(
+        value, rawScore, timestamp)
+      logScore = self.anomalyLikelihood.computeLogLikelihood(anomalyScore)
+      return (logScore, rawScore)
+
+    return (rawScore, rawScore)
+
+
+
+class _StreamShard(object):
+  """
+  The models of the streams handled by one process.
+  """
+
+  def __init__(self, modelClass):
+    self.modelClass = modelClass
+    self.models = {}
+
+
+  def addStream(self, streamId, modelParams):
+    if streamId in self.models:
+      raise ValueError("Stream %r already exists" % (streamId,))
+    self.models[streamId] = self.modelClass(**modelParams)
+
+
+  def removeStream(self, streamId):
+    del self.models[streamId]
+
+
+  def handleRecords(self, records):
+    models = self.models
+    return [models[streamId].handleRecord(timestamp, value)
+            for streamId, timestamp, value in records]
+
+
+  def getStreamIds(self):
+    return self.models.keys()
+
+
+  def getStreamState(self, streamId):
+    return pickle.dumps(self.models[streamId], pickle.HIGHEST_PROTOCOL)
+
+
+  def setStreamState(self, streamId, state):
+    self.models[streamId] = pickle.loads(state)
+
+
+
+def _serveShard(connection, modelClass):
+  """
+  Run a _StreamShard in a worker process. Each message is a method name and
+  its arguments, and the reply is the method's return value or the exception
+  it raised.
+  """
+  shard = _StreamShard(modelClass)
+  while True:
+    message = connection.recv()
+    if message is None:
+      break
+
+    methodName, args = message
+    try:
+      connection.send((True, getattr(shard, methodName)(*args)))
+    except Exception as e:
+      connection.send((False, e))
+
+  connection.close()
+
+
+
+class _WorkerShard(object):
+  """
+  Calls the methods of a _StreamShard that lives in a worker process.
+  """
+
+  def __init__(self, modelClass):
+    self.connection, childConnection = multiprocessing.Pipe()
+    self.process = multiprocessing.Process(target=_serveShard,
+                                           args=(childConnection, modelClass))
+    self.process.daemon = True
+    self.process.start()
+    childConnection.close()
+
+
+  def send(self, methodName, *args):
+    self.connection.send((methodName, args))
+
+
+  def receive(self):
+    succeeded, result = self.connection.recv()
+    if not succeeded:
+      raise result
+    return result
+
+
+  def call(self, methodName, *args):
+    self.send(methodName, *args)
+    return self.receive()
+
+
+  def close(self):
+    self.connection.send(None)
+    self.process.join()
+    self.connection.close()
+
+
+
+class _LocalShard(object):
+  """
+  Calls the methods of a _StreamShard in this process, with the same
+  interface as a _WorkerShard.
+  """
+
+  def __init__(self, modelClass):
+    self.shard = _StreamShard(modelClass)
+    self.pending = []
+
+
+  def send(self, methodName, *args):
+    self.pending.append((methodName, args))
+
+
+  def receive(self):
+    methodName, args = self.pending.pop(0)
+    return getattr(self.shard, methodName)(*args)
+
+
+  def call(self, methodName, *args):
+    return getattr(self.shard, methodName)(*args)
+
+
+  def close(self):
+    pass
+
+
+
+class MultiStreamEngine(object):
+  """
+  Hosts one anomaly detection model per data stream.
+
+  Records are handled in batches: each shard gets the records of its streams
+  in the order of the batch, and the shards run in parallel.
+
+  Usage:
+
+    engine = MultiStreamEngine(numWorkers=4)
+    engine.addStream("cpu", inputMin=0.0, inputMax=100.0,
+                     probationaryPeriod=750)
+    scores = engine.handleRecords([("cpu", timestamp, 42.0), ...])
+    engine.checkpoint("/tmp/models")
+    engine.close()
+  """
+
+  def __init__(self, numWorkers=0, modelClass=NumentaTMModel):
+    """
+    @param numWorkers (int)
+    Number of worker processes the streams are sharded across. If 0, every
+    stream is handled in this process.
+
+    @param modelClass (class)
+    Class of the stream models. It is constructed with the keyword arguments
+    given to addStream, must have a handleRecord(timestamp, value) method and
+    must be picklable to be checkpointed.
+    """
+    self.numWorkers = numWorkers
+    self.modelClass = modelClass
+    if numWorkers > 0:
+      self._shards = [_WorkerShard(modelClass) for _ in xrange(numWorkers)]
+    else:
+      self._shards = [_LocalShard(modelClass)]
+    self._shardForStream = OrderedDict()
+
+
+  def __enter__(self):
+    return self
+
+
+  def __exit__(self, *args):
+    self.close()
+
+
+  def close(self):
+    """
+    Stop the worker processes. The models are lost unless they were
+    checkpointed.
+    """
+    for shard in self._shards:
+      shard.close()
+    self._shards = []
+
+
+  def _getShardIndex(self, streamId):
+    # Not hash(), so the sharding doesn't depend on the process.
+    return (zlib.crc32(str(streamId)) & 0xffffffff) % len(self._shards)
+
+
+  def getStreamIds(self):
+    """
+    @return (list) Ids of the streams, in the order they were added.
+    """
+    return self._shardForStream.keys()
+
+
+  def addStream(self, streamId, **modelParams):
+    """
+    Create the model of a new stream.
+
+    @param streamId (str) Id of the stream; it decides the worker process that
+    handles the stream.
+    @param modelParams Keyword arguments of the model class.
+    """
+    shardIndex = self._getShardIndex(streamId)
+    self._shards[shardIndex].call("addStream", streamId, modelParams)
+    self._shardForStream[streamId] = shardIndex
+
+
+  def removeStream(self, streamId):
+    """
+    Delete the model of a stream.
+    """
+    shardIndex = self._shardForStream.pop(streamId)
+    self._shards[shardIndex].call("removeStream", streamId)
+
+
+  def handleRecord(self, streamId, timestamp, value):
+    """
+    @return (tuple) The anomaly score and the raw anomaly score.
+    """
+    shardIndex = self._shardForStream[streamId]
+    return self._shards[shardIndex].call("handleRecords",
+                                         [(streamId, timestamp, value)])[0]
+
+
+  def handleRecords(self, records):
+    """
+    Handle a batch of records, possibly from many streams. The records of each
+    stream are handled in the order they appear in the batch.
+
+    @param records (list) (streamId, timestamp, value) tuples.
+
+    @return (list) The (anomalyScore, rawScore) of each record, in the same
+    order as the records.
+    """
+    # Check every stream id before anything is sent, so that an unknown id
+    # doesn't leave the models of the other streams updated.
+    unknownIds = [record[0] for record in records
+                  if record[0] not in self._shardForStream]
+    if len(unknownIds) > 0:
+      raise KeyError("Unknown stream ids: %r" % (unknownIds,))
+
+    shardRecords = [[] for _ in self._shards]
+    positions = [[] for _ in self._shards]
+    for position, record in enumerate(records):
+      shardIndex = self._shardForStream[record[0]]
+      shardRecords[shardIndex].append(record)
+      positions[shardIndex].append(position)
+
+    # Send every batch before waiting for any, so the workers run together.
+    busyShards = [i for i, batch in enumerate(shardRecords) if len(batch) > 0]
+    for i in busyShards:
+      self._shards[i].send("handleRecords", shardRecords[i])
+
+    # Every reply is received even if a shard failed, so the next call
+    # doesn't read a stale reply.
+    scores = [None] * len(records)
+    error = None
+    for i in busyShards:
+      try:
+        shardScores = self._shards[i].receive()
+      except Exception as e:
+        error = error or e
+        continue
+      for position, score in zip(positions[i], shardScores):
+        scores[position] = score
+
+    if error is not None:
+      raise error
+
+    return scores
+
+
+  def getStreamState(self, streamId):
+    """
+    @return (str) The pickled model of a stream.
+    """
+    shardIndex = self._shardForStream[streamId]
+    return self._shards[shardIndex].call("getStreamState", streamId)
+
+
+  def setStreamState(self, streamId, state):
+    """
+    Replace the model of a stream, or add the stream, from a state returned by
+    getStreamState.
+    """
+    shardIndex = self._getShardIndex(streamId)
+    self._shards[shardIndex].call("setStreamState", streamId, state)
+    self._shardForStream[streamId] = shardIndex
+
+
+  def checkpoint(self, directory):
+    """
+    Save the model of every stream in a directory, one file per stream, with
+    an index of the stream ids.
+    """
+    if not os.path.exists(directory):
+      os.makedirs(directory)
+
+    streamIds = self.getStreamIds()
+    for i, streamId in enumerate(streamIds):
+      with open(os.path.join(directory, "stream%d.pkl" % i), "wb") as f:
+        f.write(self.getStreamState(streamId))
+
+    with open(os.path.join(directory, "streams.json"), "w") as f:
+      json.dump(streamIds, f)
+
+
+  def restore(self, directory):
+    """
+    Load the streams saved by checkpoint, replacing any streams with the same
+    ids.
+    """
+    with open(os.path.join(directory, "streams.json")) as f:
+      streamIds = json.load(f)
+
+    for i, streamId in enumerate(streamIds):
+      with open(os.path.join(directory, "stream%d.pkl" % i), "rb") as f:
+        self.setStreamState(streamId, f.read())
@@ -0,0 +1,478 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""A batched ApicalTiebreakTemporalMemory that advances many streams at once"""
+
+import numbers
+
+import numpy as np
+
+from htmresearch.algorithms.apical_tiebreak_temporal_memory import (
+  ApicalTiebreakTemporalMemory)
+from htmresearch.support import numpy_helpers as np2
+from htmresearch.support.numpy_connections import createRandom
+
+
+
+class ApicalTiebreakBatchMemory(ApicalTiebreakTemporalMemory):
+  """
+  Runs many independent ApicalTiebreakPairMemory instances ("streams") in a
+  single object.
+
+  All streams share one pair of SparseMatrixConnections. Stream i owns cells
+  [i*cellsPerStream, (i+1)*cellsPerStream) and input bits
+  [i*inputSize, (i+1)*inputSize), so the connection matrices are block
+  diagonal and each step's segment activity for every stream is computed with
+  one call per matrix.
+
+  Each stream has its own random number generator, stored in 'self.rng' as a
+  list. The order in which a stream consumes its generator is the same as in a
+  standalone ApicalTiebreakPairMemory, so every stream produces bit-identical
+  results to a separate instance constructed with the same seed.
+
+  Inputs are ragged: one numpy array per stream, using stream-local indices.
+  Outputs are returned the same way.
+  """
+
+  def __init__(self,
+               numStreams=1,
+               columnCount=2048,
+               basalInputSize=0,
+               apicalInputSize=0,
+               cellsPerColumn=32,
+               activationThreshold=13,
+               reducedBasalThreshold=13,
+               initialPermanence=0.21,
+               connectedPermanence=0.50,
+               minThreshold=10,
+               sampleSize=20,
+               permanenceIncrement=0.1,
+               permanenceDecrement=0.1,
+               basalPredictedSegmentDecrement=0.0,
+               apicalPredictedSegmentDecrement=0.0,
+               maxSynapsesPerSegment=-1,
+               seed=42,
+               connectionsImplementation="cpp"):
+    """
+    @param numStreams (int)
+    The number of independent temporal memories
+
+    @param seed (int or sequence)
+    Seed for the random number generators. If an int, every stream uses this
+    seed. Otherwise, one seed per stream.
+
+    All other parameters are per-stream and are documented in
+    ApicalTiebreakTemporalMemory.
+    """
+
+    if isinstance(seed, numbers.Integral):
+      seeds = [seed] * numStreams
+    else:
+      seeds = list(seed)
+      if len(seeds) != numStreams:
+        raise ValueError("Expected %d seeds, got %d" % (numStreams,
+                                                        len(seeds)))
+
+    super(ApicalTiebreakBatchMemory, self).__init__(
+      columnCount=numStreams*columnCount,
+      basalInputSize=numStreams*basalInputSize,
+      apicalInputSize=numStreams*apicalInputSize,
+      cellsPerColumn=cellsPerColumn,
+      activationThreshold=activationThreshold,
+      reducedBasalThreshold=reducedBasalThreshold,
+      initialPermanence=initialPermanence,
+      connectedPermanence=connectedPermanence,
+      minThreshold=minThreshold,
+      sampleSize=sampleSize,
+      permanenceIncrement=permanenceIncrement,
+      permanenceDecrement=permanenceDecrement,
+      basalPredictedSegmentDecrement=basalPredictedSegmentDecrement,
+      apicalPredictedSegmentDecrement=apicalPredictedSegmentDecrement,
+      maxSynapsesPerSegment=maxSynapsesPerSegment,
+      seed=seeds[0] if numStreams > 0 else 42,
+      connectionsImplementation=connectionsImplementation)
+
+    self.numStreams = numStreams
+    self.streamColumnCount = columnCount
+    self.streamCellCount = columnCount * cellsPerColumn
+    self.basalInputSize = basalInputSize
+    self.apicalInputSize = apicalInputSize
+    self.rng = [createRandom(s) for s in seeds]
+
+
+  def compute(self,
+              activeColumns,
+              basalInput,
+              apicalInput=None,
+              basalGrowthCandidates=None,
+              apicalGrowthCandidates=None,
+              learn=True):
+    """
+    Perform one timestep on every stream. This is equivalent to calling
+    ApicalTiebreakPairMemory.compute once per stream.
+
+    @param activeColumns (sequence of numpy arrays)
+    Active columns for each stream
+
+    @param basalInput (sequence of numpy arrays)
+    Active basal input bits for each stream
+
+    @param apicalInput (sequence of numpy arrays or None)
+    Active apical input bits for each stream. If None, no stream has apical
+    input.
+
+    @param basalGrowthCandidates (sequence of numpy arrays or None)
+    If None, the basalInput is assumed to be growth candidates.
+
+    @param apicalGrowthCandidates (sequence of numpy arrays or None)
+    If None, the apicalInput is assumed to be growth candidates.
+
+    @param learn (bool)
+    Whether to grow / reinforce / punish synapses
+    """
+    activeColumns = self._toBatch(activeColumns, self.streamColumnCount)
+    basalInput = self._toBatch(basalInput, self.basalInputSize)
+    apicalInput = self._toBatch(apicalInput, self.apicalInputSize)
+
+    if basalGrowthCandidates is None:
+      basalGrowthCandidates = basalInput
+    else:
+      basalGrowthCandidates = self._toBatch(basalGrowthCandidates,
+                                            self.basalInputSize)
+
+    if apicalGrowthCandidates is None:
+      apicalGrowthCandidates = apicalInput
+    else:
+      apicalGrowthCandidates = self._toBatch(apicalGrowthCandidates,
+                                             self.apicalInputSize)
+
+    self.depolarizeCells(basalInput, apicalInput, learn)
+    self.activateCells(activeColumns, basalInput, apicalInput,
+                       basalGrowthCandidates, apicalGrowthCandidates, learn)
+
+
+  def activateCells(self,
+                    activeColumns,
+                    basalReinforceCandidates,
+                    apicalReinforceCandidates,
+                    basalGrowthCandidates,
+                    apicalGrowthCandidates,
+                    learn=True):
+    """
+    Activate cells in the specified columns, using the result of the previous
+    'depolarizeCells' as predictions. Then learn.
+
+    All arguments use batch indices, i.e. stream-local indices offset by the
+    stream's block. See ApicalTiebreakTemporalMemory.activateCells.
+    """
+
+    # Calculate active cells
+    (correctPredictedCells,
+     burstingColumns) = np2.setCompare(self.predictedCells, activeColumns,
+                                       self.predictedCells / self.cellsPerColumn,
+                                       rightMinusLeft=True)
+    newActiveCells = np.concatenate((correctPredictedCells,
+                                     np2.getAllCellsInColumns(
+                                       burstingColumns, self.cellsPerColumn)))
+
+    # Calculate learning
+    (learningActiveBasalSegments,
+     learningMatchingBasalSegments,
+     basalSegmentsToPunish,
+     newBasalSegmentCells,
+     learningCells) = self._calculateBasalLearning(
+       activeColumns, burstingColumns, correctPredictedCells,
+       self.activeBasalSegments, self.matchingBasalSegments,
+       self.basalPotentialOverlaps)
+
+    (learningActiveApicalSegments,
+     learningMatchingApicalSegments,
+     apicalSegmentsToPunish,
+     newApicalSegmentCells) = self._calculateApicalLearning(
+       learningCells, activeColumns, self.activeApicalSegments,
+       self.matchingApicalSegments, self.apicalPotentialOverlaps)
+
+    # Learn
+    if learn:
+      # Learn on existing segments
+      for learningSegments in (learningActiveBasalSegments,
+                               learningMatchingBasalSegments):
+        self._learnBatch(self.basalConnections, learningSegments,
+                         basalReinforceCandidates, basalGrowthCandidates,
+                         self.basalInputSize, self.basalPotentialOverlaps)
+
+      for learningSegments in (learningActiveApicalSegments,
+                               learningMatchingApicalSegments):
+        self._learnBatch(self.apicalConnections, learningSegments,
+                         apicalReinforceCandidates, apicalGrowthCandidates,
+                         self.apicalInputSize, self.apicalPotentialOverlaps)
+
+      # Punish incorrect predictions
+      if self.basalPredictedSegmentDecrement != 0.0:
+        self.basalConnections.adjustActiveSynapses(
+          basalSegmentsToPunish, basalReinforceCandidates,
+          -self.basalPredictedSegmentDecrement)
+
+      if self.apicalPredictedSegmentDecrement != 0.0:
+        self.apicalConnections.adjustActiveSynapses(
+          apicalSegmentsToPunish, apicalReinforceCandidates,
+          -self.apicalPredictedSegmentDecrement)
+
+      # Grow new segments
+      self._learnOnNewSegmentsBatch(self.basalConnections,
+                                    newBasalSegmentCells,
+                                    basalGrowthCandidates,
+                                    self.basalInputSize)
+      self._learnOnNewSegmentsBatch(self.apicalConnections,
+                                    newApicalSegmentCells,
+                                    apicalGrowthCandidates,
+                                    self.apicalInputSize)
+
+    # Save the results
+    newActiveCells.sort()
+    learningCells.sort()
+    self.activeCells = newActiveCells
+    self.winnerCells = learningCells
+    self.predictedActiveCells = correctPredictedCells
+
+
+  def _learnBatch(self, connections, learningSegments, activeInput,
+                  growthCandidates, inputSize, potentialOverlaps):
+    """
+    Adjust synapses on all streams at once, then grow new synapses one stream
+    at a time with each stream's random number generator.
+    """
+
+    connections.adjustSynapses(learningSegments, activeInput,
+                               self.permanenceIncrement,
+                               -self.permanenceDecrement)
+
+    if len(learningSegments) == 0:
+      return
+
+    segmentStreams = (connections.mapSegmentsToCells(learningSegments) /
+                      self.streamCellCount)
+
+    if self.sampleSize != -1:
+      maxNew = self.sampleSize - potentialOverlaps[learningSegments]
+    if self.maxSynapsesPerSegment != -1:
+      synapseCounts = connections.mapSegmentsToSynapseCounts(learningSegments)
+      numSynapsesToReachMax = self.maxSynapsesPerSegment - synapseCounts
+
+    candidateBounds = self._streamBounds(growthCandidates, inputSize)
+
+    for stream, indices in self._groupByStream(segmentStreams):
+      candidates = growthCandidates[candidateBounds[stream]:
+                                    candidateBounds[stream + 1]]
+      if self.sampleSize == -1:
+        streamMaxNew = len(candidates)
+      else:
+        streamMaxNew = maxNew[indices]
+
+      if self.maxSynapsesPerSegment != -1:
+        streamMaxNew = np.where(streamMaxNew <= numSynapsesToReachMax[indices],
+                                streamMaxNew, numSynapsesToReachMax[indices])
+
+      connections.growSynapsesToSample(learningSegments[indices], candidates,
+                                       streamMaxNew, self.initialPermanence,
+                                       self.rng[stream])
+
+
+  def _learnOnNewSegmentsBatch(self, connections, newSegmentCells,
+                               growthCandidates, inputSize):
+    """
+    Grow new segments, one stream at a time. Streams without growth candidates
+    don't grow segments.
+    """
+
+    if len(newSegmentCells) == 0 or len(growthCandidates) == 0:
+      return
+
+    candidateBounds = self._streamBounds(growthCandidates, inputSize)
+
+    for stream, indices in self._groupByStream(newSegmentCells /
+                                               self.streamCellCount):
+      candidates = growthCandidates[candidateBounds[stream]:
+                                    candidateBounds[stream + 1]]
+      if len(candidates) > 0:
+        self._learnOnNewSegments(connections, self.rng[stream],
+                                 newSegmentCells[indices], candidates,
+                                 self.initialPermanence, self.sampleSize,
+                                 self.maxSynapsesPerSegment)
+
+
+  def _getCellsWithFewestSegments(self, connections, rng, columns,
+                                  cellsPerColumn):
+    """
+    Like ApicalTiebreakTemporalMemory._getCellsWithFewestSegments, but 'rng' is
+    a list of per-stream generators, and each stream's random offsets are drawn
+    from its own generator.
+
+    @param columns (numpy array)
+    Sorted batch column indices
+    """
+    candidateCells = np2.getAllCellsInColumns(columns, cellsPerColumn)
+
+    # Arrange the segment counts into one row per minicolumn.
+    segmentCounts = np.reshape(connections.getSegmentCounts(candidateCells),
+                               newshape=(len(columns),
+                                         cellsPerColumn))
+
+    # Filter to just the cells that are tied for fewest in their minicolumn.
+    minSegmentCounts = np.amin(segmentCounts, axis=1, keepdims=True)
+    candidateCells = candidateCells[np.flatnonzero(segmentCounts ==
+                                                   minSegmentCounts)]
+
+    (_,
+     onePerColumnFilter,
+     numCandidatesInColumns) = np.unique(candidateCells / cellsPerColumn,
+                                         return_index=True, return_counts=True)
+
+    # Draw each stream's offsets from that stream's generator, in column order.
+    offsetPercents = np.empty(len(columns), dtype="float32")
+    columnBounds = self._streamBounds(columns, self.streamColumnCount)
+    for stream in np.flatnonzero(np.diff(columnBounds)):
+      streamOffsets = offsetPercents[columnBounds[stream]:
+                                     columnBounds[stream + 1]]
+      rng[stream].initializeReal32Array(streamOffsets)
+
+    np.add(onePerColumnFilter,
+           offsetPercents*numCandidatesInColumns,
+           out=onePerColumnFilter,
+           casting="unsafe")
+
+    return candidateCells[onePerColumnFilter]
+
+
+  def _toBatch(self, arrays, size):
+    """
+    Convert a ragged sequence of stream-local index arrays into one sorted array
+    of batch indices. Each stream's indices may be in any order.
+
+    @param arrays (sequence of numpy arrays or None)
+    @param size (int) The number of indices per stream
+
+    @return (numpy array)
+    """
+    if arrays is None:
+      return np.empty(0, dtype="uint32")
+
+    if len(arrays) != self.numStreams:
+      raise ValueError("Expected %d streams, got %d" % (self.numStreams,
+                                                        len(arrays)))
+
+    lengths = [len(a) for a in arrays]
+    if sum(lengths) == 0:
+      return np.empty(0, dtype="uint32")
+
+    values = np.concatenate([np.asarray(a, dtype="uint32") for a in arrays])
+    if values.max() >= size:
+      raise ValueError("Index %d is out of range for size %d" % (values.max(),
+                                                                 size))
+    offsets = np.repeat(np.arange(self.numStreams, dtype="uint32") * size,
+                        lengths)
+
+    # The streams' index ranges don't overlap, so sorting the whole batch sorts
+    # each stream's values.
+    batchValues = values + offsets
+    batchValues.sort()
+    return batchValues
+
+
+  def _fromBatch(self, values, size):
+    """
+    Split a sorted array of batch indices into a list of stream-local arrays.
+    """
+    bounds = self._streamBounds(values, size)
+    offsets = np.repeat(np.arange(self.numStreams) * size, np.diff(bounds))
+    return np.split((values - offsets).astype(values.dtype), bounds[1:-1])
+
+
+  def _streamBounds(self, values, size):
+    """
+    @return (numpy array)
+    numStreams + 1 positions splitting the sorted 'values' into streams
+    """
+    return np.searchsorted(values,
+                           np.arange(self.numStreams + 1) * size)
+
+
+  @staticmethod
+  def _groupByStream(streams):
+    """
+    Group positions by stream, keeping each stream's positions in order.
+
+    @param streams (numpy array)
+    The stream of each element
+
+    @return (generator)
+    (stream, indices) pairs in order of stream
+    """
+    sorter = np.argsort(streams, kind="mergesort")
+    uniqueStreams, starts = np.unique(streams[sorter], return_index=True)
+    return zip(uniqueStreams, np.split(sorter, starts[1:]))
+
+
+  def getActiveCells(self):
+    """
+    @return (list of numpy arrays)
+    Active cells for each stream
+    """
+    return self._fromBatch(self.activeCells, self.streamCellCount)
+
+
+  def getPredictedActiveCells(self):
+    """
+    @return (list of numpy arrays)
+    Active cells that were correctly predicted, for each stream
+    """
+    return self._fromBatch(np.sort(self.predictedActiveCells),
+                           self.streamCellCount)
+
+
+  def getWinnerCells(self):
+    """
+    @return (list of numpy arrays)
+    Cells that were selected for learning, for each stream
+    """
+    return self._fromBatch(self.winnerCells, self.streamCellCount)
+
+
+  def getPredictedCells(self):
+    """
+    @return (list of numpy arrays)
+    Cells that were predicted for this timestep, for each stream
+    """
+    return self._fromBatch(np.sort(self.predictedCells), self.streamCellCount)
+
+
+  def numberOfStreams(self):
+    """
+    @return (int) Number of independent temporal memories
+    """
+    return self.numStreams
+
+
+  def numberOfColumns(self):
+    """
+    @return (int) Number of columns in each stream
+    """
+    return self.streamColumnCount
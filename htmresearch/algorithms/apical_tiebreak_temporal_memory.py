@@ -24,7 +24,8 @@
 import numpy as np
 
 from htmresearch.support import numpy_helpers as np2
-from nupic.bindings.math import Random, SparseMatrixConnections
+from htmresearch.support.numpy_connections import (createConnections,
+                                                   createRandom)
 
 
 
@@ -68,7 +69,8 @@ class ApicalTiebreakTemporalMemory(object):
                basalPredictedSegmentDecrement=0.0,
                apicalPredictedSegmentDecrement=0.0,
                maxSynapsesPerSegment=-1,
-               seed=42):
+               seed=42,
+               connectionsImplementation="cpp"):
     """
     @param columnCount (int)
     The number of minicolumns
@@ -122,6 +124,10 @@ class ApicalTiebreakTemporalMemory(object):
 
     @param seed (int)
     Seed for the random number generator.
+
+    @param connectionsImplementation (string)
+    "cpp" to store synapses in nupic.bindings' SparseMatrixConnections, "numpy"
+    to use htmresearch's NumpyConnections, which doesn't need the bindings.
     """
 
     self.columnCount = columnCount
@@ -138,11 +144,13 @@ class ApicalTiebreakTemporalMemory(object):
     self.activationThreshold = activationThreshold
     self.maxSynapsesPerSegment = maxSynapsesPerSegment
 
-    self.basalConnections = SparseMatrixConnections(columnCount*cellsPerColumn,
-                                                    basalInputSize)
-    self.apicalConnections = SparseMatrixConnections(columnCount*cellsPerColumn,
-                                                     apicalInputSize)
-    self.rng = Random(seed)
+    self.basalConnections = createConnections(connectionsImplementation,
+                                              columnCount*cellsPerColumn,
+                                              basalInputSize)
+    self.apicalConnections = createConnections(connectionsImplementation,
+                                               columnCount*cellsPerColumn,
+                                               apicalInputSize)
+    self.rng = createRandom(seed)
     self.activeCells = np.empty(0, dtype="uint32")
     self.winnerCells = np.empty(0, dtype="uint32")
     self.predictedCells = np.empty(0, dtype="uint32")
@@ -1123,7 +1131,8 @@ class ApicalTiebreakSequenceMemory(ApicalTiebreakTemporalMemory):
                basalPredictedSegmentDecrement=0.0,
                apicalPredictedSegmentDecrement=0.0,
                maxSynapsesPerSegment=-1,
-               seed=42):
+               seed=42,
+               connectionsImplementation="cpp"):
     params = {
       "columnCount": columnCount,
       "basalInputSize": columnCount * cellsPerColumn,
@@ -1141,6 +1150,7 @@ class ApicalTiebreakSequenceMemory(ApicalTiebreakTemporalMemory):
       "apicalPredictedSegmentDecrement": apicalPredictedSegmentDecrement,
       "maxSynapsesPerSegment": maxSynapsesPerSegment,
       "seed": seed,
+      "connectionsImplementation": connectionsImplementation,
     }
 
     super(ApicalTiebreakSequenceMemory, self).__init__(**params)
@@ -326,6 +326,10 @@ class ColumnPooler(object):
     support. If there is no feedforward activity, use lateral activity to
     activate a subset of the previous active cells.
 
+    Only the candidate cells (the feedforward supported cells and the
+    previously active cells) are ever looked at, so apart from the overlaps
+    returned by the SparseMatrix this never builds a per-cell array.
+
     Parameters:
     ----------------------------
     @param  feedforwardInput (sequence)
@@ -337,92 +341,29 @@ class ColumnPooler(object):
     """
 
     prevActiveCells = self.activeCells
-    print self.activeCells
 
     # Calculate the feedforward supported cells
     overlaps = self.proximalPermanences.rightVecSumAtNZGteThresholdSparse(
       feedforwardInput, self.connectedPermanenceProximal)
-    feedforwardSupportedCells = numpy.where(
-      overlaps >= self.minThresholdProximal)[0]
-
-    # Calculate the number of active segments on each cell
-    numActiveSegmentsByCell = numpy.zeros(self.cellCount, dtype="int")
-    overlaps = self.internalDistalPermanences.rightVecSumAtNZGteThresholdSparse(
-      prevActiveCells, self.connectedPermanenceDistal)
-    numActiveSegmentsByCell[overlaps >= self.activationThresholdDistal] += 1
+    feedforwardSupportedCells = numpy.flatnonzero(
+      overlaps >= self.minThresholdProximal).astype("uint32")
+
+    # Find the cell of every active segment. Each cell has one segment per
+    # distal matrix, so a cell appears once per active segment.
+    segmentCells = [_cellsWithActiveSegment(self.internalDistalPermanences,
+                                            prevActiveCells,
+                                            self.connectedPermanenceDistal,
+                                            self.activationThresholdDistal)]
     for i, lateralInput in enumerate(lateralInputs):
-      overlaps = self.distalPermanences[i].rightVecSumAtNZGteThresholdSparse(
-        lateralInput, self.connectedPermanenceDistal)
-      numActiveSegmentsByCell[overlaps >= self.activationThresholdDistal] += 1
-
-    chosenCells = []
-
-    # First, activate the FF-supported cells that have the highest number of
-    if len(feedforwardSupportedCells) == 0:
-    # lateral active segments (as long as it's not 0)
-      pass
-    else:
-      numActiveSegsForFFSuppCells = numActiveSegmentsByCell[
-        feedforwardSupportedCells]
-
-      # This loop will select the FF-supported AND laterally-active cells, in
-      # order of descending lateral activation, until we exceed the sdrSize
-      # quorum - but will exclude cells with 0 lateral active segments.
-      ttop = numpy.max(numActiveSegsForFFSuppCells)
-      while ttop > 0 and len(chosenCells) < self.sdrSize:
-        chosenCells = numpy.union1d(chosenCells,
-                    feedforwardSupportedCells[numActiveSegsForFFSuppCells > ttop])
-        ttop -= 1
-
-    # If we haven't filled the sdrSize quorum, add in inertial cells.
-    if len(chosenCells) < self.sdrSize:
-      if self.useInertia:
-        prevCells = numpy.setdiff1d(prevActiveCells, chosenCells)
-        inertialCap = int(len(prevCells) * self.inertiaFactor)
-        if inertialCap > 0:
-          numActiveSegsForPrevCells = numActiveSegmentsByCell[prevCells]
-          # We sort the previously-active cells by number of active lateral
-          # segments (this really helps).  We then activate them in order of
-          # descending lateral activation.
-          sortIndices = numpy.argsort(numActiveSegsForPrevCells)[::-1]
-          prevCells = prevCells[sortIndices]
-          numActiveSegsForPrevCells = numActiveSegsForPrevCells[sortIndices]
-
-          # We use inertiaFactor to limit the number of previously-active cells
-          # which can become active, forcing decay even if we are below quota.
-          prevCells = prevCells[:inertialCap]
-          numActiveSegsForPrevCells = numActiveSegsForPrevCells[:inertialCap]
-
-          # Activate groups of previously active cells by order of their lateral
-          # support until we either meet quota or run out of cells.
-          ttop = numpy.max(numActiveSegsForPrevCells)
-          while ttop >= 0 and len(chosenCells) < self.sdrSize:
-            chosenCells = numpy.union1d(chosenCells,
-                        prevCells[numActiveSegsForPrevCells > ttop])
-            ttop -= 1
-
-    # If we haven't filled the sdrSize quorum, add cells that have feedforward
-    # support and no lateral support.
-    discrepancy = self.sdrSize - len(chosenCells)
-    if discrepancy > 0:
-      remFFcells = numpy.setdiff1d(feedforwardSupportedCells, chosenCells)
-      if len(remFFcells) > discrepancy:
-        # Inhibit cells proportionally to the number of cells that have already
-        # been chosen. If ~0 have been chosen activate ~all of the feedforward
-        # supported cells. If ~sdrSize have been chosen, activate very few of
-        # the feedforward supported cells.
-        n = min(max(discrepancy,
-                    len(remFFcells) * discrepancy / self.sdrSize),
-                len(remFFcells))
-        selected = numpy.empty(n, dtype="uint32")
-        self._random.sample(numpy.asarray(remFFcells, dtype="uint32"),
-                            selected)
-        chosenCells = numpy.append(chosenCells, selected)
-      else:
-        chosenCells = numpy.append(chosenCells, remFFcells)
+      segmentCells.append(
+        _cellsWithActiveSegment(self.distalPermanences[i], lateralInput,
+                                self.connectedPermanenceDistal,
+                                self.activationThresholdDistal))
+    activeSegmentCells = numpy.sort(numpy.concatenate(segmentCells))
 
-    chosenCells.sort()
-    self.activeCells = numpy.asarray(chosenCells, dtype="uint32")
+    self.activeCells = _chooseActiveCells(
+      feedforwardSupportedCells, activeSegmentCells, prevActiveCells,
+      self.sdrSize, self.useInertia, self.inertiaFactor, self._random)
 
 
   def numberOfInputs(self):
@@ -661,3 +602,138 @@ def _countWhereGreaterEqualInRows(sparseMatrix, rows, threshold):
                                                    0, sparseMatrix.nCols(),
                                                    threshold)
              for row in rows)
+
+
+
+def _chooseActiveCells(feedforwardSupportedCells, activeSegmentCells,
+                       prevActiveCells, sdrSize, useInertia, inertiaFactor,
+                       rng):
+  """
+  Choose the active cells from the feedforward supported cells, the cells of
+  the active distal segments and the previously active cells. See
+  ColumnPooler._computeInferenceMode.
+
+  @param  feedforwardSupportedCells (numpy array)
+          Sorted cells with feedforward support
+
+  @param  activeSegmentCells (numpy array)
+          Sorted cells of the active distal segments, one entry per segment
+
+  @param  prevActiveCells (numpy array)
+          Sorted previously active cells
+
+  @param  rng (Random)
+          Used to sample the cells that only have feedforward support
+
+  @return (numpy array)
+          Sorted active cells
+  """
+  # First, activate the FF-supported cells that have the highest number of
+  # lateral active segments, in order of descending lateral activation,
+  # until we exceed the sdrSize quorum. Cells with fewer than 2 lateral
+  # active segments are left for the later steps.
+  chosenCells = _selectByLateralSupport(
+    feedforwardSupportedCells,
+    _countOccurrences(activeSegmentCells, feedforwardSupportedCells),
+    minSupport=2, quota=sdrSize)
+
+  # If we haven't filled the sdrSize quorum, add in inertial cells.
+  if len(chosenCells) < sdrSize and useInertia:
+    prevCells = numpy.setdiff1d(prevActiveCells, chosenCells)
+    inertialCap = int(len(prevCells) * inertiaFactor)
+    if inertialCap > 0:
+      numActiveSegsForPrevCells = _countOccurrences(activeSegmentCells,
+                                                    prevCells)
+
+      # We use inertiaFactor to limit the number of previously-active cells
+      # which can become active, forcing decay even if we are below quota.
+      # Keep the ones with the most active lateral segments (this really
+      # helps).
+      if inertialCap < len(prevCells):
+        sortIndices = numpy.argsort(
+          numActiveSegsForPrevCells)[::-1][:inertialCap]
+        prevCells = prevCells[sortIndices]
+        numActiveSegsForPrevCells = numActiveSegsForPrevCells[sortIndices]
+
+      # Activate groups of previously active cells by order of their lateral
+      # support until we either meet quota or run out of cells.
+      chosenCells = numpy.concatenate((
+        chosenCells,
+        _selectByLateralSupport(prevCells, numActiveSegsForPrevCells,
+                                minSupport=1,
+                                quota=sdrSize - len(chosenCells))))
+
+  # If we haven't filled the sdrSize quorum, add cells that have feedforward
+  # support and no lateral support.
+  discrepancy = sdrSize - len(chosenCells)
+  if discrepancy > 0:
+    remFFcells = numpy.setdiff1d(feedforwardSupportedCells, chosenCells)
+    if len(remFFcells) > discrepancy:
+      # Inhibit cells proportionally to the number of cells that have already
+      # been chosen. If ~0 have been chosen activate ~all of the feedforward
+      # supported cells. If ~sdrSize have been chosen, activate very few of
+      # the feedforward supported cells.
+      n = min(max(discrepancy,
+                  len(remFFcells) * discrepancy / sdrSize),
+              len(remFFcells))
+      selected = numpy.empty(n, dtype="uint32")
+      rng.sample(numpy.asarray(remFFcells, dtype="uint32"), selected)
+      chosenCells = numpy.append(chosenCells, selected)
+    else:
+      chosenCells = numpy.append(chosenCells, remFFcells)
+
+  chosenCells.sort()
+  return numpy.asarray(chosenCells, dtype="uint32")
+
+
+
+def _cellsWithActiveSegment(permanences, activeInput, connectedPermanence,
+                            activationThreshold):
+  """
+  Returns the rows of 'permanences' with at least 'activationThreshold'
+  connected synapses to 'activeInput'.
+  """
+  overlaps = permanences.rightVecSumAtNZGteThresholdSparse(
+    activeInput, connectedPermanence)
+  return numpy.flatnonzero(overlaps >= activationThreshold).astype("uint32")
+
+
+
+def _countOccurrences(sortedValues, values):
+  """
+  For each item in 'values', count how many times it appears in
+  'sortedValues'.
+  """
+  return (numpy.searchsorted(sortedValues, values, side="right") -
+          numpy.searchsorted(sortedValues, values, side="left"))
+
+
+
+def _selectByLateralSupport(cells, support, minSupport, quota):
+  """
+  Equivalent to:
+
+  chosen = []
+  for level in xrange(max(support), minSupport - 1, -1):
+    if len(chosen) >= quota:
+      break
+    chosen = cells[support >= level]
+
+  i.e. take the cells with the most support, one support level at a time,
+  until at least 'quota' cells are chosen, never going below 'minSupport'.
+
+  The levels are found with one counting pass over 'support' rather than one
+  pass per level.
+  """
+  if len(cells) == 0 or quota <= 0:
+    return cells[:0]
+
+  # numAtLeast[k] is the number of cells with support >= k.
+  numAtLeast = numpy.cumsum(numpy.bincount(support)[::-1])[::-1]
+  levels = numpy.flatnonzero(numAtLeast[minSupport:] >= quota)
+  if len(levels) > 0:
+    threshold = minSupport + levels[-1]
+  else:
+    threshold = minSupport
+
+  return cells[support >= threshold]
@@ -19,6 +19,13 @@
 # http://numenta.org/licenses/
 # ----------------------------------------------------------------------
 
+"""
+A discrete hidden Markov model trained with Baum-Welch.
+
+The forward and backward variables are scaled so that alpha sums to 1 at
+every timestep, so long sequences don't underflow.
+"""
+
 import numpy as np
 
 from copy import copy
@@ -30,8 +37,24 @@ def divide(a, b):
   return a/b
 
 
+def _safeDivide(a, b):
+  """
+  Elementwise a/b, except that it's 0 wherever a is 0, like divide().
+  """
+  a, b = np.broadcast_arrays(np.asarray(a, dtype="float"),
+                             np.asarray(b, dtype="float"))
+  return np.divide(a, b, out=np.zeros(a.shape), where=(a != 0))
+
+
 class HMM(object):
-    def __init__(self, numCats, numStates, criterion=0.0001, verbosity=0):
+    def __init__(self, numCats, numStates, criterion=0.0001, verbosity=0,
+                 keepEps=False):
+      """
+      @param keepEps (bool)
+      If True, store the states x states x T tensor of transition
+      probabilities in self.eps during training. Otherwise the transition
+      counts are accumulated without it and self.eps is None.
+      """
       self.A = None # {a_ij} = P(X_t = j | X_t-1 = i)
       self.B = None # {b_ij} = P(Y_t = i | X_t = j)
       self.pi = None # {pi_i} = P(X_0 = i)
@@ -40,121 +63,126 @@ class HMM(object):
       self.observations = []
       self.verbosity = verbosity
       self.criterion = criterion
+      self.keepEps = keepEps
 
     def reset(self):
       self.observations = []
 
-    def _initializeTrial(self, observations):
-      self.observations = observations
-      self.T = len(observations)
-      self.seenValues = set(self.observations)
-      self.alpha = np.zeros((self.numStates,self.T), dtype="float") # {a_it} = P(Y_1 = y_1, ..., Y_t=y_t, X_t=i | theta)
-      self.beta = np.zeros((self.numStates,self.T), dtype="float") # {b_it} = P(Y_t+1 = y_t+1, ..., Y_T=y_T | X_t=i, theta)
-      self.gamma = np.zeros((self.numStates,self.T), dtype="float") # {g_it} = P(X_t = i | Y, theta)
-      self.eps = np.zeros((self.numStates,self.numStates,self.T), dtype="float") # {eps_ijt} = P(X_t = i, Xt+1 = j | Y, theta)
+    def _initializeTrial(self, sequences):
+      self.sequences = [np.asarray(sequence, dtype="int")
+                        for sequence in sequences]
+      self.obs = np.concatenate(self.sequences)
+      self.T = len(self.obs)
+      self.seenValues = set(self.obs.tolist())
+
+      # The first timestep of each sequence
+      self.starts = np.zeros(self.T, dtype="bool")
+      self.starts[np.cumsum([0] + [len(sequence)
+                                   for sequence in self.sequences[:-1]])] = True
+
+      # The arrays are indexed [state, t] but stored time-major, so each
+      # timestep is contiguous.
+      self.alpha = np.zeros((self.T,self.numStates), dtype="float").T # {a_it} = P(X_t=i | Y_1 = y_1, ..., Y_t=y_t, theta)
+      self.beta = np.zeros((self.T,self.numStates), dtype="float").T # {b_it} = P(Y_t+1 = y_t+1, ..., Y_T=y_T | X_t=i, theta), scaled
+      self.gamma = np.zeros((self.T,self.numStates), dtype="float").T # {g_it} = P(X_t = i | Y, theta)
+      self.scale = np.zeros(self.T, dtype="float") # {c_t} = P(Y_t = y_t | Y_1 = y_1, ..., Y_t-1 = y_t-1, theta)
+      self.eps = None # {eps_ijt} = P(X_t = i, Xt+1 = j | Y, theta)
 
       if self.verbosity > 0:
-        print "observations: ", observations
+        print "observations: ", sequences
 
     def _forward(self):
-      y1 = self.observations[0]
-
-      for i in range(self.numStates):
-        self.alpha[i,0] = self.pi[i]
-        self.alpha[i,0] *= self.B[i,y1]
+      alpha = self.alpha.T
+      emissions = self.B[:, self.obs].T
 
+      for t in xrange(self.T):
+        if self.starts[t]:
+          a = self.pi * emissions[t]
+        else:
+          a = alpha[t-1].dot(self.A) * emissions[t]
 
-      for t in range(1, self.T):
-        yt = self.observations[t]
-
-        for j in range(0, self.numStates):
-          sumAlphaT1 = 0.0
-
-          for i in range(0, self.numStates):
-            sumAlphaT1 += self.alpha[i,t-1]*self.A[i,j]
-
-          self.alpha[j,t] = self.B[j, yt]*sumAlphaT1
+        self.scale[t] = a.sum()
+        if self.scale[t] > 0:
+          a /= self.scale[t]
+        alpha[t] = a
 
       if self.verbosity > 0:
         print "alpha: ", self.alpha
 
 
     def _backward(self):
-      for i in range(self.numStates):
-        self.beta[i,self.T-1] = 1.0
-
-      for t in range(self.T-1, 0, -1):
-        yt = self.observations[t]
-
-        for i in range(self.numStates):
-          newBetaiT1 = 0.0
-
-          for j in range(0, self.numStates):
-            newBetaiT1 += self.beta[j,t]*self.A[i,j]*self.B[j,yt]
+      beta = self.beta.T
+      emissions = self.B[:, self.obs].T
+      scale = np.where(self.scale > 0, self.scale, 1.0)
 
-          self.beta[i,t-1] = newBetaiT1
+      for t in xrange(self.T-1, -1, -1):
+        if t == self.T-1 or self.starts[t+1]:
+          beta[t] = 1.0
+        else:
+          beta[t] = self.A.dot(emissions[t+1] * beta[t+1]) / scale[t+1]
 
       if self.verbosity > 0:
         print "beta: ", self.beta
 
     def _update(self):
+      alpha = self.alpha.T
+      beta = self.beta.T
+      emissions = self.B[:, self.obs].T
+
       # updating gamma
-      for t in range(self.T):
-        denom = 0.0
-        for i in range(self.numStates):
-          denom += self.alpha[i,t]*self.beta[i,t]
-
-        for i in range(self.numStates):
-          self.gamma[i,t] = divide(self.alpha[i,t]*self.beta[i,t], denom)
-
-      # updating eps
-      for t in range(self.T-1):
-        for i in range(self.numStates):
-          denom = sum([self.alpha[j,t]*self.beta[j,t] for j in range(self.numStates)])
-          yt1 = self.observations[t+1]
-          for j in range(self.numStates):
-            self.eps[i,j,t] = divide(self.alpha[i,t]*self.A[i,j]*self.beta[j,t+1]*self.B[j,yt1], denom)
+      alphaBeta = alpha * beta
+      denoms = alphaBeta.sum(axis=1)
+      self.gamma.T[:] = _safeDivide(alphaBeta, denoms[:, np.newaxis])
+
+      # The timesteps that are followed by another in the same sequence
+      t = np.flatnonzero(~np.append(self.starts[1:], True))
+
+      # eps[i,j,t] = alpha[i,t]*A[i,j]*beta[j,t+1]*B[j,y_t+1] / (c_t+1 * denom_t)
+      # is the outer product of 'left' and 'right' times A.
+      left = _safeDivide(alpha[t], (self.scale[t+1] * denoms[t])[:, np.newaxis])
+      right = emissions[t+1] * beta[t+1]
+
+      if self.keepEps or self.verbosity > 0:
+        self.eps = np.zeros((self.numStates,self.numStates,self.T), dtype="float")
+        self.eps[:, :, t] = (left.T[:, np.newaxis, :] * self.A[:, :, np.newaxis] *
+                             right.T[np.newaxis, :, :])
 
       if self.verbosity > 0:
         print "gamma: ", self.gamma
         print "eps: ", self.eps
 
       # updating A
-      denoms = np.zeros(self.numStates, dtype="float")
-      for i in range(self.numStates):
-        self.pi[i] = self.gamma[i, 0]
-        for t in range(self.T-1):
-          denoms[i] += self.gamma[i,t]
-
-      for i in range(self.numStates):
-        for j in range(self.numStates):
-          numer = 0.0
-          for t in range(self.T-1):
-            numer += self.eps[i,j,t]
-
-          self.A[i,j] = divide(numer, denoms[i])
+      self.pi = self.gamma[:, self.starts].mean(axis=1)
+      numer = self.A * left.T.dot(right)
+      self.A = _safeDivide(numer, self.gamma[:, t].sum(axis=1)[:, np.newaxis])
 
       if self.verbosity > 0:
         print "A: ", self.A
 
 
       # updating B
-      for i in range(self.numStates):
-        for v in self.seenValues:
-          numer = 0.0
-          denom = 0.0
-          for t in range(self.T):
-            denom += self.gamma[i,t]
-            if self.observations[t] == v:
-              numer += self.gamma[i,t]
-          self.B[i,v] = divide(numer, denom)
+      numer = np.zeros((self.numCats, self.numStates), dtype="float")
+      np.add.at(numer, self.obs, self.gamma.T)
+      seen = sorted(self.seenValues)
+      self.B = self.B.copy()
+      self.B[:, seen] = _safeDivide(numer[seen].T,
+                                    self.gamma.sum(axis=1)[:, np.newaxis])
 
       if self.verbosity > 0:
         print "B: ", self.B
 
 
     def train(self, observations):
-      self._initializeTrial(observations)
+      self.observations = observations
+      self.trainSequences([observations])
+
+
+    def trainSequences(self, sequences):
+      """
+      Run Baum-Welch until convergence on several independent sequences at
+      once. Each sequence starts in a state drawn from pi.
+      """
+      self._initializeTrial(sequences)
 
       while True:
         startA = copy(self.A)
@@ -181,28 +209,19 @@ class HMM(object):
     def predict_next_inputs(self, current_input, threshold=0.3):
       next_inputs = set()
 
-      self._initializeTrial([x for x in self.observations] + [current_input])
+      self.observations = [x for x in self.observations] + [current_input]
+      self._initializeTrial([self.observations])
       t = len(self.observations)-1
 
       # P(X_t = i | Y, theta)
       # Update alpha
       self._forward()
-      denom = 0.0
-      for i in range(self.numStates):
-        denom += self.alpha[i,t]
-
-      curHiddenStateProbs = np.zeros(self.numStates, dtype="float")
-      for i in range(self.numStates):
-        curHiddenStateProbs[i] = divide(self.alpha[i,t], denom)
+      curHiddenStateProbs = _safeDivide(self.alpha[:, t],
+                                        self.alpha[:, t].sum())
 
       # P(X_t+1 | X_t) P(X_t) = A[i,j]
       # P(Y_t+1 | X_t+1) = B[i,j]
-
-      nextObservationProbs = np.zeros(self.numCats, dtype="float")
-      for k in range(self.numCats):
-        for j in range(self.numStates):
-          for i in range(self.numStates):
-            nextObservationProbs[k] += self.B[j,k]*self.A[j,i]*curHiddenStateProbs[i]
+      nextObservationProbs = self.B.T.dot(self.A.dot(curHiddenStateProbs))
 
       for v,p in enumerate(nextObservationProbs):
         if self.verbosity > 0:
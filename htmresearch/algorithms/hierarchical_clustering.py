@@ -20,6 +20,8 @@
 # http://numenta.org/licenses/
 # ----------------------------------------------------------------------
 
+import multiprocessing
+
 import matplotlib.pyplot as plt
 import numpy
 import scipy.cluster.hierarchy
@@ -63,14 +65,25 @@ class HierarchicalClustering(object):
   """
 
 
-  def __init__(self, knn):
+  def __init__(self, knn, blockSize=256, numWorkers=1, overlapsFile=None):
     """
     Initialization for HierarchicalClustering object.
     
     @param knn (nupic.algorithms.KNNClassifier) Populated instance of KNN
         classifer from which to draw training vectors.
+
+    @param blockSize (int) Number of rows per tile when computing the pairwise
+        overlaps. See _computeOverlaps().
+
+    @param numWorkers (int) Number of processes computing overlap tiles.
+
+    @param overlapsFile (string) If given, the condensed overlaps are written
+        to a memory-mapped file at this path instead of being held in memory.
     """
     self._knn = knn
+    self._blockSize = blockSize
+    self._numWorkers = numWorkers
+    self._overlapsFile = overlapsFile
     self._overlaps = None
     self._linkage = None
 
@@ -257,34 +270,39 @@ class HierarchicalClustering(object):
 
   def _populateOverlaps(self):
     sparseDataMatrix = HierarchicalClustering._extractVectorsFromKNN(self._knn)
-    self._overlaps = HierarchicalClustering._computeOverlaps(sparseDataMatrix)
+    self._overlaps = HierarchicalClustering._computeOverlaps(
+      sparseDataMatrix, blockSize=self._blockSize, numWorkers=self._numWorkers,
+      outputFile=self._overlapsFile)
 
 
   @staticmethod
   def _extractVectorsFromKNN(knn):
     dim = len(knn.getPattern(0, sparseBinaryForm=False))
-    sparseRowList = []
-
-    for i in xrange(knn._numPatterns):
-      nzIndices = knn.getPattern(i, sparseBinaryForm=True)
-      sparseRow = scipy.sparse.csr_matrix(
-        (numpy.ones(len(nzIndices), dtype=bool),
-        (numpy.zeros(len(nzIndices)), nzIndices)),
-        shape=(1,dim))
-      sparseRowList.append(sparseRow)
-    
-    sparseDataMatrix = scipy.sparse.vstack(sparseRowList)
+    rows = [numpy.asarray(knn.getPattern(i, sparseBinaryForm=True), dtype=int)
+            for i in xrange(knn._numPatterns)]
+
+    indptr = numpy.zeros(len(rows) + 1, dtype=int)
+    indptr[1:] = numpy.cumsum([len(nzIndices) for nzIndices in rows])
+    indices = numpy.concatenate(rows)
+
+    sparseDataMatrix = scipy.sparse.csr_matrix(
+      (numpy.ones(len(indices), dtype=bool), indices, indptr),
+      shape=(len(rows), dim))
 
     return sparseDataMatrix
 
 
   @staticmethod
-  def _computeOverlaps(data, selfOverlaps=False, dtype="int16"):
+  def _computeOverlaps(data, selfOverlaps=False, dtype="int16",
+                       blockSize=256, numWorkers=1, outputFile=None):
     """
     Calculates all pairwise overlaps between the rows of the input. Returns an
     array of all n(n-1)/2 values in the upper triangular portion of the
     pairwise overlap matrix. Values are returned in row-major order.
 
+    The overlaps are computed as the sparse product of blocks of rows with the
+    transpose of the data, so memory is bounded by the size of one tile.
+
     @param data (scipy.sparse.csr_matrix) A CSR sparse matrix with one vector
         per row. Any non-zero value is considered an active bit.
 
@@ -294,23 +312,103 @@ class HierarchicalClustering(object):
     
     @param dtype (string) Data type of returned array in numpy dtype format.
         Optional, defaults to 'int16'.
+
+    @param blockSize (int) Number of rows per tile. Optional, defaults to 256.
+
+    @param numWorkers (int) If greater than 1, tiles are computed on a process
+        pool of this size. Optional, defaults to 1.
+
+    @param outputFile (string) If given, the overlaps are written to a
+        numpy.memmap at this path, which is returned. Optional.
     
     @returns (numpy.ndarray) A vector of pairwise overlaps as described above.
     """
     nVectors = data.shape[0]
-    nDims = data.shape[1]
     nPairs = (nVectors+1)*nVectors/2 if selfOverlaps else (
       nVectors*(nVectors-1)/2)
-    overlaps = numpy.ndarray(nPairs, dtype=dtype)
-    pos = 0
-
-    for i in xrange(nVectors):
-      start = i if selfOverlaps else i+1
-      a = data[i]
-      b = data[start:]
-      newOverlaps = a.multiply(b).getnnz(1)
-      run = newOverlaps.shape[0]
-      overlaps[pos:pos+run] = newOverlaps
-      pos += run
+
+    if outputFile is None:
+      overlaps = numpy.zeros(nPairs, dtype=dtype)
+    elif nPairs > 0:
+      overlaps = numpy.memmap(outputFile, dtype=dtype, mode="w+",
+                              shape=(nPairs,))
+    else:
+      # numpy.memmap can't map an empty file
+      overlaps = numpy.zeros(0, dtype=dtype)
+
+    binaryData = scipy.sparse.csr_matrix(data, copy=True)
+    binaryData.eliminate_zeros()
+    binaryData.data = numpy.ones(len(binaryData.data), dtype="int32")
+
+    tiles = ((blockStart, min(blockStart + blockSize, nVectors), selfOverlaps,
+              dtype)
+             for blockStart in xrange(0, nVectors, blockSize))
+
+    if numWorkers > 1:
+      pool = multiprocessing.Pool(numWorkers, initializer=_setOverlapData,
+                                  initargs=(binaryData,))
+      try:
+        for pos, tileOverlaps in pool.imap_unordered(_computeOverlapTile,
+                                                     tiles):
+          overlaps[pos:pos+len(tileOverlaps)] = tileOverlaps
+      finally:
+        pool.close()
+        pool.join()
+    else:
+      _setOverlapData(binaryData)
+      try:
+        for tile in tiles:
+          pos, tileOverlaps = _computeOverlapTile(tile)
+          overlaps[pos:pos+len(tileOverlaps)] = tileOverlaps
+      finally:
+        _setOverlapData(None)
+
+    if isinstance(overlaps, numpy.memmap):
+      overlaps.flush()
+
     return overlaps
 
+
+
+# The data of the overlap computation, set in each process before computing
+# tiles so it isn't pickled once per tile.
+_overlapData = None
+_overlapDataTransposed = None
+
+
+
+def _setOverlapData(data):
+  global _overlapData, _overlapDataTransposed
+  _overlapData = data
+  _overlapDataTransposed = data.T.tocsc() if data is not None else None
+
+
+
+def _computeOverlapTile(args):
+  """
+  Compute the overlaps of a block of rows with themselves and all later rows.
+  These are a contiguous run of the condensed overlap vector.
+
+  @param args (tuple) The first and last+1 row of the block, whether to
+      include self-overlaps, and the dtype of the overlaps.
+
+  @returns (tuple) The position of the run in the condensed overlap vector,
+      and a numpy.ndarray with the run.
+  """
+  blockStart, blockEnd, selfOverlaps, dtype = args
+  nVectors = _overlapData.shape[0]
+
+  tile = _overlapData[blockStart:blockEnd].dot(
+    _overlapDataTransposed[:, blockStart:]).toarray()
+
+  # Row i's overlaps start with column i, or i+1 without self-overlaps, so the
+  # upper triangle of the tile in row-major order is the run.
+  firstColumn = 0 if selfOverlaps else 1
+  upper = (numpy.arange(tile.shape[1]) >=
+           numpy.arange(firstColumn, tile.shape[0] + firstColumn)[:, None])
+  tileOverlaps = tile[upper].astype(dtype)
+
+  # The number of overlaps stored before row blockStart
+  pos = blockStart * (nVectors - firstColumn) - blockStart * (blockStart - 1) / 2
+
+  return pos, tileOverlaps
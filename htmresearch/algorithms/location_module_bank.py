@@ -0,0 +1,243 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""Emulates many grid cell modules at once"""
+
+import numpy as np
+
+from htmresearch.algorithms.superficial_location_module import (
+  SuperficialLocationModule2D)
+
+
+
+class LocationModuleBank(object):
+  """
+  A set of SuperficialLocationModule2D modules that are shifted and anchored
+  together.
+
+  The active points of every module are stored in one array, grouped by module,
+  along with the module of each point. Cells are numbered globally: module i's
+  cells follow the cells of modules 0..i-1, the same as concatenating each
+  module's active cells with an offset.
+
+  Each module keeps its own synapses and random number generator, so the bank
+  gives exactly the same results as calling the modules one by one.
+
+  Usage:
+
+    bank = LocationModuleBank([config1, config2, ...], anchorInputSize)
+    bank.shift([di, dj])
+    # Consume bank.getActiveCells()
+    bank.anchor(anchorInput)  # or bank.learn(anchorInput)
+  """
+
+  def __init__(self, moduleConfigs, anchorInputSize):
+    """
+    @param moduleConfigs (list of dicts)
+    The SuperficialLocationModule2D parameters of each module, except for
+    anchorInputSize.
+
+    @param anchorInputSize (int)
+    The number of input bits in the anchor input, shared by every module.
+    """
+    self.modules = [SuperficialLocationModule2D(anchorInputSize=anchorInputSize,
+                                                **config)
+                    for config in moduleConfigs]
+
+    self.cellDimensions = np.array([module.cellDimensions
+                                    for module in self.modules], dtype="int")
+    self.rotationMatrices = np.array([module.rotationMatrix
+                                      for module in self.modules])
+    self.cellFieldsPerUnitDistance = np.array(
+      [module.cellFieldsPerUnitDistance for module in self.modules])
+
+    cellCounts = np.prod(self.cellDimensions, axis=1)
+    self.cellOffsets = np.concatenate(([0], np.cumsum(cellCounts)))
+
+    # Every (iOffset, jOffset) pair of each module, padded to the same length.
+    pairs = [[(iOffset, jOffset)
+              for iOffset in module.pointOffsets
+              for jOffset in module.pointOffsets]
+             for module in self.modules]
+    self.numPointPairs = np.array([len(p) for p in pairs], dtype="int")
+    self.pointPairs = np.zeros((len(self.modules), self.numPointPairs.max(), 2),
+                               dtype="float")
+    for i, p in enumerate(pairs):
+      self.pointPairs[i, :len(p)] = p
+
+    self.reset()
+
+
+  def reset(self):
+    """
+    Clear the active cells.
+    """
+    self.activePoints = np.empty((0,2), dtype="float")
+    self.modulesForActivePoints = np.empty(0, dtype="int")
+    self.cellsForActivePoints = np.empty(0, dtype="int")
+    self.activeCells = np.empty(0, dtype="int")
+
+
+  def _computeActiveCells(self):
+    # Round each coordinate to the nearest cell.
+    flooredActivePoints = np.floor(self.activePoints).astype("int")
+
+    # Convert coordinates to cell numbers.
+    modules = self.modulesForActivePoints
+    self.cellsForActivePoints = (
+      flooredActivePoints[:,0] * self.cellDimensions[modules,1] +
+      flooredActivePoints[:,1] + self.cellOffsets[modules])
+    self.activeCells = np.unique(self.cellsForActivePoints)
+
+
+  def activateRandomLocation(self):
+    """
+    Set the location of each module to a random point.
+    """
+    self.activePoints = (np.random.random(self.cellDimensions.shape) *
+                         self.cellDimensions)
+    self.modulesForActivePoints = np.arange(len(self.modules))
+    self._computeActiveCells()
+
+
+  def shift(self, deltaLocation):
+    """
+    Shift the active cells of every module by a vector.
+
+    @param deltaLocation (pair of floats)
+    A translation vector [di, dj].
+    """
+    # Calculate delta in each module's coordinates.
+    deltaLocationInCellFields = (np.matmul(self.rotationMatrices,
+                                           deltaLocation) *
+                                 self.cellFieldsPerUnitDistance)
+
+    # Shift the active coordinates.
+    modules = self.modulesForActivePoints
+    np.add(self.activePoints, deltaLocationInCellFields[modules],
+           out=self.activePoints)
+    np.mod(self.activePoints, self.cellDimensions[modules],
+           out=self.activePoints)
+
+    self._computeActiveCells()
+
+
+  def anchor(self, anchorInput):
+    """
+    Infer the location of every module from sensory input. Activate any cells
+    with enough active synapses to this sensory input. Deactivate all other
+    cells.
+
+    @param anchorInput (numpy array)
+    A sensory input. This will often come from a feature-location pair layer.
+    """
+    if len(anchorInput) == 0:
+      return
+
+    sensorySupportedCells = []
+    for i, module in enumerate(self.modules):
+      overlaps = module.connections.computeActivity(anchorInput,
+                                                    module.connectedPermanence)
+      module.activeSegments = np.where(
+        overlaps >= module.activationThreshold)[0]
+      sensorySupportedCells.append(
+        module.connections.mapSegmentsToCells(
+          module.activeSegments).astype("int") + self.cellOffsets[i])
+    sensorySupportedCells = np.unique(np.concatenate(sensorySupportedCells))
+
+    # Remove the points of cells that lost their support.
+    remaining = np.in1d(self.cellsForActivePoints, sensorySupportedCells)
+    activePoints = self.activePoints[remaining]
+    modules = self.modulesForActivePoints[remaining]
+
+    # Add points to the newly supported cells. Each module adds one block of
+    # points per offset pair, like SuperficialLocationModule2D.
+    activated = np.setdiff1d(sensorySupportedCells, self.activeCells)
+    if activated.size > 0:
+      activatedModules = np.searchsorted(self.cellOffsets, activated,
+                                         side="right") - 1
+      localCells = activated - self.cellOffsets[activatedModules]
+      activatedCoordsBase = np.column_stack(
+        np.divmod(localCells, self.cellDimensions[activatedModules,1])
+      ).astype("float")
+
+      numPairs = self.numPointPairs[activatedModules]
+      cellIndices = np.repeat(np.arange(len(activated)), numPairs)
+      pairIndices = (np.arange(len(cellIndices)) -
+                     np.repeat(np.cumsum(numPairs) - numPairs, numPairs))
+      order = np.lexsort((cellIndices, pairIndices,
+                          activatedModules[cellIndices]))
+      cellIndices = cellIndices[order]
+      pairIndices = pairIndices[order]
+
+      newModules = activatedModules[cellIndices]
+      activatedCoords = (activatedCoordsBase[cellIndices] +
+                         self.pointPairs[newModules, pairIndices])
+
+      # New points go after each module's remaining points.
+      modules = np.concatenate((modules, newModules))
+      order = np.argsort(modules, kind="mergesort")
+      activePoints = np.concatenate((activePoints, activatedCoords))[order]
+      modules = modules[order]
+
+    self.activePoints = activePoints
+    self.modulesForActivePoints = modules
+    self._computeActiveCells()
+
+
+  def learn(self, anchorInput):
+    """
+    Associate the current location of every module with a sensory input.
+    Subsequently, anchorInput will activate the current locations during
+    anchor().
+
+    @param anchorInput (numpy array)
+    A sensory input. This will often come from a feature-location pair layer.
+    """
+    for i, module in enumerate(self.modules):
+      module.activeCells = self.getActiveCellsForModule(i)
+      module.learn(anchorInput)
+
+
+  def getActiveCells(self):
+    return self.activeCells
+
+
+  def getActiveCellsForModule(self, moduleIndex):
+    """
+    @return (numpy array)
+    The active cells of one module, numbered within that module.
+    """
+    begin, end = np.searchsorted(self.activeCells,
+                                 self.cellOffsets[moduleIndex:moduleIndex+2])
+    return self.activeCells[begin:end] - self.cellOffsets[moduleIndex]
+
+
+  def getActivePointsForModule(self, moduleIndex):
+    """
+    @return (numpy array)
+    The active points of one module, in units of cell fields.
+    """
+    return self.activePoints[self.modulesForActivePoints == moduleIndex]
+
+
+  def numberOfCells(self):
+    return self.cellOffsets[-1]
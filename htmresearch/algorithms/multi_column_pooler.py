@@ -0,0 +1,540 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+A set of fully connected ColumnPoolers that computes the lateral support of
+every column with one sparse matrix operation.
+"""
+
+import numpy
+
+from nupic.bindings.math import SparseMatrix, Random
+
+from htmresearch.algorithms.column_pooler import (ColumnPooler,
+                                                  _chooseActiveCells,
+                                                  _countWhereGreaterEqualInRows,
+                                                  _sampleRange)
+
+
+
+class MultiColumnPooler(object):
+  """
+  Equivalent to 'numColumns' ColumnPoolers where each column receives the
+  previous active cells of every other column as lateral input, in column
+  order, with seeds seed, seed+1, ...  This is how createMultipleL4L2Columns
+  connects its L2 columns.
+
+  Every distal segment of every column is a row of one SparseMatrix, and
+  column j's cells are the inputs j*cellCount ... (j+1)*cellCount - 1. A
+  segment is keyed by its column i, its source column j and its cell c, and
+  gets a row the first time cell c learns in column i. Column i's internal
+  distal segments are the ones with j == i. The first time in a timestep that
+  a column needs its lateral support, the support of every column is computed
+  with one rightVecSumAtNZGteThresholdSparse call rather than one call per
+  pair of columns. Its cost grows with the segments that have learned, not
+  with numColumns * numColumns * cellCount.
+
+  The columns can either all be computed at once with compute(), or one at a
+  time through the objects returned by column(), which can stand in for the
+  ColumnPooler in a ColumnPoolerRegion. A timestep ends when every column has
+  been computed or reset, or when a column is computed a second time.
+  """
+
+  def __init__(self,
+               numColumns,
+               inputWidth,
+               cellCount=4096,
+               sdrSize=40,
+               onlineLearning = False,
+               maxSdrSize = None,
+               minSdrSize = None,
+
+               # Proximal
+               synPermProximalInc=0.1,
+               synPermProximalDec=0.001,
+               initialProximalPermanence=0.6,
+               sampleSizeProximal=20,
+               minThresholdProximal=10,
+               connectedPermanenceProximal=0.50,
+               predictedInhibitionThreshold=20,
+
+               # Distal
+               synPermDistalInc=0.1,
+               synPermDistalDec=0.001,
+               initialDistalPermanence=0.6,
+               sampleSizeDistal=20,
+               activationThresholdDistal=13,
+               connectedPermanenceDistal=0.50,
+               inertiaFactor=1.,
+
+               seed=42):
+    """
+    @param  numColumns (int)
+            The number of cortical columns
+
+    @param  seed (int)
+            Column i's random number generator is seeded with seed + i
+
+    For remaining parameters, see the ColumnPooler __init__ docstring. They
+    apply to every column.
+    """
+
+    assert maxSdrSize is None or maxSdrSize >= sdrSize
+    assert minSdrSize is None or minSdrSize <= sdrSize
+
+    self.numColumns = numColumns
+    self.inputWidth = inputWidth
+    self.cellCount = cellCount
+    self.sdrSize = sdrSize
+    self.onlineLearning = onlineLearning
+    if maxSdrSize is None:
+      self.maxSdrSize = sdrSize
+    else:
+      self.maxSdrSize = maxSdrSize
+    if minSdrSize is None:
+      self.minSdrSize = sdrSize
+    else:
+      self.minSdrSize = minSdrSize
+    self.synPermProximalInc = synPermProximalInc
+    self.synPermProximalDec = synPermProximalDec
+    self.initialProximalPermanence = initialProximalPermanence
+    self.connectedPermanenceProximal = connectedPermanenceProximal
+    self.sampleSizeProximal = sampleSizeProximal
+    self.minThresholdProximal = minThresholdProximal
+    self.predictedInhibitionThreshold = predictedInhibitionThreshold
+    self.synPermDistalInc = synPermDistalInc
+    self.synPermDistalDec = synPermDistalDec
+    self.initialDistalPermanence = initialDistalPermanence
+    self.connectedPermanenceDistal = connectedPermanenceDistal
+    self.sampleSizeDistal = sampleSizeDistal
+    self.activationThresholdDistal = activationThresholdDistal
+    self.inertiaFactor = inertiaFactor
+
+    self.useInertia = True
+
+    self.activeCells = [numpy.empty(0, dtype="uint32")
+                        for _ in xrange(numColumns)]
+    self._random = [Random(seed + i) for i in xrange(numColumns)]
+
+    # Each column's proximal segments only see that column's input, so they
+    # are kept in separate matrices.
+    self.proximalPermanences = [SparseMatrix(cellCount, inputWidth)
+                                for _ in xrange(numColumns)]
+    self.distalPermanences = SparseMatrix(0, numColumns*cellCount)
+
+    # For each (column, source column) that has learned, the row of each
+    # cell's segment or -1, and the column and cell of each row.
+    self._segmentRows = {}
+    self._segmentColumns = numpy.empty(0, dtype="uint32")
+    self._segmentCells = numpy.empty(0, dtype="uint32")
+    self._numSegments = 0
+
+    # The active cells at the start of the current timestep, which are every
+    # column's lateral input.
+    self._prevActiveCells = list(self.activeCells)
+    self._columnsDone = set()
+    self._activeSegmentCells = None
+
+
+  def compute(self, feedforwardInputs, feedforwardGrowthCandidates=None,
+              learn=True, predictedInputs=None):
+    """
+    Runs one time step of every column.
+
+    @param  feedforwardInputs (list of sequences)
+            For each column, sorted indices of active feedforward input bits
+
+    @param  feedforwardGrowthCandidates (list of sequences or None)
+            For each column, sorted indices of feedforward input bits that
+            active cells may grow new synapses to. If None, the
+            feedforwardInputs are used.
+
+    @param  learn (bool)
+            If True, we are learning a new object
+
+    @param  predictedInputs (list of sequences or None)
+            For each column, sorted indices of predicted cells in the TM layer
+    """
+    if feedforwardGrowthCandidates is None:
+      feedforwardGrowthCandidates = feedforwardInputs
+    if predictedInputs is None:
+      predictedInputs = [None] * self.numColumns
+
+    self._endTimestep()
+    for i in xrange(self.numColumns):
+      self.computeColumn(i, feedforwardInputs[i],
+                         feedforwardGrowthCandidates[i], learn,
+                         predictedInputs[i])
+
+
+  def computeColumn(self, column, feedforwardInput=(),
+                    feedforwardGrowthCandidates=None, learn=True,
+                    predictedInput=None):
+    """
+    Runs one time step of a single column. See ColumnPooler.compute.
+    """
+    self._startColumn(column)
+
+    if feedforwardGrowthCandidates is None:
+      feedforwardGrowthCandidates = feedforwardInput
+
+    if not learn:
+      self._computeInferenceMode(column, feedforwardInput)
+    elif not self.onlineLearning:
+      self._computeLearningMode(column, feedforwardInput,
+                                feedforwardGrowthCandidates)
+    else:
+      if (predictedInput is not None and
+          len(predictedInput) > self.predictedInhibitionThreshold):
+        predictedActiveInput = numpy.intersect1d(feedforwardInput,
+                                                 predictedInput)
+        self._computeInferenceMode(column, predictedActiveInput)
+        self._computeLearningMode(column, predictedActiveInput,
+                                  feedforwardGrowthCandidates)
+      elif not (self.minSdrSize <= len(self.activeCells[column])
+                <= self.maxSdrSize):
+        self._computeInferenceMode(column, feedforwardInput)
+        self._computeLearningMode(column, feedforwardInput,
+                                  feedforwardGrowthCandidates)
+      else:
+        self._computeLearningMode(column, feedforwardInput,
+                                  feedforwardGrowthCandidates)
+
+    self._finishColumn(column)
+
+
+  def _computeLearningMode(self, column, feedforwardInput,
+                           feedforwardGrowthCandidates):
+    """
+    See ColumnPooler._computeLearningMode.
+    """
+    prevActiveCells = self.activeCells[column]
+    rng = self._random[column]
+
+    if len(prevActiveCells) < self.minSdrSize:
+      activeCells = _sampleRange(rng, 0, self.cellCount, step=1,
+                                 k=self.sdrSize)
+      activeCells.sort()
+      self.activeCells[column] = activeCells
+
+    activeCells = self.activeCells[column]
+    if len(activeCells) > self.maxSdrSize:
+      return
+
+    if len(feedforwardInput) > 0:
+      ColumnPooler._learn(self.proximalPermanences[column], rng,
+                          activeCells, feedforwardInput,
+                          feedforwardGrowthCandidates, self.sampleSizeProximal,
+                          self.initialProximalPermanence,
+                          self.synPermProximalInc, self.synPermProximalDec,
+                          self.connectedPermanenceProximal)
+
+      # Lateral segments in column order, then internal segments, like the
+      # ColumnPooler.
+      distalInputs = [(j, self._prevActiveCells[j])
+                      for j in xrange(self.numColumns) if j != column]
+      distalInputs.append((column, prevActiveCells))
+      for j, cells in distalInputs:
+        distalInput = cells + j*self.cellCount
+        ColumnPooler._learn(self.distalPermanences, rng,
+                            self._getSegments(column, j, activeCells,
+                                              create=True),
+                            distalInput, distalInput,
+                            self.sampleSizeDistal,
+                            self.initialDistalPermanence,
+                            self.synPermDistalInc, self.synPermDistalDec,
+                            self.connectedPermanenceDistal)
+
+
+  def _computeInferenceMode(self, column, feedforwardInput):
+    """
+    See ColumnPooler._computeInferenceMode.
+    """
+    overlaps = self.proximalPermanences[
+      column].rightVecSumAtNZGteThresholdSparse(
+        feedforwardInput, self.connectedPermanenceProximal)
+    feedforwardSupportedCells = numpy.flatnonzero(
+      overlaps >= self.minThresholdProximal).astype("uint32")
+
+    if self._activeSegmentCells is None:
+      self._computeActiveSegmentCells()
+
+    self.activeCells[column] = _chooseActiveCells(
+      feedforwardSupportedCells, self._activeSegmentCells[column],
+      self.activeCells[column], self.sdrSize, self.useInertia,
+      self.inertiaFactor, self._random[column])
+
+
+  def _computeActiveSegmentCells(self):
+    """
+    Find the active distal segments of every column, given the active cells at
+    the start of the timestep.
+    """
+    if self._numSegments == 0:
+      self._activeSegmentCells = [numpy.empty(0, dtype="uint32")
+                                  for _ in xrange(self.numColumns)]
+      return
+
+    activeInput = numpy.concatenate([
+      cells + j*self.cellCount
+      for j, cells in enumerate(self._prevActiveCells)]).astype("uint32")
+    overlaps = self.distalPermanences.rightVecSumAtNZGteThresholdSparse(
+      activeInput, self.connectedPermanenceDistal)
+    activeSegments = numpy.flatnonzero(
+      overlaps[:self._numSegments] >= self.activationThresholdDistal)
+
+    columns = self._segmentColumns[activeSegments]
+    cells = self._segmentCells[activeSegments]
+    order = numpy.lexsort((cells, columns))
+    columns = columns[order]
+    cells = cells[order]
+    bounds = numpy.searchsorted(columns, numpy.arange(self.numColumns + 1))
+    self._activeSegmentCells = [cells[bounds[i]:bounds[i+1]]
+                                for i in xrange(self.numColumns)]
+
+
+  def _getSegments(self, column, sourceColumn, cells, create=False):
+    """
+    @param create (bool)
+    If True, rows are added for the segments that don't have one yet.
+
+    @return (numpy array)
+    The rows of the segments on 'cells' of 'column' that receive input from
+    'sourceColumn', in the order of 'cells'. Without 'create', the segments
+    that don't have a row are left out.
+    """
+    cells = numpy.asarray(cells, dtype="uint32")
+    cellRows = self._segmentRows.get((column, sourceColumn))
+    if cellRows is None:
+      if not create:
+        return numpy.empty(0, dtype="uint32")
+      cellRows = numpy.full(self.cellCount, -1, dtype="int32")
+      self._segmentRows[column, sourceColumn] = cellRows
+
+    rows = cellRows[cells]
+    missing = rows < 0
+    if not create:
+      return rows[~missing].astype("uint32")
+
+    numNew = numpy.count_nonzero(missing)
+    if numNew > 0:
+      newRows = numpy.arange(self._numSegments, self._numSegments + numNew,
+                             dtype="int32")
+      self._reserveSegments(self._numSegments + numNew)
+      rows[missing] = newRows
+      cellRows[cells[missing]] = newRows
+      self._segmentColumns[newRows] = column
+      self._segmentCells[newRows] = cells[missing]
+      self._numSegments += numNew
+
+    return rows.astype("uint32")
+
+
+  def _reserveSegments(self, numSegments):
+    """
+    Make room for 'numSegments' rows, doubling the capacity as needed.
+    """
+    capacity = len(self._segmentColumns)
+    if numSegments <= capacity:
+      return
+
+    capacity = max(numSegments, 2*capacity)
+    self.distalPermanences.resize(capacity, self.numColumns*self.cellCount)
+    self._segmentColumns = numpy.resize(self._segmentColumns, capacity)
+    self._segmentCells = numpy.resize(self._segmentCells, capacity)
+
+
+  def _startColumn(self, column):
+    if column in self._columnsDone:
+      self._endTimestep()
+
+
+  def _finishColumn(self, column):
+    self._columnsDone.add(column)
+    if len(self._columnsDone) == self.numColumns:
+      self._endTimestep()
+
+
+  def _endTimestep(self):
+    self._prevActiveCells = list(self.activeCells)
+    self._columnsDone.clear()
+    self._activeSegmentCells = None
+
+
+  def column(self, column):
+    """
+    @return (MultiColumnPoolerColumn)
+    An object with the ColumnPooler interface that computes a single column.
+    """
+    return MultiColumnPoolerColumn(self, column)
+
+
+  def numberOfInputs(self):
+    """
+    Returns the number of inputs into each column
+    """
+    return self.inputWidth
+
+
+  def numberOfCells(self):
+    """
+    Returns the number of cells in each column.
+    """
+    return self.cellCount
+
+
+  def getActiveCells(self):
+    """
+    Returns the indices of the active cells.
+    @return (list) For each column, the indices of the active cells.
+    """
+    return self.activeCells
+
+
+  def reset(self):
+    """
+    Reset every column.
+    """
+    self.activeCells = [numpy.empty(0, dtype="uint32")
+                        for _ in xrange(self.numColumns)]
+    self._endTimestep()
+
+
+  def resetColumn(self, column):
+    """
+    Reset a single column. This counts as computing the column for the current
+    timestep.
+    """
+    self._startColumn(column)
+    self.activeCells[column] = numpy.empty(0, dtype="uint32")
+    self._finishColumn(column)
+
+
+  def getUseInertia(self):
+    return self.useInertia
+
+
+  def setUseInertia(self, useInertia):
+    self.useInertia = useInertia
+
+
+
+class MultiColumnPoolerColumn(object):
+  """
+  One column of a MultiColumnPooler, with the ColumnPooler interface.
+  """
+
+  def __init__(self, pooler, column):
+    self.pooler = pooler
+    self.column = column
+
+
+  def compute(self, feedforwardInput=(), lateralInputs=(),
+              feedforwardGrowthCandidates=None, learn=True,
+              predictedInput=None):
+    """
+    See ColumnPooler.compute. 'lateralInputs' is ignored. The lateral input is
+    always the other columns' active cells at the start of the timestep.
+    """
+    self.pooler.computeColumn(self.column, feedforwardInput,
+                              feedforwardGrowthCandidates, learn,
+                              predictedInput)
+
+
+  def numberOfInputs(self):
+    return self.pooler.inputWidth
+
+
+  def numberOfCells(self):
+    return self.pooler.cellCount
+
+
+  def getActiveCells(self):
+    return self.pooler.activeCells[self.column]
+
+
+  def reset(self):
+    self.pooler.resetColumn(self.column)
+
+
+  def getUseInertia(self):
+    return self.pooler.getUseInertia()
+
+
+  def setUseInertia(self, useInertia):
+    self.pooler.setUseInertia(useInertia)
+
+
+  def numberOfProximalSynapses(self, cells=None):
+    """
+    Returns the number of proximal synapses with permanence>0 on these cells.
+    """
+    if cells is None:
+      cells = xrange(self.numberOfCells())
+
+    permanences = self.pooler.proximalPermanences[self.column]
+    return sum(permanences.nNonZerosOnRow(cell) for cell in cells)
+
+
+  def numberOfConnectedProximalSynapses(self, cells=None):
+    """
+    Returns the number of proximal connected synapses on these cells.
+    """
+    if cells is None:
+      cells = xrange(self.numberOfCells())
+
+    return _countWhereGreaterEqualInRows(
+      self.pooler.proximalPermanences[self.column], cells,
+      self.pooler.connectedPermanenceProximal)
+
+
+  def numberOfDistalSegments(self, cells=None):
+    """
+    Returns the total number of distal segments for these cells.
+    """
+    return sum(1 for row in self._distalRows(cells)
+               if self.pooler.distalPermanences.nNonZerosOnRow(row) > 0)
+
+
+  def numberOfDistalSynapses(self, cells=None):
+    """
+    Returns the total number of distal synapses for these cells.
+    """
+    return sum(self.pooler.distalPermanences.nNonZerosOnRow(row)
+               for row in self._distalRows(cells))
+
+
+  def numberOfConnectedDistalSynapses(self, cells=None):
+    """
+    Returns the number of connected distal synapses on these cells.
+    """
+    return _countWhereGreaterEqualInRows(
+      self.pooler.distalPermanences, self._distalRows(cells),
+      self.pooler.connectedPermanenceDistal)
+
+
+  def _distalRows(self, cells):
+    if cells is None:
+      cells = xrange(self.numberOfCells())
+    cells = numpy.asarray(list(cells), dtype="uint32")
+    return numpy.concatenate([
+      self.pooler._getSegments(self.column, j, cells)
+      for j in xrange(self.pooler.numColumns)]).tolist()
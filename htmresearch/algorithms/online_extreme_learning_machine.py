@@ -22,6 +22,7 @@
 
 import numpy as np
 from numpy.linalg import pinv
+from scipy.linalg import cho_factor, cho_solve
 """
 Implementation of the online-sequential extreme learning machine
 
@@ -31,45 +32,71 @@ N.-Y. Liang, G.-B. Huang, P. Saratchandran, and N. Sundararajan,
 Networks," IEEE Transactions on Neural Networks, vol. 17, no. 6, pp. 1411-1423
 """
 
-def sigmoidActFunc(features, weights, bias):
+def sigmoidActFunc(features, weights, bias, out=None):
   assert(features.shape[1] == weights.shape[1])
-  (numSamples, numInputs) = features.shape
-  (numHiddenNeuron, numInputs) = weights.shape
-  V = np.dot(features, np.transpose(weights))
-  for i in range(numHiddenNeuron):
-    V[:, i] += bias[0, i]
-  H = 1 / (1+np.exp(-V))
-  return H
+  V = np.dot(features, np.transpose(weights), out=out)
+  V += bias
+  np.negative(V, out=V)
+  np.exp(V, out=V)
+  V += 1
+  np.reciprocal(V, out=V)
+  return V
 
 
 
 class OSELM(object):
-  def __init__(self, inputs, outputs, numHiddenNeurons, activationFunction):
+  def __init__(self, inputs, outputs, numHiddenNeurons, activationFunction,
+               dtype="float64"):
+    """
+    :param dtype: dtype of the weights and of the matrix M. With "float32" the
+    sequential updates are faster but less accurate.
+    """
 
     self.activationFunction = activationFunction
     self.inputs = inputs
     self.outputs = outputs
     self.numHiddenNeurons = numHiddenNeurons
+    self.dtype = np.dtype(dtype)
 
     # input to hidden weights
-    self.inputWeights = np.random.random((self.numHiddenNeurons, self.inputs))
+    self.inputWeights = np.random.random(
+      (self.numHiddenNeurons, self.inputs)).astype(self.dtype)
     # bias of hidden units
-    self.bias = np.random.random((1, self.numHiddenNeurons)) * 2 - 1
+    self.bias = (np.random.random((1, self.numHiddenNeurons)) * 2 - 1).astype(
+      self.dtype)
     # hidden to output layer connection
-    self.beta = np.random.random((self.numHiddenNeurons, self.outputs))
+    self.beta = np.random.random(
+      (self.numHiddenNeurons, self.outputs)).astype(self.dtype)
 
     # auxiliary matrix used for sequential learning
     self.M = None
 
+    # work arrays of the sequential learning phase, by name
+    self._buffers = {}
+
+
+  def _buffer(self, name, shape):
+    """
+    Return a work array, reusing the previous one if it has the same shape.
+    """
+    buf = self._buffers.get(name)
+    if buf is None or buf.shape != shape:
+      buf = np.empty(shape, dtype=self.dtype)
+      self._buffers[name] = buf
+    return buf
+
 
-  def calculateHiddenLayerActivation(self, features):
+  def calculateHiddenLayerActivation(self, features, out=None):
     """
     Calculate activation level of the hidden layer
     :param features feature matrix with dimension (numSamples, numInputs)
+    :param out optional array of dimension (numSamples, numHiddenNeurons) for
+    the result
     :return: activation level (numSamples, numHiddenNeurons)
     """
+    features = np.asarray(features, dtype=self.dtype)
     if self.activationFunction is "sig":
-      H = sigmoidActFunc(features, self.inputWeights, self.bias)
+      H = sigmoidActFunc(features, self.inputWeights, self.bias, out)
     else:
       print " Unknown activation function type"
       raise NotImplementedError
@@ -88,17 +115,21 @@ class OSELM(object):
 
     # randomly initialize the input->hidden connections
     self.inputWeights = np.random.random((self.numHiddenNeurons, self.inputs))
-    self.inputWeights = self.inputWeights * 2 - 1
+    self.inputWeights = (self.inputWeights * 2 - 1).astype(self.dtype)
 
     if self.activationFunction is "sig":
-      self.bias = np.random.random((1, self.numHiddenNeurons)) * 2 - 1
+      self.bias = (np.random.random((1, self.numHiddenNeurons)) * 2 - 1).astype(
+        self.dtype)
     else:
       print " Unknown activation function type"
       raise NotImplementedError
 
     H0 = self.calculateHiddenLayerActivation(features)
     self.M = pinv(np.dot(np.transpose(H0), H0))
-    self.beta = np.dot(pinv(H0), targets)
+    # The updates assume M is symmetric, so remove the rounding asymmetry
+    self.M += np.transpose(self.M)
+    self.M /= 2
+    self.beta = np.dot(pinv(H0), targets).astype(self.dtype)
 
 
   def train(self, features, targets):
@@ -110,20 +141,100 @@ class OSELM(object):
     (numSamples, numOutputs) = targets.shape
     assert features.shape[0] == targets.shape[0]
 
-    H = self.calculateHiddenLayerActivation(features)
-    Ht = np.transpose(H)
+    H = self.calculateHiddenLayerActivation(
+      features, self._buffer("H", (numSamples, self.numHiddenNeurons)))
     try:
-      self.M -= np.dot(self.M,
-                       np.dot(Ht, np.dot(
-          pinv(np.eye(numSamples) + np.dot(H, np.dot(self.M, Ht))),
-          np.dot(H, self.M))))
-
-      self.beta += np.dot(self.M, np.dot(Ht, targets - np.dot(H, self.beta)))
+      if numSamples == 1:
+        self._trainSample(H[0], targets[0])
+      else:
+        self._trainChunk(H, targets)
     except np.linalg.linalg.LinAlgError:
       print "SVD not converge, ignore the current training cycle"
     # else:
     #   raise RuntimeError
 
+
+  def _trainSample(self, h, target):
+    """
+    Rank-one update of M and beta with the Sherman-Morrison formula, using
+    only the preallocated work arrays.
+    :param h hidden layer activation of one sample (numHiddenNeurons,)
+    :param target target of the sample (numOutputs,)
+    """
+    Mh = np.dot(self.M, h, out=self._buffer("Mh", h.shape))
+    denominator = 1 + np.dot(h, Mh)
+    if not denominator > 0:
+      # M has lost positive definiteness through rounding
+      self._trainChunk(h[np.newaxis, :], target[np.newaxis, :])
+      return
+
+    error = np.dot(h, self.beta,
+                   out=self._buffer("error", (self.outputs,)))
+    np.subtract(target, error, out=error)
+
+    update = np.multiply(Mh[:, np.newaxis], Mh[np.newaxis, :],
+                         out=self._buffer("MUpdate", self.M.shape))
+    update /= denominator
+    self.M -= update
+
+    # M h after the update is Mh / denominator
+    Mh /= denominator
+    betaUpdate = np.multiply(Mh[:, np.newaxis], error[np.newaxis, :],
+                             out=self._buffer("betaUpdate", self.beta.shape))
+    self.beta += betaUpdate
+
+
+  def _trainChunk(self, H, targets):
+    """
+    Rank-k update of M and beta, solving with the Cholesky factorization of
+    the k x k matrix I + H M H' and with its pseudoinverse if that fails.
+    :param H hidden layer activation (numSamples, numHiddenNeurons)
+    :param targets target matrix (numSamples, numOutputs)
+    """
+    numSamples = H.shape[0]
+    HM = np.dot(H, self.M)
+    S = np.dot(HM, np.transpose(H))
+    S.flat[::numSamples + 1] += 1
+    try:
+      G = cho_solve(cho_factor(S), HM)
+    except np.linalg.linalg.LinAlgError:
+      G = np.dot(pinv(S), HM)
+
+    self.M -= np.dot(np.transpose(HM), G)
+    self.beta += np.dot(self.M, np.dot(np.transpose(H),
+                                       targets - np.dot(H, self.beta)))
+
+
+  def trainStream(self, stream, chunkSize=1):
+    """
+    Sequential learning phase over a stream of samples. The samples are
+    trained in chunks of chunkSize, which gives the same result as training
+    them one at a time, up to rounding.
+    :param stream iterable of (features, target) pairs with dimensions
+    (numInputs,) and (numOutputs,)
+    :param chunkSize number of samples per update
+    :return: number of samples trained
+    """
+    features = np.empty((chunkSize, self.inputs), dtype=self.dtype)
+    targets = np.empty((chunkSize, self.outputs), dtype=self.dtype)
+
+    numSamples = 0
+    numPending = 0
+    for feature, target in stream:
+      features[numPending] = feature
+      targets[numPending] = target
+      numPending += 1
+      if numPending == chunkSize:
+        self.train(features, targets)
+        numSamples += numPending
+        numPending = 0
+
+    if numPending > 0:
+      self.train(features[:numPending], targets[:numPending])
+      numSamples += numPending
+
+    return numSamples
+
   def predict(self, features):
     """
     Make prediction with feature matrix
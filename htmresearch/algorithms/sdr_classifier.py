@@ -124,11 +124,15 @@ class SDRClassifier(object):
     # each bucket index during inference
     self._maxBucketIdx = 0
 
-    # The connection weight matrix
-    self._weightMatrix = dict()
+    # The connection weights. These arrays have spare rows and columns so that
+    # they only need to be reallocated when the number of inputs or buckets
+    # doubles. _weightMatrix holds views of the used part of each array, which
+    # are kept in _weightMatrixViews until the weights grow.
+    self._weights = dict()
     for step in self.steps:
-      self._weightMatrix[step] = numpy.zeros(shape=(self._maxInputIdx+1,
-                                                    self._maxBucketIdx+1))
+      self._weights[step] = numpy.zeros(shape=(self._maxInputIdx+1,
+                                               self._maxBucketIdx+1))
+    self._weightMatrixViews = None
 
     # This keeps track of the actual value to use for each bucket index. We
     # start with 1 bucket, no actual value so that the first infer has something
@@ -202,13 +206,7 @@ class SDRClassifier(object):
 
     # Update maxInputIdx and augment weight matrix with zero padding
     if max(patternNZ) > self._maxInputIdx:
-      newMaxInputIdx = max(patternNZ)
-      for nSteps in self.steps:
-        self._weightMatrix[nSteps] = numpy.concatenate((
-          self._weightMatrix[nSteps],
-          numpy.zeros(shape=(newMaxInputIdx-self._maxInputIdx,
-                             self._maxBucketIdx+1))), axis=0)
-      self._maxInputIdx = newMaxInputIdx
+      self._growWeights(max(patternNZ), self._maxBucketIdx)
 
     # ------------------------------------------------------------------------
     # Inference:
@@ -225,13 +223,7 @@ class SDRClassifier(object):
 
       # Update maxBucketIndex and augment weight matrix with zero padding
       if bucketIdx > self._maxBucketIdx:
-        for nSteps in self.steps:
-          self._weightMatrix[nSteps] = numpy.concatenate((
-            self._weightMatrix[nSteps],
-            numpy.zeros(shape=(self._maxInputIdx+1,
-                               bucketIdx-self._maxBucketIdx))), axis=1)
-
-        self._maxBucketIdx = bucketIdx
+        self._growWeights(self._maxInputIdx, bucketIdx)
 
       # Update rolling average of actual values if it's a scalar. If it's
       # not, it must be a category, in which case each bucket only ever
@@ -248,13 +240,25 @@ class SDRClassifier(object):
         else:
           self._actualValues[bucketIdx] = actValue
 
-      for (iteration, learnPatternNZ) in self._patternNZHistory:
-        error = self.calculateError(classification)
+      # The error for each number of steps comes from the most recent
+      # pattern with that number of steps, evaluated just before the weights
+      # are updated.
+      targetDist = numpy.zeros(self._maxBucketIdx + 1)
+      targetDist[bucketIdx] = 1.0
+      errorPatterns = self._historyBySteps()
+      weightMatrices = self._weightMatrix
 
+      for (iteration, learnPatternNZ) in self._patternNZHistory:
         nSteps = self._learnIteration - iteration
         if nSteps in self.steps:
-          for bit in learnPatternNZ:
-            self._weightMatrix[nSteps][bit, :] += self.alpha * error[nSteps]
+          weightMatrix = weightMatrices[nSteps]
+          error = targetDist - self.inferSingleStep(errorPatterns[nSteps],
+                                                    weightMatrix)
+          # A bit that appears twice in the pattern is updated twice.
+          bits, counts = numpy.unique(numpy.asarray(learnPatternNZ,
+                                                    dtype="int"),
+                                      return_counts=True)
+          weightMatrix[bits] += numpy.outer(counts, self.alpha * error)
 
     # ------------------------------------------------------------------------
     # Verbose print
@@ -322,14 +326,152 @@ class SDRClassifier(object):
 
 
   def inferSingleStep(self, patternNZ, weightMatrix):
-    outputActivation = numpy.zeros(self._maxBucketIdx + 1)
-    for bit in patternNZ:
-      outputActivation += weightMatrix[bit, :]
+    outputActivation = weightMatrix[numpy.asarray(patternNZ,
+                                                  dtype="int")].sum(axis=0)
+    return _softmax(outputActivation)
+
+
+  def computeBatch(self, records, learn=False, infer=True):
+    """
+    Process many input samples, in order. Equivalent to calling compute() on
+    each of them, but when only inferring, the likelihoods of all records are
+    computed together.
+
+    Parameters:
+    --------------------------------------------------------------------
+    @param records  Sequence of (recordNum, patternNZ, classification) tuples.
+                See compute().
+    @param learn (bool) if true, learn the samples
+    @param infer (bool) if true, perform inference
+
+    @return     List with the value compute() would return for each record
+    """
+    if learn or not infer or self.verbosity >= 1:
+      return [self.compute(recordNum, patternNZ, classification, learn, infer)
+              for recordNum, patternNZ, classification in records]
+
+    if len(records) == 0:
+      return []
+
+    # Do the bookkeeping that compute() does for every record.
+    maxInputIdx = self._maxInputIdx
+    for recordNum, patternNZ, _ in records:
+      if self._recordNumMinusLearnIteration is None:
+        self._recordNumMinusLearnIteration = recordNum - self._learnIteration
+      self._learnIteration = recordNum - self._recordNumMinusLearnIteration
+      self._patternNZHistory.append((self._learnIteration, patternNZ))
+      maxInputIdx = max(maxInputIdx, max(patternNZ))
+    if maxInputIdx > self._maxInputIdx:
+      self._growWeights(maxInputIdx, self._maxBucketIdx)
+
+    # The weights of each record's bits are consecutive rows of
+    # weightMatrix[allBits], summed with one reduceat.
+    patterns = [numpy.asarray(patternNZ, dtype="int")
+                for _, patternNZ, _ in records]
+    allBits = numpy.concatenate(patterns)
+    patternStarts = numpy.cumsum([0] + [len(pattern)
+                                        for pattern in patterns[:-1]])
+
+    predictDists = dict()
+    for nSteps in self.steps:
+      outputActivation = numpy.add.reduceat(
+        self._weightMatrix[nSteps][allBits], patternStarts, axis=0)
+      predictDists[nSteps] = _softmax(outputActivation)
+
+    results = []
+    for i, (_, _, classification) in enumerate(records):
+      if self.steps[0] == 0:
+        defaultValue = 0
+      else:
+        defaultValue = classification["actValue"]
+      retval = {"actualValues": [x if x is not None else defaultValue
+                                 for x in self._actualValues]}
+      for nSteps in self.steps:
+        retval[nSteps] = predictDists[nSteps][i]
+      results.append(retval)
+
+    return results
+
+
+  @property
+  def _weightMatrix(self):
+    """
+    The used part of the weights, a (maxInputIdx+1, maxBucketIdx+1) array for
+    each number of steps.
+    """
+    if self._weightMatrixViews is None:
+      self._weightMatrixViews = dict(
+        (nSteps, weights[:self._maxInputIdx+1, :self._maxBucketIdx+1])
+        for nSteps, weights in self._weights.iteritems())
+    return self._weightMatrixViews
+
+
+  @_weightMatrix.setter
+  def _weightMatrix(self, weightMatrix):
+    """
+    Replace the weights with a (maxInputIdx+1, maxBucketIdx+1) array for each
+    number of steps. All the arrays must have the same shape, which sets the
+    highest input and bucket indices.
+    """
+    shapes = set(numpy.shape(weights) for weights in weightMatrix.itervalues())
+    if len(shapes) != 1:
+      raise ValueError("The weight matrices have different shapes: %s"
+                       % sorted(shapes))
+    numRows, numColumns = shapes.pop()
+
+    self._weights = dict((nSteps, numpy.asarray(weights, dtype=float))
+                         for nSteps, weights in weightMatrix.iteritems())
+    self._maxInputIdx = numRows - 1
+    self._maxBucketIdx = numColumns - 1
+    self._weightMatrixViews = None
+
+
+  def __getstate__(self):
+    # The views are rebuilt after unpickling, so that they share memory with
+    # the weights again.
+    state = self.__dict__.copy()
+    state["_weightMatrixViews"] = None
+    return state
+
+
+  def __setstate__(self, state):
+    if "_weightMatrix" in state:
+      # Pickled before the weights had spare rows and columns.
+      state["_weights"] = state.pop("_weightMatrix")
+      state["_weightMatrixViews"] = None
+    self.__dict__.update(state)
+
+
+  def _growWeights(self, maxInputIdx, maxBucketIdx):
+    """
+    Make room for inputs up to maxInputIdx and buckets up to maxBucketIdx. New
+    weights are zero.
+    """
+    for nSteps, weights in self._weights.items():
+      numRows, numColumns = weights.shape
+      if maxInputIdx >= numRows or maxBucketIdx >= numColumns:
+        grown = numpy.zeros((max(maxInputIdx + 1, 2*numRows),
+                             max(maxBucketIdx + 1, 2*numColumns)))
+        grown[:numRows, :numColumns] = weights
+        self._weights[nSteps] = grown
+
+    self._maxInputIdx = maxInputIdx
+    self._maxBucketIdx = maxBucketIdx
+    self._weightMatrixViews = None
+
 
-    # softmax normalization
-    expOutputActivation = numpy.exp(outputActivation)
-    predictDist = expOutputActivation / numpy.sum(expOutputActivation)
-    return predictDist
+  def _historyBySteps(self):
+    """
+    @return (dict)
+    For each number of steps in self.steps, the most recent pattern in the
+    history that many steps ago.
+    """
+    patterns = dict()
+    for (iteration, learnPatternNZ) in self._patternNZHistory:
+      nSteps = self._learnIteration - iteration
+      if nSteps in self.steps:
+        patterns[nSteps] = learnPatternNZ
+    return patterns
 
 
   def calculateError(self, classification):
@@ -343,12 +485,20 @@ class SDRClassifier(object):
     targetDist = numpy.zeros(self._maxBucketIdx + 1)
     targetDist[classification["bucketIdx"]] = 1.0
 
-    for (iteration, learnPatternNZ) in self._patternNZHistory:
-      nSteps = self._learnIteration - iteration
-      if nSteps in self.steps:
-        predictDist = self.inferSingleStep(learnPatternNZ,
-                                           self._weightMatrix[nSteps])
-        error[nSteps] = targetDist - predictDist
+    for nSteps, learnPatternNZ in self._historyBySteps().iteritems():
+      predictDist = self.inferSingleStep(learnPatternNZ,
+                                         self._weightMatrix[nSteps])
+      error[nSteps] = targetDist - predictDist
 
     return error
 
+
+
+def _softmax(activation):
+  """
+  Softmax over the last axis. The largest activation is subtracted first so
+  that exp() can't overflow.
+  """
+  expActivation = numpy.exp(activation -
+                            numpy.max(activation, axis=-1, keepdims=True))
+  return expActivation / numpy.sum(expActivation, axis=-1, keepdims=True)
@@ -19,12 +19,18 @@
 # http://numenta.org/licenses/
 # ----------------------------------------------------------------------
 
+from collections import deque
+
 import numpy
 
 class SimpleUnionPooler(object):
   """
   Experimental Simple Union Pooler Python Implementation.
   The simple union pooler computes a union of the last N SDRs
+
+  The history holds the sparse active cells of the last N steps, and a count
+  per input bit of how many of them contain it, so each step only updates the
+  bits entering and leaving the window.
   """
 
   def __init__(self,
@@ -53,7 +59,12 @@ class SimpleUnionPooler(object):
     Reset Union Pooler, clear active cell history
     """
     self._unionSDR = numpy.zeros(shape=(self._numInputs,))
-    self._activeCellsHistory = []
+    self._activeCellsHistory = deque()
+    self._unionCounts = numpy.zeros(self._numInputs, dtype="uint32")
+    self._numUnionCells = 0
+    # Whether _unionSDR holds the union, rather than zeros because of
+    # minHistory
+    self._unionOutput = False
 
 
   def updateHistory(self, activeCells, forceOutput=False):
@@ -66,14 +77,47 @@ class SimpleUnionPooler(object):
     @param forceOutput: if True, a union will be created without regard to
                         minHistory
     """
+    return self._updateHistory(activeCells, forceOutput).copy()
+
+
+  def _updateHistory(self, activeCells, forceOutput):
+    """
+    Like updateHistory, but returns the union SDR array itself, which is
+    updated in place by the following calls.
+    """
+    activeCells = numpy.unique(numpy.asarray(activeCells, dtype="int64"))
+
+    enteredUnion = activeCells[self._unionCounts[activeCells] == 0]
+    self._unionCounts[activeCells] += 1
     self._activeCellsHistory.append(activeCells)
-    if len(self._activeCellsHistory) > self._historyLength:
-      self._activeCellsHistory.pop(0)
 
-    self._unionSDR = numpy.zeros(shape=(self._numInputs,))
+    leavingCells = []
+    while len(self._activeCellsHistory) > self._historyLength:
+      cells = self._activeCellsHistory.popleft()
+      self._unionCounts[cells] -= 1
+      leavingCells.append(cells)
+
+    if len(leavingCells) > 0:
+      # With a historyLength of 0, the cells that entered have left again.
+      leavingCells = numpy.unique(numpy.concatenate(leavingCells))
+      leftUnion = numpy.setdiff1d(
+        leavingCells[self._unionCounts[leavingCells] == 0], enteredUnion,
+        assume_unique=True)
+      enteredUnion = enteredUnion[self._unionCounts[enteredUnion] > 0]
+    else:
+      leftUnion = numpy.empty(0, dtype="int64")
+    self._numUnionCells += len(enteredUnion) - len(leftUnion)
+
     if (len(self._activeCellsHistory) >= self._minHistory) or forceOutput:
-      for i in self._activeCellsHistory:
-        self._unionSDR[i] = 1
+      if self._unionOutput:
+        self._unionSDR[leftUnion] = 0
+        self._unionSDR[enteredUnion] = 1
+      else:
+        self._unionSDR[:] = self._unionCounts > 0
+        self._unionOutput = True
+    elif self._unionOutput:
+      self._unionSDR[:] = 0
+      self._unionOutput = False
 
     return self._unionSDR
 
@@ -115,7 +159,7 @@ class SimpleUnionPooler(object):
         "Output vector dimension does match dimension of union pooler "
         "Expecting %s but got %s" % (self._numInputs, len(outputVector)))
 
-    unionSDR = self.updateHistory(activeBits, forceOutput)
+    unionSDR = self._updateHistory(activeBits, forceOutput)
 
     numpy.copyto(outputVector, unionSDR, casting="unsafe")
 
@@ -124,5 +168,18 @@ class SimpleUnionPooler(object):
     """
     Return the sparsity of the current union SDR
     """
-    sparsity = numpy.sum(self._unionSDR) / self._numInputs
-    return sparsity
\ No newline at end of file
+    if not self._unionOutput:
+      return 0.0
+
+    sparsity = float(self._numUnionCells) / self._numInputs
+    return sparsity
+
+
+  def getUnionSDR(self):
+    """
+    Return the sorted indices of the cells in the current union SDR
+    """
+    if not self._unionOutput:
+      return numpy.empty(0, dtype="int64")
+
+    return numpy.flatnonzero(self._unionCounts)
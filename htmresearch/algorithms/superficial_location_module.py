@@ -26,7 +26,8 @@ import math
 import numpy as np
 
 from htmresearch.support import numpy_helpers as np2
-from nupic.bindings.math import SparseMatrixConnections, Random
+from htmresearch.support.numpy_connections import (createConnections,
+                                                   createRandom)
 
 
 
@@ -107,7 +108,8 @@ class SuperficialLocationModule2D(object):
                permanenceIncrement=0.1,
                permanenceDecrement=0.0,
                maxSynapsesPerSegment=-1,
-               seed=42):
+               seed=42,
+               connectionsImplementation="cpp"):
     """
     @param cellDimensions (tuple(int, int))
     Determines the number of cells. Determines how space is divided between the
@@ -131,6 +133,10 @@ class SuperficialLocationModule2D(object):
     parameter allows you to control where the point is placed and whether multiple
     are placed. For example, With value [0.2, 0.8], it will place 4 points:
     [0.2, 0.2], [0.2, 0.8], [0.8, 0.2], [0.8, 0.8]
+
+    @param connectionsImplementation (string)
+    "cpp" to store synapses in nupic.bindings' SparseMatrixConnections, "numpy"
+    to use htmresearch's NumpyConnections, which doesn't need the bindings.
     """
 
     self.cellDimensions = np.asarray(cellDimensions, dtype="int")
@@ -151,8 +157,9 @@ class SuperficialLocationModule2D(object):
     self.activeCells = np.empty(0, dtype="int")
     self.activeSegments = np.empty(0, dtype="uint32")
 
-    self.connections = SparseMatrixConnections(np.prod(cellDimensions),
-                                               anchorInputSize)
+    self.connections = createConnections(connectionsImplementation,
+                                         np.prod(cellDimensions),
+                                         anchorInputSize)
 
     self.initialPermanence = initialPermanence
     self.connectedPermanence = connectedPermanence
@@ -163,7 +170,7 @@ class SuperficialLocationModule2D(object):
     self.activationThreshold = activationThreshold
     self.maxSynapsesPerSegment = maxSynapsesPerSegment
 
-    self.rng = Random(seed)
+    self.rng = createRandom(seed)
 
 
   def reset(self):
@@ -220,6 +220,7 @@ class TemporalPooler(SpatialPooler):
     # pooling cells have priority during competition
     self._poolingActivation = numpy.zeros((self._numColumns), dtype="int32")
     self._poolingColumns = []
+    self._poolingMask = numpy.zeros(self._numColumns, dtype=realDType)
     # Initialize a tiny random tie breaker. This is used to determine winning
     # columns where the overlaps are identical.
     self._tieBreaker = 0.01 * numpy.array([self._random.getReal64() for i in
@@ -308,6 +309,11 @@ class TemporalPooler(SpatialPooler):
     # stored separately for efficiency purposes.
     self._connectedCounts = numpy.zeros(numColumns, dtype=realDType)
 
+    # The potential pools are also stored as one bit per synapse, so that
+    # learning can look up whether a block of synapses is potential.
+    self._potentialBits = numpy.zeros((numColumns, (numInputs + 7) // 8),
+                                      dtype="uint8")
+
 
     # Initialize the set of permanence values for each column. Ensure that
     # each column is connected to enough input bits to allow it to be
@@ -315,6 +321,7 @@ class TemporalPooler(SpatialPooler):
     for i in xrange(numColumns):
       potential = self._mapPotential(i, wrapAround=self._wrapAround)
       self._potentialPools.replaceSparseRow(i, potential.nonzero()[0])
+      self._potentialBits[i] = numpy.packbits(potential > 0)
       perm = self._initPermanence(potential, initConnectedPct)
       self._updatePermanencesForColumn(perm, i, raisePerm=True)
 
@@ -368,6 +375,7 @@ class TemporalPooler(SpatialPooler):
     """
     self._poolingActivation = numpy.zeros((self._numColumns), dtype="int32")
     self._poolingColumns = []
+    self._poolingMask = numpy.zeros(self._numColumns, dtype=realDType)
     self._overlapDutyCycles = numpy.zeros(self._numColumns, dtype=realDType)
     self._activeDutyCycles = numpy.zeros(self._numColumns, dtype=realDType)
     self._minOverlapDutyCycles = numpy.zeros(self._numColumns,
@@ -377,6 +385,25 @@ class TemporalPooler(SpatialPooler):
     self._boostFactors = numpy.ones(self._numColumns, dtype=realDType)
 
 
+  def __setstate__(self, state):
+    """
+    Initialize class properties from stored values. Poolers pickled before
+    the pooling mask and the packed potential pools existed get them rebuilt
+    from the pooling columns and the potential pools.
+    """
+    numColumns = state["_numColumns"]
+    if "_poolingMask" not in state:
+      poolingMask = numpy.zeros(numColumns, dtype=realDType)
+      poolingMask[state["_poolingColumns"]] = 1
+      state["_poolingMask"] = poolingMask
+    if "_potentialBits" not in state:
+      potentialPools = state["_potentialPools"]
+      state["_potentialBits"] = numpy.array(
+        [numpy.packbits(potentialPools.getRow(i) > 0)
+         for i in xrange(numColumns)], dtype="uint8")
+    super(TemporalPooler, self).__setstate__(state)
+
+
   def compute(self, inputVector, learn, activeArray, burstingColumns,
               predictedCells):
     """
@@ -402,10 +429,35 @@ class TemporalPooler(SpatialPooler):
     assert (numpy.size(inputVector) == self._numInputs)
     assert (numpy.size(predictedCells) == self._numInputs)
 
+    return self.computeSparse(
+      numpy.flatnonzero(numpy.asarray(inputVector).reshape(-1) > 0),
+      learn, activeArray, burstingColumns,
+      numpy.flatnonzero(numpy.asarray(predictedCells).reshape(-1) > 0))
+
+
+  def computeSparse(self, activeInput, learn, activeArray, burstingColumns,
+                    predictedInput):
+    """
+    Like compute, but the active and predicted cells from the Temporal Memory
+    are given as indices.
+
+    @param activeInput:         The indices of the active cells from a
+                                Temporal Memory
+    @param predictedInput:      The indices of the cells that switched from
+                                predicted state in the previous time step to
+                                active state in the current timestep
+
+    See compute for the other parameters.
+    """
+    activeInput = numpy.unique(numpy.asarray(activeInput, dtype=uintType))
+    predictedInput = numpy.unique(numpy.asarray(predictedInput,
+                                                dtype=uintType))
+
     self._updateBookeepingVars(learn)
-    inputVector = numpy.array(inputVector, dtype=realDType)
-    predictedCells = numpy.array(predictedCells, dtype=realDType)
-    inputVector.reshape(-1)
+    inputVector = numpy.zeros(self._numInputs, dtype=realDType)
+    inputVector[activeInput] = 1
+    predictedCells = numpy.zeros(self._numInputs, dtype=realDType)
+    predictedCells[predictedInput] = 1
 
     if self._spVerbosity > 3:
       print " Input bits: ", inputVector.nonzero()[0]
@@ -478,7 +530,7 @@ class TemporalPooler(SpatialPooler):
     activeColumns = self._inhibitColumns(boostedOverlaps)
 
     if learn:
-      self._adaptSynapses(inputVector, activeColumns, predictedCells)
+      self._adaptSynapsesSparse(activeInput, activeColumns, predictedInput)
       self._updateDutyCycles(overlaps, activeColumns)
       self._bumpUpWeakColumns()
       self._updateBoostFactors()
@@ -495,7 +547,8 @@ class TemporalPooler(SpatialPooler):
     activeColWithPredictedInput = activeColumns[activeColumnIndices]
 
     numUnPredictedInput = float(len(burstingColumns.nonzero()[0]))
-    numPredictedInput = float(len(predictedCells))
+    # The length of the dense predictedCells array
+    numPredictedInput = float(self._numInputs)
     fracUnPredicted = numUnPredictedInput / (numUnPredictedInput +
                                              numPredictedInput)
 
@@ -535,7 +588,9 @@ class TemporalPooler(SpatialPooler):
       # reset activation of cells that are receiving predicted input
       self._poolingActivation[activeColWithPredictedInput] = self._poolingLife
 
+    self._poolingMask[self._poolingColumns] = 0
     self._poolingColumns = self._poolingActivation.nonzero()[0]
+    self._poolingMask[self._poolingColumns] = 1
 
 
   def _calculatePoolingActivity(self, predictedActiveCells, learn):
@@ -566,11 +621,11 @@ class TemporalPooler(SpatialPooler):
     """
 
 
-    overlaps = numpy.zeros(self._numColumns).astype(realDType)
+    overlaps = numpy.zeros(self._numColumns, dtype=realDType)
 
     # If no pooling columns or no predicted active inputs, return all zeros
-    if (sum(self._poolingActivation) == 0 or
-       len(predictedActiveCells.nonzero()[0]) == 0):
+    if (len(self._poolingColumns) == 0 or
+       not predictedActiveCells.any()):
       return overlaps
 
     if learn:
@@ -583,14 +638,12 @@ class TemporalPooler(SpatialPooler):
     poolingColumns = self._poolingColumns
 
     # Only consider columns that are in pooling state
-    mask = numpy.zeros(self._numColumns).astype(realDType)
-    mask[poolingColumns] = 1
-    overlaps = overlaps * mask
+    overlaps *= self._poolingMask
     # Pooling TP cells that receive predicted input
     # will have their overlap boosted by a large factor so that they are likely
     # to win the inhibition competition
     boostFactorPooling = self._boostStrength * self._numInputs
-    overlaps = boostFactorPooling * overlaps
+    overlaps *= boostFactorPooling
 
     if self._spVerbosity > 3:
       print "\n============== In _calculatePoolingActivity ======"
@@ -644,33 +697,114 @@ class TemporalPooler(SpatialPooler):
                           the previous time step to active state in the current
                           timestep
     """
-    inputIndices = numpy.where(inputVector > 0)[0]
-    predictedIndices = numpy.where(predictedActiveCells > 0)[0]
-    permChanges = numpy.zeros(self._numInputs)
+    self._adaptSynapsesSparse(
+      numpy.where(inputVector > 0)[0].astype(uintType), activeColumns,
+      numpy.where(predictedActiveCells > 0)[0].astype(uintType))
+
+
+  def _adaptSynapsesSparse(self, activeInput, activeColumns, predictedInput):
+    """
+    Like _adaptSynapses, but the input is given as sorted indices, and all of
+    the active columns are updated together with operations on the nonzero
+    permanences of the sparse matrix.
 
-    # Decrement inactive TM cell -> active TP cell connections
-    permChanges.fill(-1 * self._synPermInactiveDec)
+    Synapses are trimmed by decrementing them by an extra _synPermTrimThreshold
+    and adding it back after clipping at 0. When _synPermInactiveDec is
+    nonzero, the permanences can differ from _adaptSynapses by float32
+    rounding.
 
-    # Increment active TM cell -> active TP cell connections
-    permChanges[inputIndices] = self._synPermActiveInc
+    Parameters:
+    ----------------------------
+    activeInput:    sorted indices of the active cells from temporal memory
+    activeColumns:  an array containing the indices of the columns that
+                    survived the inhibition step
+    predictedInput: sorted indices of the cells that switched from predicted
+                    state in the previous time step to active state in the
+                    current timestep
+    """
+    activeColumns = numpy.unique(numpy.asarray(activeColumns, dtype=uintType))
+    if activeColumns.size == 0:
+      return
 
-    # Increment correctly predicted TM cell -> active TP cell connections
-    permChanges[predictedIndices] = self._synPredictedInc
+    predictedInput = numpy.asarray(predictedInput, dtype=uintType)
+    allInput = numpy.union1d(activeInput, predictedInput).astype(uintType)
+    unpredictedInput = numpy.setdiff1d(activeInput,
+                                       predictedInput).astype(uintType)
 
     if self._spVerbosity > 4:
       print "\n============== _adaptSynapses ======"
-      print "Active input indices:",inputIndices
-      print "predicted input indices:",predictedIndices
+      print "Active input indices:",activeInput
+      print "predicted input indices:",predictedInput
       print "\n============== _adaptSynapses ======\n"
 
-    for i in activeColumns:
-      # Get the permanences of the synapses of TP cell i
-      perm = self._permanences.getRow(i)
+    permanences = self._permanences
+    trimThreshold = self._synPermTrimThreshold
+
+    # Every nonzero permanence is a potential synapse. Synapses that are
+    # decremented below the trim threshold are removed by the clip.
+    if self._synPermInactiveDec > 0:
+      permanences.incrementNonZerosOnRowsExcludingCols(
+        activeColumns, allInput, -(self._synPermInactiveDec + trimThreshold))
+    permanences.incrementNonZerosOnOuter(
+      activeColumns, unpredictedInput, self._synPermActiveInc)
+    permanences.incrementNonZerosOnOuter(
+      activeColumns, predictedInput, self._synPredictedInc)
+    permanences.clipRowsBelowAndAbove(
+      activeColumns, self._synPermMin, self._synPermMax)
+    if self._synPermInactiveDec > 0:
+      permanences.incrementNonZerosOnRowsExcludingCols(
+        activeColumns, allInput, trimThreshold)
+
+    # Potential synapses with a zero permanence start from 0.
+    for inputIndices, increment in ((unpredictedInput, self._synPermActiveInc),
+                                    (predictedInput, self._synPredictedInc)):
+      if inputIndices.size == 0 or increment < trimThreshold:
+        continue
+      potential = self._getPotentialOuter(activeColumns, inputIndices)
+      if potential.all():
+        permanences.setZerosOnOuter(activeColumns, inputIndices,
+                                    min(increment, self._synPermMax))
+      else:
+        # Mask the outer product with the potential pools and set the masked
+        # synapses that have a zero permanence, all in one call.
+        rows, cols = potential.nonzero()
+        rows = activeColumns[rows]
+        cols = inputIndices[cols]
+        zero = permanences.getElements(rows, cols) == 0
+        permanences.setElements(
+          rows[zero], cols[zero],
+          numpy.full(zero.sum(), min(increment, self._synPermMax),
+                     dtype=realDType))
+
+    self._updateConnectedSynapses(activeColumns)
+
+
+  def _getPotentialOuter(self, columns, inputIndices):
+    """
+    @return (numpy array) A boolean matrix with one row per column and one
+    column per input, True where the input is in the column's potential pool.
+    """
+    inputIndices = numpy.asarray(inputIndices, dtype="int64")
+    bits = self._potentialBits[numpy.ix_(columns, inputIndices >> 3)]
+    return ((bits >> (7 - (inputIndices & 7)).astype("uint8")) & 1).astype(bool)
+
 
-      # Only consider connections in column's potential pool (receptive field)
-      maskPotential = numpy.where(self._potentialPools.getRow(i) > 0)[0]
-      perm[maskPotential] += permChanges[maskPotential]
-      self._updatePermanencesForColumn(perm, i, raisePerm=False)
+  def _updateConnectedSynapses(self, columns):
+    """
+    Update the connected synapses and connected counts of these columns from
+    their nonzero permanences. The sparse matrix thresholds each row and
+    returns its connected inputs as an array, rather than a tuple of Python
+    numbers per row.
+    """
+    numInputs = self._numInputs
+    threshold = self._synPermConnected
+    connected = [self._permanences.whereGreaterEqual(column, column + 1, 0,
+                                                     numInputs, threshold)[:, 1]
+                 for column in columns]
+    for column, inputIndices in zip(columns, connected):
+      self._connectedSynapses.replaceSparseRow(column, inputIndices)
+    self._connectedCounts[columns] = [inputIndices.size
+                                      for inputIndices in connected]
 
 
 
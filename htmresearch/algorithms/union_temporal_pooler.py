@@ -61,6 +61,7 @@ class UnionTemporalPooler(SpatialPooler):
                synPermPreviousPredActiveInc=0.0,
                historyLength=0,
                minHistory=0,
+               foldHistoryLearning=False,
                **kwargs):
     """
     Please see spatial_pooler.py in NuPIC for super class parameter
@@ -93,6 +94,13 @@ class UnionTemporalPooler(SpatialPooler):
 
     @param minHistory don't perform union (output all zeros) until buffer
     length >= minHistory
+
+    @param foldHistoryLearning If True, the increments from the historyLength
+    previously predicted inputs are summed and applied as one update, instead
+    of one update per previous step. Faster for long histories, but the
+    result differs when an intermediate permanence is below the trim
+    threshold: e.g. a synapse at zero can grow from increments that would
+    each be trimmed away.
     """
 
     super(UnionTemporalPooler, self).__init__(**kwargs)
@@ -108,6 +116,7 @@ class UnionTemporalPooler(SpatialPooler):
 
     self._historyLength = historyLength
     self._minHistory = minHistory
+    self._foldHistoryLearning = foldHistoryLearning
 
     # initialize excite/decay functions
     if exciteFunctionType == 'Fixed':
@@ -216,19 +225,7 @@ class UnionTemporalPooler(SpatialPooler):
     self._getMostActiveCells()
 
     if learn:
-      # adapt permanence of connections from predicted active inputs to newly active cell
-      # This step is the spatial pooler learning rule, applied only to the predictedActiveInput
-      # Todo: should we also include unpredicted active input in this step?
-      self._adaptSynapses(predictedActiveInput, activeCells, self.getSynPermActiveInc(), self.getSynPermInactiveDec())
-
-      # Increase permanence of connections from predicted active inputs to cells in the union SDR
-      # This is Hebbian learning applied to the current time step
-      self._adaptSynapses(predictedActiveInput, self._unionSDR, self._synPermPredActiveInc, 0.0)
-
-      # adapt permenence of connections from previously predicted inputs to newly active cells
-      # This is a reinforcement learning rule that considers previous input to the current cell
-      for i in xrange(self._historyLength):
-        self._adaptSynapses(self._prePredictedActiveInput[:,i], activeCells, self._synPermPreviousPredActiveInc, 0.0)
+      self._adaptSynapsesForStep(predictedActiveInput, activeCells)
 
       # Homeostasis learning inherited from the spatial pooler
       self._updateDutyCycles(totalOverlap.astype(UINT_DTYPE), activeCells)
@@ -343,6 +340,107 @@ class UnionTemporalPooler(SpatialPooler):
       self._updatePermanencesForColumn(perm, i, raisePerm=False)
 
 
+  def _adaptSynapsesForStep(self, predictedActiveInput, activeCells):
+    """
+    Applies all the permanence updates of one learning step. Gives the same
+    result as calling _adaptSynapses once for each of the rules below, but
+    the permanences of each affected column are read and written only once,
+    and the increments only touch the predicted active inputs.
+
+    Parameters:
+    ----------------------------
+    @param predictedActiveInput:
+                    A numpy array of 0's and 1's with the correctly predicted
+                    input of this time step.
+    @param activeCells:
+                    An array containing the indices of the columns that
+                    survived inhibition.
+    """
+    activeCells = numpy.asarray(activeCells, dtype=UINT_DTYPE)
+    unionCells = numpy.asarray(self._unionSDR, dtype=UINT_DTYPE)
+    columns = numpy.union1d(activeCells, unionCells)
+    if len(columns) == 0:
+      return
+
+    numInputs = self.getNumInputs()
+    perms = numpy.zeros((len(columns), numInputs), dtype=REAL_DTYPE)
+    potentials = numpy.zeros((len(columns), numInputs), dtype=REAL_DTYPE)
+    for row, column in enumerate(columns):
+      self.getPermanence(column, perms[row])
+      self.getPotential(column, potentials[row])
+    potentials = potentials > 0
+
+    activeRows = numpy.searchsorted(columns, activeCells)
+    unionRows = numpy.searchsorted(columns, unionCells)
+    predictedInputs = numpy.where(predictedActiveInput > 0)[0]
+
+    # adapt permanence of connections from predicted active inputs to newly active cell
+    # This step is the spatial pooler learning rule, applied only to the predictedActiveInput
+    # Todo: should we also include unpredicted active input in this step?
+    permChanges = numpy.zeros(numInputs, dtype=REAL_DTYPE)
+    permChanges.fill(-1 * self.getSynPermInactiveDec())
+    permChanges[predictedInputs] = self.getSynPermActiveInc()
+    activePerms = perms[activeRows]
+    activePerms += permChanges * potentials[activeRows]
+    self._trimPermanences(activePerms)
+    perms[activeRows] = activePerms
+
+    # Increase permanence of connections from predicted active inputs to cells in the union SDR
+    # This is Hebbian learning applied to the current time step
+    self._incrementPermanences(perms, potentials, unionRows, predictedInputs,
+                               self._synPermPredActiveInc)
+
+    # adapt permenence of connections from previously predicted inputs to newly active cells
+    # This is a reinforcement learning rule that considers previous input to the current cell
+    if self._foldHistoryLearning and self._historyLength > 0:
+      numPredicted = (self._prePredictedActiveInput > 0).sum(axis=1)
+      previousInputs = numpy.where(numPredicted > 0)[0]
+      self._incrementPermanences(
+        perms, potentials, activeRows, previousInputs,
+        numPredicted[previousInputs] * self._synPermPreviousPredActiveInc)
+    else:
+      for i in xrange(self._historyLength):
+        previousInputs = numpy.where(self._prePredictedActiveInput[:,i] > 0)[0]
+        self._incrementPermanences(perms, potentials, activeRows,
+                                   previousInputs,
+                                   self._synPermPreviousPredActiveInc)
+
+    for row, column in enumerate(columns):
+      self._updatePermanencesForColumn(perms[row], column, raisePerm=False)
+
+
+  def _incrementPermanences(self, perms, potentials, rows, inputs, increment):
+    """
+    Adds increment to the permanences of the given rows and inputs, within
+    the potential pools, then trims and clips them like
+    _updatePermanencesForColumn.
+
+    @param perms: permanences, one row per column
+    @param potentials: boolean potential pools, one row per column
+    @param rows: the rows to update
+    @param inputs: the input indices to update
+    @param increment: a scalar, or one increment per input
+    """
+    if len(rows) == 0 or len(inputs) == 0:
+      return
+
+    block = numpy.ix_(rows, inputs)
+    permChanges = numpy.where(potentials[block], increment, 0).astype(REAL_DTYPE)
+    blockPerms = perms[block]
+    blockPerms += permChanges
+    self._trimPermanences(blockPerms)
+    perms[block] = blockPerms
+
+
+  def _trimPermanences(self, perms):
+    """
+    Sets permanences below the trim threshold to zero and clips the rest to
+    [0, 1], as the spatial pooler does when it stores permanences.
+    """
+    perms[perms < self.getSynPermTrimThreshold()] = 0
+    numpy.clip(perms, 0.0, 1.0, out=perms)
+
+
   def getUnionSDR(self):
     return self._unionSDR
 
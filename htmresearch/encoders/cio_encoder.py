@@ -49,7 +49,7 @@ class CioEncoder(LanguageEncoder):
   def __init__(self, retina=DEFAULT_RETINA, retinaScaling=1.0, cacheDir=None,
                verbosity=0, fingerprintType=EncoderTypes.document,
                unionSparsity=0.20, apiKey=None,
-               maxSparsity=0.50):
+               maxSparsity=0.50, fingerprintStore=None, offline=False):
     """
     @param retina          (str)      Cortical.io retina, either "en_synonymous"
                                       or "en_associative".
@@ -64,10 +64,18 @@ class CioEncoder(LanguageEncoder):
                                       bitmap. If the percentage of bits in the
                                       encoding is > maxSparsity, it will be
                                       randomly subsampled.
+    @param fingerprintStore (FingerprintStore) If not None, fingerprints are
+                                      looked up in this store before the API,
+                                      and the API results are added to it.
+    @param offline         (bool)     Never query the API. Terms that aren't
+                                      in the fingerprint store get a random
+                                      encoding, and texts that aren't in it
+                                      are encoded from their terms.
 
     TODO: replace enum with a simple string
     """
-    if apiKey is None and "CORTICAL_API_KEY" not in os.environ:
+    if (not offline and apiKey is None and
+        "CORTICAL_API_KEY" not in os.environ):
       print ("Missing CORTICAL_API_KEY environment variable. If you have a "
         "key, set it with $ export CORTICAL_API_KEY=api_key\n"
         "You can retrieve a key by registering for the REST API at "
@@ -81,10 +89,16 @@ class CioEncoder(LanguageEncoder):
       root = os.path.dirname(os.path.realpath(__file__))
       cacheDir = os.path.join(root, "CioCache")
 
-    self.apiKey = apiKey if apiKey else os.environ["CORTICAL_API_KEY"]
+    self.apiKey = apiKey if apiKey else os.environ.get("CORTICAL_API_KEY")
     self.retina = retina
+    self.fingerprintStore = fingerprintStore
+    self.offline = offline
 
-    self.client = CorticalClient(self.apiKey, retina=retina, cacheDir=cacheDir)
+    if offline:
+      self.client = None
+    else:
+      self.client = CorticalClient(self.apiKey, retina=retina,
+                                   cacheDir=cacheDir)
 
     self._setDimensions(retinaScaling)
 
@@ -117,9 +131,10 @@ class CioEncoder(LanguageEncoder):
       # Only set cacheDir if value explicitly provided
       self._cacheDir = value
       # Re-init the encoder's Cio client for the new cacheDir
-      self.client = CorticalClient(self.apiKey,
-                                   retina=self.retina,
-                                   cacheDir=value)
+      if not self.offline:
+        self.client = CorticalClient(self.apiKey,
+                                     retina=self.retina,
+                                     cacheDir=value)
 
 
   def __setstate__(self, state):
@@ -129,7 +144,10 @@ class CioEncoder(LanguageEncoder):
     CorticalClient instance includes a cacheDir that does not exist, which is
     likely the case when a model is trained on one machine for reuse elsewhere.
     """
-    if "_cacheDir" not in state:
+    state.setdefault("fingerprintStore", None)
+    state.setdefault("offline", False)
+
+    if "_cacheDir" not in state and not state["offline"]:
       state["client"] = CorticalClient(state["apiKey"],
                                        retina=state["client"].retina,
                                        cacheDir=self.cacheDir)
@@ -167,13 +185,13 @@ class CioEncoder(LanguageEncoder):
 
     try:
       if self.fingerprintType == EncoderTypes.document:
-        encoding = self.client.getTextBitmap(text)
+        encoding = self._getFingerprint("text", text)
 
       elif self.fingerprintType == EncoderTypes.word:
         encoding = self.getUnionEncoding(text)
 
       else:
-        encoding = self.client.getTextBitmap(text)
+        encoding = self._getFingerprint("text", text)
 
     except UnsuccessfulEncodingError:
       if self.verbosity > 0:
@@ -328,7 +346,93 @@ class CioEncoder(LanguageEncoder):
     Return a bitmap for the word. If the Cortical.io API can't encode, cortipy
     will use a random encoding for the word.
     """
-    return self.client.getBitmap(term)["fingerprint"]["positions"]
+    return self._getFingerprint("term", term)["fingerprint"]["positions"]
+
+
+  def _getFingerprint(self, kind, key):
+    """
+    Return the fingerprint dict of a term or a text, from the fingerprint store
+    if it has it, and otherwise from the API.
+
+    @param kind     (str)     "term" or "text".
+    @param key      (str)     The term or text.
+    """
+    if self.fingerprintStore is not None:
+      fingerprint = self.fingerprintStore.get(self.retina, kind, key)
+      if fingerprint is not None:
+        return fingerprint
+
+    if self.offline:
+      if kind == "term":
+        return self._getRandomTermFingerprint(key)
+      raise UnsuccessfulEncodingError(
+        "No stored fingerprint for the text in offline mode.")
+
+    if kind == "term":
+      fingerprint = self.client.getBitmap(key)
+    else:
+      fingerprint = self.client.getTextBitmap(key)
+
+    if self.fingerprintStore is not None:
+      self.fingerprintStore.put(self.retina, kind, key, fingerprint)
+
+    return fingerprint
+
+
+  def _getRandomTermFingerprint(self, term):
+    """
+    Return a random fingerprint for a term, like cortipy does for terms the
+    API can't encode. These are not stored.
+    """
+    n = RETINA_SIZES[self.retina]["width"] * RETINA_SIZES[self.retina]["height"]
+    w = int(n * self.targetSparsity)
+    return {"term": term,
+            "df": 0.0,
+            "score": 0.0,
+            "pos_types": [],
+            "fingerprint": {
+              "positions": self.encodeRandomly(term, w, n).tolist()
+            }}
+
+
+  def prefetch(self, tokens):
+    """
+    Load the fingerprints that encoding each of these tokens needs: term
+    fingerprints for word encoders, otherwise text fingerprints. The stored
+    ones are read with a few queries, and the others are fetched from the API
+    and stored in one transaction. Does nothing without a fingerprint store.
+
+    @param tokens   (iterable)  Tokens that will be encoded.
+    @return         (int)       Number of fingerprints fetched from the API.
+    """
+    if self.fingerprintStore is None:
+      return 0
+
+    kind = "term" if self.fingerprintType == EncoderTypes.word else "text"
+    tokens = set(tokens)
+    stored = self.fingerprintStore.getMany(self.retina, kind, tokens)
+    missing = [token for token in tokens if token not in stored]
+    if self.offline or len(missing) == 0:
+      return 0
+
+    fetched = {}
+    for token in missing:
+      try:
+        if kind == "term":
+          fetched[token] = self.client.getBitmap(token)
+        else:
+          fetched[token] = self.client.getTextBitmap(token)
+      except UnsuccessfulEncodingError:
+        pass
+
+    self.fingerprintStore.putMany(self.retina, kind, fetched)
+    return len(fetched)
+
+
+  def _getClient(self):
+    if self.offline:
+      raise RuntimeError("The Cortical.io API can't be used in offline mode.")
+    return self.client
 
 
   def encodeIntoArray(self, inputText, output):
@@ -357,7 +461,7 @@ class CioEncoder(LanguageEncoder):
     @return                 (list)            List of dictionaries, where keys
                                               are terms and likelihood scores.
     """
-    terms = self.client.bitmapToTerms(encoding, numTerms=numTerms)
+    terms = self._getClient().bitmapToTerms(encoding, numTerms=numTerms)
     # Convert cortipy response to list of tuples (term, weight)
     return [(term["term"], term["score"]) for term in terms]
 
@@ -372,9 +476,10 @@ class CioEncoder(LanguageEncoder):
     try:
       if method == "df":
         tokens = list(itertools.chain.from_iterable(
-          [t.split(",") for t in self.client.tokenize(text)]))
+          [t.split(",") for t in self._getClient().tokenize(text)]))
         encoding = min(
-          [self.client.getBitmap(t) for t in tokens], key=lambda x: x["df"])
+          [self._getFingerprint("term", t) for t in tokens],
+          key=lambda x: x["df"])
       elif method == "keyword":
         encoding = self.getUnionEncoding(text)
       else:
@@ -409,7 +514,7 @@ class CioEncoder(LanguageEncoder):
     if not isinstance(bitmap1 and bitmap2, list):
       raise TypeError("Comparison bitmaps must be lists.")
 
-    return self.client.compare(bitmap1, bitmap2)
+    return self._getClient().compare(bitmap1, bitmap2)
 
 
   def createCategory(self, label, positives, negatives=None):
@@ -428,7 +533,8 @@ class CioEncoder(LanguageEncoder):
     if not isinstance(positives and negatives, list):
       raise TypeError("Input bitmaps must be lists.")
 
-    return self.client.createClassification(label, positives, negatives)
+    return self._getClient().createClassification(label, positives,
+                                                  negatives)
 
 
   def getWidth(self):
@@ -72,6 +72,16 @@ class LanguageEncoder(object):
     raise NotImplementedError
 
 
+  def prefetch(self, tokens):
+    """
+    Load the encodings of these tokens in bulk before they are encoded one at
+    a time. Encoders that fetch encodings from elsewhere override this.
+
+    @param tokens         (iterable)  Tokens that will be encoded.
+    """
+    pass
+
+
   def encodeIntoArray(self, inputText, output):
     """
     Encodes inputData and puts the encoded value into the numpy output array,
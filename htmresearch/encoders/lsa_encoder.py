@@ -21,8 +21,10 @@
 
 import collections
 import gensim
+import itertools
 import numpy
 import operator
+import scipy.sparse
 
 from htmresearch.encoders.language_encoder import LanguageEncoder
 
@@ -40,19 +42,23 @@ class LSAEncoder(LanguageEncoder):
   are used by the encoder. The encoder takes arbitrary text, converts it to the
   topic space via the models, and then creates an SDR. The SDR has a bit for
   each topic. The top `w` topics are set to 1.
+
+  Use encodeCorpus() to encode many texts: the texts are projected into the
+  topic space with one sparse matrix product per chunk.
   """
 
-  def __init__(self):
-    self.dictionary = gensim.corpora.Dictionary.load_from_text(
-        "wiki/wiki_en_wordids.txt")
+  def __init__(self, tfidfModelPath, languageModelPath,
+               dictionaryPath="wiki/wiki_en_wordids.txt", w=None):
+    self.dictionary = gensim.corpora.Dictionary.load_from_text(dictionaryPath)
     self.tfidf = gensim.models.TfidfModel.load(tfidfModelPath)
     self.lsa = gensim.models.lsimodel.LsiModel.load(languageModelPath)
 
     self.n = self.lsa.num_topics
-    if width:
+    if w:
       self.w = w
     else:
-      self.w = int(float(self.n) * 0.05)
+      # Small models still get one active bit.
+      self.w = max(1, int(float(self.n) * 0.05))
 
     self.description = ("LSA Encoder", 0)
 
@@ -75,10 +81,7 @@ class LSAEncoder(LanguageEncoder):
 
     TODO: test tokenization logic for str and list inputs
     """
-    if isinstance(text, str):
-      text = self._tokenize(text)
-
-    bow = self.dictionary.doc2bow(text.lower().split())
+    bow = self.dictionary.doc2bow(self._getTokens(text))
     tfidf = self.tfidf[bow]
     weights = self.lsa[tfidf]
     topWeights = sorted(weights, key=operator.itemgetter(1))[-self.w:]
@@ -94,8 +97,99 @@ class LSAEncoder(LanguageEncoder):
       raise TypeError("Expected a string input but got input of type {}."
                       .format(type(inputText)))
 
-    ## TODO
-    pass
+    output[:] = self.encode(inputText)
+
+
+  def encodeCorpus(self, texts, chunkSize=1000):
+    """
+    Encodes many texts. Each chunk of texts is converted to a sparse
+    term-document matrix, weighted by tf-idf and projected into the topic space
+    with one matrix product, and the top `w` topics of every text are selected
+    together. Only one chunk of texts and topic weights is in memory at a time.
+
+    Topics are ranked by their weight, as in encode(). encode() chooses only
+    among the topics with a nonzero weight, so the two can differ for texts
+    with fewer than `w` of them, e.g. texts with no known terms.
+
+    @param  texts     (iterable)  Texts, as str or lists of tokens, as in
+                                  encode(). This may be a generator.
+    @param  chunkSize (int)       Number of texts to encode at a time.
+    @return           (scipy.sparse.csr_matrix) One SDR per row, with the
+                                  active bits of each row in ascending order.
+    """
+    texts = iter(texts)
+    indices = []
+    while True:
+      chunk = list(itertools.islice(texts, chunkSize))
+      if len(chunk) == 0:
+        break
+      weights = self._projectCorpus(chunk)
+      activeTopics = numpy.argpartition(-weights, self.w - 1,
+                                        axis=1)[:, :self.w]
+      activeTopics.sort(axis=1)
+      indices.append(activeTopics.astype("int32").ravel())
+
+    numTexts = sum(len(chunkIndices) for chunkIndices in indices) // self.w
+    indices = (numpy.concatenate(indices) if len(indices) > 0
+               else numpy.empty(0, dtype="int32"))
+    return scipy.sparse.csr_matrix(
+      (numpy.ones(len(indices), dtype="bool"), indices,
+       numpy.arange(0, len(indices) + 1, self.w)),
+      shape=(numTexts, self.n))
+
+
+  def _getTokens(self, text):
+    """Lowercase tokens of a text, as they are looked up in the dictionary."""
+    if isinstance(text, basestring):
+      text = self._tokenize(text)
+    return " ".join(text).lower().split()
+
+
+  def _projectCorpus(self, texts):
+    """
+    @return (numpy.ndarray) The topic weights of each text, one text per row.
+    """
+    token2id = self.dictionary.token2id
+    rows = []
+    termIds = []
+    for i, text in enumerate(texts):
+      ids = [token2id[token] for token in self._getTokens(text)
+             if token in token2id]
+      rows.extend([i] * len(ids))
+      termIds.extend(ids)
+
+    # Duplicate entries are summed into term counts
+    counts = scipy.sparse.csr_matrix(
+      (numpy.ones(len(termIds)), (rows, termIds)),
+      shape=(len(texts), len(self.dictionary)))
+
+    if self.tfidf.normalize is True:
+      tfidf = counts * scipy.sparse.diags(self._getIdfs(), 0)
+      norms = numpy.sqrt(numpy.asarray(tfidf.multiply(tfidf).sum(axis=1)))
+      norms[norms == 0] = 1.0
+      tfidf = scipy.sparse.diags(1.0 / norms.ravel(), 0) * tfidf
+    else:
+      # Custom normalizations are applied one text at a time
+      tfidf = gensim.matutils.corpus2csc(
+        (self.tfidf[gensim.matutils.scipy2sparse(row)] for row in counts),
+        num_terms=len(self.dictionary), num_docs=len(texts)).T
+
+    projection = self.lsa.projection.u[:, :self.lsa.num_topics]
+    return numpy.asarray(tfidf.tocsr() * projection)
+
+
+  def _getIdfs(self):
+    """
+    @return (numpy.ndarray) The idf of every term of the dictionary. Terms
+    that the tf-idf model doesn't know have a weight of 0, so they are ignored,
+    like in the model.
+    """
+    if getattr(self, "_idfs", None) is None:
+      self._idfs = numpy.zeros(len(self.dictionary))
+      for termId, idf in self.tfidf.idfs.iteritems():
+        if termId < len(self._idfs):
+          self._idfs[termId] = idf
+    return self._idfs
 
 
   def decode(self, encoding, numTerms=None):
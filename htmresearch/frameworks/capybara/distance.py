@@ -19,6 +19,8 @@
 # http://numenta.org/licenses/
 # ----------------------------------------------------------------------
 
+import multiprocessing
+
 import numpy as np
 
 
@@ -45,14 +47,8 @@ def sequence_distance(sequence_embeddings_1, sequence_embeddings_2,
 
 
 def min_distances(sequence_embeddings_1, sequence_embeddings_2):
-  min_dists = []
-  for e1 in sequence_embeddings_1:
-    dists = []
-    for e2 in sequence_embeddings_2:
-      d = np.linalg.norm(e2 - e1)
-      dists.append(d)
-    min_dists.append(np.min(dists))
-  return min_dists
+  return euclidian_distances(sequence_embeddings_1,
+                             sequence_embeddings_2).min(axis=1)
 
 
 
@@ -63,52 +59,293 @@ def aligned_distances(sequence_embeddings_1, sequence_embeddings_2):
                      'len(sequence_embeddings_2)=%s'
                      % (len(sequence_embeddings_1), len(sequence_embeddings_2)))
 
-  aligned_dists = []
-  for i in range(len(sequence_embeddings_1)):
-    d = np.linalg.norm(sequence_embeddings_1[i] - sequence_embeddings_2[i])
-    aligned_dists.append(d)
-  return aligned_dists
+  diffs = _as_float(sequence_embeddings_1) - _as_float(sequence_embeddings_2)
+  return np.sqrt(np.einsum('ij,ij->i', diffs, diffs))
 
 
 
 def distance_matrix(sp_sequence_embeddings,
                     tm_sequence_embeddings, distance, sp_w=1.0, tm_w=1.0):
-  if len(sp_sequence_embeddings) != len(tm_sequence_embeddings):
-    raise ValueError('The number of SP sequence embeddings (%s) is '
-                     'different from the number of TM sequence embeddings (%s)'
-                     % (len(sp_sequence_embeddings),
-                        len(tm_sequence_embeddings)))
+  _check_nb_sequences(sp_sequence_embeddings, tm_sequence_embeddings)
   nb_sequences = len(sp_sequence_embeddings)
   col_mat = np.zeros((nb_sequences, nb_sequences), dtype=np.float64)
   cell_mat = np.zeros((nb_sequences, nb_sequences), dtype=np.float64)
-  combined_mat = np.zeros((nb_sequences, nb_sequences), dtype=np.float64)
 
   for i in range(nb_sequences):
     for j in range(i, nb_sequences):
-      col_dist = distance(sp_sequence_embeddings[i], sp_sequence_embeddings[j])
-      cell_dist = distance(tm_sequence_embeddings[i], tm_sequence_embeddings[j])
-      col_mat[i, j] = col_dist
-      cell_mat[i, j] = cell_dist
-      combined_mat[i, j] = (tm_w * col_dist + sp_w * cell_dist) / (
-        tm_w + sp_w)
+      col_mat[i, j] = distance(sp_sequence_embeddings[i],
+                               sp_sequence_embeddings[j])
+      cell_mat[i, j] = distance(tm_sequence_embeddings[i],
+                                tm_sequence_embeddings[j])
 
       col_mat[j, i] = col_mat[i, j]
       cell_mat[j, i] = cell_mat[i, j]
-      combined_mat[j, i] = combined_mat[i, j]
+  combined_mat = combine_distances(col_mat, cell_mat, sp_w, tm_w)
+  return col_mat, cell_mat, combined_mat
+
+
+
+def sequence_distance_matrices(sp_sequence_embeddings, tm_sequence_embeddings,
+                               assume_sequence_alignment, metric='euclidian',
+                               sp_w=1.0, tm_w=1.0, tile_size=64,
+                               dtype=np.float64, processes=1):
+  """
+  Vectorized equivalent of distance_matrix() with sequence_distance(). The SP
+  and TM matrices are computed together, tile by tile.
+
+  :param sp_sequence_embeddings: (np.array) SP sequence embeddings, of shape
+    (nb_sequences, nb_chunks, sp_width)
+  :param tm_sequence_embeddings: (np.array) TM sequence embeddings, of shape
+    (nb_sequences, nb_chunks, tm_width)
+  :param assume_sequence_alignment: (bool) compare the embeddings of two
+    sequences chunk by chunk instead of using the closest chunk
+  :param metric: (str) 'euclidian' or 'percent_overlap'
+  :param sp_w: (float) weight of the SP distances in the combined matrix
+  :param tm_w: (float) weight of the TM distances in the combined matrix
+  :param tile_size: (int) number of sequences per tile. The memory used is
+    about 2 * tile_size * nb_chunks * width * dtype size.
+  :param dtype: (np.dtype) float type used to compute the distances
+  :param processes: (int) number of processes to spread the tiles over. 1
+    computes them in this process, None uses all the CPUs.
+  :return: col_mat, cell_mat, combined_mat
+  """
+  _check_nb_sequences(sp_sequence_embeddings, tm_sequence_embeddings)
+  col_mat, cell_mat = _sequence_distance_matrices(
+    [sp_sequence_embeddings, tm_sequence_embeddings],
+    assume_sequence_alignment, metric, tile_size, dtype, processes)
+  combined_mat = combine_distances(col_mat, cell_mat, sp_w, tm_w)
   return col_mat, cell_mat, combined_mat
 
 
 
+def sequence_distance_matrix(sequence_embeddings, assume_sequence_alignment,
+                             metric='euclidian', tile_size=64,
+                             dtype=np.float64, processes=1):
+  """
+  Pair-wise sequence distances of one cell type. See
+  sequence_distance_matrices() for the parameters.
+  """
+  return _sequence_distance_matrices([sequence_embeddings],
+                                     assume_sequence_alignment, metric,
+                                     tile_size, dtype, processes)[0]
+
+
+
+def combine_distances(col_dists, cell_dists, sp_w=1.0, tm_w=1.0):
+  return (tm_w * col_dists + sp_w * cell_dists) / (tm_w + sp_w)
+
+
+
+def _check_nb_sequences(sp_sequence_embeddings, tm_sequence_embeddings):
+  if len(sp_sequence_embeddings) != len(tm_sequence_embeddings):
+    raise ValueError('The number of SP sequence embeddings (%s) is '
+                     'different from the number of TM sequence embeddings (%s)'
+                     % (len(sp_sequence_embeddings),
+                        len(tm_sequence_embeddings)))
+
+
+
+def _sequence_distance_matrices(sequence_embeddings, assume_sequence_alignment,
+                                metric, tile_size, dtype, processes):
+  if metric not in DISTANCE_KERNELS:
+    raise ValueError('Invalid metric name: %s' % metric)
+
+  sources = [SequenceEmbeddings(embeddings, tile_size)
+             for embeddings in sequence_embeddings]
+  dtype = np.dtype(dtype)
+  state = (sources, metric, assume_sequence_alignment, tile_size, dtype)
+
+  # Only the tiles on and above the diagonal are computed.
+  tasks = []
+  for source_idx, source in enumerate(sources):
+    for i in range(0, len(source), tile_size):
+      for j in range(i, len(source), tile_size):
+        tasks.append((source_idx, i, j))
+
+  mats = [np.zeros((len(source), len(source)), dtype=dtype)
+          for source in sources]
+  if processes == 1:
+    for task in tasks:
+      _store_tile(mats, task, _compute_tile(task, state), metric)
+  else:
+    pool = multiprocessing.Pool(processes, _init_tile_worker, state)
+    for task, tile in pool.imap_unordered(_run_tile_task, tasks):
+      _store_tile(mats, task, tile, metric)
+    pool.close()
+    pool.join()
+  return mats
+
+
+
+def _compute_tile(task, state):
+  sources, metric, assume_sequence_alignment, tile_size, dtype = state
+  source_idx, i, j = task
+  x = sources[source_idx].rows(i, i + tile_size, dtype)
+  y = x if i == j else sources[source_idx].rows(j, j + tile_size, dtype)
+  return distance_tile(x, y, metric, assume_sequence_alignment)
+
+
+
+def _store_tile(mats, task, tile, metric):
+  source_idx, i, j = task
+  mat = mats[source_idx]
+  if i == j:
+    # Like distance_matrix(), the distance of i to j is used for j to i.
+    tile = np.triu(tile) + np.triu(tile, 1).T
+    if metric == 'euclidian':
+      np.fill_diagonal(tile, 0)
+  else:
+    mat[j:j + tile.shape[1], i:i + tile.shape[0]] = tile.T
+  mat[i:i + tile.shape[0], j:j + tile.shape[1]] = tile
+
+
+
+_tile_worker_state = None
+
+
+
+def _init_tile_worker(*state):
+  """ Pool initializer: keeps the sequence embeddings in the worker. """
+  global _tile_worker_state
+  _tile_worker_state = state
+
+
+
+def _run_tile_task(task):
+  return task, _compute_tile(task, _tile_worker_state)
+
+
+
+def distance_tile(sequence_embeddings_1, sequence_embeddings_2, metric,
+                  assume_sequence_alignment):
+  """
+  Sequence distances from each sequence of a tile to each sequence of another.
+
+  :param sequence_embeddings_1: (np.array) float sequence embeddings, of shape
+    (nb_sequences_1, nb_chunks, width)
+  :param sequence_embeddings_2: (np.array) float sequence embeddings, of shape
+    (nb_sequences_2, nb_chunks, width)
+  :param metric: (str) 'euclidian' or 'percent_overlap'
+  :param assume_sequence_alignment: (bool) see sequence_distance()
+  :return: (np.array) distances, of shape (nb_sequences_1, nb_sequences_2)
+  """
+  kernel = DISTANCE_KERNELS[metric]
+  nb_sequences_1, nb_chunks, width = sequence_embeddings_1.shape
+  nb_sequences_2 = len(sequence_embeddings_2)
+
+  if assume_sequence_alignment:
+    tile = np.zeros((nb_sequences_1, nb_sequences_2),
+                    dtype=sequence_embeddings_1.dtype)
+    for k in range(nb_chunks):
+      tile += kernel(sequence_embeddings_1[:, k], sequence_embeddings_2[:, k])
+    tile /= nb_chunks
+  else:
+    dists = kernel(sequence_embeddings_1.reshape(-1, width),
+                   sequence_embeddings_2.reshape(-1, width))
+    dists = dists.reshape(nb_sequences_1, nb_chunks, nb_sequences_2, nb_chunks)
+    tile = dists.min(axis=3).mean(axis=1)
+  return tile
+
+
+
+class SequenceEmbeddings(object):
+  """
+  Sequence embeddings of shape (nb_sequences, nb_chunks, width). Binary
+  embeddings are kept bit-packed and unpacked a few rows at a time.
+  """
+
+
+  def __init__(self, sequence_embeddings, block_size=64):
+    sequence_embeddings = np.asarray(sequence_embeddings)
+    self.shape = sequence_embeddings.shape
+    self.data = sequence_embeddings
+    self.packed = False
+
+    nb_sequences = self.shape[0]
+    packed = np.empty(self.shape[:2] + ((self.shape[2] + 7) // 8,),
+                      dtype=np.uint8)
+    for start in range(0, nb_sequences, block_size):
+      block = sequence_embeddings[start:start + block_size]
+      if (block.dtype != np.bool_ and
+          not np.logical_or(block == 0, block == 1).all()):
+        return
+      packed[start:start + block_size] = np.packbits(block != 0, axis=2)
+
+    self.data = packed
+    self.packed = True
+
+
+  def __len__(self):
+    return self.shape[0]
+
+
+  def rows(self, start, stop, dtype):
+    """
+    :return: (np.array) sequence embeddings start to stop, as dtype
+    """
+    if self.packed:
+      bits = np.unpackbits(self.data[start:stop], axis=2)
+      return bits[:, :, :self.shape[2]].astype(dtype)
+    else:
+      return self.data[start:stop].astype(dtype)
+
+
+
+def _as_float(x):
+  x = np.asarray(x)
+  if x.dtype.kind != 'f':
+    x = x.astype(np.float64)
+  return x
+
+
+
 def euclidian_distance(x1, x2):
   return np.linalg.norm(np.array(x1) - np.array(x2))
 
 
 
+def euclidian_distances(x1, x2):
+  """
+  Euclidian distances between the rows of x1 and the rows of x2.
+
+  :param x1: (np.array) vectors, of shape (n1, width)
+  :param x2: (np.array) vectors, of shape (n2, width)
+  :return: (np.array) distances, of shape (n1, n2)
+  """
+  x1 = _as_float(x1)
+  x2 = _as_float(x2)
+  squared = (np.einsum('ij,ij->i', x1, x1)[:, np.newaxis]
+             + np.einsum('ij,ij->i', x2, x2)[np.newaxis, :]
+             - 2 * np.dot(x1, x2.T))
+  np.maximum(squared, 0, out=squared)
+  return np.sqrt(squared, out=squared)
+
+
+
 def percent_overlap_distance(x1, x2):
   return 1 - percent_overlap(x1, x2)
 
 
 
+def percent_overlap_distances(x1, x2):
+  """
+  Percent overlap distances between the rows of x1 and the rows of x2.
+
+  :param x1: (np.array) binary vectors, of shape (n1, width)
+  :param x2: (np.array) binary vectors, of shape (n2, width)
+  :return: (np.array) distances, of shape (n1, n2)
+  """
+  x1 = _as_float(x1)
+  x2 = _as_float(x2)
+  overlaps = np.dot(x1, x2.T)
+  non_zeros = np.outer(np.sum(x1 != 0, axis=1), np.sum(x2 != 0, axis=1))
+  norms = np.sqrt(non_zeros.astype(overlaps.dtype))
+  pct_overlaps = np.zeros_like(overlaps)
+  np.divide(overlaps, norms, out=pct_overlaps, where=norms > 0)
+  return 1 - pct_overlaps
+
+
+
 def percent_overlap(x1, x2):
   """
   Computes the percentage of overlap between SDR 1 and 2
@@ -133,6 +370,43 @@ def percent_overlap(x1, x2):
 
 
 
+DISTANCE_KERNELS = {
+  'euclidian': euclidian_distances,
+  'percent_overlap': percent_overlap_distances,
+}
+
+# Pair-wise kernels of the distance functions above, used on cluster centroids.
+_VECTORIZED_DISTANCES = {
+  euclidian_distance: euclidian_distances,
+  percent_overlap_distance: percent_overlap_distances,
+}
+
+
+
+def vectorized_distance(distance_func):
+  """
+  Pair-wise version of a distance function.
+
+  :param distance_func: (function) distance between two vectors
+  :return: (function) function of x1 and x2 returning the distances between
+    the rows of x1 and the rows of x2, of shape (len(x1), len(x2)). The
+    distance function is called for each pair if it has no kernel.
+  """
+  if distance_func in _VECTORIZED_DISTANCES:
+    return _VECTORIZED_DISTANCES[distance_func]
+
+  def distances(x1, x2):
+    dists = np.zeros((len(x1), len(x2)), dtype=np.float64)
+    for i in range(len(x1)):
+      for j in range(len(x2)):
+        dists[i, j] = distance_func(x1[i], x2[j])
+    return dists
+
+
+  return distances
+
+
+
 def cluster_distance_factory(distance):
   def cluster_distance(c1, c2):
     """
@@ -178,16 +452,28 @@ def cluster_distance_matrix(sdr_clusters, distance_func):
   :param sdr_clusters: list of sdr clusters. Each cluster is a list of SDRs.
   :return: distance matrix
   """
-
-  cluster_dist = cluster_distance_factory(distance_func)
-
   num_clusters = len(sdr_clusters)
   distance_mat = np.zeros((num_clusters, num_clusters), dtype=np.float64)
 
-  for i in range(num_clusters):
-    for j in range(i, num_clusters):
-      distance_mat[i, j] = cluster_dist(sdr_clusters[i],
-                                        sdr_clusters[j])
-      distance_mat[j, i] = distance_mat[i, j]
+  # The distance between two clusters is the distance between their
+  # centroids, and is 0 if one of them is empty.
+  non_empty = [i for i in range(num_clusters) if len(sdr_clusters[i]) > 0]
+  centroids = [np.sum(sdr_clusters[i], axis=0) / float(len(sdr_clusters[i]))
+               for i in non_empty]
+
+  if len(non_empty) > 0 and distance_func in _VECTORIZED_DISTANCES:
+    centroids = np.array(centroids)
+    dists = _VECTORIZED_DISTANCES[distance_func](centroids, centroids)
+    dists = (dists + dists.T) / 2
+    if distance_func is euclidian_distance:
+      np.fill_diagonal(dists, 0)
+    distance_mat[np.ix_(non_empty, non_empty)] = dists
+  else:
+    for a in range(len(non_empty)):
+      for b in range(a, len(non_empty)):
+        i, j = non_empty[a], non_empty[b]
+        distance_mat[i, j] = np.mean([distance_func(centroids[a], centroids[b]),
+                                      distance_func(centroids[b], centroids[a])])
+        distance_mat[j, i] = distance_mat[i, j]
 
   return distance_mat
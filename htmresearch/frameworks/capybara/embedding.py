@@ -22,10 +22,14 @@
 import json
 import numpy as np
 import pandas as pd
+import scipy.sparse
 
 
 
 def make_embedding(sdrs_chunk, aggregation):
+  if scipy.sparse.issparse(sdrs_chunk):
+    return make_sparse_embedding(sdrs_chunk, aggregation)
+
   if aggregation == 'or':
     embedding = sdrs_chunk[0]
     for sdr in sdrs_chunk:
@@ -42,15 +46,34 @@ def make_embedding(sdrs_chunk, aggregation):
 
 
 
+def make_sparse_embedding(sdrs_chunk, aggregation):
+  """
+  Same as make_embedding() for a chunk of binary SDRs in a sparse matrix,
+  with one row per SDR.
+  """
+  nb_sdrs = sdrs_chunk.shape[0]
+  counts = np.asarray(sdrs_chunk.sum(axis=0), dtype=np.float64).ravel()
+  if aggregation == 'or':
+    embedding = counts > 0
+  elif aggregation == 'and':
+    embedding = counts == nb_sdrs
+  elif aggregation == 'mean':
+    embedding = counts / nb_sdrs
+  else:
+    raise ValueError('Invalid aggregation name.')
+  return embedding
+
+
+
 def make_embeddings(sdrs_sequence, aggregation, nb_chunks):
   """
   Split a sequence of SDRs in chunks and create an embedding for each chunk.
-  :param sdrs_sequence: (array of arrays) a sequence of SDRs
+  :param sdrs_sequence: (array of arrays or sparse matrix) a sequence of SDRs
   :param aggregation: (str) type of aggregation
   :param nb_chunks: (int) how many chunks in the SDRs sequence
   :return: (array of arrays) embeddings
   """
-  chunk_size = len(sdrs_sequence) / nb_chunks
+  chunk_size = sdrs_sequence.shape[0] / nb_chunks
   embeddings = []
   for i in range(nb_chunks):
     chunk = sdrs_sequence[i * chunk_size:(i + 1) * chunk_size]
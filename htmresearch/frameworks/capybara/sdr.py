@@ -19,6 +19,7 @@
 # http://numenta.org/licenses/
 # ----------------------------------------------------------------------
 
+import os
 import sys
 import copy
 import csv
@@ -26,15 +27,62 @@ import pandas as pd
 import json
 import numpy as np
 
+from htmresearch.support.trace_file import TraceFile
+
 
 
 def load_sdrs(file_path, sp_output_width, tm_output_width):
+  """
+  Load SDR sequences, one per row, from a CSV trace file or from a binary
+  trace file (see htmresearch.support.trace_file).
+
+  :param file_path: (str) path of the CSV file or of the trace file directory
+  :param sp_output_width: (int) number of SP columns
+  :param tm_output_width: (int) number of TM cells
+  :return: (pd.DataFrame) label, spActiveColumns and tmPredictedActiveCells
+    of each sequence. The SDRs of a sequence are a dense array for a CSV file
+    and a scipy.sparse CSR matrix for a trace file.
+  """
+  if os.path.isdir(file_path):
+    return load_sparse_sdrs(TraceFile(file_path), sp_output_width,
+                            tm_output_width)
+
   return pd.read_csv(file_path, converters={
     'spActiveColumns': sdr_converter_factory(sp_output_width),
     'tmPredictedActiveCells': sdr_converter_factory(tm_output_width)})
 
 
 
+def load_sparse_sdrs(trace, sp_output_width, tm_output_width):
+  """
+  Load SDR sequences from a trace file with one row per SDR and a 'sequence'
+  column, as written by convertCsvTraces().
+
+  :param trace: (TraceFile) the trace file
+  :param sp_output_width: (int) number of SP columns
+  :param tm_output_width: (int) number of TM cells
+  :return: (pd.DataFrame) see load_sdrs()
+  """
+  sequences = np.asarray(trace['sequence'])
+  if len(sequences) > 0:
+    starts = np.flatnonzero(np.diff(sequences)) + 1
+    starts = np.concatenate([[0], starts])
+  else:
+    starts = np.zeros(0, dtype=np.int64)
+  stops = np.append(starts[1:], len(sequences))
+
+  data = {'label': np.asarray(trace['label'])[starts]}
+  for name, width in [('spActiveColumns', sp_output_width),
+                      ('tmPredictedActiveCells', tm_output_width)]:
+    sdrs = trace[name].toSparse(width)
+    sequence_sdrs = np.empty(len(starts), dtype=object)
+    for i in range(len(starts)):
+      sequence_sdrs[i] = sdrs[starts[i]:stops[i]]
+    data[name] = sequence_sdrs
+  return pd.DataFrame(data=data)
+
+
+
 def sdr_converter_factory(sdr_width):
   def convert_sdr(patternNZ_strings):
     patternNZs = json.loads(patternNZ_strings)
@@ -120,10 +168,12 @@ def generate_sdrs(num_sdr_classes, num_sdr_per_class, n, w, noise_level):
 
 def load_traces(file_name):
   """
-  Load network traces from CSV
+  Load network traces from CSV, or from a binary trace file
   :param file_name: (str) name of the file
   :return traces: (dict) network traces. E.g: activeCells, sensorValues, etc.
   """
+  if os.path.isdir(file_name):
+    return dict(TraceFile(file_name).items())
 
   csv.field_size_limit(sys.maxsize)
 
@@ -23,7 +23,7 @@ import os
 import time
 
 from htmresearch.frameworks.capybara.distance import \
-  distance_matrix, sequence_distance, reshaped_sequence_distance
+  sequence_distance_matrices, reshaped_sequence_distance
 from htmresearch.frameworks.capybara.embedding import \
   convert_to_embeddings, reshape_embeddings
 from htmresearch.frameworks.capybara.sdr import load_sdrs
@@ -78,9 +78,10 @@ def analyze_sdr_sequences(sdr_sequences_train, sdr_sequences_test, data_id,
     check_shape(y[phase], (nb_sequences,))
 
     # Compute distance matrix.
-    distance = lambda a, b: sequence_distance(a, b, assume_sequence_alignment)
-    dist_mats['sp'][phase], dist_mats['tm'][phase], _ = distance_matrix(
-      embeddings['sp'][phase], embeddings['tm'][phase], distance)
+    dist_mats['sp'][phase], dist_mats['tm'][phase], _ = \
+      sequence_distance_matrices(embeddings['sp'][phase],
+                                 embeddings['tm'][phase],
+                                 assume_sequence_alignment)
 
   # Step 2: Flatten the sequence embeddings to be able to classify each
   # sequence with a supervised classifier. The classifier uses the same
@@ -0,0 +1,274 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+import collections
+
+import numpy as np
+
+from htmresearch.frameworks.capybara.distance import vectorized_distance
+
+
+
+class ClusterIndex(object):
+  def __init__(self, distance_func, capacity=16, dtype=np.float64):
+    """
+    Cluster centers stored in a contiguous matrix, with a cache of the
+    distances between every pair of clusters. The cache is updated when a
+    cluster is added, updated or removed.
+
+    :param distance_func: (function) distance metric between two centers.
+      euclidian_distance and percent_overlap_distance are vectorized.
+    :param capacity: (int) initial number of rows of the centers matrix.
+    :param dtype: (np.dtype) type of the centers and distances.
+    """
+    self.distance_func = distance_func
+    self.dtype = np.dtype(dtype)
+    self.keys = []  # Cluster key of each row.
+    self._distances = vectorized_distance(distance_func)
+    self._rows = {}
+    self._centers = np.zeros((capacity, 0), dtype=self.dtype)
+    # Distances between clusters, inf on the diagonal and for unused rows.
+    self._pair_dists = np.full((capacity, capacity), np.inf, dtype=self.dtype)
+    # Sum of the distances of each cluster to the others.
+    self._dist_sums = np.zeros(capacity, dtype=self.dtype)
+
+
+  def __len__(self):
+    return len(self.keys)
+
+
+  def __contains__(self, key):
+    return key in self._rows
+
+
+  def add(self, key, center):
+    """
+    Add a cluster.
+
+    :param key: (hashable) key of the cluster, e.g. its ID.
+    :param center: (np.array) center of the cluster.
+    :raise: (ValueError) raise error if the key is already used.
+    """
+    if key in self._rows:
+      raise ValueError('Cluster %s already exists' % key)
+
+    row = len(self.keys)
+    if row == len(self._centers):
+      self._grow(max(2 * row, 1))
+    self._pair_dists[row, :row + 1] = 0
+    self._pair_dists[:row + 1, row] = 0
+    self.keys.append(key)
+    self._rows[key] = row
+    self.update(key, center)
+
+
+  def update(self, key, center):
+    """
+    Set the center of a cluster and update its distances to the others.
+
+    :param key: (hashable) key of the cluster.
+    :param center: (np.array) new center of the cluster.
+    """
+    row = self._rows[key]
+    num_clusters = len(self.keys)
+    self._centers[row] = self._as_row(center)
+
+    dists = self._distances(self._centers[:num_clusters],
+                            self._centers[row:row + 1]).ravel()
+    dists[row] = 0
+    old_dists = self._pair_dists[row, :num_clusters].copy()
+    old_dists[row] = 0
+
+    self._dist_sums[:num_clusters] += dists - old_dists
+    self._dist_sums[row] = dists.sum()
+    self._pair_dists[row, :num_clusters] = dists
+    self._pair_dists[:num_clusters, row] = dists
+    self._pair_dists[row, row] = np.inf
+
+
+  def remove(self, key):
+    """
+    Remove a cluster. The last row takes its place.
+
+    :param key: (hashable) key of the cluster.
+    """
+    row = self._rows.pop(key)
+    last = len(self.keys) - 1
+    num_clusters = last + 1
+
+    old_dists = self._pair_dists[row, :num_clusters].copy()
+    old_dists[row] = 0
+    self._dist_sums[:num_clusters] -= old_dists
+
+    if row != last:
+      moved_key = self.keys[last]
+      self.keys[row] = moved_key
+      self._rows[moved_key] = row
+      self._centers[row] = self._centers[last]
+      self._pair_dists[row, :num_clusters] = self._pair_dists[last,
+                                                              :num_clusters]
+      self._pair_dists[:num_clusters, row] = self._pair_dists[:num_clusters,
+                                                              last]
+      self._pair_dists[row, row] = np.inf
+      self._dist_sums[row] = self._dist_sums[last]
+
+    self.keys.pop()
+    self._pair_dists[last, :num_clusters] = np.inf
+    self._pair_dists[:num_clusters, last] = np.inf
+    self._dist_sums[last] = 0
+
+
+  def distances(self, value):
+    """
+    Distances between a point and every cluster center, with one vectorized
+    distance call.
+
+    :param value: (np.array) the point.
+    :return: (np.array) distance to the center of each cluster in self.keys.
+    """
+    num_clusters = len(self.keys)
+    if num_clusters == 0:
+      return np.zeros(0, dtype=self.dtype)
+    return self._distances(self._centers[:num_clusters],
+                           self._as_row(value)[np.newaxis]).ravel()
+
+
+  def nearest(self, value):
+    """
+    Find the closest cluster to a point.
+
+    :param value: (np.array) the point.
+    :return key, distance: key of the closest cluster and its distance to the
+      point. None, None if there are no clusters.
+    """
+    dists = self.distances(value)
+    if len(dists) == 0:
+      return None, None
+    row = np.argmin(dists)
+    return self.keys[row], dists[row]
+
+
+  def closest_pair(self):
+    """
+    Find the two closest clusters from the distance cache.
+
+    :return key1, key2, distance: keys of the two closest clusters, in the
+      order they were added, and their distance. None, None, None if there
+      are less than two clusters.
+    """
+    num_clusters = len(self.keys)
+    if num_clusters < 2:
+      return None, None, None
+    row1, row2 = divmod(np.argmin(self._pair_dists[:num_clusters,
+                                                   :num_clusters]),
+                        num_clusters)
+    if row1 > row2:
+      row1, row2 = row2, row1
+    return self.keys[row1], self.keys[row2], self._pair_dists[row1, row2]
+
+
+  def average_distance(self):
+    """
+    :return: (float) average distance between two clusters. 0 if there are
+      less than two clusters.
+    """
+    num_clusters = len(self.keys)
+    if num_clusters < 2:
+      return 0.0
+    return float(self._dist_sums[:num_clusters].sum() /
+                 (num_clusters * (num_clusters - 1)))
+
+
+  def _as_row(self, value):
+    """
+    Convert a point to a row of the centers matrix. The centers are padded
+    with zeros if the point is wider, and the point if it is narrower.
+    """
+    value = np.asarray(value, dtype=self.dtype).ravel()
+    dim = self._centers.shape[1]
+    if len(value) > dim:
+      centers = np.zeros((len(self._centers), len(value)), dtype=self.dtype)
+      centers[:, :dim] = self._centers
+      self._centers = centers
+    elif len(value) < dim:
+      value = np.concatenate([value,
+                              np.zeros(dim - len(value), dtype=self.dtype)])
+    return value
+
+
+  def _grow(self, capacity):
+    num_clusters = len(self.keys)
+
+    centers = np.zeros((capacity, self._centers.shape[1]), dtype=self.dtype)
+    centers[:num_clusters] = self._centers[:num_clusters]
+    self._centers = centers
+
+    pair_dists = np.full((capacity, capacity), np.inf, dtype=self.dtype)
+    pair_dists[:num_clusters, :num_clusters] = self._pair_dists[:num_clusters,
+                                                                :num_clusters]
+    self._pair_dists = pair_dists
+
+    dist_sums = np.zeros(capacity, dtype=self.dtype)
+    dist_sums[:num_clusters] = self._dist_sums[:num_clusters]
+    self._dist_sums = dist_sums
+
+
+
+class LatencyStats(object):
+  def __init__(self, history_size=1000):
+    """
+    Time taken to process each record.
+
+    :param history_size: (int) number of recent latencies kept for the
+      percentiles.
+    """
+    self.count = 0
+    self.total = 0.0
+    self.max = 0.0
+    self.recent = collections.deque(maxlen=history_size)
+
+
+  def add(self, seconds):
+    self.count += 1
+    self.total += seconds
+    self.max = max(self.max, seconds)
+    self.recent.append(seconds)
+
+
+  def mean(self):
+    if self.count == 0:
+      return 0.0
+    return self.total / self.count
+
+
+  def percentile(self, q):
+    """
+    :param q: (float) percentile, between 0 and 100.
+    :return: (float) percentile of the recent latencies, in seconds.
+    """
+    if len(self.recent) == 0:
+      return 0.0
+    return float(np.percentile(list(self.recent), q))
+
+
+  def __str__(self):
+    return ('LatencyStats(count=%d, mean=%.1fus, p99=%.1fus, max=%.1fus)'
+            % (self.count, self.mean() * 1e6, self.percentile(99) * 1e6,
+               self.max * 1e6))
@@ -19,10 +19,14 @@
 #
 # http://numenta.org/licenses/
 # ----------------------------------------------------------------------
+import time
+
 import numpy as np
 
 from abc import ABCMeta, abstractmethod
-from queue import PriorityQueue
+
+from htmresearch.frameworks.capybara.unsupervised.cluster_index import \
+  ClusterIndex, LatencyStats
 
 
 
@@ -124,6 +128,8 @@ class ClusteringInterface(object):
     """
     self.distance_func = distance_func
     self.clusters = {}  # Keys are cluster IDs; Values are Clusters.
+    self.index = ClusterIndex(distance_func)  # Centers of self.clusters.
+    self.latencies = {'infer': LatencyStats(), 'learn': LatencyStats()}
 
 
   @abstractmethod
@@ -177,43 +183,44 @@ class ClusteringInterface(object):
     """
     Merge closest two clusters.
     """
-    inter_cluster_dists = PriorityQueue()
-
-    numClusters = len(self.clusters)
-    for i in range(numClusters):
-      for j in range(i + 1, numClusters):
-        c1 = self.clusters.values()[i]
-        c2 = self.clusters.values()[j]
-        d = self.distance_func(c1.center.value, c2.center.value)
-        inter_cluster_dists.put(InterClusterDist(c1, c2, d))
-
-    smallest_inter_cluster_dist = inter_cluster_dists.get()
-    cluster_to_merge = smallest_inter_cluster_dist.c2
-    smallest_inter_cluster_dist.c1.merge(cluster_to_merge)
-    del self.clusters[cluster_to_merge.id]
-
+    c1_id, c2_id, _ = self.index.closest_pair()
+    cluster_to_merge = self.clusters[c2_id]
+    self._merge_cluster(self.clusters[c1_id], cluster_to_merge)
+    self._remove_cluster(cluster_to_merge.id)
 
 
-class InterClusterDist(object):
-  """
-  Inter-cluster distance.
-
-  Useful to define cmp() for queue.PriorityQueue.
-  """
+  def _add_cluster(self, cluster):
+    """
+    Add cluster to the existing clusters.
+    
+    :param cluster: (Cluster) cluster to add.
+    :raise: (ValueError) raise error if the cluster ID is already used. 
+    """
+    if cluster.id in self.clusters:
+      raise ValueError('Cluster ID %s already exists' % cluster.id)
+    self.clusters[cluster.id] = cluster
+    self.index.add(cluster.id, cluster.center.value)
 
 
-  def __init__(self, c1, c2, c1_c2_dist):
-    self.c1 = c1
-    self.c2 = c2
-    self.dist = c1_c2_dist
+  def _merge_cluster(self, cluster, cluster_to_merge):
+    """
+    Merge a cluster into one of the existing clusters.
 
+    :param cluster: (Cluster) existing cluster.
+    :param cluster_to_merge: (Cluster) cluster to merge into it.
+    """
+    cluster.merge(cluster_to_merge)
+    self.index.update(cluster.id, cluster.center.value)
 
-  def __cmp__(self, inter_cluster_dist):
-    return cmp(self.dist, inter_cluster_dist.dist)
 
+  def _remove_cluster(self, cluster_id):
+    """
+    Remove a cluster from the existing clusters.
 
-  def __str__(self):
-    return "InterClusterDist(%f)" % self.dist
+    :param cluster_id: (int) ID of the cluster to remove.
+    """
+    del self.clusters[cluster_id]
+    self.index.remove(cluster_id)
 
 
 
@@ -238,6 +245,7 @@ class OnlineClustering(ClusteringInterface):
     :param point: (Point) input point.
     :return confidence, closest: (Cluster) best cluster for the input point.
     """
+    start = time.time()
 
     if len(self.clusters) > 0:
 
@@ -260,6 +268,8 @@ class OnlineClustering(ClusteringInterface):
     else:
       confidence = None
       closest = None
+
+    self.latencies['infer'].add(time.time() - start)
     return confidence, closest
 
 
@@ -270,11 +280,13 @@ class OnlineClustering(ClusteringInterface):
     
     :param new_cluster: (Cluster) cluster of points to learn.
     """
+    start = time.time()
     if self.merge_threshold is None:
       cutoff_distance = self._average_cluster_distance() * 0.10
     else:
       cutoff_distance = self.merge_threshold
     self._add_or_merge_cluster(new_cluster, cutoff_distance)
+    self.latencies['learn'].add(time.time() - start)
 
 
   def _average_cluster_distance(self):
@@ -283,21 +295,7 @@ class OnlineClustering(ClusteringInterface):
     
     :return average_distance: (float) average distance between clusters. 
     """
-    cluster_distances = []
-    cluster_ids = self.clusters.keys()
-
-    numClusters = len(cluster_ids)
-    for i in range(numClusters):
-      for j in range(i + 1, numClusters):
-        ci = self.clusters[cluster_ids[i]].center.value
-        cj = self.clusters[cluster_ids[j]].center.value
-        d = self.distance_func(ci, cj)
-        cluster_distances.append(d)
-
-    if len(cluster_distances) > 0:
-      return np.mean(cluster_distances)
-    else:
-      return 0.0
+    return self.index.average_distance()
 
 
   def _add_or_merge_cluster(self, cluster, merge_threshold):
@@ -315,23 +313,11 @@ class OnlineClustering(ClusteringInterface):
      distance_to_closest,
      closest) = self._find_closest_cluster(cluster.center)
     if closest and distance_to_closest < merge_threshold:
-      closest.merge(cluster)
+      self._merge_cluster(closest, cluster)
     else:
       self._add_cluster(cluster)
 
 
-  def _add_cluster(self, cluster):
-    """
-    Add cluster to the existing clusters.
-    
-    :param cluster: (Cluster) cluster to add.
-    :raise: (ValueError) raise error if the cluster ID is already used. 
-    """
-    if cluster.id in self.clusters:
-      raise ValueError('Cluster ID %s already exists' % cluster.id)
-    self.clusters[cluster.id] = cluster
-
-
   def _find_closest_cluster(self, point):
     """
     Find the closest cluster to a point.
@@ -343,18 +329,14 @@ class OnlineClustering(ClusteringInterface):
       center and point.
     :return closest: (Cluster) closest cluster to point.
     """
-    distance_cluster_pairs = []
-    for cluster in self.clusters.values():
-      d = self.distance_func(cluster.center.value, point.value)
-      distance_cluster_pairs.append((d, cluster))
-    if len(distance_cluster_pairs) > 0:
-      cluster_distances = [d[0] for d in distance_cluster_pairs]
+    cluster_distances = self.index.distances(point.value)
+    if len(cluster_distances) > 0:
       min_dist_idx = np.argmin(cluster_distances)
 
       # Get the closest cluster and some other useful distance metrics.
       average_cluster_distances = np.mean(cluster_distances)
-      distance_to_closest = distance_cluster_pairs[min_dist_idx][0]
-      closest = distance_cluster_pairs[min_dist_idx][1]
+      distance_to_closest = cluster_distances[min_dist_idx]
+      closest = self.clusters[self.index.keys[min_dist_idx]]
       return average_cluster_distances, distance_to_closest, closest
     else:
       return None, None, None
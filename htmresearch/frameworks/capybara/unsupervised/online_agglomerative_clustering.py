@@ -1,7 +1,12 @@
-import heapq
-import operator
+import time
+
+import numpy as np
 import scipy
 
+from htmresearch.frameworks.capybara.distance import vectorized_distance
+from htmresearch.frameworks.capybara.unsupervised.cluster_index import \
+  ClusterIndex, LatencyStats
+
 
 
 class Cluster(object):
@@ -36,28 +41,6 @@ class Cluster(object):
 
 
 
-class Dist(object):
-  """
-  this is just a tuple,
-  but we need an object so we can define cmp for heapq
-  """
-
-
-  def __init__(self, c1, c2, d):
-    self.c1 = c1
-    self.c2 = c2
-    self.d = d
-
-
-  def __cmp__(self, o):
-    return cmp(self.d, o.d)
-
-
-  def __str__(self):
-    return "Dist(%f)" % (self.d)
-
-
-
 class OnlineAgglomerativeClustering(object):
   def __init__(self,
                max_num_clusters,
@@ -79,24 +62,31 @@ class OnlineAgglomerativeClustering(object):
     # max number of dimensions we've seen so far
     self._dim = 0
 
-    # cache inter-cluster distances
-    self._dist = []
+    # cluster centers and cache of inter-cluster distances
+    self._index = ClusterIndex(distance_func)
+    self._distances = vectorized_distance(distance_func)
+
+    self.latencies = {'cluster': LatencyStats()}
 
 
   def _resize(self, dim):
     for c in self._clusters:
-      c._resize(dim)
+      c.resize(dim)
     self._dim = dim
 
 
   def find_closest_cluster(self, point, clusters):
-    c = [(i, self._distance_func(c.center, point))
-         for i, c in enumerate(clusters)]
-    closest = clusters[min(c, key=operator.itemgetter(1))[0]]
+    if clusters is self._clusters:
+      closest, _ = self._index.nearest(point)
+    else:
+      centers = np.array([c.center for c in clusters])
+      dists = self._distances(centers, np.asarray(point)[np.newaxis]).ravel()
+      closest = clusters[np.argmin(dists)]
     return closest
 
 
   def cluster(self, new_point, trim_clusters, label=None):
+    start = time.time()
 
     if len(new_point) > self._dim:
       self._resize(len(new_point))
@@ -113,15 +103,13 @@ class OnlineAgglomerativeClustering(object):
     if len(self._clusters) >= self._max_num_clusters and len(
       self._clusters) > 1:
       # merge closest two clusters
-      inter_cluster_dist = heapq.heappop(self._dist)
-      cluster_to_merge = inter_cluster_dist.c2
-      inter_cluster_dist.c1.merge(cluster_to_merge)
-      if cluster_to_merge in self._clusters:
-        self._clusters.remove(cluster_to_merge)
+      c1, cluster_to_merge, _ = self._index.closest_pair()
+      c1.merge(cluster_to_merge)
+      self._clusters.remove(cluster_to_merge)
 
-      # update inter-cluster distances      
+      # update inter-cluster distances
       self._remove_dist(cluster_to_merge)
-      self._update_dist(inter_cluster_dist.c1)
+      self._update_dist(c1)
 
     # make a new cluster for this point
     cluster_id = self._total_num_clusters_created + 1
@@ -133,34 +121,27 @@ class OnlineAgglomerativeClustering(object):
     self._num_points_processed += 1
 
     if trim_clusters:
-      trimmed_clusters = self._trim_clusters()
+      clusters = self._trim_clusters()
       # closest cluster might not be in the list of trimmed clusters
-      self.find_closest_cluster(new_point, trimmed_clusters)
-      return trimmed_clusters, closest
+      self.find_closest_cluster(new_point, clusters)
     else:
-      return self._clusters, closest
+      clusters = self._clusters
+
+    self.latencies['cluster'].add(time.time() - start)
+    return clusters, closest
 
 
-  def _remove_dist(self, d):
-    """Invalidate inter-cluster distance cache for c"""
-    inter_cluster_dist_to_remove = []
-    for inter_cluster_dist in self._dist:
-      if inter_cluster_dist.c1 == d or inter_cluster_dist.c2 == d:
-        inter_cluster_dist_to_remove.append(inter_cluster_dist)
-    for x in inter_cluster_dist_to_remove:
-      self._dist.remove(x)
-    heapq.heapify(self._dist)
+  def _remove_dist(self, c):
+    """Remove cluster c from the inter-cluster distance cache"""
+    self._index.remove(c)
 
 
   def _update_dist(self, c):
     """Cluster c has changed, re-compute all inter-cluster distances"""
-    self._remove_dist(c)
-
-    for x in self._clusters:
-      if x == c: continue
-      d = self._distance_func(x.center, c.center)
-      inter_cluster_dist = Dist(x, c, d)
-      heapq.heappush(self._dist, inter_cluster_dist)
+    if c in self._index:
+      self._index.update(c, c.center)
+    else:
+      self._index.add(c, c.center)
 
 
   def _trim_clusters(self):
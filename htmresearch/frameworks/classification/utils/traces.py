@@ -29,6 +29,8 @@ import os
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 
+from htmresearch.support.trace_file import TraceFile
+
 
 
 def constructStableIntervals(confidence):
@@ -236,10 +238,14 @@ def saveTraces(traces, fileName):
 
 def loadTraces(fileName):
   """
-  Load network traces from CSV
-  :param fileName: (str) name of the file
+  Load network traces from CSV, or from a binary trace file (see
+  htmresearch.support.trace_file). The traces of a binary trace file are
+  numpy arrays and SDRColumns, whose items are arrays of active indices.
+  :param fileName: (str) name of the file or of the trace file directory
   :return traces: (dict) network traces. E.g: activeCells, sensorValues, etc.
   """
+  if os.path.isdir(fileName):
+    return dict(TraceFile(fileName).items())
 
   csv.field_size_limit(sys.maxsize)
 
@@ -151,7 +151,8 @@ class L4L2Experiment(object):
                enableFeedForwardSP=False,
                feedForwardSPOverrides=None,
                objectNamesAreIndices=False,
-               enableFeedback=True
+               enableFeedback=True,
+               multiColumnL2=False
                ):
     """
     Creates the network.
@@ -228,6 +229,11 @@ class L4L2Experiment(object):
     @param   enableFeedback (bool)
              If True, enable feedback between L2 and L4
 
+    @param   multiColumnL2 (bool)
+             If True, the L2 columns share one MultiColumnPooler, which
+             computes the lateral input of every column at once. Only relevant
+             when networkType is "MultipleL4L2Columns".
+
     """
     # Handle logging - this has to be done first
     self.logCalls = logCalls
@@ -251,6 +257,7 @@ class L4L2Experiment(object):
       "networkType": networkType,
       "longDistanceConnections": longDistanceConnections,
       "enableFeedback": enableFeedback,
+      "multiColumnL2": multiColumnL2,
       "numCorticalColumns": numCorticalColumns,
       "externalInputSize": externalInputSize,
       "sensorInputSize": inputSize,
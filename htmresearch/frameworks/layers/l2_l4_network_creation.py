@@ -98,12 +98,27 @@ import copy
 import json
 import numpy
 
+from htmresearch.algorithms.multi_column_pooler import MultiColumnPooler
+from htmresearch.support.sparse_links import linkSparse
+
 def enableProfiling(network):
   """Enable profiling for all regions in the network."""
   for region in network.regions.values():
     region.enableProfiling()
 
 
+def _link(network, networkConfig, srcName, destName, srcOutput, destInput):
+  """
+  Link without a propagation delay, as a sparse link if the networkConfig asks
+  for it.
+  """
+  if networkConfig.get("sparseLinks", False):
+    linkSparse(network, srcName, destName, srcOutput, destInput)
+  else:
+    network.link(srcName, destName, "UniformLink", "",
+                 srcOutput=srcOutput, destInput=destInput)
+
+
 def _addLateralSPRegion(network, networkConfig, suffix=""):
   spParams = networkConfig.get("lateralSPParams", {})
 
@@ -133,10 +148,10 @@ def _linkLateralSPRegion(network, networkConfig, externalInputName, L4ColumnName
 
   if not spParams:
     # Link sensors to L4, ignoring SP
-    network.link(externalInputName, L4ColumnName, "UniformLink", "",
-                 srcOutput="dataOut", destInput="basalInput")
-    network.link(externalInputName, L4ColumnName, "UniformLink", "",
-                 srcOutput="dataOut", destInput="basalGrowthCandidates")
+    _link(network, networkConfig, externalInputName, L4ColumnName,
+          srcOutput="dataOut", destInput="basalInput")
+    _link(network, networkConfig, externalInputName, L4ColumnName,
+          srcOutput="dataOut", destInput="basalGrowthCandidates")
     return
 
   # Link lateral input to SP input, SP output to L4 lateral input
@@ -151,8 +166,8 @@ def _linkFeedForwardSPRegion(network, networkConfig, sensorInputName, L4ColumnNa
 
   if not spParams:
     # Link sensors to L4, ignoring SP
-    network.link(sensorInputName, L4ColumnName, "UniformLink", "",
-                 srcOutput="dataOut", destInput="activeColumns")
+    _link(network, networkConfig, sensorInputName, L4ColumnName,
+          srcOutput="dataOut", destInput="activeColumns")
     return
 
   # Link lateral input to SP input, SP output to L4 lateral input
@@ -205,7 +220,8 @@ def createL4L2Column(network, networkConfig, suffix=""):
       },
       "feedForwardSPParams": {
         <constructor parameters for optional SPRegion>
-      }
+      },
+      "sparseLinks": False
     }
 
   Region names are externalInput, sensorInput, L4Column, and ColumnPoolerRegion.
@@ -219,6 +235,11 @@ def createL4L2Column(network, networkConfig, suffix=""):
     If externalInputSize is 0, the externalInput sensor (and SP if appropriate)
     will NOT be created. In this case it is expected that L4 is a sequence
     memory region (e.g. ApicalTMSequenceRegion)
+
+    If "sparseLinks" is True, the sensors, an ApicalTMPairRegion L4 and L2 are
+    created with sparseLinks enabled, and the links between them without a
+    propagation delay are created with linkSparse(), so each region reads the
+    active indices of its inputs directly. See htmresearch.support.sparse_links.
   """
 
   externalInputName = "externalInput" + suffix
@@ -229,14 +250,23 @@ def createL4L2Column(network, networkConfig, suffix=""):
   L4Params = copy.deepcopy(networkConfig["L4Params"])
   L4Params["basalInputWidth"] = networkConfig["externalInputSize"]
   L4Params["apicalInputWidth"] = networkConfig["L2Params"]["cellCount"]
+  L2Params = copy.deepcopy(networkConfig["L2Params"])
+
+  sparseLinks = networkConfig.get("sparseLinks", False)
+  if sparseLinks:
+    if networkConfig["L4RegionType"] == "py.ApicalTMPairRegion":
+      L4Params["sparseLinks"] = True
+    L2Params["sparseLinks"] = True
 
   if networkConfig["externalInputSize"] > 0:
     network.addRegion(
       externalInputName, "py.RawSensor",
-      json.dumps({"outputWidth": networkConfig["externalInputSize"]}))
+      json.dumps({"outputWidth": networkConfig["externalInputSize"],
+                  "sparseLinks": sparseLinks}))
   network.addRegion(
     sensorInputName, "py.RawSensor",
-    json.dumps({"outputWidth": networkConfig["sensorInputSize"]}))
+    json.dumps({"outputWidth": networkConfig["sensorInputSize"],
+                "sparseLinks": sparseLinks}))
 
   # Fixup network to include SP, if defined in networkConfig
   if networkConfig["externalInputSize"] > 0:
@@ -248,7 +278,7 @@ def createL4L2Column(network, networkConfig, suffix=""):
     json.dumps(L4Params))
   network.addRegion(
     L2ColumnName, "py.ColumnPoolerRegion",
-    json.dumps(networkConfig["L2Params"]))
+    json.dumps(L2Params))
 
   # Set phases appropriately so regions are executed in the proper sequence
   # This is required when we create multiple columns - the order of execution
@@ -270,11 +300,11 @@ def createL4L2Column(network, networkConfig, suffix=""):
   _linkFeedForwardSPRegion(network, networkConfig, sensorInputName, L4ColumnName)
 
   # Link L4 to L2
-  network.link(L4ColumnName, L2ColumnName, "UniformLink", "",
-               srcOutput="activeCells", destInput="feedforwardInput")
-  network.link(L4ColumnName, L2ColumnName, "UniformLink", "",
-               srcOutput="predictedActiveCells",
-               destInput="feedforwardGrowthCandidates")
+  _link(network, networkConfig, L4ColumnName, L2ColumnName,
+        srcOutput="activeCells", destInput="feedforwardInput")
+  _link(network, networkConfig, L4ColumnName, L2ColumnName,
+        srcOutput="predictedActiveCells",
+        destInput="feedforwardGrowthCandidates")
 
   # Link L2 feedback to L4
   if networkConfig.get("enableFeedback", True):
@@ -322,8 +352,14 @@ def createMultipleL4L2Columns(network, networkConfig):
       },
       "feedForwardSPParams": {
         <constructor parameters for optional SPRegion>
-      }
+      },
+      "multiColumnL2": False
     }
+
+  If "multiColumnL2" is True, the L2 columns share one MultiColumnPooler,
+  which computes every column's lateral support in a single sparse matrix
+  operation, and the L2 columns aren't linked to each other. The results are
+  the same.
   """
 
   # Create each column
@@ -338,6 +374,11 @@ def createMultipleL4L2Columns(network, networkConfig):
     suffix = "_" + str(i)
     network = createL4L2Column(network, networkConfigCopy, suffix)
 
+  if networkConfig.get("multiColumnL2", False):
+    _shareMultiColumnPooler(network, numCorticalColumns)
+    enableProfiling(network)
+    return network
+
   # Now connect the L2 columns laterally
   for i in range(networkConfig["numCorticalColumns"]):
     suffixSrc = "_" + str(i)
@@ -355,6 +396,22 @@ def createMultipleL4L2Columns(network, networkConfig):
   return network
 
 
+def _shareMultiColumnPooler(network, numCorticalColumns):
+  """
+  Replace the ColumnPoolers of the L2 columns with the columns of a single
+  MultiColumnPooler built from the first L2 column's parameters.
+  """
+  regions = [network.regions["L2Column_" + str(i)].getSelf()
+             for i in xrange(numCorticalColumns)]
+
+  params = regions[0].getPoolerParams()
+  del params["lateralInputWidths"]
+  pooler = MultiColumnPooler(numColumns=numCorticalColumns, **params)
+
+  for i, region in enumerate(regions):
+    region.setPooler(pooler.column(i))
+
+
 def createMultipleL4L2ColumnsWithTopology(network, networkConfig):
   """
   Create a network consisting of multiple columns.  Each column contains one
@@ -188,7 +188,7 @@ class BucketHTMRunner(BucketRunner, HTMRunner):
     return prototypeMap
 
 
-  def prepBucket(self, idx):
+  def prepBucket(self, idx, _=None):
     queryIDs = [self.buckets[idx][i][2] for i in self.partitions[idx][0]]
     rankIDs = [self.buckets[idx][i][2] for i in self.partitions[idx][1]]
     return queryIDs, rankIDs
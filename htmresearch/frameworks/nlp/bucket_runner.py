@@ -20,8 +20,10 @@
 # ----------------------------------------------------------------------
 import copy
 import itertools
+import multiprocessing
 import numpy
 import pprint
+import time
 
 from collections import defaultdict, OrderedDict
 
@@ -29,6 +31,26 @@ from htmresearch.frameworks.nlp.runner import Runner
 from htmresearch.support.data_split import Buckets
 
 
+# The runner and prototype map shared with the worker processes. They are set
+# before the pool is created, so the forked workers inherit the trained model
+# instead of unpickling it.
+_pooledBucketArgs = None
+
+
+
+def _runPooledBucket(idx):
+  """
+  Test one bucket in a worker process.
+
+  @return (tuple) The bucket index, the metrics for this bucket only, and the
+                  number of seconds it took.
+  """
+  runner, prototypeMap = _pooledBucketArgs
+  runner.metrics = runner._emptyMetrics()
+  elapsed = runner._runBucket(idx, prototypeMap)
+  return idx, runner.metrics, elapsed
+
+
 
 class BucketRunner(Runner):
   """Runner methods specific to the buckets experiment."""
@@ -36,23 +58,28 @@ class BucketRunner(Runner):
   # buffer ensures we use buckets large enough for both querying and ranking
   _rankBuffer = 5
 
-  def __init__(self, concatenationMethod="min", *args, **kwargs):
+  def __init__(self, concatenationMethod="min", numWorkers=1, *args,
+               **kwargs):
     """
     @param concatenationMethod  (str)   How to combine KNN distances from
       subsequent inference iterations.
+    @param numWorkers           (int)   Number of processes that test buckets
+      once the model is trained. The workers are forked, so they share the
+      trained model.
     """
     if concatenationMethod not in ("min", "mean"):
       raise ValueError(
         "Distance concatenation method must be one of 'min' or 'mean'.")
     self.concatenationMethod = concatenationMethod
+    self.numWorkers = numWorkers
     self.buckets = None
     self.skippedBuckets = []
 
     # the metrics lists exclude the buckets we skipped b/c they're too small.
-    self.metrics = {
-      "firstTP": defaultdict(list),
-      "numTop10": defaultdict(list),
-    }
+    self.metrics = self._emptyMetrics()
+
+    # seconds spent testing each bucket
+    self.bucketTimes = OrderedDict()
 
     super(BucketRunner, self).__init__(*args, **kwargs)
 
@@ -129,6 +156,7 @@ class BucketRunner(Runner):
     # The prototypeMap dict maps data samples' unique IDs to KNN prototype #s.
     prototypeMap = self.populateKNN()
 
+    bucketIndices = []
     for idx, bucket in self.buckets.iteritems():
       if len(bucket) < numInference + self._rankBuffer:
         self.skippedBuckets.append(idx)
@@ -136,13 +164,65 @@ class BucketRunner(Runner):
           self.labelRefs[idx])
         continue
 
-      queryIDs, rankIDs = self.prepBucket(idx, prototypeMap)
+      bucketIndices.append(idx)
 
-      self.testBucket(idx, prototypeMap, queryIDs, rankIDs)
+    if self.numWorkers > 1:
+      self._runBucketsInPool(bucketIndices, prototypeMap)
+    else:
+      for idx in bucketIndices:
+        self.bucketTimes[idx] = self._runBucket(idx, prototypeMap)
+
+    if self.verbosity > 0:
+      for idx, elapsed in self.bucketTimes.iteritems():
+        print "Bucket '{}' tested in {:.2f} seconds.".format(
+          self.labelRefs[idx], elapsed)
 
     return self.metrics
 
 
+  def _runBucket(self, idx, prototypeMap):
+    """
+    Test one bucket, adding its results to self.metrics.
+
+    @return (float) Number of seconds it took.
+    """
+    start = time.time()
+    queryIDs, rankIDs = self.prepBucket(idx, prototypeMap)
+    self.testBucket(idx, prototypeMap, queryIDs, rankIDs)
+    return time.time() - start
+
+
+  def _runBucketsInPool(self, bucketIndices, prototypeMap):
+    """
+    Test the buckets in self.numWorkers processes. The results are merged in
+    the order of bucketIndices, so the metrics are the same as when the buckets
+    are tested one after another.
+    """
+    global _pooledBucketArgs
+    _pooledBucketArgs = (self, prototypeMap)
+    pool = multiprocessing.Pool(self.numWorkers)
+    try:
+      results = pool.map(_runPooledBucket, bucketIndices)
+    finally:
+      pool.close()
+      pool.join()
+      _pooledBucketArgs = None
+
+    for idx, bucketMetrics, elapsed in results:
+      for metricName, iterations in bucketMetrics.iteritems():
+        for iteration, values in iterations.iteritems():
+          self.metrics[metricName][iteration].extend(values)
+      self.bucketTimes[idx] = elapsed
+
+
+  @staticmethod
+  def _emptyMetrics():
+    return {
+      "firstTP": defaultdict(list),
+      "numTop10": defaultdict(list),
+    }
+
+
   def populateKNN(self):
     """
     Populate the KNN space with every pattern. We track the KNN prototype number
@@ -227,28 +307,40 @@ class BucketRunner(Runner):
     @param protoIDs   (dict)  Map of unique IDs to sequence numbers as they are
                               used when populating KNN space.
     """
-    numProtos=0
-    for val in protoIDs.values():
-      numProtos += len(val)
+    if len(distances) == 0:
+      return []
+
+    queryIDs = distances.keys()
+    queryDistances = numpy.array(distances.values(), dtype="float64")
+    iterations = numpy.arange(len(queryIDs))
+
+    # The prototypes of the sample queried in each iteration.
+    excludedIterations = numpy.repeat(
+      iterations, [len(protoIDs[ID]) for ID in queryIDs])
+    excludedPrototypes = numpy.concatenate(
+      [protoIDs[ID] for ID in queryIDs]).astype("int64")
 
     if self.concatenationMethod == "mean":
-      summedDist = numpy.zeros(numProtos)
+      accumulated = (numpy.cumsum(queryDistances, axis=0) /
+                     (iterations + 1.0)[:, numpy.newaxis])
     elif self.concatenationMethod == "min":
-      tempDist = numpy.ones(numProtos)
+      accumulated = numpy.minimum.accumulate(
+        numpy.minimum(queryDistances, 1.0), axis=0)
 
-    accumulatedDistances = []
-    for n, (ID, dist) in enumerate(distances.iteritems()):
-      if self.concatenationMethod == "mean":
-        summedDist += dist
-        tempDist = summedDist / (n+1.0)
-      elif self.concatenationMethod == "min":
-        tempDist = numpy.minimum(tempDist, dist)
-      # In each iteration, exclude the queried samples.
-      tempDist[protoIDs[ID]] = 1.1  # TODO: w/ nupic #2890, use sequenceId
+      # The excluded distance of 1.1 is carried into the following minimums,
+      # so after its exclusion a prototype's minimum starts over from 1.1.
+      later = iterations[:, numpy.newaxis] > excludedIterations
+      restarted = numpy.where(later, queryDistances[:, excludedPrototypes],
+                              1.1)
+      numpy.minimum.accumulate(restarted, axis=0, out=restarted)
+      accumulated[:, excludedPrototypes] = numpy.where(
+        later, restarted, accumulated[:, excludedPrototypes])
 
-      accumulatedDistances.append(tempDist)
+    # In each iteration, exclude the queried samples.
+    # TODO: w/ nupic #2890, use sequenceId
+    accumulated[excludedIterations, excludedPrototypes] = 1.1
 
-    return accumulatedDistances
+    return list(accumulated)
 
 
   def calcMetrics(self, accumulatedDistances, protoIDs, rankIDs):
@@ -262,33 +354,53 @@ class BucketRunner(Runner):
                                     these lists do not include buckets too
                                     small for the experiment.
     """
+    sampleIDs = protoIDs.keys()
+    samplePositions = dict(zip(sampleIDs, xrange(len(sampleIDs))))
+    rankPositions = numpy.array([samplePositions[ID] for ID in rankIDs],
+                                dtype="int64")
+
+    if isinstance(protoIDs[sampleIDs[0]], list):
+      # IDs each map to multiple prototypes. Group the samples by their number
+      # of prototypes, so that each group's prototypes form a matrix with one
+      # row per sample.
+      counts = numpy.array([len(protoIDs[ID]) for ID in sampleIDs])
+      prototypeGroups = []
+      for count in numpy.unique(counts):
+        samples = numpy.flatnonzero(counts == count)
+        prototypes = numpy.array([protoIDs[sampleIDs[i]] for i in samples],
+                                 dtype="int64")
+        prototypeGroups.append((samples, prototypes))
+    else:
+      prototypeGroups = None
+      bestPrototypes = numpy.array(protoIDs.values(), dtype="int64")
+
     for iteration, distances in enumerate(accumulatedDistances):
+      distances = numpy.asarray(distances)
+
       # First make sure each sample maps to its best prototype.
-      protoMappings = copy.deepcopy(protoIDs)
-      if isinstance(protoIDs[protoIDs.keys()[0]], list):
-        # IDs each map to multiple prototypes, so use the closest prototype
-        # (i.e. best matching window) for each ID
-        for i, (pID, prototypes) in enumerate(protoIDs.iteritems()):
-          distForThisID = [distances[proto] for proto in prototypes]
-          bestProto = numpy.argsort(distForThisID)[0]
-          protoMappings[pID] = prototypes[bestProto]
+      if prototypeGroups is not None:
+        # Use the closest prototype (i.e. best matching window) for each ID.
+        # Each row is sorted like numpy.argsort(distForThisID)[0], so ties go
+        # to the same prototype.
+        bestPrototypes = numpy.empty(len(sampleIDs), dtype="int64")
+        for samples, prototypes in prototypeGroups:
+          best = numpy.argsort(distances[prototypes], axis=1)[:, 0]
+          bestPrototypes[samples] = prototypes[numpy.arange(len(samples)),
+                                               best]
 
       # Only use the prototypes for which we've mapped data samples.
-      # eligibleDistances = [distances[j] for j in protoMappings.values()]
-      eligibleDistances = numpy.zeros(len(protoMappings))
-      mapDistances = OrderedDict()
-      for eligibleDIdx, allDIdx in enumerate(protoMappings.values()):
-        # eligibile distances are to the prototypes which best represent each
-        # sample, and we need to map the indices of the eligible distances
-        # array to those of the distances array
-        eligibleDistances[eligibleDIdx] = distances[allDIdx]
-        mapDistances[allDIdx] = eligibleDIdx
+      eligibleDistances = distances[bestPrototypes]
+
+      # Map each prototype to its index in the eligible distances; if samples
+      # share a prototype, the last one wins.
+      mapDistances = dict(zip(bestPrototypes.tolist(),
+                              xrange(len(bestPrototypes))))
 
       # get the indices of closest-to-farthest eligible prototypes:
       sortedDistances = numpy.argsort(eligibleDistances)
       # get the prototype indices (in distances array) representing the samples
       # we want to rank:
-      rankPrototypes = [protoMappings[ID] for ID in rankIDs]
+      rankPrototypes = bestPrototypes[rankPositions].tolist()
       # get the ranks of the desired prototypes:
       ranks = sortedDistances[[mapDistances[rP] for rP in rankPrototypes]]
       topRanks = numpy.sort(ranks)
@@ -107,6 +107,7 @@ class ClassificationModel(object):
     # mappings produced by the tokenizer.
     assert (sampleId is not None), "Must pass in a sampleId"
     tokenList, _ = self.tokenize(document)
+    self.prefetch(tokenList)
     lastTokenIndex = len(tokenList) - 1
     for i, token in enumerate(tokenList):
       self.trainToken(
@@ -270,6 +271,24 @@ class ClassificationModel(object):
     raise NotImplementedError
 
 
+  def prefetch(self, tokens):
+    """
+    Let the encoder load the encodings of these tokens in bulk, before the
+    model is trained or run on them one token at a time. Models that don't
+    encode individual tokens should override this to do nothing.
+
+    @param tokens (iterable) Tokens that will be passed to trainToken or
+                             inferToken.
+    """
+    try:
+      encoder = self.getEncoder()
+    except NotImplementedError:
+      return
+
+    if encoder is not None:
+      encoder.prefetch(tokens)
+
+
   def getClassifier(self):
     """
     Returns the classifier instance for the model.
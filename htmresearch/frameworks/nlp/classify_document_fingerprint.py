@@ -68,12 +68,16 @@ class ClassificationModelDocumentFingerprint(ClassificationNetworkAPI):
                retina="en_associative",
                apiKey=None,
                k=1,
+               fingerprintStore=None,
+               offline=False,
                **kwargs):
     """
     @param retinaScaling      (float)   Scales the dimensions of the SDRs.
     @param retina             (str)     Name of Cio retina.
     @param apiKey             (str)     Key for Cio API.
     @param k                  (int)     The k for KNN classifier
+    @param fingerprintStore   (FingerprintStore) Local store of Cio encodings.
+    @param offline            (bool)    Never query the Cio API.
 
     Note classifierMetric is not specified here as it is in other models. This
     is done in the network config file.
@@ -83,6 +87,8 @@ class ClassificationModelDocumentFingerprint(ClassificationNetworkAPI):
     self.retinaScaling = retinaScaling
     self.retina = retina
     self.apiKey = apiKey
+    self.fingerprintStore = fingerprintStore
+    self.offline = offline
     self.currentDocument = None
     self._initModel(k)
     self._initializeRegionHelpers()
@@ -96,7 +102,9 @@ class ClassificationModelDocumentFingerprint(ClassificationNetworkAPI):
                          retina=self.retina,
                          fingerprintType=EncoderTypes.document,
                          apiKey=self.apiKey,
-                         verbosity=self.verbosity-1)
+                         verbosity=self.verbosity-1,
+                         fingerprintStore=self.fingerprintStore,
+                         offline=self.offline)
 
     modelConfig["classifierRegionConfig"]["regionParams"]["k"] = k
     modelConfig["classifierRegionConfig"]["regionParams"][
@@ -105,6 +113,13 @@ class ClassificationModelDocumentFingerprint(ClassificationNetworkAPI):
     self.network = createAndConfigureNetwork(None, self.networkConfig, encoder)
 
 
+  def prefetch(self, tokens):
+    """
+    Documents are encoded whole, so there is nothing to prefetch per token.
+    """
+    pass
+
+
   def trainToken(self, token, labels, sampleId, resetSequence=0):
     """
     Train the model with the given text token, associated labels, and
@@ -46,6 +46,8 @@ class ClassificationModelFingerprint(ClassificationModel):
                k=1,
                classifierMetric="rawOverlap",
                cacheRoot=None,
+               fingerprintStore=None,
+               offline=False,
                **kwargs):
 
     super(ClassificationModelFingerprint, self).__init__(**kwargs)
@@ -66,7 +68,9 @@ class ClassificationModelFingerprint(ClassificationModel):
                               unionSparsity=unionSparsity,
                               retina=retina,
                               apiKey=apiKey,
-                              cacheDir=cacheRoot)
+                              cacheDir=cacheRoot,
+                              fingerprintStore=fingerprintStore,
+                              offline=offline)
 
     self.currentDocument = None
 
@@ -155,6 +159,15 @@ class ClassificationModelFingerprint(ClassificationModel):
     return inferenceResult, idList, sortedDistances
 
 
+  def prefetch(self, tokens):
+    """
+    Documents are encoded whole, so only word encoders use the tokens'
+    fingerprints.
+    """
+    if self.encoder.fingerprintType == EncoderTypes.word:
+      self.encoder.prefetch(tokens)
+
+
   def getEncoder(self):
     """
     Returns the encoder instance for the model.
@@ -36,6 +36,8 @@ class ClassificationModelHTM(ClassificationNetworkAPI):
                apiKey=None,
                maxSparsity=1.0,
                cacheRoot=None,
+               fingerprintStore=None,
+               offline=False,
                **kwargs):
     """
     @param retinaScaling      (float)   Scales the dimensions of the SDRs.
@@ -43,6 +45,8 @@ class ClassificationModelHTM(ClassificationNetworkAPI):
     @param apiKey             (str)     Key for Cio API.
     @param maxSparsity        (float)   The maximum sparsity of the CIO bitmap.
     @param cacheRoot          (str)     Directory for caching Cio encodings.
+    @param fingerprintStore   (FingerprintStore) Local store of Cio encodings.
+    @param offline            (bool)    Never query the Cio API.
 
     See ClassificationModel for remaining parameters.
     """
@@ -52,6 +56,8 @@ class ClassificationModelHTM(ClassificationNetworkAPI):
     self.retina = retina
     self.apiKey = apiKey
     self.maxSparsity = maxSparsity
+    self.fingerprintStore = fingerprintStore
+    self.offline = offline
 
     self.network = self._initModel(cacheRoot)
     self._initializeRegionHelpers()
@@ -66,7 +72,9 @@ class ClassificationModelHTM(ClassificationNetworkAPI):
                          apiKey=self.apiKey,
                          maxSparsity=self.maxSparsity,
                          verbosity=self.verbosity-1,
-                         cacheDir=cacheRoot)
+                         cacheDir=cacheRoot,
+                         fingerprintStore=self.fingerprintStore,
+                         offline=self.offline)
 
     # This encoder specifies the LanguageSensor output width.
     return createAndConfigureNetwork(None, self.networkConfig, encoder)
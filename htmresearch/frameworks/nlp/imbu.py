@@ -47,6 +47,7 @@ from tqdm import tqdm
 from htmresearch.encoders import EncoderTypes
 from htmresearch.frameworks.nlp.classification_model import ClassificationModel
 from htmresearch.support.csv_helper import readCSV
+from htmresearch.support.fingerprint_store import FingerprintStore
 from htmresearch.support.register_regions import registerAllResearchRegions
 from htmresearch.frameworks.nlp.model_factory import (
   ClassificationModelTypes,
@@ -132,7 +133,7 @@ class ImbuModels(object):
 
 
   def __init__(self, dataPath, cacheRoot=None, modelSimilarityMetric=None,
-      apiKey=None, retina=None):
+      apiKey=None, retina=None, fingerprintStore=None, offline=False):
 
     if not dataPath:
       raise RuntimeError("Imbu needs a CSV datafile to run.")
@@ -145,6 +146,8 @@ class ImbuModels(object):
     self.dataDict = self._loadData()
     self.apiKey = apiKey
     self.retina = retina or self.defaultRetina
+    self.fingerprintStore = fingerprintStore
+    self.offline = offline
 
 
   def __repr__(self):
@@ -192,7 +195,9 @@ class ImbuModels(object):
       # Model type requires Cortical.io credentials
       kwargs.update(retina=self.retina, apiKey=self.apiKey)
       # Specify encoder params
-      kwargs.update(cacheRoot=self.cacheRoot, retinaScaling=1.0)
+      kwargs.update(cacheRoot=self.cacheRoot, retinaScaling=1.0,
+                    fingerprintStore=self.fingerprintStore,
+                    offline=self.offline)
 
     if modelName == "CioWordFingerprint":
       kwargs.update(fingerprintType=EncoderTypes.word)
@@ -277,12 +282,20 @@ class ImbuModels(object):
     """
     labels = [0]
     modelType = type(model)
+
+    # Fetch the encodings of the whole dataset in bulk
+    tokenized = dict((seqId, model.tokenize(text))
+                     for seqId, (text, _, _) in self.dataDict.iteritems())
+    model.prefetch(set(token
+                       for tokenList, _ in tokenized.itervalues()
+                       for token in tokenList))
+
     for seqId, (text, _, _) in tqdm(self.dataDict.iteritems()):
       if modelType in self.documentLevel:
         model.trainDocument(text, labels, seqId)
       else:
         # Word-level model, so use token-word mappings
-        tokenList, mapping = model.tokenize(text)
+        tokenList, mapping = tokenized[seqId]
         lastTokenIndex = len(tokenList) - 1
         for i, (token, tokenIndex) in enumerate(zip(tokenList, mapping)):
           wordId = seqId * self.tokenIndexingFactor + tokenIndex
@@ -475,7 +488,10 @@ def startImbu(args):
     modelSimilarityMetric=args.modelSimilarityMetric,
     dataPath=args.dataPath,
     retina=args.imbuRetinaId,
-    apiKey=args.corticalApiKey
+    apiKey=args.corticalApiKey,
+    fingerprintStore=(FingerprintStore(args.fingerprintStore)
+                      if args.fingerprintStore else None),
+    offline=args.offline
   )
 
   model = imbu.createModel(args.modelName,
@@ -520,6 +536,15 @@ def getArgs():
   parser.add_argument("--cacheRoot",
                       type=str,
                       help="Root directory in which to cache encodings")
+  parser.add_argument("--fingerprintStore",
+                      type=str,
+                      help="SQLite file in which to store encodings, instead "
+                           "of the cacheRoot directory")
+  parser.add_argument("--offline",
+                      default=False,
+                      action="store_true",
+                      help="Never query the Cortical.io API; use only the "
+                           "encodings in the fingerprint store")
   parser.add_argument("--modelSimilarityMetric",
                       default=ImbuModels.defaultSimilarityMetric,
                       type=str,
@@ -0,0 +1,313 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+A vectorized version of neuron_model.Matrix_Neuron.
+
+The synapses of each dendrite are stored as a row of index arrays, and the
+activations of a whole dataset are computed with one sparse matrix product.
+Training can update the permanences for a minibatch of datapoints at once.
+
+Data can be a scipy sparse matrix, a dense numpy array or a nupic SparseMatrix.
+The nonlinearities in this module take and return scipy sparse matrices; the
+ones in neuron_model only work with nupic SparseMatrices.
+"""
+
+from collections import Counter
+from multiprocessing import Pool, cpu_count
+
+import numpy
+import scipy.sparse
+from sklearn.cluster import KMeans
+
+
+def power_nonlinearity(power):
+  def l(activations):
+    activations = activations.copy()
+    activations.data **= power
+    return activations
+  return l
+
+def threshold_nonlinearity(threshold):
+  def l(activations):
+    activations = activations.copy()
+    activations.data[activations.data < threshold] = 0
+    activations.eliminate_zeros()
+    return activations
+  return l
+
+def sigmoid(center, scale):
+  return lambda x: 1./(1. + numpy.exp(scale*(center - x)))
+
+def sigmoid_nonlinearity(center, scale):
+  def l(activations):
+    f = sigmoid(center, scale)
+    return scipy.sparse.csr_matrix(f(activations.toarray()))
+  return l
+
+def to_csr(data):
+  """
+  Convert a dataset to a scipy CSR matrix with one row per datapoint.
+  """
+  if scipy.sparse.issparse(data):
+    return data.tocsr()
+  if isinstance(data, numpy.ndarray):
+    return scipy.sparse.csr_matrix(data)
+
+  # nupic SparseMatrix
+  indices = []
+  values = []
+  indptr = [0]
+  for row in range(data.nRows()):
+    rowIndices, rowValues = data.rowNonZeros(row)
+    indices.append(numpy.asarray(rowIndices, dtype="int32"))
+    values.append(numpy.asarray(rowValues, dtype="float32"))
+    indptr.append(indptr[-1] + len(rowIndices))
+  return scipy.sparse.csr_matrix(
+    (numpy.concatenate(values) if values else numpy.empty(0, "float32"),
+     numpy.concatenate(indices) if indices else numpy.empty(0, "int32"),
+     indptr),
+    shape=(data.nRows(), data.nCols()))
+
+def sample_rows(num_rows, population, k):
+  """
+  Draw k distinct values from range(population) for each of num_rows rows.
+  """
+  samples = numpy.random.randint(population, size=(num_rows, k))
+  for attempt in range(10):
+    samples.sort(axis=1)
+    duplicates = numpy.where((samples[:, 1:] == samples[:, :-1]).any(axis=1))[0]
+    if len(duplicates) == 0:
+      return samples
+    samples[duplicates] = numpy.random.randint(population,
+                                               size=(len(duplicates), k))
+
+  for row in numpy.where((numpy.sort(samples, axis=1)[:, 1:] ==
+                          numpy.sort(samples, axis=1)[:, :-1]).any(axis=1))[0]:
+    samples[row] = numpy.random.choice(population, k, replace=False)
+  return samples
+
+def run_sweep(experiment, parameters, num_workers=None):
+  """
+  Call experiment(p) for every p in parameters, in a process pool.  The
+  results are returned in the order of parameters.  experiment must be a
+  top-level function so that it can be sent to the workers.
+  """
+  if num_workers == 1:
+    return [experiment(p) for p in parameters]
+
+  pool = Pool(num_workers or cpu_count())
+  try:
+    return pool.map(experiment, parameters, chunksize=1)
+  finally:
+    pool.close()
+    pool.join()
+
+class CSR_Neuron(object):
+  """
+  Same model and learning rule as Matrix_Neuron.  self.synapses holds the
+  input index of each synapse, one row per dendrite, with -1 for empty slots.
+  self.permanences holds the permanence of each synapse.
+  """
+  def __init__(self,
+         size = 10000,
+         num_dendrites = 1000,
+         dendrite_length = 10,
+         dim = 400,
+         nonlinearity = threshold_nonlinearity(6),
+         initial_permanence = 0.5,
+         permanence_threshold = 0.15,
+         permanence_decrement = 0.0125,
+         permanence_increment = 0.02):
+    self.size = size
+    self.num_dendrites = num_dendrites
+    self.dendrite_length = dendrite_length
+    self.dim = dim
+    self.nonlinearity = nonlinearity
+    self.initial_permanence = initial_permanence
+    self.permanence_threshold = permanence_threshold
+    self.permanence_decrement = permanence_decrement
+    self.permanence_increment = permanence_increment
+    self.initialize_dendrites()
+    self.initialize_permanences()
+
+  def initialize_dendrites(self):
+    """
+    Initialize all the dendrites of the neuron to a set of random connections
+    """
+    self.synapses = sample_rows(self.num_dendrites, self.dim,
+                                self.dendrite_length)
+
+  def initialize_permanences(self):
+    self.permanences = numpy.where(self.synapses >= 0,
+                                   self.initial_permanence, 0.)
+
+  def dendrite_matrix(self):
+    """
+    @return a binary CSR matrix with a row for each dendrite and a column for
+    each input.
+    """
+    valid = self.synapses >= 0
+    indptr = numpy.concatenate(([0], numpy.cumsum(valid.sum(axis=1))))
+    return scipy.sparse.csr_matrix(
+      (numpy.ones(indptr[-1], dtype="float32"), self.synapses[valid], indptr),
+      shape=(self.num_dendrites, self.dim))
+
+  def calculate_activation(self, datapoint):
+    """
+    Only for a single datapoint
+    """
+    return self.calculate_on_entire_dataset(datapoint)[0]
+
+  def calculate_on_entire_dataset(self, data):
+    activations = to_csr(data).dot(self.dendrite_matrix().T)
+    activations = self.nonlinearity(activations)
+    return numpy.asarray(activations.sum(axis=1)).ravel()
+
+  def HTM_style_initialize_on_data(self, data, labels):
+    """
+    Uses a style of initialization inspired by the temporal memory.  When a new positive example is found,
+    a dendrite is chosen and a number of synapses are created to the example.
+
+    If there are more positive examples than dendrites, the data is clustered and similar datapoints
+    share a dendrite, as in Matrix_Neuron.
+    """
+    self.synapses = numpy.full((self.num_dendrites, self.dendrite_length), -1,
+                               dtype="int64")
+
+    # We want to avoid training on any negative examples
+    data = to_csr(data)[numpy.asarray(labels) == 1]
+
+    if data.shape[0] > self.num_dendrites:
+      print "Neuron using clustering to initialize dendrites"
+      data = data.toarray()
+      model = KMeans(n_clusters = self.num_dendrites, n_jobs=1)
+      clusters = model.fit_predict(data)
+      multisets = [[Counter(), []] for i in range(self.num_dendrites)]
+      sparse_data = [numpy.nonzero(datapoint)[0].tolist() for datapoint in data]
+
+      for datapoint, cluster in zip(sparse_data, clusters):
+        multisets[cluster][0] = multisets[cluster][0] + Counter(datapoint)
+        multisets[cluster][1].append(set(datapoint))
+
+      for i, multiset in enumerate(multisets):
+        shared_elements = set(map(lambda x: x[0], filter(lambda x: x[1] > 1, multiset[0].most_common(self.dendrite_length))))
+        dendrite_connections = shared_elements
+        while len(shared_elements) < self.dendrite_length:
+          most_distant_point = multiset[1][numpy.argmin([len(dendrite_connections.intersection(point)) for point in multiset[1]])]
+          new_connection = numpy.random.choice(sorted(most_distant_point - dendrite_connections))
+          dendrite_connections.add(new_connection)
+
+        self.synapses[i, :len(dendrite_connections)] = sorted(dendrite_connections)
+
+    else:
+      # Pick dendrite_length random active bits of each datapoint: give every
+      # active bit a random key and keep the smallest keys of each row.
+      rows = numpy.repeat(numpy.arange(data.shape[0]), numpy.diff(data.indptr))
+      order = numpy.lexsort((numpy.random.rand(len(rows)), rows))
+      rank = numpy.arange(len(rows)) - data.indptr[rows]
+      chosen = rank < self.dendrite_length
+      self.synapses[rows[chosen], rank[chosen]] = data.indices[order][chosen]
+
+    self.initialize_permanences()
+
+  def HTM_style_train_on_data(self, data, labels, batch_size = 1):
+    """
+    Train on each datapoint in turn, like Matrix_Neuron.  With batch_size > 1,
+    the activations of a minibatch are all computed before its permanence
+    updates are applied together.
+    """
+    data = to_csr(data)
+    labels = numpy.asarray(labels)
+    for start in range(0, data.shape[0], batch_size):
+      self.HTM_style_train_on_batch(data[start:start + batch_size],
+                                    labels[start:start + batch_size])
+
+  def HTM_style_train_on_datapoint(self, datapoint, label):
+    self.HTM_style_train_on_batch(to_csr(datapoint), [label])
+
+  def HTM_style_train_on_batch(self, batch, labels):
+    """
+    Run a version of permanence-based training on a minibatch of datapoints.  Due to the fixed dendrite count and
+    dendrite length, we are forced to more efficiently use each synapse, deleting synapses and resetting them if
+    they are not found useful.
+    """
+    labels = numpy.asarray(labels)
+    activations = self.nonlinearity(batch.dot(self.dendrite_matrix().T))
+    activations = numpy.asarray(activations.todense())
+    active = activations.sum(axis=1) > 0
+    strongest_branches = activations.argmax(axis=1)
+
+    inputs = batch.toarray() != 0
+    valid = self.synapses >= 0
+    positive = numpy.where((labels >= 1) & active)[0]
+    negative = numpy.where((labels < 1) & active)[0]
+
+    # Reinforce the strongest branch on positive examples, and weaken it on
+    # negative examples. Matrix_Neuron computes the change of the inactive
+    # synapses on positive examples with "1 - datapoint", which an SM32
+    # evaluates as "datapoint - 1", so they are incremented by
+    # permanence_decrement. Do the same to keep the two models identical.
+    changes = numpy.zeros(self.permanences.shape)
+    for rows, active_change, inactive_change in (
+        (positive, self.permanence_increment, self.permanence_decrement),
+        (negative, -self.permanence_decrement, 0.)):
+      branches = strongest_branches[rows]
+      synapses = self.synapses[branches]
+      on = inputs[rows[:, numpy.newaxis], synapses]
+      numpy.add.at(changes, branches,
+                   numpy.where(on, active_change, inactive_change) *
+                   valid[branches])
+    self.permanences += changes
+
+    # Replace the weak synapses on the reinforced branches, using the active
+    # bits of the last positive example on each branch.
+    last_positive = dict(zip(strongest_branches[positive].tolist(),
+                             positive.tolist()))
+    for branch, row in sorted(last_positive.iteritems()):
+      scores = self.permanences[branch]
+      weak = numpy.where(valid[branch] & (scores < self.permanence_threshold) &
+                         (scores != 0))[0]
+      for slot in weak:
+        candidates = numpy.setdiff1d(numpy.where(inputs[row])[0],
+                                     self.synapses[branch])
+        if len(candidates) == 0:
+          self.synapses[branch, slot] = -1
+          self.permanences[branch, slot] = 0
+        else:
+          self.synapses[branch, slot] = numpy.random.choice(candidates)
+          self.permanences[branch, slot] = self.initial_permanence
+
+    # Grow a new branch for positive examples that weren't recognized.
+    unrecognized = numpy.where((labels >= 1) & ~active)[0]
+    if len(unrecognized) > 0:
+      sums = self.permanences.sum(axis=1)
+      for row in unrecognized:
+        weakest_branch = numpy.argmin(sums)
+        scores = self.permanences[weakest_branch][self.synapses[weakest_branch] >= 0]
+        scores = scores[scores != 0]
+        column = numpy.concatenate((scores, numpy.zeros(self.dim - len(scores))))
+        if numpy.median(column) < self.permanence_threshold:
+          ones = numpy.where(inputs[row])[0]
+          self.synapses[weakest_branch] = numpy.random.choice(
+            ones, size = self.dendrite_length, replace = False)
+          self.permanences[weakest_branch] = self.initial_permanence
+          sums[weakest_branch] = self.permanences[weakest_branch].sum()
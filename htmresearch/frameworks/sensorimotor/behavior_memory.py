@@ -32,7 +32,12 @@ class BehaviorMemory(object):
                goalToBehaviorLearningRate=0.3,
                behaviorToMotorLearningRate=0.3,
                motorToBehaviorLearningRate=0.3,
-               behaviorDecayRate=0.10):
+               behaviorDecayRate=0.10,
+               weightDtype="float64"):
+    """
+    @param weightDtype (string)
+    The dtype of the three weight tensors. "float32" halves their memory.
+    """
     self.numMotorColumns = numMotorColumns
     self.numSensorColumns = numSensorColumns
     self.numCellsPerSensorColumn = numCellsPerSensorColumn
@@ -53,13 +58,14 @@ class BehaviorMemory(object):
 
     self.goalToBehavior = self._initWeights([self.numSensorColumns,
                                              self.numCellsPerSensorColumn,
-                                             self.numGoalCells])
+                                             self.numGoalCells], weightDtype)
     self.behaviorToMotor = self._initWeights([self.numMotorCells,
                                               self.numSensorColumns,
-                                              self.numCellsPerSensorColumn])
+                                              self.numCellsPerSensorColumn],
+                                             weightDtype)
     self.motorToBehavior = self._initWeights([self.numSensorColumns,
                                               self.numCellsPerSensorColumn,
-                                              self.numMotorCells])
+                                              self.numMotorCells], weightDtype)
 
     # For debugging
     self.activeMotorColumns = set()
@@ -74,11 +80,11 @@ class BehaviorMemory(object):
 
 
   @staticmethod
-  def _initWeights(shape):
+  def _initWeights(shape, dtype="float64"):
     weights = numpy.random.normal(0.1, 0.1, shape)
     numpy.clip(weights, 0, 1, out=weights)
 
-    return weights
+    return weights.astype(dtype, copy=False)
 
 
   @staticmethod
@@ -88,12 +94,51 @@ class BehaviorMemory(object):
     return arr
 
 
+  @staticmethod
+  def _makeArrays(sequence, length):
+    """
+    Like _makeArray, with one row for each set of active columns.
+    """
+    arr = numpy.zeros([len(sequence), length])
+    rows = [i for i, s in enumerate(sequence) for _ in s]
+    columns = [c for s in sequence for c in s]
+    arr[rows, columns] = 1
+    return arr
+
+
   @classmethod
   def _reinforce(cls, weights, active, learningRate):
     delta = active * learningRate
     return cls._addAndNormalize(weights, delta)
 
 
+  @staticmethod
+  def _reinforceRows(weights, rows, active, learningRates):
+    """
+    Reinforce several rows of a 2D weight matrix at once, each with its own
+    learning rate. Same as calling _reinforce on each row.
+    """
+    if len(rows) == 0:
+      return
+
+    rowWeights = weights[rows]
+    total = rowWeights.sum(axis=1, keepdims=True)
+    rowWeights += numpy.outer(learningRates, active)
+    numpy.clip(rowWeights, 0, 1, out=rowWeights)
+    rowWeights /= (rowWeights.sum(axis=1, keepdims=True) / total)
+    weights[rows] = rowWeights
+
+
+  @staticmethod
+  def _dot(activity, weights):
+    """
+    numpy.dot(activity, weights.T), in the dtype of the weights so that
+    float32 weights aren't copied to float64.
+    """
+    return numpy.dot(activity.astype(weights.dtype, copy=False),
+                     weights.transpose())
+
+
   @staticmethod
   def _addAndNormalize(numbers, delta):
     total = numbers.sum()
@@ -137,6 +182,97 @@ class BehaviorMemory(object):
       self._reinforceMotorToBehavior(self.motor, self.activeBehavior)
 
 
+  def computeSequence(self, motorSequence, sensorSequence, goalSequence=None):
+    """
+    Run compute over a recorded trajectory.
+
+    Timesteps without a goal learn, so they run one at a time. Each run of
+    consecutive timesteps with a goal doesn't change the weights, so it is
+    computed with one matrix product per weight tensor.
+
+    @param motorSequence (list of sets)
+    @param sensorSequence (list of sets)
+    @param goalSequence (list of sets or None)
+    Active columns at each timestep. If goalSequence is None, every timestep
+    learns.
+
+    @return (numpy array)
+    The motor output after each timestep, one row per timestep.
+    """
+    numSteps = len(motorSequence)
+    if goalSequence is None:
+      goalSequence = [()] * numSteps
+
+    motors = numpy.zeros([numSteps, self.numMotorCells])
+
+    start = 0
+    while start < numSteps:
+      if len(goalSequence[start]) == 0:
+        self.compute(motorSequence[start], sensorSequence[start],
+                     goalSequence[start])
+        motors[start] = self.motor
+        start += 1
+      else:
+        end = start
+        while end < numSteps and len(goalSequence[end]):
+          end += 1
+        motors[start:end] = self._computeGoalSteps(motorSequence[start:end],
+                                                   sensorSequence[start:end],
+                                                   goalSequence[start:end])
+        start = end
+
+    return motors
+
+
+  def _computeGoalSteps(self, motorSequence, sensorSequence, goalSequence):
+    """
+    Same as calling compute at each timestep, when every timestep has a goal.
+
+    @return (numpy array) The motor output at each timestep.
+    """
+    numSteps = len(motorSequence)
+    motorPatterns = self._makeArrays(motorSequence, self.numMotorColumns)
+    sensorPatterns = self._makeArrays(sensorSequence, self.numSensorColumns)
+    goalPatterns = self._makeArrays(goalSequence, self.numSensorColumns)
+    prevSensorPatterns = numpy.zeros(sensorPatterns.shape)
+    prevSensorPatterns[0] = self._makeArray(self.activeSensorColumns,
+                                            self.numSensorColumns)
+    prevSensorPatterns[1:] = sensorPatterns[:-1]
+
+    activity = self._dot(goalPatterns, self.goalToBehaviorFlat())
+    activity = activity.reshape([numSteps, self.numSensorColumns,
+                                 self.numCellsPerSensorColumn])
+
+    def behaviorFromGoal(patterns):
+      behavior = activity * patterns[:, :, numpy.newaxis]
+      behavior /= behavior.max(axis=(1, 2), keepdims=True)
+      return behavior
+
+    def motorFromBehavior(behavior):
+      motor = self._dot(behavior.reshape([numSteps, -1]),
+                        self.behaviorToMotorFlat())
+      motor /= motorPatterns.sum(axis=1, keepdims=True)
+      motor /= motor.max(axis=1, keepdims=True)
+      return motor
+
+    reconstructedBehavior = behaviorFromGoal(prevSensorPatterns)
+    activeBehavior = behaviorFromGoal(sensorPatterns)
+    motors = motorFromBehavior(activeBehavior)
+
+    self.prevActiveSensorColumns = (sensorSequence[-2] if numSteps > 1
+                                    else self.activeSensorColumns)
+    self.activeMotorColumns = motorSequence[-1]
+    self.activeSensorColumns = sensorSequence[-1]
+    self.activeGoalColumns = goalSequence[-1]
+    self.goal = goalPatterns[-1]
+    self.reconstructedBehavior = reconstructedBehavior[-1]
+    self.reconstructedMotor = motorFromBehavior(reconstructedBehavior)[-1]
+    self.activeBehavior = activeBehavior[-1]
+    self.motor = motors[-1]
+
+    return motors
+
+
   def numBehaviorCells(self):
     return self.numSensorColumns * self.numCellsPerSensorColumn
 
@@ -157,28 +293,23 @@ class BehaviorMemory(object):
 
 
   def _reinforceGoalToBehavior(self, goal, behavior):
-    goalToBehaviorFlat = self.goalToBehaviorFlat()
-    for cell in numpy.flatnonzero(behavior):
-      weights = goalToBehaviorFlat[cell]
-      idx = numpy.unravel_index(cell, behavior.shape)
-      learningRate = self.goalToBehaviorLearningRate * behavior[idx]
-      self._reinforce(weights, goal, learningRate)
+    cells = numpy.flatnonzero(behavior)
+    learningRates = self.goalToBehaviorLearningRate * behavior.flat[cells]
+    self._reinforceRows(self.goalToBehaviorFlat(), cells, goal, learningRates)
 
 
   def _reinforceBehaviorToMotor(self, behavior, motor):
-    for cell in motor.nonzero()[0]:
-      weights = self.behaviorToMotor[cell]
-      self._reinforce(weights,
-                      behavior,
-                      self.behaviorToMotorLearningRate)
+    cells = motor.nonzero()[0]
+    self._reinforceRows(self.behaviorToMotorFlat(), cells, behavior.flatten(),
+                        numpy.full(len(cells),
+                                   self.behaviorToMotorLearningRate))
 
 
   def _reinforceMotorToBehavior(self, motor, behavior):
-    for cell in numpy.transpose(behavior.nonzero()):
-      weights = self.motorToBehavior[cell[0], cell[1]]
-      self._reinforce(weights,
-                      motor,
-                      self.motorToBehaviorLearningRate)
+    cells = numpy.flatnonzero(behavior)
+    self._reinforceRows(self.motorToBehaviorFlat(), cells, motor,
+                        numpy.full(len(cells),
+                                   self.motorToBehaviorLearningRate))
 
 
   def _computeLearningBehavior(self, learningBehavior, activeBehavior,
@@ -187,11 +318,9 @@ class BehaviorMemory(object):
     behavior += activeBehavior
 
     winnerCells = behavior.argmax(axis=1)
+    columns = numpy.arange(len(winnerCells))
     sparseBehavior = numpy.zeros(behavior.shape)
-
-    for column in range(len(winnerCells)):
-      winnerCell = winnerCells[column]
-      sparseBehavior[column][winnerCell] = behavior[column][winnerCell]
+    sparseBehavior[columns, winnerCells] = behavior[columns, winnerCells]
 
     numpy.clip(sparseBehavior, 0, 1, out=sparseBehavior)
     sparseBehavior[sparseBehavior < minWeight] = 0
@@ -199,7 +328,7 @@ class BehaviorMemory(object):
 
 
   def _computeBehaviorFromMotor(self, motor, sensorPattern):
-    activity = numpy.dot(motor, self.motorToBehaviorFlat().transpose())
+    activity = self._dot(motor, self.motorToBehaviorFlat())
     activity = activity.reshape([self.numSensorColumns,
                                 self.numCellsPerSensorColumn])
     winnerCells = numpy.argmax(activity, axis=1)
@@ -207,22 +336,21 @@ class BehaviorMemory(object):
     behavior = numpy.zeros([self.numSensorColumns,
                             self.numCellsPerSensorColumn])
 
-    for column in sensorPattern.nonzero()[0]:
-      winnerCell = winnerCells[column]
-      behavior[column][winnerCell] = 1
+    columns = sensorPattern.nonzero()[0]
+    behavior[columns, winnerCells[columns]] = 1
 
     return behavior
 
 
   def _computeBehaviorFromGoal(self, goal, sensorPattern):
     """TODO: Rename to _reconstruct..."""
-    activity = numpy.dot(goal, self.goalToBehaviorFlat().transpose())
+    activity = self._dot(goal, self.goalToBehaviorFlat())
     activity = activity.reshape([self.numSensorColumns,
                                 self.numCellsPerSensorColumn])
     behavior = numpy.zeros(activity.shape)
 
-    for column in sensorPattern.nonzero()[0]:
-      behavior[column][:] = activity[column]
+    columns = sensorPattern.nonzero()[0]
+    behavior[columns] = activity[columns]
 
     behavior /= behavior.max()
     return behavior
@@ -230,8 +358,7 @@ class BehaviorMemory(object):
 
   def _computeMotorFromBehavior(self, behavior):
     """TODO: Rename to _reconstruct..."""
-    motor = numpy.dot(behavior.flatten(),
-                      self.behaviorToMotorFlat().transpose())
+    motor = self._dot(behavior.flatten(), self.behaviorToMotorFlat())
     motor /= self.motor.sum()
 
     motor /= motor.max()
@@ -27,6 +27,8 @@ import numpy as np
 
 from nupic.bindings.regions.PyRegion import PyRegion
 
+from htmresearch.support.sparse_links import SparseInputs, SparseOutputs
+
 
 
 class ApicalTMPairRegion(PyRegion):
@@ -239,6 +241,16 @@ class ApicalTMPairRegion(PyRegion):
           "dataType": "UInt32",
           "count": 1
         },
+        "sparseLinks": {
+          "description": ("If True, clear only the previously active bits "
+                          "of the outputs on each compute, rather than the "
+                          "whole outputs. See "
+                          "htmresearch.support.sparse_links."),
+          "accessMode": "Read",
+          "dataType": "Bool",
+          "count": 1,
+          "defaultValue": "false"
+        },
         "learnOnOneCell": {
           "description": ("If True, the winner cell for each column will be"
                           " fixed between resets."),
@@ -336,6 +348,7 @@ class ApicalTMPairRegion(PyRegion):
                # Region params
                implementation="ApicalTiebreak",
                learn=True,
+               sparseLinks=False,
                **kwargs):
 
     # Input sizes (the network API doesn't provide these during initialize)
@@ -363,6 +376,11 @@ class ApicalTMPairRegion(PyRegion):
     # Region params
     self.implementation = implementation
     self.learn = learn
+    self.sparseLinks = sparseLinks
+
+    # Active indices of the outputs, and of the inputs linked with linkSparse
+    self.sparseOutputs = SparseOutputs(clearPrevious=sparseLinks)
+    self.sparseInputs = SparseInputs()
 
     PyRegion.__init__(self, **kwargs)
 
@@ -430,30 +448,31 @@ class ApicalTMPairRegion(PyRegion):
       if inputs["resetIn"][0] != 0:
         # send empty output
         self._tm.reset()
-        outputs["activeCells"][:] = 0
-        outputs["predictedActiveCells"][:] = 0
-        outputs["winnerCells"][:] = 0
+        for name in ("activeCells", "predictedActiveCells", "winnerCells"):
+          self.sparseOutputs.clear(outputs, name)
         return
 
-    activeColumns = inputs["activeColumns"].nonzero()[0]
+    activeColumns = self.sparseInputs.getIndices(inputs, "activeColumns")
 
     if "basalInput" in inputs:
-      basalInput = inputs["basalInput"].nonzero()[0]
+      basalInput = self.sparseInputs.getIndices(inputs, "basalInput")
     else:
       basalInput = np.empty(0, dtype="uint32")
 
     if "apicalInput" in inputs:
-      apicalInput = inputs["apicalInput"].nonzero()[0]
+      apicalInput = self.sparseInputs.getIndices(inputs, "apicalInput")
     else:
       apicalInput = np.empty(0, dtype="uint32")
 
     if "basalGrowthCandidates" in inputs:
-      basalGrowthCandidates = inputs["basalGrowthCandidates"].nonzero()[0]
+      basalGrowthCandidates = self.sparseInputs.getIndices(
+        inputs, "basalGrowthCandidates")
     else:
       basalGrowthCandidates = basalInput
 
     if "apicalGrowthCandidates" in inputs:
-      apicalGrowthCandidates = inputs["apicalGrowthCandidates"].nonzero()[0]
+      apicalGrowthCandidates = self.sparseInputs.getIndices(
+        inputs, "apicalGrowthCandidates")
     else:
       apicalGrowthCandidates = apicalInput
 
@@ -461,15 +480,14 @@ class ApicalTMPairRegion(PyRegion):
                      basalGrowthCandidates, apicalGrowthCandidates, self.learn)
 
     # Extract the active / predicted cells and put them into binary arrays.
-    outputs["activeCells"][:] = 0
-    outputs["activeCells"][self._tm.getActiveCells()] = 1
-    outputs["predictedCells"][:] = 0
-    outputs["predictedCells"][
-      self._tm.getPredictedCells()] = 1
-    outputs["predictedActiveCells"][:] = (outputs["activeCells"] *
-                                          outputs["predictedCells"])
-    outputs["winnerCells"][:] = 0
-    outputs["winnerCells"][self._tm.getWinnerCells()] = 1
+    activeCells = self._tm.getActiveCells()
+    predictedCells = self._tm.getPredictedCells()
+    self.sparseOutputs.write(outputs, "activeCells", activeCells)
+    self.sparseOutputs.write(outputs, "predictedCells", predictedCells)
+    self.sparseOutputs.write(outputs, "predictedActiveCells",
+                             np.intersect1d(activeCells, predictedCells))
+    self.sparseOutputs.write(outputs, "winnerCells",
+                             self._tm.getWinnerCells())
 
 
   def getParameter(self, parameterName, index=-1):
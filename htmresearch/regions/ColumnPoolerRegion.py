@@ -25,6 +25,7 @@ import inspect
 
 from nupic.bindings.regions.PyRegion import PyRegion
 from htmresearch.algorithms.column_pooler import ColumnPooler
+from htmresearch.support.sparse_links import SparseInputs, SparseOutputs
 
 
 def getConstructorArguments():
@@ -318,6 +319,14 @@ class ColumnPoolerRegion(PyRegion):
           count=0,
           constraints="enum: active,predicted,predictedActiveCells",
           defaultValue="active"),
+        sparseLinks=dict(
+          description="If True, clear only the previously active bits of the "
+                      "outputs on each compute, rather than the whole "
+                      "outputs. See htmresearch.support.sparse_links.",
+          accessMode="Read",
+          dataType="Bool",
+          count=1,
+          defaultValue="false"),
       ),
       commands=dict(
         reset=dict(description="Explicitly reset TM states now."),
@@ -357,6 +366,7 @@ class ColumnPoolerRegion(PyRegion):
 
                seed=42,
                defaultOutputType = "active",
+               sparseLinks=False,
                **kwargs):
 
     # Used to derive Column Pooler params
@@ -389,6 +399,11 @@ class ColumnPoolerRegion(PyRegion):
     # Region params
     self.learningMode = True
     self.defaultOutputType = defaultOutputType
+    self.sparseLinks = sparseLinks
+
+    # Active indices of the outputs, and of the inputs linked with linkSparse
+    self.sparseOutputs = SparseOutputs(clearPrevious=sparseLinks)
+    self.sparseInputs = SparseInputs()
 
     self._pooler = None
 
@@ -400,31 +415,45 @@ class ColumnPoolerRegion(PyRegion):
     Initialize the internal objects.
     """
     if self._pooler is None:
-      params = {
-        "inputWidth": self.inputWidth,
-        "lateralInputWidths": [self.cellCount] * self.numOtherCorticalColumns,
-        "cellCount": self.cellCount,
-        "sdrSize": self.sdrSize,
-        "onlineLearning": self.onlineLearning,
-        "maxSdrSize": self.maxSdrSize,
-        "minSdrSize": self.minSdrSize,
-        "synPermProximalInc": self.synPermProximalInc,
-        "synPermProximalDec": self.synPermProximalDec,
-        "initialProximalPermanence": self.initialProximalPermanence,
-        "minThresholdProximal": self.minThresholdProximal,
-        "sampleSizeProximal": self.sampleSizeProximal,
-        "connectedPermanenceProximal": self.connectedPermanenceProximal,
-        "predictedInhibitionThreshold": self.predictedInhibitionThreshold,
-        "synPermDistalInc": self.synPermDistalInc,
-        "synPermDistalDec": self.synPermDistalDec,
-        "initialDistalPermanence": self.initialDistalPermanence,
-        "activationThresholdDistal": self.activationThresholdDistal,
-        "sampleSizeDistal": self.sampleSizeDistal,
-        "connectedPermanenceDistal": self.connectedPermanenceDistal,
-        "inertiaFactor": self.inertiaFactor,
-        "seed": self.seed,
-      }
-      self._pooler = ColumnPooler(**params)
+      self._pooler = ColumnPooler(**self.getPoolerParams())
+
+
+  def setPooler(self, pooler):
+    """
+    Use 'pooler' rather than creating a ColumnPooler in initialize(), e.g. one
+    column of a MultiColumnPooler.
+    """
+    self._pooler = pooler
+
+
+  def getPoolerParams(self):
+    """
+    Return the ColumnPooler constructor arguments for this region.
+    """
+    return {
+      "inputWidth": self.inputWidth,
+      "lateralInputWidths": [self.cellCount] * self.numOtherCorticalColumns,
+      "cellCount": self.cellCount,
+      "sdrSize": self.sdrSize,
+      "onlineLearning": self.onlineLearning,
+      "maxSdrSize": self.maxSdrSize,
+      "minSdrSize": self.minSdrSize,
+      "synPermProximalInc": self.synPermProximalInc,
+      "synPermProximalDec": self.synPermProximalDec,
+      "initialProximalPermanence": self.initialProximalPermanence,
+      "minThresholdProximal": self.minThresholdProximal,
+      "sampleSizeProximal": self.sampleSizeProximal,
+      "connectedPermanenceProximal": self.connectedPermanenceProximal,
+      "predictedInhibitionThreshold": self.predictedInhibitionThreshold,
+      "synPermDistalInc": self.synPermDistalInc,
+      "synPermDistalDec": self.synPermDistalDec,
+      "initialDistalPermanence": self.initialDistalPermanence,
+      "activationThresholdDistal": self.activationThresholdDistal,
+      "sampleSizeDistal": self.sampleSizeDistal,
+      "connectedPermanenceDistal": self.connectedPermanenceDistal,
+      "inertiaFactor": self.inertiaFactor,
+      "seed": self.seed,
+    }
 
 
   def compute(self, inputs, outputs):
@@ -442,16 +471,15 @@ class ColumnPoolerRegion(PyRegion):
       if inputs["resetIn"][0] != 0:
         # send empty output
         self.reset()
-        outputs["feedForwardOutput"][:] = 0
-        outputs["activeCells"][:] = 0
+        self.sparseOutputs.clear(outputs, "feedForwardOutput")
+        self.sparseOutputs.clear(outputs, "activeCells")
         return
 
-    feedforwardInput = numpy.asarray(inputs["feedforwardInput"].nonzero()[0],
-                                     dtype="uint32")
+    feedforwardInput = self.sparseInputs.getIndices(inputs, "feedforwardInput")
 
     if "feedforwardGrowthCandidates" in inputs:
-      feedforwardGrowthCandidates = numpy.asarray(
-        inputs["feedforwardGrowthCandidates"].nonzero()[0], dtype="uint32")
+      feedforwardGrowthCandidates = self.sparseInputs.getIndices(
+        inputs, "feedforwardGrowthCandidates")
     else:
       feedforwardGrowthCandidates = feedforwardInput
 
@@ -465,8 +493,7 @@ class ColumnPoolerRegion(PyRegion):
       lateralInputs = ()
 
     if "predictedInput" in inputs:
-      predictedInput = numpy.asarray(
-        inputs["predictedInput"].nonzero()[0], dtype="uint32")
+      predictedInput = self.sparseInputs.getIndices(inputs, "predictedInput")
     else:
       predictedInput = None
 
@@ -476,12 +503,12 @@ class ColumnPoolerRegion(PyRegion):
                          predictedInput = predictedInput)
 
     # Extract the active / predicted cells and put them into binary arrays.
-    outputs["activeCells"][:] = 0
-    outputs["activeCells"][self._pooler.getActiveCells()] = 1
+    activeCells = self._pooler.getActiveCells()
+    self.sparseOutputs.write(outputs, "activeCells", activeCells)
 
     # Send appropriate output to feedForwardOutput.
     if self.defaultOutputType == "active":
-      outputs["feedForwardOutput"][:] = outputs["activeCells"]
+      self.sparseOutputs.write(outputs, "feedForwardOutput", activeCells)
     else:
       raise Exception("Unknown outputType: " + self.defaultOutputType)
 
@@ -20,8 +20,13 @@
 # ----------------------------------------------------------------------
 
 from collections import deque
+
+import numpy
+
 from nupic.bindings.regions.PyRegion import PyRegion
 
+from htmresearch.support.sparse_links import SparseOutputs
+
 
 class RawSensor(PyRegion):
   """
@@ -37,12 +42,17 @@ class RawSensor(PyRegion):
 
   def __init__(self,
                outputWidth=2048,
-               verbosity=0):
+               verbosity=0,
+               sparseLinks=False):
     """Create an instance with the appropriate output size."""
     self.verbosity = verbosity
     self.outputWidth = outputWidth
+    self.sparseLinks = sparseLinks
     self.queue = deque()
 
+    # Active indices of dataOut, for regions linked with linkSparse
+    self.sparseOutputs = SparseOutputs(clearPrevious=sparseLinks)
+
 
   @classmethod
   def getSpec(cls):
@@ -90,6 +100,15 @@ class RawSensor(PyRegion):
           "defaultValue": 2048,
           "constraints":"",
         },
+        "sparseLinks":{
+          "description":("If True, clear only the previously active bits of "
+                         "dataOut on each compute. See "
+                         "htmresearch.support.sparse_links."),
+          "dataType":"Bool",
+          "accessMode":"Read",
+          "count":1,
+          "defaultValue":"false",
+        },
       },
       "commands":{
         "addDataToQueue": {
@@ -116,8 +135,8 @@ class RawSensor(PyRegion):
     # Copy data into output vectors
     outputs["resetOut"][0] = data["reset"]
     outputs["sequenceIdOut"][0] = data["sequenceId"]
-    outputs["dataOut"][:] = 0
-    outputs["dataOut"][data["nonZeros"]] = 1
+    self.sparseOutputs.write(outputs, "dataOut",
+                             numpy.unique(data["nonZeros"]))
 
     if self.verbosity > 1:
       print "RawSensor outputs:"
@@ -25,14 +25,12 @@ Apical Temporal Memory pair mixin that enables detailed monitoring of history.
 
 from collections import defaultdict
 
-import copy
-
 from prettytable import PrettyTable
 
 from nupic.algorithms.monitor_mixin.metric import Metric
 from nupic.algorithms.monitor_mixin.monitor_mixin_base import MonitorMixinBase
-from nupic.algorithms.monitor_mixin.trace import (IndicesTrace, CountsTrace,
-                                                BoolsTrace, StringsTrace)
+
+from htmresearch.support.trace_store import ListTraces, createMetric
 
 
 
@@ -40,9 +38,14 @@ class ApicalTMPairMonitorMixin(MonitorMixinBase):
   """
   Mixin for Apical TemporalMemory + pairs that stores a detailed history, for
   inspection and debugging.
+
+  Pass a TraceStore as 'mmTraceStore' to keep the history in packed chunks,
+  optionally on disk and with a bounded length.
   """
 
   def __init__(self, *args, **kwargs):
+    self._mmTraceStore = kwargs.pop("mmTraceStore", None) or ListTraces()
+
     super(ApicalTMPairMonitorMixin, self).__init__(*args, **kwargs)
 
     self._mmResetActive = True  # First iteration is always a reset
@@ -153,8 +156,8 @@ class ApicalTMPairMonitorMixin(MonitorMixinBase):
 
     @return (Metric) Metric over trace excluding resets
     """
-    return Metric.createFromTrace(trace.makeCountsTrace(),
-                                  excludeResets=self.mmGetTraceResets())
+    return createMetric(trace.makeCountsTrace(),
+                        excludeResets=self.mmGetTraceResets())
 
 
   def mmGetMetricSequencesPredictedActiveCellsPerColumn(self):
@@ -273,7 +276,7 @@ class ApicalTMPairMonitorMixin(MonitorMixinBase):
 
   def _mmComputeTransitionTraces(self):
     """
-    Computes the transition traces, if necessary.
+    Computes the transition traces for the timesteps added since the last call.
 
     Transition traces are the following:
 
@@ -286,35 +289,29 @@ class ApicalTMPairMonitorMixin(MonitorMixinBase):
     if not self._mmTransitionTracesStale:
       return
 
-    self._mmData["predictedActiveCellsForSequence"] = defaultdict(set)
-
-    self._mmTraces["predictedActiveCells"] = IndicesTrace(self,
-      "predicted => active cells (correct)")
-    self._mmTraces["predictedInactiveCells"] = IndicesTrace(self,
-      "predicted => inactive cells (extra)")
-    self._mmTraces["predictedActiveColumns"] = IndicesTrace(self,
-      "predicted => active columns (correct)")
-    self._mmTraces["predictedInactiveColumns"] = IndicesTrace(self,
-      "predicted => inactive columns (extra)")
-    self._mmTraces["unpredictedActiveColumns"] = IndicesTrace(self,
-      "unpredicted => active columns (bursting)")
+    activeColumnsData = self.mmGetTraceActiveColumns().data
+    predictedCellsData = self._mmTraces["predictedCells"].data
+    sequenceLabelsData = self.mmGetTraceSequenceLabels().data
 
-    predictedCellsTrace = self._mmTraces["predictedCells"]
+    # Timesteps dropped by a bounded TraceStore are skipped.
+    numDropped = getattr(activeColumnsData, "numDropped", 0)
+    start = max(self._mmTransitionTracesComputed - numDropped, 0)
 
-    for i, activeColumns in enumerate(self.mmGetTraceActiveColumns().data):
+    for i in xrange(start, len(activeColumnsData)):
+      activeColumns = activeColumnsData[i]
       predictedActiveCells = set()
       predictedInactiveCells = set()
       predictedActiveColumns = set()
       predictedInactiveColumns = set()
 
-      for predictedCell in predictedCellsTrace.data[i]:
+      for predictedCell in predictedCellsData[i]:
         predictedColumn = self.columnForCell(predictedCell)
 
         if predictedColumn  in activeColumns:
           predictedActiveCells.add(predictedCell)
           predictedActiveColumns.add(predictedColumn)
 
-          sequenceLabel = self.mmGetTraceSequenceLabels().data[i]
+          sequenceLabel = sequenceLabelsData[i]
           if sequenceLabel is not None:
             self._mmData["predictedActiveCellsForSequence"][sequenceLabel].add(
               predictedCell)
@@ -332,6 +329,7 @@ class ApicalTMPairMonitorMixin(MonitorMixinBase):
       self._mmTraces["unpredictedActiveColumns"].data.append(
         unpredictedActiveColumns)
 
+    self._mmTransitionTracesComputed = numDropped + len(activeColumnsData)
     self._mmTransitionTracesStale = False
 
 
@@ -401,9 +399,9 @@ class ApicalTMPairMonitorMixin(MonitorMixinBase):
 
   def mmGetDefaultMetrics(self, verbosity=1):
     resetsTrace = self.mmGetTraceResets()
-    return ([Metric.createFromTrace(trace, excludeResets=resetsTrace)
+    return ([createMetric(trace, excludeResets=resetsTrace)
               for trace in self.mmGetDefaultTraces()[:-3]] +
-            [Metric.createFromTrace(trace)
+            [createMetric(trace)
               for trace in self.mmGetDefaultTraces()[-3:-1]] +
             [self.mmGetMetricSequencesPredictedActiveCellsPerColumn(),
              self.mmGetMetricSequencesPredictedActiveCellsShared()])
@@ -412,15 +410,37 @@ class ApicalTMPairMonitorMixin(MonitorMixinBase):
   def mmClearHistory(self):
     super(ApicalTMPairMonitorMixin, self).mmClearHistory()
 
-    self._mmTraces["activeColumns"] = IndicesTrace(self, "active columns")
-    self._mmTraces["activeCells"] = IndicesTrace(self, "active cells")
-    self._mmTraces["predictedCells"] = IndicesTrace(self, "predicted cells")
-    self._mmTraces["numBasalSegments"] = CountsTrace(self, "# basal segments")
-    self._mmTraces["numBasalSynapses"] = CountsTrace(self, "# basal synapses")
-    self._mmTraces["numApicalSegments"] = CountsTrace(self, "# apical segments")
-    self._mmTraces["numApicalSynapses"] = CountsTrace(self, "# apical synapses")
-    self._mmTraces["sequenceLabels"] = StringsTrace(self, "sequence labels")
-    self._mmTraces["resets"] = BoolsTrace(self, "resets")
+    store = self._mmTraceStore
+    store.release(self)
+
+    self._mmTraces["activeColumns"] = store.indicesTrace(self, "active columns")
+    self._mmTraces["activeCells"] = store.indicesTrace(self, "active cells")
+    self._mmTraces["predictedCells"] = store.indicesTrace(self,
+                                                          "predicted cells")
+    self._mmTraces["numBasalSegments"] = store.countsTrace(self,
+                                                           "# basal segments")
+    self._mmTraces["numBasalSynapses"] = store.countsTrace(self,
+                                                           "# basal synapses")
+    self._mmTraces["numApicalSegments"] = store.countsTrace(
+      self, "# apical segments")
+    self._mmTraces["numApicalSynapses"] = store.countsTrace(
+      self, "# apical synapses")
+    self._mmTraces["sequenceLabels"] = store.stringsTrace(self,
+                                                          "sequence labels")
+    self._mmTraces["resets"] = store.boolsTrace(self, "resets")
+
+    self._mmData["predictedActiveCellsForSequence"] = defaultdict(set)
+    self._mmTraces["predictedActiveCells"] = store.indicesTrace(self,
+      "predicted => active cells (correct)")
+    self._mmTraces["predictedInactiveCells"] = store.indicesTrace(self,
+      "predicted => inactive cells (extra)")
+    self._mmTraces["predictedActiveColumns"] = store.indicesTrace(self,
+      "predicted => active columns (correct)")
+    self._mmTraces["predictedInactiveColumns"] = store.indicesTrace(self,
+      "predicted => inactive columns (extra)")
+    self._mmTraces["unpredictedActiveColumns"] = store.indicesTrace(self,
+      "unpredicted => active columns (bursting)")
+    self._mmTransitionTracesComputed = 0
     self._mmTransitionTracesStale = True
 
 
@@ -447,7 +467,7 @@ class ApicalTMPairMonitorMixin(MonitorMixinBase):
     if activityType == "predictedActiveCells":
       self._mmComputeTransitionTraces()
 
-    cellTrace = copy.deepcopy(self._mmTraces[activityType].data)
+    cellTrace = list(self._mmTraces[activityType].data)
     for i in xrange(len(cellTrace)):
       cellTrace[i] = self.getCellIndices(cellTrace[i])
 
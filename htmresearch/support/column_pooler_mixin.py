@@ -25,23 +25,25 @@ ColumnPooler mixin that enables detailed monitoring of history.
 
 from collections import defaultdict
 
-import copy
-
 from prettytable import PrettyTable
 
-from nupic.algorithms.monitor_mixin.metric import Metric
 from nupic.algorithms.monitor_mixin.monitor_mixin_base import MonitorMixinBase
-from nupic.algorithms.monitor_mixin.trace import (IndicesTrace, CountsTrace,
-                                                BoolsTrace, StringsTrace)
+
+from htmresearch.support.trace_store import ListTraces, createMetric
 
 
 class ColumnPoolerMonitorMixin(MonitorMixinBase):
   """
   Mixin for ColumnPooler that stores a detailed history, for inspection and
   debugging.
+
+  Pass a TraceStore as 'mmTraceStore' to keep the history in packed chunks,
+  optionally on disk and with a bounded length.
   """
 
   def __init__(self, *args, **kwargs):
+    self._mmTraceStore = kwargs.pop("mmTraceStore", None) or ListTraces()
+
     super(ColumnPoolerMonitorMixin, self).__init__(*args, **kwargs)
 
     self._mmResetActive = True  # First iteration is always a reset
@@ -112,8 +114,8 @@ class ColumnPoolerMonitorMixin(MonitorMixinBase):
 
     @return (Metric) Metric over trace excluding resets
     """
-    return Metric.createFromTrace(trace.makeCountsTrace(),
-                                  excludeResets=self.mmGetTraceResets())
+    return createMetric(trace.makeCountsTrace(),
+                        excludeResets=self.mmGetTraceResets())
 
 
   # ==============================
@@ -175,26 +177,32 @@ class ColumnPoolerMonitorMixin(MonitorMixinBase):
 
   def mmGetDefaultMetrics(self, verbosity=1):
     resetsTrace = self.mmGetTraceResets()
-    return ([Metric.createFromTrace(trace, excludeResets=resetsTrace)
+    return ([createMetric(trace, excludeResets=resetsTrace)
               for trace in self.mmGetDefaultTraces()[:-3]] +
-            [Metric.createFromTrace(trace)
+            [createMetric(trace)
               for trace in self.mmGetDefaultTraces()[-3:-1]])
 
 
   def mmClearHistory(self):
     super(ColumnPoolerMonitorMixin, self).mmClearHistory()
 
-    self._mmTraces["activeCells"] = IndicesTrace(self, "active cells")
-    self._mmTraces["numDistalSegments"] = CountsTrace(self, "# distal segments")
-    self._mmTraces["numDistalSynapses"] = CountsTrace(self, "# distal synapses")
-    self._mmTraces["numConnectedDistalSynapses"] = CountsTrace(
+    store = self._mmTraceStore
+    store.release(self)
+
+    self._mmTraces["activeCells"] = store.indicesTrace(self, "active cells")
+    self._mmTraces["numDistalSegments"] = store.countsTrace(
+      self, "# distal segments")
+    self._mmTraces["numDistalSynapses"] = store.countsTrace(
+      self, "# distal synapses")
+    self._mmTraces["numConnectedDistalSynapses"] = store.countsTrace(
       self, "# connected distal synapses")
-    self._mmTraces["numProximalSynapses"] = CountsTrace(
+    self._mmTraces["numProximalSynapses"] = store.countsTrace(
       self, "# proximal synapses")
-    self._mmTraces["numConnectedProximalSynapses"] = CountsTrace(
+    self._mmTraces["numConnectedProximalSynapses"] = store.countsTrace(
       self, "# connected proximal synapses")
-    self._mmTraces["sequenceLabels"] = StringsTrace(self, "sequence labels")
-    self._mmTraces["resets"] = BoolsTrace(self, "resets")
+    self._mmTraces["sequenceLabels"] = store.stringsTrace(self,
+                                                          "sequence labels")
+    self._mmTraces["resets"] = store.boolsTrace(self, "resets")
     self._mmTransitionTracesStale = True
 
 
@@ -218,7 +226,7 @@ class ColumnPoolerMonitorMixin(MonitorMixinBase):
     @return (Plot) plot
     """
 
-    cellTrace = copy.deepcopy(self._mmTraces[activityType].data)
+    cellTrace = list(self._mmTraces[activityType].data)
     for i in xrange(len(cellTrace)):
       cellTrace[i] = self.getCellIndices(cellTrace[i])
 
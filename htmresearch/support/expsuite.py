@@ -20,26 +20,117 @@
 #############################################################################
 
 from ConfigParser import ConfigParser
+from collections import OrderedDict
 from multiprocessing import Process, Pool, cpu_count
 from numpy import *
-import json, os, sys, time, itertools, re, optparse, types
+import atexit, json, os, shutil, struct, sys, tempfile, time, itertools, re, optparse, types
+
+# each entry of a log index is the byte offset of the end of one iteration's
+# line in the log, as a little-endian int64
+INDEX_ENTRY = struct.Struct('<q')
 
 def mp_runrep(args):
     """ Helper function to allow multiprocessing support. """
     return PyExperimentSuite.run_rep(*args)
 
+# the suite of a worker process, set once by mp_init_worker, so that only
+# (params, rep) is sent for every task
+_worker_suite = None
+
+def mp_init_worker(suite):
+    """ Pool initializer: keeps the suite in the worker process. """
+    global _worker_suite
+    _worker_suite = suite
+
+def mp_runtask(task):
+    """ Runs one (params, rep) task with the worker's suite. Returns the
+        experiment name, the repetition, the number of iterations run and the
+        time it took. 
+    """
+    params, rep = task
+    start = time.time()
+    iterations = _worker_suite.run_rep(params, rep) or 0
+    return params['name'], rep, iterations, time.time() - start
+
+def log_name(params, rep):
+    """ Helper function to return the log file of one repetition. """
+    return os.path.join(params['path'], params['name'], '%i.log'%rep)
+
+def index_name(logname):
+    """ Helper function to return the index file of a log file. """
+    return logname + '.idx'
+
+def write_index(logname):
+    """ Writes the index of a log file that was written without one, and
+        returns the number of complete iterations in it. 
+    """
+    offsets = []
+    offset = 0
+    with open(logname, 'rb') as logfile:
+        for line in logfile:
+            if not line.endswith('\n'):
+                break
+            offset += len(line)
+            offsets.append(offset)
+    with open(index_name(logname), 'wb') as indexfile:
+        for offset in offsets:
+            indexfile.write(INDEX_ENTRY.pack(offset))
+    return len(offsets)
+
+def count_iterations(logname):
+    """ Helper function to return the number of complete iterations in a log
+        file. With an index this only reads the size of the index; logs
+        without one are counted line by line. 
+    """
+    if not os.path.exists(logname):
+        return 0
+    indexname = index_name(logname)
+    if os.path.exists(indexname):
+        return os.path.getsize(indexname) // INDEX_ENTRY.size
+    iterations = 0
+    with open(logname, 'rb') as logfile:
+        for line in logfile:
+            if line.endswith('\n'):
+                iterations += 1
+    return iterations
+
+def history_name(logname):
+    """ Helper function to return the binary history file of a log file. """
+    return logname + '.npz'
+
+def make_column(values):
+    """ Helper function to convert the values of one tag, with None for the 
+        iterations that don't have it, to a (values, present) pair of arrays.
+        Booleans, integers and floats are stored in arrays of that type,
+        everything else in object arrays. Integers mixed with floats are 
+        stored as objects too, so that each value keeps its type. 
+    """
+    present = array([v is not None for v in values], dtype=bool)
+    kinds = set(type(v) for v in values if v is not None)
+    if kinds and kinds <= set([bool]):
+        dtype, fill = bool, False
+    elif kinds and kinds <= set([int, long]):
+        dtype, fill = int64, 0
+    elif kinds and kinds <= set([float]):
+        dtype, fill = float64, nan
+    else:
+        dtype, fill = object, None
+    if dtype is not object:
+        try:
+            return array([fill if v is None else v for v in values], dtype=dtype), present
+        except OverflowError:
+            # integers that don't fit in 64 bits
+            pass
+    
+    # fill the array one item at a time, so that lists stay items
+    column = empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        column[i] = v
+    return column, present
+
 def progress(params, rep):
     """ Helper function to calculate the progress made on one experiment. """
-    name = params['name']
-    fullpath = os.path.join(params['path'], params['name'])
-    logname = os.path.join(fullpath, '%i.log'%rep)
-    if os.path.exists(logname):
-        logfile = open(logname, 'r')
-        lines = logfile.readlines()
-        logfile.close()
-        return int(100 * len(lines) / params['iterations'])
-    else: 
-        return 0
+    return int(100 * count_iterations(log_name(params, rep)) / params['iterations'])
 
 def convert_param_to_dirname(param):
     """ Helper function to convert a parameter value to a valid directory name. """
@@ -54,9 +145,56 @@ class PyExperimentSuite(object):
     # change this in subclass, if you support restoring state on iteration level
     restore_supported = False
     
+    # change this in subclass to save the parsed histories of each log in a
+    # binary file next to it (<rep>.log.npz), which is loaded instead of 
+    # parsing the log again as long as the log doesn't change
+    history_files = False
+    
+    # the number of logs whose parsed columns are kept in memory, most 
+    # recently used first. Each log takes about as much memory as the values 
+    # of the tags that were requested from it
+    history_cache_size = 100
+    
     def __init__(self):
         # list of keys, that had to be renamed because they contained spaces
         self.key_warning_issued = []
+        # files of the arrays shared with share_array(), by name
+        self.shared_files = {}
+        self.shared_dir = None
+        self._shared_arrays = {}
+        # parsed histories, by log file, least recently used first
+        self._histories = OrderedDict()
+    
+    def __getstate__(self):
+        # the suite is sent to every worker process: never send the arrays 
+        # that are loaded from the shared files, or the parsed histories
+        state = self.__dict__.copy()
+        state['_shared_arrays'] = {}
+        state['_histories'] = OrderedDict()
+        return state
+    
+    def share_array(self, name, array):
+        """ writes a large read-only input (e.g. a dataset) to a .npy file 
+            once, so that the worker processes memory map it with 
+            get_shared() instead of receiving a copy. Call this before 
+            do_experiment(). The files are deleted when the process that 
+            created them exits.
+        """
+        if self.shared_dir is None:
+            self.shared_dir = tempfile.mkdtemp(prefix='expsuite')
+            atexit.register(shutil.rmtree, self.shared_dir, True)
+        filename = os.path.join(self.shared_dir, '%s.npy'%name)
+        save(filename, asarray(array))
+        self.shared_files[name] = filename
+        self._shared_arrays.pop(name, None)
+    
+    def get_shared(self, name):
+        """ returns an array shared with share_array(), memory mapped 
+            read-only. 
+        """
+        if name not in self._shared_arrays:
+            self._shared_arrays[name] = load(self.shared_files[name], mmap_mode='r')
+        return self._shared_arrays[name]
     
     def parse_opt(self):
         """ parses the command line options for different settings. """
@@ -82,6 +220,12 @@ class PyExperimentSuite(object):
         optparser.add_option('-p', '--progress',
             action='store_true', dest='progress', default=False, 
             help="like browse, but only shows name and progress bar")
+        optparser.add_option('-s', '--status',
+            action='store_true', dest='status', default=False, 
+            help="print the progress and throughput after each repetition")
+        optparser.add_option('--chunksize',
+            action='store', dest='chunksize', type='int', default=1, 
+            help="number of repetitions sent to a process at a time, default is 1")
 
         options, args = optparser.parse_args()
         self.options = options
@@ -183,29 +327,21 @@ class PyExperimentSuite(object):
         if tags != 'all' and not hasattr(tags, '__iter__'):
             tags = [tags] 
         
-        results = {}
         logfile = os.path.join(exp, '%i.log'%rep)
-        try:
-            f = open(logfile)
-        except IOError:
+        columns = self.get_history_columns(logfile, None if tags == 'all' else tags)
+        if columns is None:
             if len(tags) == 1:
                 return []
             else:
                 return {}
 
-        for line in f:
-            dic = json.loads(line)
-            for tag in tags:
-              if not tag in results:
-                results[tag] = []
-
-              if tag in dic:
-                results[tag].append(dic[tag])
-              else:
-                results[tag].append(None)
-                            
-        f.close()
-        if len(results) == 0:
+        results = {}
+        for tag, (values, present) in columns.iteritems():
+            results[tag] = values.tolist()
+            if values.dtype != object:
+                for i in flatnonzero(~present):
+                    results[tag][i] = None
+        if len(results) == 0 or len(results.values()[0]) == 0:
             if len(tags) == 1:
                 return []
             else:
@@ -217,6 +353,122 @@ class PyExperimentSuite(object):
             return results
     
     
+    def get_history_columns(self, logfile, tags=None):
+        """ returns the history of a log file as a dictionary of 
+            (values, present) pairs of arrays, one pair per tag, or None if 
+            the log file doesn't exist. 'present' is False for the iterations
+            that don't have the tag. If tags is None, all tags are returned.
+            
+            Each log file is parsed only for the requested tags, and again 
+            for tags that weren't requested before. The columns of the 
+            history_cache_size most recently used logs are kept until the 
+            size or modification time of the log changes. 
+        """
+        try:
+            stat = os.stat(logfile)
+        except OSError:
+            return None
+        stamp = (stat.st_mtime, stat.st_size)
+        
+        if not hasattr(self, '_histories'):
+            self._histories = OrderedDict()
+        history = self._histories.pop(logfile, None)
+        if history is None or history['stamp'] != stamp:
+            history = None
+            if self.history_files:
+                history = self.load_history_file(logfile, stamp)
+            if history is None:
+                history = {'stamp': stamp, 'columns': {}, 'tags': None}
+                if self.history_files:
+                    # the history file holds the columns of all tags
+                    self._parse_history(logfile, history, None)
+                    self.save_history_file(logfile, history)
+        self._histories[logfile] = history
+        while len(self._histories) > self.history_cache_size:
+            self._histories.popitem(last=False)
+        
+        if tags is None:
+            if history['tags'] is None:
+                self._parse_history(logfile, history, None)
+            tags = history['tags']
+        
+        missing = [tag for tag in tags if tag not in history['columns'] 
+                   and (history['tags'] is None or tag in history['tags'])]
+        if missing:
+            self._parse_history(logfile, history, missing)
+            
+        columns = {}
+        for tag in tags:
+            if tag not in history['columns']:
+                # the tag is in none of the iterations
+                history['columns'][tag] = make_column([None] * history['length'])
+            columns[tag] = history['columns'][tag]
+        return columns
+    
+    def _parse_history(self, logfile, history, tags):
+        """ parses the log file and adds the columns of the given tags to the
+            history, or of all tags if tags is None. 
+        """
+        with open(logfile) as f:
+            dics = [json.loads(line) for line in f]
+        history['length'] = len(dics)
+        
+        alltags = set()
+        for dic in dics:
+            alltags.update(dic)
+        history['tags'] = alltags
+        
+        for tag in (alltags if tags is None else tags):
+            history['columns'][tag] = make_column([dic.get(tag) for dic in dics])
+    
+    def load_history_file(self, logfile, stamp):
+        """ loads the history saved by save_history_file(), if it was saved 
+            for this version of the log file. 
+        """
+        filename = history_name(logfile)
+        if not os.path.exists(filename):
+            return None
+        with open(filename, 'rb') as f:
+            data = load(f)
+            if tuple(data['stamp'].tolist()) != stamp:
+                return None
+            tags = data['tags'].tolist()
+            history = {'stamp': stamp, 'length': int(data['length']), 
+                       'tags': set(tags), 'columns': {}}
+            for i, tag in enumerate(tags):
+                if 'json%i'%i in data:
+                    history['columns'][tag] = make_column(json.loads(data['json%i'%i].item()))
+                else:
+                    history['columns'][tag] = (data['values%i'%i], data['present%i'%i])
+        return history
+    
+    def save_history_file(self, logfile, history):
+        """ saves all columns of a history next to its log file. Object 
+            columns are saved as JSON. 
+        """
+        tags = sorted(history['tags'])
+        arrays = {'stamp': array(history['stamp'], dtype=float64),
+                  'length': array(history['length']),
+                  'tags': array(tags, dtype=unicode)}
+        for i, tag in enumerate(tags):
+            values, present = history['columns'][tag]
+            if values.dtype == object:
+                arrays['json%i'%i] = array(json.dumps(values.tolist()))
+            else:
+                arrays['values%i'%i] = values
+                arrays['present%i'%i] = present
+        
+        # write to a temporary file first, so that readers never see a 
+        # partial file
+        filename = history_name(logfile)
+        with open(filename + '.tmp', 'wb') as f:
+            savez(f, **arrays)
+        os.rename(filename + '.tmp', filename)
+    
+    def clear_history_cache(self):
+        """ forgets all parsed histories. """
+        self._histories = OrderedDict()
+    
     def get_history_tags(self, exp, rep=0):
         """ returns all available tags (logging keys) of the given experiment 
             repetition. 
@@ -316,7 +568,11 @@ class PyExperimentSuite(object):
         # make list of tags if it is just a string
         if not hasattr(tags, '__iter__'):
             tags = [tags]
-         
+        
+        # parse each log once for all of the tags
+        for i in range(params['repetitions']):
+            self.get_history_columns(os.path.join(exp, '%i.log'%i), tags)
+        
         results = {}
         for tag in tags:
             # get all histories
@@ -525,56 +781,107 @@ class PyExperimentSuite(object):
                 print 'Error: parameter set does not contain all required keys: name, iterations, repetitions, path'
                 return False
             
-        # create experiment list 
-        explist = []
-            
-        # expand paramlist for all repetitions and add self and rep number
+        # create the list of (params, rep) tasks, leaving out completed 
+        # repetitions, with the most expensive first so that the long 
+        # repetitions don't end up last on a single process
+        tasks = []
         for p in paramlist:
-            explist.extend(zip( [self]*p['repetitions'], [p]*p['repetitions'], xrange(p['repetitions']) ))
-                
+            for rep in xrange(p['repetitions']):
+                if count_iterations(log_name(p, rep)) < p['iterations']:
+                    tasks.append((self.estimate_cost(p, rep), p, rep))
+        tasks.sort(key=lambda task: -task[0])
+        tasks = [(p, rep) for _, p, rep in tasks]
+        
         # if only 1 process is required call each experiment seperately (no worker pool)
         if self.options.ncores == 1:
-            for e in explist:
-                mp_runrep(e)
+            mp_init_worker(self)
+            pool = None
+            results = itertools.imap(mp_runtask, tasks)
         else:
-            # create worker processes    
-            pool = Pool(processes=self.options.ncores)
-            pool.map(mp_runrep, explist)
+            # create worker processes, the suite is sent once to each of them
+            pool = Pool(processes=self.options.ncores, initializer=mp_init_worker, initargs=(self,))
+            results = pool.imap_unordered(mp_runtask, tasks, getattr(self.options, 'chunksize', 1))
+        
+        # if a repetition fails, stop the workers instead of waiting for the 
+        # remaining tasks
+        finished = False
+        try:
+            start = time.time()
+            iterations = 0
+            for done, (name, rep, its, duration) in enumerate(results, 1):
+                iterations += its
+                if getattr(self.options, 'status', False):
+                    self.print_status(done, len(tasks), iterations, time.time() - start, name, rep)
+            finished = True
+        finally:
+            if pool is not None:
+                if finished:
+                    pool.close()
+                else:
+                    pool.terminate()
+                pool.join()
         
         return True        
+    
+    def estimate_cost(self, params, rep):
+        """ estimates the cost of one repetition, to run the most expensive 
+            repetitions first. By default this is the number of iterations 
+            left. Can be implemented by subclass.
+        """
+        return params['iterations'] - count_iterations(log_name(params, rep))
+    
+    def print_status(self, done, total, iterations, elapsed, name, rep):
+        """ prints the progress after a repetition has finished. """
+        rate = iterations / elapsed if elapsed > 0 else 0.0
+        remaining = elapsed * (total - done) / done
+        print '[%i/%i] %s rep %i done, %i iterations in %.0fs (%.1f/s), about %.0fs left'%(
+            done, total, name, rep, iterations, elapsed, rate, remaining)
+        sys.stdout.flush()
         
        
     def run_rep(self, params, rep):
-        """ run a single repetition including directory creation, log files, etc. """
-        name = params['name']
-        fullpath = os.path.join(params['path'], params['name'])
-        logname = os.path.join(fullpath, '%i.log'%rep)
+        """ run a single repetition including directory creation, log files, etc. 
+            returns the number of iterations run. 
+        """
+        logname = log_name(params, rep)
+        indexname = index_name(logname)
         # check if repetition exists and has been completed
         restore = 0
         if os.path.exists(logname):
-            logfile = open(logname, 'r')
-            lines = logfile.readlines()
-            logfile.close()
+            # the index has one entry per complete iteration in the log
+            if os.path.exists(indexname):
+                completed = count_iterations(logname)
+            else:
+                completed = write_index(logname)
             
             # if completed, continue loop
-            if 'iterations' in params and len(lines) == params['iterations']:
+            if 'iterations' in params and completed == params['iterations']:
                 return False
             # if not completed, check if restore_state is supported
             if not self.restore_supported:
                 # not supported, delete repetition and start over
                 # print 'restore not supported, deleting %s' % logname
                 os.remove(logname)
+                os.remove(indexname)
                 restore = 0
             else:
-                restore = len(lines)
+                restore = completed
             
         self.reset(params, rep)
         
         if restore:
-            logfile = open(logname, 'a')
+            # drop anything written after the last indexed iteration
+            indexfile = open(indexname, 'r+b')
+            indexfile.seek((restore - 1) * INDEX_ENTRY.size)
+            end, = INDEX_ENTRY.unpack(indexfile.read(INDEX_ENTRY.size))
+            indexfile.truncate(restore * INDEX_ENTRY.size)
+            logfile = open(logname, 'r+b')
+            logfile.truncate(end)
+            logfile.seek(end)
             self.restore_state(params, rep, restore)
         else:
-            logfile = open(logname, 'w')
+            logfile = open(logname, 'wb')
+            indexfile = open(indexname, 'wb')
             
         # loop through iterations and call iterate
         for it in xrange(restore, params['iterations']):
@@ -588,10 +895,15 @@ class PyExperimentSuite(object):
               json.dump(dic, logfile)
               logfile.write('\n')
               logfile.flush()
+              # index the iteration only once its line is complete
+              indexfile.write(INDEX_ENTRY.pack(logfile.tell()))
+              indexfile.flush()
 
         logfile.close()
+        indexfile.close()
 
         self.finalize(params, rep)
+        return params['iterations'] - restore
     
     
     def reset(self, params, rep):
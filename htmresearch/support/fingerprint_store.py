@@ -0,0 +1,203 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+A local store of Cortical.io fingerprints for CioEncoder.
+
+The cortipy client caches every API response as a separate JSON file. A
+FingerprintStore keeps all of the fingerprints in one indexed SQLite file, with
+the positions packed as uint32, and keeps the most recently used ones in
+memory. Many fingerprints can be read or written with one query.
+"""
+
+import json
+import sqlite3
+from collections import OrderedDict
+
+import numpy
+
+
+
+# SQLite limits the number of parameters of a query
+_MAX_KEYS_PER_QUERY = 500
+
+
+
+class FingerprintStore(object):
+  """
+  Fingerprint dicts, as returned by the cortipy client, indexed by retina, kind
+  ("term" or "text") and key.
+  """
+
+  def __init__(self, path, cacheSize=20000):
+    """
+    @param path (str)
+    The SQLite file. It is created if it doesn't exist.
+
+    @param cacheSize (int)
+    Number of fingerprints kept in memory.
+    """
+    self.path = path
+    self.cacheSize = cacheSize
+    self._connection = None
+    self._cache = OrderedDict()
+
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    state["_connection"] = None
+    state["_cache"] = OrderedDict()
+    return state
+
+
+  def get(self, retina, kind, key):
+    """
+    @return (dict or None) The fingerprint, or None if it isn't stored.
+    """
+    key = _toUnicode(key)
+    entry = self._cache.pop((retina, kind, key), None)
+    if entry is None:
+      row = self._connect().execute(
+        "SELECT positions, fields FROM fingerprints "
+        "WHERE retina = ? AND kind = ? AND key = ?",
+        (retina, kind, key)).fetchone()
+      if row is None:
+        return None
+      entry = (numpy.frombuffer(row[0], dtype="uint32"), row[1])
+
+    self._addToCache((retina, kind, key), entry)
+    return _unpack(entry)
+
+
+  def getMany(self, retina, kind, keys):
+    """
+    Load many fingerprints into memory, with one query per
+    _MAX_KEYS_PER_QUERY keys that aren't in memory.
+
+    @return (dict) The stored fingerprints, by key. Missing keys are left out.
+    """
+    keys = dict((_toUnicode(key), key) for key in keys)
+    entries = {}
+    missing = []
+    for key in keys:
+      entry = self._cache.get((retina, kind, key))
+      if entry is None:
+        missing.append(key)
+      else:
+        entries[key] = entry
+
+    connection = self._connect()
+    for start in xrange(0, len(missing), _MAX_KEYS_PER_QUERY):
+      chunk = missing[start:start + _MAX_KEYS_PER_QUERY]
+      rows = connection.execute(
+        "SELECT key, positions, fields FROM fingerprints "
+        "WHERE retina = ? AND kind = ? AND key IN (%s)" % (
+          ",".join("?" * len(chunk))),
+        [retina, kind] + chunk)
+      for key, positions, fields in rows:
+        entries[key] = (numpy.frombuffer(positions, dtype="uint32"), fields)
+
+    for key, entry in entries.iteritems():
+      self._addToCache((retina, kind, key), entry)
+
+    return dict((keys[key], _unpack(entry))
+                for key, entry in entries.iteritems())
+
+
+  def put(self, retina, kind, key, fingerprint):
+    self.putMany(retina, kind, {key: fingerprint})
+
+
+  def putMany(self, retina, kind, fingerprints):
+    """
+    Store many fingerprints in one transaction.
+
+    @param fingerprints (dict) Fingerprint dicts by key.
+    """
+    rows = []
+    for key, fingerprint in fingerprints.iteritems():
+      key = _toUnicode(key)
+      entry = _pack(fingerprint)
+      self._addToCache((retina, kind, key), entry)
+      rows.append((retina, kind, key, sqlite3.Binary(entry[0].tostring()),
+                   entry[1]))
+
+    connection = self._connect()
+    with connection:
+      connection.executemany(
+        "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)", rows)
+
+
+  def __len__(self):
+    return self._connect().execute(
+      "SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+
+  def close(self):
+    if self._connection is not None:
+      self._connection.close()
+      self._connection = None
+
+
+  def _connect(self):
+    if self._connection is None:
+      self._connection = sqlite3.connect(self.path)
+      self._connection.execute(
+        "CREATE TABLE IF NOT EXISTS fingerprints ("
+        "retina TEXT, kind TEXT, key TEXT, positions BLOB, fields TEXT, "
+        "PRIMARY KEY (retina, kind, key))")
+    return self._connection
+
+
+  def _addToCache(self, cacheKey, entry):
+    self._cache.pop(cacheKey, None)
+    self._cache[cacheKey] = entry
+    while len(self._cache) > self.cacheSize:
+      self._cache.popitem(last=False)
+
+
+
+def _toUnicode(key):
+  return key if isinstance(key, unicode) else key.decode("utf-8")
+
+
+
+def _pack(fingerprint):
+  """
+  @return (tuple) The positions as a uint32 array and the rest of the
+  fingerprint dict as JSON.
+  """
+  fields = dict(fingerprint)
+  positionsDict = dict(fields.pop("fingerprint"))
+  positions = numpy.asarray(positionsDict.pop("positions"), dtype="uint32")
+  fields["fingerprint"] = positionsDict
+  return positions, json.dumps(fields)
+
+
+
+def _unpack(entry):
+  """
+  @return (dict) A new fingerprint dict, which the caller may modify.
+  """
+  positions, fields = entry
+  fingerprint = json.loads(fields)
+  fingerprint["fingerprint"]["positions"] = positions.tolist()
+  return fingerprint
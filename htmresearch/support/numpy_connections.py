@@ -0,0 +1,721 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+A pure numpy implementation of nupic's SparseMatrixConnections, and factories
+for choosing between it and the C++ implementation.
+"""
+
+import numpy as np
+
+try:
+  from nupic.bindings.math import Random, SparseMatrixConnections
+except ImportError:
+  Random = None
+  SparseMatrixConnections = None
+
+
+# nupic's SparseMatrix treats values this close to zero as zero, so synapses
+# whose permanence decays to this value are destroyed.
+EPSILON = 1e-6
+
+CONNECTIONS_IMPLEMENTATIONS = ("cpp", "numpy")
+
+
+
+def createConnections(implementation, cellCount, inputSize):
+  """
+  Create a connections object.
+
+  @param implementation (string)
+  "cpp" for nupic.bindings' SparseMatrixConnections, "numpy" for
+  NumpyConnections.
+
+  @param cellCount (int)
+  @param inputSize (int)
+  """
+  if implementation == "cpp":
+    if SparseMatrixConnections is None:
+      raise ImportError("The 'cpp' connections implementation requires "
+                        "nupic.bindings. Use 'numpy' instead.")
+    return SparseMatrixConnections(cellCount, inputSize)
+  elif implementation == "numpy":
+    return NumpyConnections(cellCount, inputSize)
+  else:
+    raise ValueError("Unrecognized connections implementation: %s. Expected "
+                     "one of %s" % (implementation,
+                                    CONNECTIONS_IMPLEMENTATIONS))
+
+
+
+def createRandom(seed):
+  """
+  Create a random number generator that is compatible with both connections
+  implementations.
+
+  When nupic.bindings is available this is always nupic's Random, so the "cpp"
+  and "numpy" connections produce identical results for the same seed.
+  Otherwise it's a NumpyRandom.
+  """
+  if Random is not None:
+    return Random(seed)
+  return NumpyRandom(seed)
+
+
+
+class NumpyRandom(object):
+  """
+  Implements the subset of nupic.bindings.math.Random used by the temporal
+  memories and by NumpyConnections. The random sequences are different from
+  nupic's.
+  """
+
+  def __init__(self, seed=42):
+    self.seed = seed
+    self.randomState = np.random.RandomState(seed)
+
+
+  def sample(self, population, choices):
+    """
+    Fill 'choices' with a random sample of 'population', preserving the order
+    of 'population'.
+    """
+    if len(choices) > len(population):
+      raise ValueError("population too small")
+    selected = self.randomState.choice(len(population), len(choices),
+                                       replace=False)
+    selected.sort()
+    choices[:] = population[selected]
+
+
+  def initializeReal32Array(self, array):
+    """
+    Fill 'array' with random numbers in [0, 1).
+    """
+    array[:] = self.randomState.random_sample(len(array))
+
+
+  def getReal64(self):
+    return self.randomState.random_sample()
+
+
+  def getUInt32(self, max=2**32 - 1):
+    return self.randomState.randint(max)
+
+
+
+class NumpyConnections(object):
+  """
+  A drop-in replacement for nupic.bindings.math.SparseMatrixConnections,
+  written with numpy.
+
+  Each segment is a row of a cellCount-independent sparse matrix of synapse
+  permanences. Synapses are stored in three flat parallel arrays (segment,
+  presynaptic input, permanence) with spare capacity, and the slots of
+  destroyed synapses are reused, so growing synapses is an amortized append.
+  Two indexes of these slots, by segment and by input, are updated as
+  synapses are created and destroyed. Learning only visits the synapses on
+  the learning segments, and computeActivity only visits the synapses on
+  active inputs.
+
+  Given the same Random, every method returns the same values as the C++
+  implementation.
+  """
+
+  def __init__(self, cellCount, inputSize):
+    """
+    @param cellCount (int)
+    The number of cells that segments can belong to
+
+    @param inputSize (int)
+    The number of presynaptic inputs
+    """
+    self.cellCount = cellCount
+    self.inputSize = inputSize
+
+    self._numSegments = 0
+    self._segmentCells = np.empty(0, dtype="uint32")
+    self._segmentSynapseCounts = np.empty(0, dtype="int32")
+    self._cellSegmentCounts = np.zeros(cellCount, dtype="int32")
+    self._destroyedSegments = []
+
+    self._numSynapses = 0
+    self._numSynapseSlots = 0
+    self._freeSynapses = np.empty(0, dtype="int64")
+    self._synapseSegments = np.empty(0, dtype="uint32")
+    self._synapseInputs = np.empty(0, dtype="uint32")
+    self._synapsePermanences = np.empty(0, dtype="float32")
+
+    self._segmentSynapses = _BucketIndex(0)
+    self._inputSynapses = _BucketIndex(inputSize)
+
+
+  def nCells(self):
+    return self.cellCount
+
+
+  def nSegments(self):
+    """
+    @return (int)
+    The number of segment rows, including rows of destroyed segments.
+    """
+    return self._numSegments
+
+
+  @property
+  def matrix(self):
+    """
+    A read-only view with the same row accessors as a nupic SparseMatrix.
+    """
+    return _MatrixView(self)
+
+
+  def createSegment(self, cell):
+    return self.createSegments(np.array([cell], dtype="uint32"))[0]
+
+
+  def createSegments(self, cells):
+    """
+    Create one segment on each of the specified cells. Destroyed segments are
+    reused first.
+
+    @param cells (numpy array)
+
+    @return (numpy array)
+    The new segments
+    """
+    cells = np.asarray(cells, dtype="uint32")
+    segments = np.empty(len(cells), dtype="uint32")
+
+    numReused = min(len(cells), len(self._destroyedSegments))
+    for i in xrange(numReused):
+      segments[i] = self._destroyedSegments.pop()
+
+    numNew = len(cells) - numReused
+    segments[numReused:] = np.arange(self._numSegments,
+                                     self._numSegments + numNew)
+
+    self._numSegments += numNew
+    self._segmentCells = _ensureCapacity(self._segmentCells,
+                                         self._numSegments)
+    self._segmentSynapseCounts = _ensureCapacity(self._segmentSynapseCounts,
+                                                 self._numSegments)
+
+    self._segmentSynapses.reserveKeys(self._numSegments)
+
+    self._segmentCells[segments] = cells
+    self._segmentSynapseCounts[segments] = 0
+    np.add.at(self._cellSegmentCounts, cells, 1)
+
+    return segments
+
+
+  def destroySegment(self, segment):
+    self.destroySegments(np.array([segment], dtype="uint32"))
+
+
+  def destroySegments(self, segments):
+    """
+    Destroy the specified segments and all of their synapses.
+
+    @param segments (numpy array)
+    """
+    segments = np.unique(np.asarray(segments, dtype="uint32"))
+
+    self._removeSynapses(self._synapsesOnSegments(segments))
+    np.subtract.at(self._cellSegmentCounts, self._segmentCells[segments], 1)
+
+    # Point destroyed segments past the last cell so that they're never
+    # returned by cell lookups.
+    self._segmentCells[segments] = self.cellCount
+    self._destroyedSegments.extend(segments.tolist())
+
+
+  def computeActivity(self, activeInput, permanenceThreshold=None):
+    """
+    Compute the number of active synapses on each segment.
+
+    @param activeInput (numpy array)
+    The active inputs
+
+    @param permanenceThreshold (float or None)
+    If specified, only count synapses with permanence >= this value.
+
+    @return (numpy array)
+    An overlap for every segment
+    """
+    activeInput = np.unique(np.asarray(activeInput, dtype="uint32"))
+    synapses = self._inputSynapses.get(activeInput)
+
+    if permanenceThreshold is not None:
+      synapses = synapses[self._synapsePermanences[synapses] >=
+                          np.float32(permanenceThreshold)]
+
+    return np.bincount(self._synapseSegments[synapses],
+                       minlength=self._numSegments).astype("int32")
+
+
+  def adjustSynapses(self, segments, activeInput, activeInputDelta,
+                     inactiveInputDelta):
+    """
+    Add 'activeInputDelta' to the permanence of each synapse on 'segments' with
+    an active input, and 'inactiveInputDelta' to the others. Synapses whose
+    permanence reaches zero are destroyed.
+    """
+    synapses = self._synapsesOnSegments(segments)
+    isActive = self._inputMask(activeInput)[self._synapseInputs[synapses]]
+    deltas = np.where(isActive,
+                      np.float32(activeInputDelta),
+                      np.float32(inactiveInputDelta))
+    self._adjustPermanences(synapses, deltas)
+
+
+  def adjustActiveSynapses(self, segments, activeInput, delta):
+    """
+    Add 'delta' to the permanence of each synapse on 'segments' with an active
+    input.
+    """
+    synapses = self._synapsesOnSegments(segments)
+    synapses = synapses[
+      self._inputMask(activeInput)[self._synapseInputs[synapses]]]
+    self._adjustPermanences(synapses, np.float32(delta))
+
+
+  def adjustInactiveSynapses(self, segments, activeInput, delta):
+    """
+    Add 'delta' to the permanence of each synapse on 'segments' with an inactive
+    input.
+    """
+    synapses = self._synapsesOnSegments(segments)
+    synapses = synapses[
+      ~self._inputMask(activeInput)[self._synapseInputs[synapses]]]
+    self._adjustPermanences(synapses, np.float32(delta))
+
+
+  def clipPermanences(self, segments):
+    """
+    Clip the permanences on 'segments' to [0, 1], destroying synapses that
+    reach zero.
+    """
+    self._adjustPermanences(self._synapsesOnSegments(segments),
+                            np.float32(0.0))
+
+
+  def growSynapses(self, segments, activeInput, initialPermanence):
+    """
+    Grow a synapse from each segment to each input that it isn't already
+    connected to.
+    """
+    segments = np.asarray(segments, dtype="uint32")
+    activeInput = np.asarray(activeInput, dtype="uint32")
+
+    segmentColumn = np.repeat(segments, len(activeInput))
+    inputColumn = np.tile(activeInput, len(segments))
+    isNew = ~self._isConnected(segmentColumn, inputColumn)
+
+    self._appendSynapses(segmentColumn[isNew], inputColumn[isNew],
+                         initialPermanence)
+
+
+  def growSynapsesToSample(self, segments, activeInput, sampleSize,
+                           initialPermanence, rng):
+    """
+    For each segment, grow synapses to a random sample of the inputs that it
+    isn't already connected to.
+
+    @param segments (numpy array)
+
+    @param activeInput (numpy array)
+    The candidate inputs
+
+    @param sampleSize (int or numpy array)
+    The maximum number of synapses to grow, either for every segment or for
+    each segment.
+
+    @param initialPermanence (float)
+
+    @param rng (Random)
+    Sampling is done with rng.sample, one call per segment, in segment order.
+    Like the C++ implementation, a segment keeps drawing one number per
+    unconnected input until it has passed all of its existing synapses, so the
+    generator ends up in the same state.
+    """
+    segments = np.asarray(segments, dtype="uint32")
+    activeInput = np.asarray(activeInput, dtype="uint32")
+    sampleSizes = np.broadcast_to(np.asarray(sampleSize, dtype="int64"),
+                                  segments.shape)
+
+    if len(segments) == 0 or len(activeInput) == 0:
+      return
+
+    unconnected = ~self._isConnected(
+      np.repeat(segments, len(activeInput)),
+      np.tile(activeInput, len(segments))).reshape(len(segments),
+                                                   len(activeInput))
+
+    # The largest input that each segment is already connected to.
+    existing = self._synapsesOnSegments(segments)
+    maxExistingInputs = np.full(self._numSegments, -1, dtype="int64")
+    np.maximum.at(maxExistingInputs, self._synapseSegments[existing],
+                  self._synapseInputs[existing])
+
+    grownSegments = []
+    grownInputs = []
+    for i in np.flatnonzero(sampleSizes > 0):
+      population = activeInput[unconnected[i]]
+      numChoices = min(sampleSizes[i], len(population))
+      if numChoices == 0:
+        continue
+      choices = np.empty(numChoices, dtype="uint32")
+      rng.sample(population, choices)
+      grownSegments.append(np.repeat(segments[i], numChoices))
+      grownInputs.append(choices)
+
+      # rng.sample made one draw per input up to its last choice.
+      numDrawn = np.searchsorted(population, choices[-1]) + 1
+      numToDraw = np.searchsorted(population, maxExistingInputs[segments[i]])
+      for remaining in xrange(len(population) - numDrawn,
+                              len(population) - numToDraw, -1):
+        rng.getUInt32(remaining)
+
+    if len(grownSegments) > 0:
+      self._appendSynapses(np.concatenate(grownSegments),
+                           np.concatenate(grownInputs),
+                           initialPermanence)
+
+
+  def filterSegmentsByCell(self, segments, cells, assumeSorted=False):
+    """
+    Return the subset of 'segments' that are on the specified cells, sorted by
+    cell. Segments on the same cell keep their relative order.
+
+    @param assumeSorted (bool)
+    If True, 'segments' are assumed to already be sorted by cell.
+    """
+    segments = np.asarray(segments, dtype="uint32")
+    if not assumeSorted:
+      segments = segments[np.argsort(self._segmentCells[segments],
+                                     kind="mergesort")]
+    return segments[np.in1d(self._segmentCells[segments], cells)]
+
+
+  def sortSegmentsByCell(self, segments):
+    """
+    Sort 'segments' in place by cell. Segments on the same cell keep their
+    relative order.
+    """
+    segments[:] = segments[np.argsort(self._segmentCells[segments],
+                                      kind="mergesort")]
+
+
+  def mapSegmentsToCells(self, segments):
+    return self._segmentCells[np.asarray(segments, dtype="uint32")]
+
+
+  def mapSegmentsToSynapseCounts(self, segments):
+    return self._segmentSynapseCounts[np.asarray(segments, dtype="uint32")]
+
+
+  def getSegmentCounts(self, cells):
+    return self._cellSegmentCounts[np.asarray(cells, dtype="uint32")]
+
+
+  def getSegmentsForCell(self, cell):
+    return np.flatnonzero(
+      self._segmentCells[:self._numSegments] == cell).astype("uint32")
+
+
+  def _synapsesOnSegments(self, segments):
+    """
+    @return (numpy array)
+    Positions of all synapses on the specified segments
+    """
+    return self._segmentSynapses.get(
+      np.unique(np.asarray(segments, dtype="uint32")))
+
+
+  def _inputMask(self, activeInput):
+    mask = np.zeros(self.inputSize, dtype="bool")
+    mask[np.asarray(activeInput, dtype="uint32")] = True
+    return mask
+
+
+  def _isConnected(self, segments, inputs):
+    """
+    @return (numpy array)
+    For each (segment, input) pair, whether the segment has a synapse to the
+    input.
+    """
+    if len(segments) == 0:
+      return np.zeros(0, dtype="bool")
+
+    existing = self._synapsesOnSegments(np.unique(segments))
+    existingKeys = (self._synapseSegments[existing].astype("int64") *
+                    self.inputSize + self._synapseInputs[existing])
+    keys = segments.astype("int64") * self.inputSize + inputs
+    return np.in1d(keys, existingKeys)
+
+
+  def _adjustPermanences(self, synapses, deltas):
+    permanences = self._synapsePermanences[synapses] + deltas
+    np.clip(permanences, 0.0, 1.0, out=permanences)
+    self._synapsePermanences[synapses] = permanences
+    self._removeSynapses(synapses[permanences <= EPSILON])
+
+
+  def _appendSynapses(self, segments, inputs, initialPermanence):
+    count = len(segments)
+    if count == 0:
+      return
+
+    # Reuse the slots of destroyed synapses first.
+    numReused = min(count, len(self._freeSynapses))
+    synapses = np.empty(count, dtype="int64")
+    synapses[:numReused] = self._freeSynapses[len(self._freeSynapses) -
+                                              numReused:]
+    self._freeSynapses = self._freeSynapses[:len(self._freeSynapses) -
+                                            numReused]
+    numNew = count - numReused
+    synapses[numReused:] = np.arange(self._numSynapseSlots,
+                                     self._numSynapseSlots + numNew)
+    self._numSynapseSlots += numNew
+
+    self._synapseSegments = _ensureCapacity(self._synapseSegments,
+                                            self._numSynapseSlots)
+    self._synapseInputs = _ensureCapacity(self._synapseInputs,
+                                          self._numSynapseSlots)
+    self._synapsePermanences = _ensureCapacity(self._synapsePermanences,
+                                               self._numSynapseSlots)
+
+    self._synapseSegments[synapses] = segments
+    self._synapseInputs[synapses] = inputs
+    self._synapsePermanences[synapses] = initialPermanence
+    np.add.at(self._segmentSynapseCounts, segments, 1)
+    self._numSynapses += count
+
+    self._segmentSynapses.add(segments, synapses)
+    self._inputSynapses.add(inputs, synapses)
+
+
+  def _removeSynapses(self, synapses):
+    """
+    @param synapses (numpy array)
+    Unique slots of synapses to destroy.
+    """
+    if len(synapses) == 0:
+      return
+
+    synapses = np.asarray(synapses, dtype="int64")
+    segments = self._synapseSegments[synapses]
+    np.subtract.at(self._segmentSynapseCounts, segments, 1)
+    self._numSynapses -= len(synapses)
+
+    self._segmentSynapses.remove(segments, synapses)
+    self._inputSynapses.remove(self._synapseInputs[synapses], synapses)
+    self._freeSynapses = np.concatenate((self._freeSynapses, synapses))
+
+
+
+class _BucketIndex(object):
+  """
+  Ids grouped by an integer key, such as the synapses of each segment.
+
+  Each key has a block of the 'ids' array with spare room. When a block is
+  full it is moved to the end of the array with twice the room, and the array
+  is compacted once more than half of it is in abandoned blocks. Adding and
+  removing ids only touches the blocks of their keys.
+  """
+
+  def __init__(self, numKeys):
+    self.starts = np.zeros(numKeys, dtype="int64")
+    self.counts = np.zeros(numKeys, dtype="int64")
+    self.capacities = np.zeros(numKeys, dtype="int64")
+    self.ids = np.empty(0, dtype="int64")
+    self.slots = np.empty(0, dtype="int64")
+    self.end = 0
+    self.numAbandoned = 0
+
+
+  def reserveKeys(self, numKeys):
+    """
+    Make sure keys 0 ... numKeys-1 exist. New keys are empty.
+    """
+    numExtra = numKeys - len(self.starts)
+    if numExtra > 0:
+      numExtra = max(numExtra, len(self.starts))
+      self.starts = np.append(self.starts, np.zeros(numExtra, dtype="int64"))
+      self.counts = np.append(self.counts, np.zeros(numExtra, dtype="int64"))
+      self.capacities = np.append(self.capacities,
+                                  np.zeros(numExtra, dtype="int64"))
+
+
+  def get(self, keys):
+    """
+    @return (numpy array)
+    The ids of every key in 'keys', grouped by key.
+    """
+    keys = np.asarray(keys, dtype="int64")
+    return self.ids[_ranges(self.starts[keys], self.counts[keys])]
+
+
+  def add(self, keys, ids):
+    """
+    Add each id to the block of its key. The ids must not be in the index.
+    """
+    if len(keys) == 0:
+      return
+
+    keys = np.asarray(keys, dtype="int64")
+    ids = np.asarray(ids, dtype="int64")
+    order = np.argsort(keys, kind="mergesort")
+    keys = keys[order]
+    ids = ids[order]
+    uniqueKeys, first, numAdded = np.unique(keys, return_index=True,
+                                            return_counts=True)
+
+    needed = self.counts[uniqueKeys] + numAdded
+    full = needed > self.capacities[uniqueKeys]
+    if full.any():
+      self._moveToEnd(uniqueKeys[full],
+                      np.maximum(needed[full],
+                                 2*self.capacities[uniqueKeys[full]]))
+
+    rank = np.arange(len(keys)) - np.repeat(first, numAdded)
+    slots = self.starts[keys] + self.counts[keys] + rank
+    self.ids[slots] = ids
+    self.slots = _ensureCapacity(self.slots, ids.max() + 1)
+    self.slots[ids] = slots
+    self.counts[uniqueKeys] += numAdded
+
+
+  def remove(self, keys, ids):
+    """
+    Remove each id from the block of its key, keeping the order of the others.
+    """
+    if len(ids) == 0:
+      return
+
+    ids = np.asarray(ids, dtype="int64")
+    self.ids[self.slots[ids]] = -1
+
+    affected = np.unique(np.asarray(keys, dtype="int64"))
+    counts = self.counts[affected]
+    values = self.ids[_ranges(self.starts[affected], counts)]
+    blocks = np.repeat(np.arange(len(affected)), counts)
+    kept = values >= 0
+    values = values[kept]
+    newCounts = np.bincount(blocks[kept], minlength=len(affected))
+
+    slots = _ranges(self.starts[affected], newCounts)
+    self.ids[slots] = values
+    self.slots[values] = slots
+    self.counts[affected] = newCounts
+
+
+  def _moveToEnd(self, keys, capacities):
+    capacities = np.maximum(capacities, 4)
+    starts = self.end + np.cumsum(capacities) - capacities
+    self.end += capacities.sum()
+    self.ids = _ensureCapacity(self.ids, self.end)
+
+    counts = self.counts[keys]
+    values = self.ids[_ranges(self.starts[keys], counts)]
+    slots = _ranges(starts, counts)
+    self.ids[slots] = values
+    self.slots[values] = slots
+
+    self.numAbandoned += self.capacities[keys].sum()
+    self.starts[keys] = starts
+    self.capacities[keys] = capacities
+
+    if self.numAbandoned > self.end / 2:
+      self._compact()
+
+
+  def _compact(self):
+    keys = np.flatnonzero(self.capacities)
+    capacities = self.capacities[keys]
+    starts = np.cumsum(capacities) - capacities
+    counts = self.counts[keys]
+
+    values = self.ids[_ranges(self.starts[keys], counts)]
+    slots = _ranges(starts, counts)
+    self.ids = np.empty(capacities.sum(), dtype="int64")
+    self.ids[slots] = values
+    self.slots[values] = slots
+
+    self.starts[keys] = starts
+    self.end = len(self.ids)
+    self.numAbandoned = 0
+
+
+
+class _MatrixView(object):
+  """
+  Exposes NumpyConnections permanences through the SparseMatrix row accessors
+  that experiments use for tracing.
+  """
+
+  def __init__(self, connections):
+    self.connections = connections
+
+
+  def nRows(self):
+    return self.connections.nSegments()
+
+
+  def nCols(self):
+    return self.connections.inputSize
+
+
+  def nNonZeros(self):
+    return self.connections._numSynapses
+
+
+  def getRow(self, row):
+    c = self.connections
+    synapses = c._synapsesOnSegments([row])
+    dense = np.zeros(c.inputSize, dtype="float32")
+    dense[c._synapseInputs[synapses]] = c._synapsePermanences[synapses]
+    return dense
+
+
+
+def _ranges(starts, lengths):
+  """
+  @return (numpy array)
+  The concatenation of arange(start, start + length) for each start and length.
+  """
+  offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+  return offsets + np.arange(lengths.sum())
+
+
+
+def _ensureCapacity(array, size):
+  """
+  Return 'array' or a copy with room for at least 'size' elements, growing
+  geometrically.
+  """
+  if len(array) >= size:
+    return array
+  grown = np.empty(max(size, 2*len(array)), dtype=array.dtype)
+  grown[:len(array)] = array
+  return grown
@@ -0,0 +1,145 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Sparse links between htmresearch regions.
+
+The network API links regions through dense output buffers. Regions that write
+binary outputs with a SparseOutputs clear only the previously set bits, and
+remember the indices they set. A region linked with linkSparse() reads those
+indices directly instead of calling nonzero() on its input buffer.
+
+The dense buffers are always kept up to date, so non-sparse links and
+getOutputData() still work. Sparse links aren't saved with the network; a
+loaded network reads its inputs with nonzero() again.
+"""
+
+import numpy
+
+
+
+class SparseOutputs(object):
+  """
+  Writes binary outputs from arrays of active indices.
+  """
+
+  def __init__(self, clearPrevious=False):
+    """
+    @param clearPrevious (bool)
+    If True, only the bits set by the previous write are cleared before
+    writing. Otherwise the whole output buffer is cleared. This relies on
+    nothing else writing to the output buffers.
+    """
+    self.clearPrevious = clearPrevious
+    self.indices = {}
+
+
+  def __getstate__(self):
+    # The output buffers aren't saved with the region, so neither are the
+    # indices that were set in them.
+    return {"clearPrevious": self.clearPrevious}
+
+
+  def __setstate__(self, state):
+    self.clearPrevious = state["clearPrevious"]
+    self.indices = {}
+
+
+  def write(self, outputs, name, indices):
+    """
+    Set outputs[name] to 1 at 'indices' and 0 elsewhere.
+
+    @param indices (numpy array)
+    The sorted indices to set.
+    """
+    output = outputs[name]
+    previous = self.indices.get(name)
+
+    if self.clearPrevious and previous is not None:
+      output[previous] = 0
+    else:
+      output[:] = 0
+
+    indices = numpy.asarray(indices, dtype="uint32")
+    output[indices] = 1
+    self.indices[name] = indices
+
+
+  def clear(self, outputs, name):
+    self.write(outputs, name, numpy.empty(0, dtype="uint32"))
+
+
+
+class SparseInputs(object):
+  """
+  The inputs of a region that are linked with linkSparse().
+  """
+
+  def __init__(self):
+    # input name -> (SparseOutputs, output name)
+    self.sources = {}
+
+
+  def __getstate__(self):
+    # The sources belong to other regions, which are saved separately. The
+    # state must not be empty, or pickle skips __setstate__.
+    return {"sources": None}
+
+
+  def __setstate__(self, state):
+    self.sources = {}
+
+
+  def link(self, name, sparseOutputs, srcOutput):
+    if name in self.sources:
+      raise ValueError("Input %s already has a sparse link" % name)
+    self.sources[name] = (sparseOutputs, srcOutput)
+
+
+  def getIndices(self, inputs, name):
+    """
+    Return the active indices of inputs[name] as a sorted uint32 array.
+    """
+    if name in self.sources:
+      sparseOutputs, srcOutput = self.sources[name]
+      return sparseOutputs.indices.get(srcOutput,
+                                       numpy.empty(0, dtype="uint32"))
+
+    return numpy.asarray(inputs[name].nonzero()[0], dtype="uint32")
+
+
+
+def linkSparse(network, srcName, destName, srcOutput, destInput):
+  """
+  Link srcOutput of srcName to destInput of destName, and let the destination
+  read the active indices of the source directly.
+
+  The source must be computed before the destination in each timestep, so this
+  can't be used for links with a propagation delay. If either region doesn't
+  support sparse links, this is an ordinary link.
+  """
+  network.link(srcName, destName, "UniformLink", "",
+               srcOutput=srcOutput, destInput=destInput)
+
+  src = network.regions[srcName].getSelf()
+  dest = network.regions[destName].getSelf()
+  if hasattr(src, "sparseOutputs") and hasattr(dest, "sparseInputs"):
+    dest.sparseInputs.link(destInput, src.sparseOutputs, srcOutput)
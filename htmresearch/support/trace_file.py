@@ -0,0 +1,446 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Binary columnar trace files.
+
+A trace file is a directory holding one column per trace and one row per
+timestep. Scalar columns are raw arrays of a numpy dtype. SDR columns hold
+the active indices of each timestep in CSR form: an int64 array of row
+offsets (indptr) and a uint32 array of indices. The arrays are appended to
+every chunkSize rows while a network runs, and are memory mapped when the
+file is loaded.
+
+The traces that were saved as CSV files, with one JSON value per cell, can be
+converted with convertCsvTraces(), or from the command line:
+
+    python -m htmresearch.support.trace_file trace.csv trace_dir
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import OrderedDict
+
+import numpy
+import scipy.sparse
+
+HEADER_FILE = "columns.json"
+
+
+
+class TraceWriter(object):
+  """
+  Writes the rows of a trace file, a chunk at a time.
+  """
+
+  def __init__(self, path, columns=None, sdrWidths=None, chunkSize=1000):
+    """
+    @param path (string)
+    Directory of the trace file. It is created if needed, and any trace file
+    in it is replaced.
+
+    @param columns (list or None)
+    (name, kind) pairs, where kind is "sdr" or the numpy dtype of a scalar
+    column. If None, the columns are inferred from the first row: lists and
+    integer arrays are SDRs, bools, ints and floats are scalars. An integer
+    column becomes a float64 column if a later row has a float or a None.
+
+    @param sdrWidths (dict or None)
+    Number of bits of each SDR column. Columns that are missing get the
+    largest index + 1 when the file is loaded.
+
+    @param chunkSize (int)
+    Number of rows kept in memory before they are written.
+    """
+    self.path = path
+    self.sdrWidths = sdrWidths if sdrWidths is not None else {}
+    self.chunkSize = chunkSize
+    self.numRows = 0
+    self._columns = None
+    self._header = None
+    self._files = {}
+    self._pending = {}
+    self._nnz = {}
+
+    if not os.path.exists(path):
+      os.makedirs(path)
+    if os.path.exists(os.path.join(path, HEADER_FILE)):
+      os.remove(os.path.join(path, HEADER_FILE))
+
+    if columns is not None:
+      self._createColumns(columns)
+
+
+  def __enter__(self):
+    return self
+
+
+  def __exit__(self, *args):
+    self.close()
+
+
+  def append(self, row):
+    """
+    @param row (dict)
+    Value of each column for this timestep. Missing values are None, which
+    is NaN in a float column and an empty SDR.
+    """
+    if self._columns is None:
+      self._createColumns(inferColumns(row))
+
+    for name, _ in self._columns:
+      self._pending[name].append(row.get(name))
+    self.numRows += 1
+
+    if len(self._pending[self._columns[0][0]]) >= self.chunkSize:
+      self.flush()
+
+
+  def flush(self):
+    """
+    Write the pending rows.
+    """
+    if self._columns is None:
+      return
+
+    for name, kind in self._columns:
+      pending = self._pending[name]
+      if len(pending) == 0:
+        continue
+
+      if isinstance(kind, basestring):
+        indices = [numpy.asarray(sdr if sdr is not None else [],
+                                 dtype="<u4").ravel()
+                   for sdr in pending]
+        counts = numpy.array([len(sdr) for sdr in indices], dtype="<i8")
+        indptr = self._nnz[name] + numpy.cumsum(counts)
+        numpy.concatenate(indices).astype("<u4").tofile(
+          self._files[name, "indices"])
+        indptr.astype("<i8").tofile(self._files[name, "indptr"])
+        self._nnz[name] = int(indptr[-1])
+      else:
+        if (kind.kind in "iu" and
+            not all(isinstance(value, (int, long, numpy.integer))
+                    for value in pending)):
+          kind = self._promoteToFloat(name)
+        numpy.array(pending, dtype=kind).tofile(self._files[name, "values"])
+
+      self._pending[name] = []
+
+    for f in self._files.itervalues():
+      f.flush()
+
+
+  def close(self):
+    if self._columns is None:
+      self._createColumns([])
+    self.flush()
+    for f in self._files.itervalues():
+      f.close()
+    self._files = {}
+
+
+  def _promoteToFloat(self, name):
+    """
+    Rewrite the values written so far of an integer column as float64.
+
+    @return (numpy.dtype) The new dtype of the column.
+    """
+    i = [columnName for columnName, _ in self._columns].index(name)
+    kind = numpy.dtype("<f8")
+
+    f = self._files[name, "values"]
+    f.close()
+    values = numpy.fromfile(f.name, dtype=self._columns[i][1])
+    with open(f.name, "wb") as f:
+      values.astype(kind).tofile(f)
+    self._files[name, "values"] = open(f.name, "ab")
+
+    self._columns[i] = (name, kind)
+    self._header[i]["dtype"] = kind.str
+    self._writeHeader()
+    return kind
+
+
+  def _writeHeader(self):
+    with open(os.path.join(self.path, HEADER_FILE), "w") as f:
+      json.dump(self._header, f, indent=2)
+
+
+  def _createColumns(self, columns):
+    self._columns = []
+    self._header = header = []
+    for i, (name, kind) in enumerate(columns):
+      prefix = os.path.join(self.path, "column%d" % i)
+      # Comparing a numpy dtype with "sdr" would parse "sdr" as a dtype.
+      if isinstance(kind, basestring) and kind == "sdr":
+        self._files[name, "indptr"] = open(prefix + "-indptr.bin", "wb")
+        self._files[name, "indices"] = open(prefix + "-indices.bin", "wb")
+        numpy.zeros(1, dtype="<i8").tofile(self._files[name, "indptr"])
+        self._nnz[name] = 0
+        header.append({"name": name, "kind": "sdr",
+                       "width": self.sdrWidths.get(name)})
+      else:
+        kind = numpy.dtype(kind).newbyteorder("<")
+        self._files[name, "values"] = open(prefix + "-values.bin", "wb")
+        header.append({"name": name, "kind": "scalar", "dtype": kind.str})
+      self._columns.append((name, kind))
+      self._pending[name] = []
+
+    self._writeHeader()
+
+
+
+def inferColumns(row):
+  """
+  @param row (dict) Values of the first row of a trace.
+  @return (list) (name, kind) pairs for TraceWriter.
+  """
+  columns = []
+  for name in sorted(row.keys()):
+    value = row[name]
+    if isinstance(value, (list, tuple)) or (isinstance(value, numpy.ndarray)
+                                            and value.ndim > 0):
+      kind = "sdr"
+    elif isinstance(value, (bool, numpy.bool_)):
+      kind = "bool"
+    elif isinstance(value, (int, long, numpy.integer)):
+      kind = "int64"
+    elif value is None or isinstance(value, (float, numpy.floating)):
+      kind = "float64"
+    else:
+      raise ValueError("Column %s has a %s value, which can't be stored in a "
+                       "trace file" % (name, type(value).__name__))
+    columns.append((name, kind))
+  return columns
+
+
+
+class TraceFile(object):
+  """
+  A trace file loaded as a read-only dict of columns. Scalar columns are
+  numpy arrays and SDR columns are SDRColumns.
+  """
+
+  def __init__(self, path, mmap=True):
+    """
+    @param path (string) Directory of the trace file.
+    @param mmap (bool) Memory map the arrays instead of reading them.
+    """
+    self.path = path
+    with open(os.path.join(path, HEADER_FILE)) as f:
+      header = json.load(f)
+
+    arrays = []
+    for i, column in enumerate(header):
+      prefix = os.path.join(path, "column%d" % i)
+      if column["kind"] == "sdr":
+        arrays.append((_loadArray(prefix + "-indptr.bin", "<i8", mmap),
+                       _loadArray(prefix + "-indices.bin", "<u4", mmap)))
+      else:
+        arrays.append(_loadArray(prefix + "-values.bin", column["dtype"],
+                                 mmap))
+
+    # A run that was interrupted may have written some columns of its last
+    # chunk but not all of them.
+    self.numRows = min([len(array[0]) - 1 if isinstance(array, tuple)
+                        else len(array)
+                        for array in arrays] or [0])
+
+    self.columns = OrderedDict()
+    for column, array in zip(header, arrays):
+      if column["kind"] == "sdr":
+        indptr, indices = array
+        self.columns[column["name"]] = SDRColumn(indptr[:self.numRows + 1],
+                                                 indices, column["width"])
+      else:
+        self.columns[column["name"]] = array[:self.numRows]
+
+
+  def __len__(self):
+    return self.numRows
+
+
+  def __getitem__(self, name):
+    return self.columns[name]
+
+
+  def __contains__(self, name):
+    return name in self.columns
+
+
+  def __iter__(self):
+    return iter(self.columns)
+
+
+  def keys(self):
+    return self.columns.keys()
+
+
+  def items(self):
+    return self.columns.items()
+
+
+
+class SDRColumn(object):
+  """
+  The SDRs of a trace file column. Indexing returns the active indices of a
+  timestep, and slicing returns another SDRColumn without copying.
+  """
+
+  def __init__(self, indptr, indices, width=None):
+    """
+    @param indptr (numpy.ndarray) Offset of each timestep in 'indices', plus
+    the end of the last one.
+    @param indices (numpy.ndarray) Active indices of every timestep.
+    @param width (int or None) Number of bits of each SDR.
+    """
+    self.indptr = indptr
+    self.indices = indices
+    self._width = width
+
+
+  @property
+  def width(self):
+    if self._width is None:
+      used = self.indices[self.indptr[0]:self.indptr[-1]]
+      self._width = int(used.max()) + 1 if len(used) > 0 else 0
+    return self._width
+
+
+  def __len__(self):
+    return len(self.indptr) - 1
+
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      start, stop, step = index.indices(len(self))
+      if step != 1:
+        raise ValueError("SDR columns can only be sliced with a step of 1")
+      return SDRColumn(self.indptr[start:max(start, stop) + 1], self.indices,
+                       self._width)
+
+    if index < 0:
+      index += len(self)
+    if index < 0 or index >= len(self):
+      raise IndexError("trace index out of range")
+    return numpy.asarray(self.indices[self.indptr[index]:
+                                      self.indptr[index + 1]])
+
+
+  def __iter__(self):
+    for i in xrange(len(self)):
+      yield self[i]
+
+
+  def toSparse(self, width=None, dtype="float32"):
+    """
+    @param width (int or None) Number of columns, self.width by default.
+    @param dtype (numpy.dtype) Type of the ones of the active bits.
+    @return (scipy.sparse.csr_matrix) One row per timestep.
+    """
+    if width is None:
+      width = self.width
+    start, end = self.indptr[0], self.indptr[-1]
+    return scipy.sparse.csr_matrix(
+      (numpy.ones(end - start, dtype=dtype), self.indices[start:end],
+       numpy.asarray(self.indptr) - start),
+      shape=(len(self), width))
+
+
+
+def _loadArray(path, dtype, mmap):
+  if mmap and os.path.getsize(path) > 0:
+    return numpy.memmap(path, dtype=dtype, mode="r")
+  return numpy.fromfile(path, dtype=dtype)
+
+
+
+def convertCsvTraces(csvPath, tracePath, sdrWidths=None, chunkSize=1000):
+  """
+  Convert a CSV trace file, with a header row and one JSON value per cell, to
+  a trace file. Empty cells are None.
+
+  Rows whose SDR cells hold a list of SDRs, i.e. one sequence per row, are
+  written as one row per SDR with a "sequence" column holding the number of
+  the CSV row.
+
+  @param csvPath (string) The CSV trace file.
+  @param tracePath (string) Directory of the new trace file.
+  @param sdrWidths (dict or None) See TraceWriter.
+  @param chunkSize (int) See TraceWriter.
+  @return (int) Number of rows written.
+  """
+  csv.field_size_limit(sys.maxsize)
+
+  with open(csvPath, "rb") as fr, TraceWriter(tracePath, sdrWidths=sdrWidths,
+                                              chunkSize=chunkSize) as writer:
+    reader = csv.reader(fr)
+    headers = reader.next()
+    sequenceColumns = None
+
+    for rowNumber, row in enumerate(reader):
+      values = dict((name, json.loads(cell) if cell != "" else None)
+                    for name, cell in zip(headers, row))
+
+      if sequenceColumns is None:
+        sequenceColumns = [name for name, value in values.iteritems()
+                           if isinstance(value, list) and len(value) > 0
+                           and isinstance(value[0], list)]
+
+      if len(sequenceColumns) > 0:
+        numSteps = len(values[sequenceColumns[0]])
+        for step in xrange(numSteps):
+          stepValues = dict(values)
+          stepValues["sequence"] = rowNumber
+          for name in sequenceColumns:
+            stepValues[name] = values[name][step]
+          writer.append(stepValues)
+      else:
+        writer.append(values)
+
+  return writer.numRows
+
+
+
+def _parseWidth(option):
+  name, width = option.rsplit("=", 1)
+  return name, int(width)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(
+    description="Convert a CSV trace file to a binary trace file.")
+  parser.add_argument("csvPath")
+  parser.add_argument("tracePath")
+  parser.add_argument("--width", type=_parseWidth, action="append", default=[],
+                      metavar="COLUMN=BITS",
+                      help="Number of bits of an SDR column")
+  parser.add_argument("--chunkSize", type=int, default=1000)
+  args = parser.parse_args()
+
+  numRows = convertCsvTraces(args.csvPath, args.tracePath, dict(args.width),
+                             args.chunkSize)
+  print "Wrote %d rows to %s" % (numRows, args.tracePath)
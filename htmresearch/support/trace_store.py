@@ -0,0 +1,450 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Memory-bounded traces for the monitor mixins.
+
+The nupic traces keep one Python object per timestep forever. A TraceStore
+creates the same trace types, but their data is packed into numpy arrays of
+chunkSize timesteps. Full chunks can be written to .npy files and memory
+mapped, and only the last maxChunks full chunks are kept.
+
+The data of these traces acts like a read-only list with append(): indexing
+an indices trace returns a set, like the nupic traces.
+"""
+
+import os
+
+import numpy
+
+from nupic.algorithms.monitor_mixin.metric import Metric
+from nupic.algorithms.monitor_mixin.trace import (IndicesTrace, CountsTrace,
+                                                  BoolsTrace, StringsTrace,
+                                                  MetricsTrace)
+
+
+
+class ListTraces(object):
+  """
+  Creates the nupic traces, which keep every timestep in Python lists.
+  """
+
+  def indicesTrace(self, monitor, title):
+    return IndicesTrace(monitor, title)
+
+
+  def countsTrace(self, monitor, title):
+    return CountsTrace(monitor, title)
+
+
+  def boolsTrace(self, monitor, title):
+    return BoolsTrace(monitor, title)
+
+
+  def stringsTrace(self, monitor, title):
+    return StringsTrace(monitor, title)
+
+
+  def metricsTrace(self, monitor, title):
+    return MetricsTrace(monitor, title)
+
+
+  def release(self, monitor=None):
+    """
+    Free the storage of the traces created so far for 'monitor', or of every
+    trace if 'monitor' is None.
+    """
+    pass
+
+
+
+class TraceStore(ListTraces):
+  """
+  Creates traces whose data is stored in chunks of packed arrays. Several
+  monitors can share a store; each one releases only its own traces.
+  """
+
+  def __init__(self, chunkSize=1000, maxChunks=None, directory=None):
+    """
+    @param chunkSize (int)
+    Number of timesteps per chunk.
+
+    @param maxChunks (int or None)
+    If not None, keep only this many full chunks, plus the chunk being filled,
+    and drop the oldest.
+
+    @param directory (string or None)
+    If not None, full chunks of indices and numbers are saved as .npy files in
+    this directory and memory mapped. Strings and metrics stay in memory.
+    """
+    self.chunkSize = chunkSize
+    self.maxChunks = maxChunks
+    self.directory = directory
+    # (monitor, data) pairs
+    self._data = []
+    self._numCreated = 0
+
+    if directory is not None and not os.path.exists(directory):
+      os.makedirs(directory)
+
+
+  def indicesTrace(self, monitor, title):
+    return ChunkedIndicesTrace(monitor, title,
+                               self._createData(monitor, ChunkedIndices))
+
+
+  def countsTrace(self, monitor, title):
+    trace = CountsTrace(monitor, title)
+    trace.data = self._createData(monitor, ChunkedValues, "int64")
+    return trace
+
+
+  def boolsTrace(self, monitor, title):
+    trace = BoolsTrace(monitor, title)
+    trace.data = self._createData(monitor, ChunkedValues, "bool")
+    return trace
+
+
+  def stringsTrace(self, monitor, title):
+    trace = StringsTrace(monitor, title)
+    trace.data = self._createData(monitor, ChunkedValues, "object")
+    return trace
+
+
+  def metricsTrace(self, monitor, title):
+    trace = MetricsTrace(monitor, title)
+    trace.data = self._createData(monitor, ChunkedValues, "object")
+    return trace
+
+
+  def release(self, monitor=None):
+    kept = []
+    for owner, data in self._data:
+      if monitor is None or owner is monitor:
+        data.release()
+      else:
+        kept.append((owner, data))
+    self._data = kept
+
+
+  def _createData(self, monitor, cls, *args):
+    if self.directory is not None:
+      prefix = os.path.join(self.directory, "trace%d" % self._numCreated)
+    else:
+      prefix = None
+    self._numCreated += 1
+
+    data = cls(self.chunkSize, self.maxChunks, prefix, *args)
+    self._data.append((monitor, data))
+    return data
+
+
+
+class ChunkedIndicesTrace(IndicesTrace):
+  """
+  An IndicesTrace whose counts are computed from the packed chunks.
+  """
+
+  def __init__(self, monitor, title, data):
+    super(ChunkedIndicesTrace, self).__init__(monitor, title)
+    self.data = data
+
+
+  def makeCountsTrace(self):
+    """
+    @return (CountsTrace) A new Trace made up of counts of this trace's indices.
+    """
+    trace = CountsTrace(self.monitor, "# {0}".format(self.title))
+    trace.data = ChunkedValues(self.data.chunkSize, self.data.maxChunks, None,
+                               "int64")
+    trace.data.numDropped = self.data.numDropped
+    for counts in self.data.counts():
+      trace.data.extend(counts)
+    return trace
+
+
+
+class _ChunkedData(object):
+  """
+  An append-only sequence stored in chunks of chunkSize timesteps.
+
+  Indices are relative to the first timestep that is still kept; numDropped
+  timesteps have been dropped before it.
+  """
+
+  def __init__(self, chunkSize, maxChunks, prefix):
+    self.chunkSize = chunkSize
+    self.maxChunks = maxChunks
+    self.numDropped = 0
+    self._prefix = prefix
+    self._numChunksSealed = 0
+    self._chunks = []
+    self._pending = []
+
+
+  def __len__(self):
+    return len(self._chunks) * self.chunkSize + len(self._pending)
+
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in xrange(*index.indices(len(self)))]
+
+    if index < 0:
+      index += len(self)
+    if index < 0 or index >= len(self):
+      raise IndexError("trace index out of range")
+
+    chunkIndex, offset = divmod(index, self.chunkSize)
+    if chunkIndex < len(self._chunks):
+      return self._getFromChunk(self._chunks[chunkIndex], offset)
+    return self._unpack(self._pending[offset])
+
+
+  def __iter__(self):
+    for chunk in self._chunks:
+      for offset in xrange(self.chunkSize):
+        yield self._getFromChunk(chunk, offset)
+
+    for value in self._pending:
+      yield self._unpack(value)
+
+
+  def append(self, value):
+    self._pending.append(self._pack(value))
+
+    if len(self._pending) == self.chunkSize:
+      self._chunks.append(self._seal(self._pending))
+      self._numChunksSealed += 1
+      self._pending = []
+
+      if self.maxChunks is not None and len(self._chunks) > self.maxChunks:
+        self._discard(self._chunks.pop(0))
+        self.numDropped += self.chunkSize
+
+
+  def extend(self, values):
+    for value in values:
+      self.append(value)
+
+
+  def release(self):
+    """
+    Drop all of the data and delete any files.
+    """
+    for chunk in self._chunks:
+      self._discard(chunk)
+    self._chunks = []
+    self._pending = []
+    self.numDropped = 0
+
+
+  def _chunkPath(self, name):
+    return "%s-chunk%d-%s.npy" % (self._prefix, self._numChunksSealed, name)
+
+
+  def _saveArray(self, name, array):
+    """
+    Write a sealed array to disk and return it memory mapped, if this data is
+    stored on disk.
+    """
+    if self._prefix is None:
+      return array
+
+    path = self._chunkPath(name)
+    numpy.save(path, array)
+    return numpy.load(path, mmap_mode="r")
+
+
+  @staticmethod
+  def _deleteArray(array):
+    if isinstance(array, numpy.memmap):
+      path = array.filename
+      del array
+      os.remove(path)
+
+
+
+class ChunkedIndices(_ChunkedData):
+  """
+  Sets of indices, packed into one uint32 array per chunk with offsets.
+  """
+
+  def _pack(self, indices):
+    return numpy.unique(numpy.asarray(list(indices), dtype="uint32"))
+
+
+  def _unpack(self, packed):
+    return set(packed.tolist())
+
+
+  def _seal(self, pending):
+    offsets = numpy.zeros(len(pending) + 1, dtype="int64")
+    offsets[1:] = numpy.cumsum([len(packed) for packed in pending])
+    values = (numpy.concatenate(pending) if offsets[-1] > 0
+              else numpy.empty(0, dtype="uint32"))
+    return (self._saveArray("offsets", offsets),
+            self._saveArray("values", values))
+
+
+  def _discard(self, chunk):
+    for array in chunk:
+      self._deleteArray(array)
+
+
+  def _getFromChunk(self, chunk, offset):
+    offsets, values = chunk
+    return set(values[offsets[offset]:offsets[offset+1]].tolist())
+
+
+  def counts(self):
+    """
+    Yield an array with the number of indices at each timestep, one chunk at
+    a time.
+    """
+    for offsets, _ in self._chunks:
+      yield numpy.diff(offsets)
+
+    if len(self._pending) > 0:
+      yield numpy.array([len(packed) for packed in self._pending],
+                        dtype="int64")
+
+
+
+class ChunkedValues(_ChunkedData):
+  """
+  One value per timestep, packed into an array of 'dtype' per chunk.
+  """
+
+  def __init__(self, chunkSize, maxChunks, prefix, dtype):
+    # Objects can't be memory mapped.
+    if dtype == "object":
+      prefix = None
+
+    super(ChunkedValues, self).__init__(chunkSize, maxChunks, prefix)
+    self.dtype = numpy.dtype(dtype)
+
+
+  def _pack(self, value):
+    return value
+
+
+  def _unpack(self, value):
+    return value
+
+
+  def _seal(self, pending):
+    array = numpy.empty(len(pending), dtype=self.dtype)
+    array[:] = pending
+    return self._saveArray("values", array)
+
+
+  def _discard(self, chunk):
+    self._deleteArray(chunk)
+
+
+  def _getFromChunk(self, chunk, offset):
+    value = chunk[offset]
+    return value if self.dtype == object else value.item()
+
+
+  def arrays(self):
+    """
+    Yield the values as arrays, one chunk at a time.
+    """
+    for chunk in self._chunks:
+      yield chunk
+
+    if len(self._pending) > 0:
+      array = numpy.empty(len(self._pending), dtype=self.dtype)
+      array[:] = self._pending
+      yield array
+
+
+
+def createMetric(trace, excludeResets=None):
+  """
+  Like Metric.createFromTrace, but for a trace created by a TraceStore the
+  statistics are accumulated one chunk at a time.
+
+  @param trace (CountsTrace)
+  @param excludeResets (BoolsTrace) Timesteps to leave out. It must end at the
+  same timestep as 'trace' and must not have dropped any of its timesteps.
+
+  @return (Metric)
+  """
+  if not isinstance(trace.data, ChunkedValues):
+    return Metric.createFromTrace(trace, excludeResets=excludeResets)
+
+  if excludeResets is not None:
+    # Line the resets up with the trace by absolute timestep.
+    start = trace.data.numDropped
+    resetsStart = getattr(excludeResets.data, "numDropped", 0)
+    assert (resetsStart <= start and
+            resetsStart + len(excludeResets.data) ==
+            start + len(trace.data)), (
+      "The resets cover timesteps %d to %d but the trace covers %d to %d" %
+      (resetsStart, resetsStart + len(excludeResets.data), start,
+       start + len(trace.data)))
+    position = start - resetsStart
+
+  count = 0
+  mean = 0.0
+  sumSquaredDeviations = 0.0
+  total = 0
+  minimum = None
+  maximum = None
+
+  for values in trace.data.arrays():
+    if excludeResets is not None:
+      resets = numpy.asarray(excludeResets.data[position:position+len(values)],
+                             dtype="bool")
+      position += len(values)
+      values = values[~resets]
+
+    if len(values) == 0:
+      continue
+
+    # Combine the statistics of this chunk with the previous ones (Chan et al.)
+    chunkMean = values.mean()
+    chunkCount = len(values)
+    delta = chunkMean - mean
+    newCount = count + chunkCount
+    mean += delta * chunkCount / newCount
+    sumSquaredDeviations += (((values - chunkMean) ** 2).sum() +
+                             delta ** 2 * count * chunkCount / newCount)
+    count = newCount
+
+    total += values.sum().item()
+    chunkMin = values.min().item()
+    chunkMax = values.max().item()
+    minimum = chunkMin if minimum is None else min(minimum, chunkMin)
+    maximum = chunkMax if maximum is None else max(maximum, chunkMax)
+
+  metric = Metric(trace.monitor, trace.title, [])
+  if count > 0:
+    metric.min = minimum
+    metric.max = maximum
+    metric.sum = total
+    metric.mean = mean
+    metric.standardDeviation = numpy.sqrt(sumSquaredDeviations / count)
+
+  return metric
@@ -31,8 +31,7 @@ from nupic.algorithms.monitor_mixin.metric import Metric
 from nupic.algorithms.monitor_mixin.monitor_mixin_base import MonitorMixinBase
 from htmresearch.algorithms.union_temporal_pooler import UnionTemporalPooler
 from nupic.algorithms.monitor_mixin.plot import Plot
-from nupic.algorithms.monitor_mixin.trace import (
-  IndicesTrace, StringsTrace, BoolsTrace, MetricsTrace, CountsTrace)
+from htmresearch.support.trace_store import ListTraces, createMetric
 
 from nupic.bindings.math import GetNTAReal
 
@@ -46,9 +45,14 @@ class UnionTemporalPoolerMonitorMixin(MonitorMixinBase):
   """
   Mixin for UnionTemporalPooler that stores a detailed history, for inspection and
   debugging.
+
+  Pass a TraceStore as 'mmTraceStore' to keep the history in packed chunks,
+  optionally on disk and with a bounded length.
   """
 
   def __init__(self, *args, **kwargs):
+    self._mmTraceStore = kwargs.pop("mmTraceStore", None) or ListTraces()
+
     super(UnionTemporalPoolerMonitorMixin, self).__init__(*args, **kwargs)
 
     self._mmResetActive = True  # First iteration is always a reset
@@ -442,28 +446,29 @@ class UnionTemporalPoolerMonitorMixin(MonitorMixinBase):
     if not self._sequenceRepresentationDataStale:
       return
 
-    unionSDRTrace = self.mmGetTraceUnionSDR()
-    sequenceLabelsTrace = self.mmGetTraceSequenceLabels()
-    resetsTrace = self.mmGetTraceResets()
+    # Read each trace once, rather than once per pair of timesteps.
+    unionSDRs = list(self.mmGetTraceUnionSDR().data)
+    sequenceLabels = list(self.mmGetTraceSequenceLabels().data)
+    resets = list(self.mmGetTraceResets().data)
 
-    n = len(unionSDRTrace.data)
+    n = len(unionSDRs)
     overlapMatrix = numpy.empty((n, n), dtype=uintType)
     stabilityConfusionUnionSDR = []
     distinctnessConfusionUnionSDR = []
 
     for i in xrange(n):
       for j in xrange(i+1):
-        overlapUnionSDR = len(unionSDRTrace.data[i] & unionSDRTrace.data[j])
+        overlapUnionSDR = len(unionSDRs[i] & unionSDRs[j])
 
         overlapMatrix[i][j] = overlapUnionSDR
         overlapMatrix[j][i] = overlapUnionSDR
 
         if (i != j and
-            sequenceLabelsTrace.data[i] is not None and
-            not resetsTrace.data[i] and
-            sequenceLabelsTrace.data[j] is not None and
-            not resetsTrace.data[j]):
-          if sequenceLabelsTrace.data[i] == sequenceLabelsTrace.data[j]:
+            sequenceLabels[i] is not None and
+            not resets[i] and
+            sequenceLabels[j] is not None and
+            not resets[j]):
+          if sequenceLabels[i] == sequenceLabels[j]:
             stabilityConfusionUnionSDR.append(overlapUnionSDR)
           else:
             distinctnessConfusionUnionSDR.append(overlapUnionSDR)
@@ -547,7 +552,7 @@ class UnionTemporalPoolerMonitorMixin(MonitorMixinBase):
 
 
   def mmGetDefaultMetrics(self, verbosity=1):
-    metrics = ([Metric.createFromTrace(trace)
+    metrics = ([createMetric(trace)
                 for trace in self.mmGetDefaultTraces()[:-2]])
 
     connectionsPerColumnMetricIntial = (
@@ -568,16 +573,20 @@ class UnionTemporalPoolerMonitorMixin(MonitorMixinBase):
   def mmClearHistory(self):
     super(UnionTemporalPoolerMonitorMixin, self).mmClearHistory()
 
-    self._mmTraces["unionSDR"] = IndicesTrace(self, "union SDR")
-    self._mmTraces["sequenceLabels"] = StringsTrace(self, "sequence labels")
-    self._mmTraces["resets"] = BoolsTrace(self, "resets")
-    self._mmTraces["connectionsPerColumnMetric"] = MetricsTrace(
+    store = self._mmTraceStore
+    store.release(self)
+
+    self._mmTraces["unionSDR"] = store.indicesTrace(self, "union SDR")
+    self._mmTraces["sequenceLabels"] = store.stringsTrace(self,
+                                                          "sequence labels")
+    self._mmTraces["resets"] = store.boolsTrace(self, "resets")
+    self._mmTraces["connectionsPerColumnMetric"] = store.metricsTrace(
       self, "connections per column (metric)")
 
     self._mmData["unionSDRDutyCycle"] = numpy.zeros(self.getNumColumns(), dtype=realDType)
     self._mmData["persistenceDutyCycle"] = numpy.zeros(self.getNumColumns(), dtype=realDType)
 
-    self._mmTraces["numConnections"] = CountsTrace(self, "connections")
+    self._mmTraces["numConnections"] = store.countsTrace(self, "connections")
 
     self._sequenceRepresentationDataStale = True
 
@@ -0,0 +1,127 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the per-stream cost of N separate ApicalTiebreakPairMemory instances
+against one ApicalTiebreakBatchMemory holding N streams.
+
+Each stream learns its own repeating sequence, then the models are timed on
+further steps with learning enabled and disabled.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from htmresearch.algorithms.apical_tiebreak_batch_memory import (
+  ApicalTiebreakBatchMemory)
+from htmresearch.algorithms.apical_tiebreak_temporal_memory import (
+  ApicalTiebreakPairMemory)
+
+
+PARAMS = {
+  "columnCount": 1024,
+  "basalInputSize": 1024*8,
+  "apicalInputSize": 1024,
+  "cellsPerColumn": 8,
+  "activationThreshold": 13,
+  "reducedBasalThreshold": 13,
+  "minThreshold": 10,
+  "sampleSize": 20,
+}
+
+
+
+def generateStreams(numStreams, sequenceLength, seed=42):
+  rng = np.random.RandomState(seed)
+
+  def sdrs(size, active):
+    return [np.sort(rng.choice(size, active, replace=False)).astype("uint32")
+            for _ in xrange(sequenceLength)]
+
+  return [(sdrs(PARAMS["columnCount"], 20),
+           sdrs(PARAMS["basalInputSize"], 40),
+           sdrs(PARAMS["apicalInputSize"], 20))
+          for _ in xrange(numStreams)]
+
+
+
+def runSeparate(streams, numSteps, learn, tms=None):
+  if tms is None:
+    tms = [ApicalTiebreakPairMemory(seed=i, **PARAMS)
+           for i in xrange(len(streams))]
+
+  start = time.time()
+  for step in xrange(numSteps):
+    for tm, (columns, basal, apical) in zip(tms, streams):
+      j = step % len(columns)
+      tm.compute(columns[j], basal[j], apical[j], learn=learn)
+  return tms, time.time() - start
+
+
+
+def runBatch(streams, numSteps, learn, batch=None):
+  if batch is None:
+    batch = ApicalTiebreakBatchMemory(numStreams=len(streams),
+                                      seed=range(len(streams)), **PARAMS)
+
+  start = time.time()
+  for step in xrange(numSteps):
+    j = step % len(streams[0][0])
+    batch.compute([columns[j] for columns, _, _ in streams],
+                  [basal[j] for _, basal, _ in streams],
+                  [apical[j] for _, _, apical in streams],
+                  learn=learn)
+  return batch, time.time() - start
+
+
+
+def main(streamCounts, numSteps, sequenceLength):
+  print "%8s %8s %18s %18s %8s" % ("streams", "learn", "separate (ms/str)",
+                                   "batch (ms/str)", "speedup")
+  for numStreams in streamCounts:
+    streams = generateStreams(numStreams, sequenceLength)
+
+    tms, separateLearn = runSeparate(streams, numSteps, True)
+    batch, batchLearn = runBatch(streams, numSteps, True)
+    _, separateInfer = runSeparate(streams, numSteps, False, tms)
+    _, batchInfer = runBatch(streams, numSteps, False, batch)
+
+    for learn, separate, batched in ((True, separateLearn, batchLearn),
+                                     (False, separateInfer, batchInfer)):
+      perStep = 1000.0 / (numSteps * numStreams)
+      print "%8d %8s %18.3f %18.3f %7.2fx" % (numStreams, learn,
+                                              separate * perStep,
+                                              batched * perStep,
+                                              separate / batched)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--streams", type=int, nargs="+",
+                      default=[1, 10, 100, 500])
+  parser.add_argument("--steps", type=int, default=50)
+  parser.add_argument("--sequenceLength", type=int, default=10)
+  args = parser.parse_args()
+
+  main(args.streams, args.steps, args.sequenceLength)
@@ -0,0 +1,203 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the time per timestep of BehaviorMemory, learning and following
+goals, with the previous implementation, which reinforced the weights one row
+at a time and looped over the sensor columns.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from htmresearch.frameworks.sensorimotor.behavior_memory import BehaviorMemory
+
+
+
+class PreviousBehaviorMemory(BehaviorMemory):
+  """
+  The learning and inference loops of the previous BehaviorMemory.
+  """
+
+  def _reinforceGoalToBehavior(self, goal, behavior):
+    goalToBehaviorFlat = self.goalToBehaviorFlat()
+    for cell in numpy.flatnonzero(behavior):
+      weights = goalToBehaviorFlat[cell]
+      idx = numpy.unravel_index(cell, behavior.shape)
+      learningRate = self.goalToBehaviorLearningRate * behavior[idx]
+      self._reinforce(weights, goal, learningRate)
+
+
+  def _reinforceBehaviorToMotor(self, behavior, motor):
+    for cell in motor.nonzero()[0]:
+      weights = self.behaviorToMotor[cell]
+      self._reinforce(weights,
+                      behavior,
+                      self.behaviorToMotorLearningRate)
+
+
+  def _reinforceMotorToBehavior(self, motor, behavior):
+    for cell in numpy.transpose(behavior.nonzero()):
+      weights = self.motorToBehavior[cell[0], cell[1]]
+      self._reinforce(weights,
+                      motor,
+                      self.motorToBehaviorLearningRate)
+
+
+  def _computeLearningBehavior(self, learningBehavior, activeBehavior,
+                               minWeight=0.001):
+    behavior = learningBehavior * (1 - self.behaviorDecayRate)
+    behavior += activeBehavior
+
+    winnerCells = behavior.argmax(axis=1)
+    sparseBehavior = numpy.zeros(behavior.shape)
+
+    for column in range(len(winnerCells)):
+      winnerCell = winnerCells[column]
+      sparseBehavior[column][winnerCell] = behavior[column][winnerCell]
+
+    numpy.clip(sparseBehavior, 0, 1, out=sparseBehavior)
+    sparseBehavior[sparseBehavior < minWeight] = 0
+    return sparseBehavior
+
+
+  def _computeBehaviorFromMotor(self, motor, sensorPattern):
+    activity = numpy.dot(motor, self.motorToBehaviorFlat().transpose())
+    activity = activity.reshape([self.numSensorColumns,
+                                self.numCellsPerSensorColumn])
+    winnerCells = numpy.argmax(activity, axis=1)
+
+    behavior = numpy.zeros([self.numSensorColumns,
+                            self.numCellsPerSensorColumn])
+
+    for column in sensorPattern.nonzero()[0]:
+      winnerCell = winnerCells[column]
+      behavior[column][winnerCell] = 1
+
+    return behavior
+
+
+  def _computeBehaviorFromGoal(self, goal, sensorPattern):
+    activity = numpy.dot(goal, self.goalToBehaviorFlat().transpose())
+    activity = activity.reshape([self.numSensorColumns,
+                                self.numCellsPerSensorColumn])
+    behavior = numpy.zeros(activity.shape)
+
+    for column in sensorPattern.nonzero()[0]:
+      behavior[column][:] = activity[column]
+
+    behavior /= behavior.max()
+    return behavior
+
+
+
+def createTrajectory(numSteps, numMotorColumns, numSensorColumns, numActive,
+                     withGoals, seed=42):
+  rng = numpy.random.RandomState(seed)
+
+  def randomColumns(numColumns):
+    return set(rng.choice(numColumns, numActive, replace=False).tolist())
+
+  motorSequence = [randomColumns(numMotorColumns) for _ in xrange(numSteps)]
+  sensorSequence = [randomColumns(numSensorColumns) for _ in xrange(numSteps)]
+  goalSequence = [randomColumns(numSensorColumns) if withGoals else set()
+                  for _ in xrange(numSteps)]
+  return motorSequence, sensorSequence, goalSequence
+
+
+
+def createMemory(memoryClass, numMotorColumns, numSensorColumns,
+                 numCellsPerSensorColumn, weightDtype="float64"):
+  numpy.random.seed(42)
+  return memoryClass(numMotorColumns=numMotorColumns,
+                     numSensorColumns=numSensorColumns,
+                     numCellsPerSensorColumn=numCellsPerSensorColumn,
+                     weightDtype=weightDtype)
+
+
+
+def timeSteps(memory, trajectory):
+  start = time.time()
+  for motor, sensor, goal in zip(*trajectory):
+    memory.compute(motor, sensor, goal)
+  return (time.time() - start) / len(trajectory[0])
+
+
+
+def timeSequence(memory, trajectory):
+  start = time.time()
+  memory.computeSequence(*trajectory)
+  return (time.time() - start) / len(trajectory[0])
+
+
+
+def main(numMotorColumns, numSensorColumns, numCellsPerSensorColumn,
+         numActive, numSteps):
+  args = (numMotorColumns, numSensorColumns, numCellsPerSensorColumn)
+  learnTrajectory = createTrajectory(numSteps, numMotorColumns,
+                                     numSensorColumns, numActive, False)
+  goalTrajectory = createTrajectory(numSteps, numMotorColumns,
+                                    numSensorColumns, numActive, True, seed=43)
+
+  previous = createMemory(PreviousBehaviorMemory, *args)
+  current = createMemory(BehaviorMemory, *args)
+  sequence = createMemory(BehaviorMemory, *args)
+  float32 = createMemory(BehaviorMemory, *args, weightDtype="float32")
+
+  results = [
+    ("previous",
+     timeSteps(previous, learnTrajectory), timeSteps(previous, goalTrajectory)),
+    ("compute",
+     timeSteps(current, learnTrajectory), timeSteps(current, goalTrajectory)),
+    ("sequence",
+     timeSequence(sequence, learnTrajectory),
+     timeSequence(sequence, goalTrajectory)),
+    ("float32",
+     timeSequence(float32, learnTrajectory),
+     timeSequence(float32, goalTrajectory)),
+  ]
+
+  maxError = max(
+    numpy.abs(previous.goalToBehavior - current.goalToBehavior).max(),
+    numpy.abs(previous.behaviorToMotor - current.behaviorToMotor).max(),
+    numpy.abs(previous.motorToBehavior - current.motorToBehavior).max())
+
+  print "%d motor columns, %d sensor columns, %d cells per column" % args
+  print "%10s %14s %14s" % ("", "learn ms/step", "goal ms/step")
+  for name, learnTime, goalTime in results:
+    print "%10s %14.2f %14.2f" % (name, learnTime * 1000, goalTime * 1000)
+  print "max weight difference from previous: %g" % maxError
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--motorColumns", type=int, default=256)
+  parser.add_argument("--sensorColumns", type=int, default=256)
+  parser.add_argument("--cellsPerColumn", type=int, default=16)
+  parser.add_argument("--numActive", type=int, default=20)
+  parser.add_argument("--steps", type=int, default=50)
+  args = parser.parse_args()
+
+  main(args.motorColumns, args.sensorColumns, args.cellsPerColumn,
+       args.numActive, args.steps)
@@ -0,0 +1,189 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the per-record latency of the capybara online clustering with a
+ClusterIndex versus the previous implementations, which called the distance
+function for every cluster and kept the inter-cluster distances of
+OnlineAgglomerativeClustering in a heap that was rebuilt on every update.
+"""
+
+import argparse
+import heapq
+import operator
+import time
+
+import numpy as np
+
+from htmresearch.frameworks.capybara.distance import euclidian_distance
+from htmresearch.frameworks.capybara.unsupervised.clustering import \
+  OnlineClustering, Point
+from htmresearch.frameworks.capybara.unsupervised.online_agglomerative_clustering \
+  import Cluster, OnlineAgglomerativeClustering
+
+
+
+class Dist(object):
+
+
+  def __init__(self, c1, c2, d):
+    self.c1 = c1
+    self.c2 = c2
+    self.d = d
+
+
+  def __cmp__(self, o):
+    return cmp(self.d, o.d)
+
+
+
+class PreviousOnlineAgglomerativeClustering(OnlineAgglomerativeClustering):
+
+
+  def __init__(self, *args, **kwargs):
+    super(PreviousOnlineAgglomerativeClustering, self).__init__(*args,
+                                                                **kwargs)
+    self._dist = []
+
+
+  def find_closest_cluster(self, point, clusters):
+    c = [(i, self._distance_func(c.center, point))
+         for i, c in enumerate(clusters)]
+    closest = clusters[min(c, key=operator.itemgetter(1))[0]]
+    return closest
+
+
+  def cluster(self, new_point, trim_clusters, label=None):
+    start = time.time()
+
+    if len(self._clusters) > 0:
+      closest = self.find_closest_cluster(new_point, self._clusters)
+      closest.add(new_point, label)
+      self._update_dist(closest)
+    else:
+      closest = None
+
+    if len(self._clusters) >= self._max_num_clusters and len(
+      self._clusters) > 1:
+      inter_cluster_dist = heapq.heappop(self._dist)
+      cluster_to_merge = inter_cluster_dist.c2
+      inter_cluster_dist.c1.merge(cluster_to_merge)
+      if cluster_to_merge in self._clusters:
+        self._clusters.remove(cluster_to_merge)
+      self._remove_dist(cluster_to_merge)
+      self._update_dist(inter_cluster_dist.c1)
+
+    cluster_id = self._total_num_clusters_created + 1
+    new_cluster = Cluster(cluster_id, new_point, self._distance_func)
+    self._total_num_clusters_created += 1
+    self._clusters.append(new_cluster)
+    self._update_dist(new_cluster)
+
+    self.latencies['cluster'].add(time.time() - start)
+    return self._clusters, closest
+
+
+  def _remove_dist(self, d):
+    inter_cluster_dist_to_remove = []
+    for inter_cluster_dist in self._dist:
+      if inter_cluster_dist.c1 == d or inter_cluster_dist.c2 == d:
+        inter_cluster_dist_to_remove.append(inter_cluster_dist)
+    for x in inter_cluster_dist_to_remove:
+      self._dist.remove(x)
+    heapq.heapify(self._dist)
+
+
+  def _update_dist(self, c):
+    self._remove_dist(c)
+    for x in self._clusters:
+      if x == c: continue
+      d = self._distance_func(x.center, c.center)
+      heapq.heappush(self._dist, Dist(x, c, d))
+
+
+
+class PreviousOnlineClustering(OnlineClustering):
+
+
+  def _find_closest_cluster(self, point):
+    distance_cluster_pairs = []
+    for cluster in self.clusters.values():
+      d = self.distance_func(cluster.center.value, point.value)
+      distance_cluster_pairs.append((d, cluster))
+    cluster_distances = [d[0] for d in distance_cluster_pairs]
+    min_dist_idx = np.argmin(cluster_distances)
+    return (np.mean(cluster_distances),
+            distance_cluster_pairs[min_dist_idx][0],
+            distance_cluster_pairs[min_dist_idx][1])
+
+
+
+def agglomerative_latency(ClusteringClass, points, num_clusters):
+  model = ClusteringClass(num_clusters, euclidian_distance)
+  for point in points:
+    model.cluster(point.copy(), False)
+  return model.latencies['cluster'].mean()
+
+
+
+def closest_cluster_latency(ClusteringClass, points, num_clusters):
+  model = ClusteringClass(euclidian_distance)
+  for i in range(num_clusters):
+    cluster = model.create_cluster(Point(points[i].copy()))
+    model._add_cluster(cluster)
+
+  start = time.time()
+  for point in points:
+    model._find_closest_cluster(Point(point))
+  return (time.time() - start) / len(points)
+
+
+
+def run(cluster_counts, num_points, dim):
+  print "{:>10} {:>16} {:>16} {:>16} {:>16}".format(
+    "clusters", "previous agglo", "indexed agglo", "previous closest",
+    "indexed closest")
+
+  for num_clusters in cluster_counts:
+    points = np.random.rand(max(num_points, num_clusters), dim)
+    print "{:>10} {:>14.1f}us {:>14.1f}us {:>14.1f}us {:>14.1f}us".format(
+      num_clusters,
+      1e6 * agglomerative_latency(PreviousOnlineAgglomerativeClustering,
+                                  points, num_clusters),
+      1e6 * agglomerative_latency(OnlineAgglomerativeClustering,
+                                  points, num_clusters),
+      1e6 * closest_cluster_latency(PreviousOnlineClustering,
+                                    points, num_clusters),
+      1e6 * closest_cluster_latency(OnlineClustering,
+                                    points, num_clusters))
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--clusters", type=int, nargs="+",
+                      default=[10, 50, 100, 200])
+  parser.add_argument("--points", type=int, default=1000)
+  parser.add_argument("--dim", type=int, default=2048)
+  args = parser.parse_args()
+
+  np.random.seed(42)
+  run(args.clusters, args.points, args.dim)
@@ -0,0 +1,104 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the time to compute the SP, TM and combined sequence distance
+matrices of capybara with sequence_distance_matrices, in float64, in float32
+and over a process pool, versus distance_matrix with the previous
+sequence_distance, which looped over every pair of sequences and every pair
+of embeddings.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from htmresearch.frameworks.capybara.distance import \
+  distance_matrix, sequence_distance_matrices
+
+
+
+def previous_sequence_distance(sequence_embeddings_1, sequence_embeddings_2,
+                               assume_sequence_alignment):
+  if assume_sequence_alignment:
+    dists = []
+    for i in range(len(sequence_embeddings_1)):
+      dists.append(np.linalg.norm(sequence_embeddings_1[i]
+                                  - sequence_embeddings_2[i]))
+  else:
+    dists = []
+    for e1 in sequence_embeddings_1:
+      dists.append(np.min([np.linalg.norm(e2 - e1)
+                           for e2 in sequence_embeddings_2]))
+  return np.mean(dists)
+
+
+
+def random_embeddings(nb_sequences, nb_chunks, width, sparsity):
+  return (np.random.rand(nb_sequences, nb_chunks, width)
+          < sparsity).astype(np.float64)
+
+
+
+def timed(f):
+  start = time.time()
+  f()
+  return time.time() - start
+
+
+
+def run(sequence_counts, nb_chunks, assume_sequence_alignment, processes):
+  print "{:>10} {:>12} {:>12} {:>12} {:>12}".format(
+    "sequences", "previous", "float64", "float32",
+    "%d procs" % processes)
+
+  for nb_sequences in sequence_counts:
+    sp = random_embeddings(nb_sequences, nb_chunks, 2048, 0.02)
+    tm = random_embeddings(nb_sequences, nb_chunks, 2048 * 32, 0.005)
+
+    distance = lambda a, b: previous_sequence_distance(
+      a, b, assume_sequence_alignment)
+    previous = timed(lambda: distance_matrix(sp, tm, distance))
+    new64 = timed(lambda: sequence_distance_matrices(
+      sp, tm, assume_sequence_alignment))
+    new32 = timed(lambda: sequence_distance_matrices(
+      sp, tm, assume_sequence_alignment, dtype=np.float32))
+    pooled = timed(lambda: sequence_distance_matrices(
+      sp, tm, assume_sequence_alignment, dtype=np.float32,
+      processes=processes))
+
+    print "{:>10} {:>11.2f}s {:>11.2f}s {:>11.2f}s {:>11.2f}s".format(
+      nb_sequences, previous, new64, new32, pooled)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--sequences", type=int, nargs="+", default=[25, 50, 100])
+  parser.add_argument("--chunks", type=int, default=4)
+  parser.add_argument("--aligned", action="store_true",
+                      help="Assume the sequences are aligned")
+  parser.add_argument("--processes", type=int, default=4)
+  args = parser.parse_args()
+
+  np.random.seed(42)
+  run(args.sequences, args.chunks, args.aligned, args.processes)
@@ -0,0 +1,184 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare ColumnPooler inference steps per second with the previous
+_computeInferenceMode, which chose cells with one union1d per lateral support
+level.
+
+Each of N cortical columns learns a set of objects, then every column infers
+the objects while receiving the other columns' active cells as lateral input.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from htmresearch.algorithms.column_pooler import ColumnPooler
+
+
+PARAMS = {
+  "inputWidth": 1024 * 16,
+  "cellCount": 4096,
+  "sdrSize": 40,
+}
+
+
+
+class PreviousColumnPooler(ColumnPooler):
+  """
+  A ColumnPooler with the previous inference implementation.
+  """
+
+  def _computeInferenceMode(self, feedforwardInput, lateralInputs):
+    prevActiveCells = self.activeCells
+
+    overlaps = self.proximalPermanences.rightVecSumAtNZGteThresholdSparse(
+      feedforwardInput, self.connectedPermanenceProximal)
+    feedforwardSupportedCells = numpy.where(
+      overlaps >= self.minThresholdProximal)[0]
+
+    numActiveSegmentsByCell = numpy.zeros(self.cellCount, dtype="int")
+    overlaps = self.internalDistalPermanences.rightVecSumAtNZGteThresholdSparse(
+      prevActiveCells, self.connectedPermanenceDistal)
+    numActiveSegmentsByCell[overlaps >= self.activationThresholdDistal] += 1
+    for i, lateralInput in enumerate(lateralInputs):
+      overlaps = self.distalPermanences[i].rightVecSumAtNZGteThresholdSparse(
+        lateralInput, self.connectedPermanenceDistal)
+      numActiveSegmentsByCell[overlaps >= self.activationThresholdDistal] += 1
+
+    chosenCells = []
+
+    if len(feedforwardSupportedCells) > 0:
+      numActiveSegsForFFSuppCells = numActiveSegmentsByCell[
+        feedforwardSupportedCells]
+      ttop = numpy.max(numActiveSegsForFFSuppCells)
+      while ttop > 0 and len(chosenCells) < self.sdrSize:
+        chosenCells = numpy.union1d(chosenCells,
+                    feedforwardSupportedCells[numActiveSegsForFFSuppCells > ttop])
+        ttop -= 1
+
+    if len(chosenCells) < self.sdrSize:
+      if self.useInertia:
+        prevCells = numpy.setdiff1d(prevActiveCells, chosenCells)
+        inertialCap = int(len(prevCells) * self.inertiaFactor)
+        if inertialCap > 0:
+          numActiveSegsForPrevCells = numActiveSegmentsByCell[prevCells]
+          sortIndices = numpy.argsort(numActiveSegsForPrevCells)[::-1]
+          prevCells = prevCells[sortIndices]
+          numActiveSegsForPrevCells = numActiveSegsForPrevCells[sortIndices]
+          prevCells = prevCells[:inertialCap]
+          numActiveSegsForPrevCells = numActiveSegsForPrevCells[:inertialCap]
+          ttop = numpy.max(numActiveSegsForPrevCells)
+          while ttop >= 0 and len(chosenCells) < self.sdrSize:
+            chosenCells = numpy.union1d(chosenCells,
+                        prevCells[numActiveSegsForPrevCells > ttop])
+            ttop -= 1
+
+    discrepancy = self.sdrSize - len(chosenCells)
+    if discrepancy > 0:
+      remFFcells = numpy.setdiff1d(feedforwardSupportedCells, chosenCells)
+      if len(remFFcells) > discrepancy:
+        n = min(max(discrepancy,
+                    len(remFFcells) * discrepancy / self.sdrSize),
+                len(remFFcells))
+        selected = numpy.empty(n, dtype="uint32")
+        self._random.sample(numpy.asarray(remFFcells, dtype="uint32"),
+                            selected)
+        chosenCells = numpy.append(chosenCells, selected)
+      else:
+        chosenCells = numpy.append(chosenCells, remFFcells)
+
+    chosenCells.sort()
+    self.activeCells = numpy.asarray(chosenCells, dtype="uint32")
+
+
+
+def generateObjects(numColumns, numObjects, numFeatures, seed=42):
+  """
+  @return (list)
+  For each object, for each sensation, the feedforward input of each column.
+  """
+  rng = numpy.random.RandomState(seed)
+  return [[[numpy.sort(rng.choice(PARAMS["inputWidth"], 40,
+                                  replace=False)).astype("uint32")
+            for _ in xrange(numColumns)]
+           for _ in xrange(numFeatures)]
+          for _ in xrange(numObjects)]
+
+
+
+def step(poolers, feedforwardInputs, learn):
+  prevActiveCells = [pooler.getActiveCells() for pooler in poolers]
+  for i, pooler in enumerate(poolers):
+    lateralInputs = [cells for j, cells in enumerate(prevActiveCells)
+                     if j != i]
+    pooler.compute(feedforwardInputs[i], lateralInputs, learn=learn)
+
+
+
+def run(cls, objects, numColumns, numRepeats):
+  poolers = [cls(lateralInputWidths=[PARAMS["cellCount"]] * (numColumns - 1),
+                 seed=i, **PARAMS)
+             for i in xrange(numColumns)]
+
+  for sensations in objects:
+    for _ in xrange(3):
+      for feedforwardInputs in sensations:
+        step(poolers, feedforwardInputs, True)
+    for pooler in poolers:
+      pooler.reset()
+
+  start = time.time()
+  numSteps = 0
+  for _ in xrange(numRepeats):
+    for sensations in objects:
+      for feedforwardInputs in sensations:
+        step(poolers, feedforwardInputs, False)
+        numSteps += 1
+      for pooler in poolers:
+        pooler.reset()
+  return numSteps / (time.time() - start)
+
+
+
+def main(columnCounts, numObjects, numFeatures, numRepeats):
+  print "%8s %18s %18s %8s" % ("columns", "previous (steps/s)",
+                               "current (steps/s)", "speedup")
+  for numColumns in columnCounts:
+    objects = generateObjects(numColumns, numObjects, numFeatures)
+    previous = run(PreviousColumnPooler, objects, numColumns, numRepeats)
+    current = run(ColumnPooler, objects, numColumns, numRepeats)
+    print "%8d %18.1f %18.1f %7.2fx" % (numColumns, previous, current,
+                                        current / previous)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--columns", type=int, nargs="+", default=[1, 5, 10])
+  parser.add_argument("--objects", type=int, default=10)
+  parser.add_argument("--features", type=int, default=10)
+  parser.add_argument("--repeats", type=int, default=5)
+  args = parser.parse_args()
+
+  main(args.columns, args.objects, args.features, args.repeats)
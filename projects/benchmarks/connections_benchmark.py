@@ -0,0 +1,100 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare ApicalTiebreakSequenceMemory throughput with the "cpp" and "numpy"
+connections implementations across column counts.
+
+The models learn a set of repeating sequences, then are timed on further
+steps with learning enabled and disabled.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from htmresearch.algorithms.apical_tiebreak_temporal_memory import (
+  ApicalTiebreakSequenceMemory)
+
+
+
+def generateSequences(columnCount, numSequences, sequenceLength, seed=42):
+  rng = np.random.RandomState(seed)
+  numActive = max(columnCount / 50, 1)
+  return [[np.sort(rng.choice(columnCount, numActive,
+                              replace=False)).astype("uint32")
+           for _ in xrange(sequenceLength)]
+          for _ in xrange(numSequences)]
+
+
+
+def run(tm, sequences, numRepeats, learn):
+  start = time.time()
+  numSteps = 0
+  for _ in xrange(numRepeats):
+    for sequence in sequences:
+      for activeColumns in sequence:
+        tm.compute(activeColumns, learn=learn)
+        numSteps += 1
+      tm.reset()
+  return numSteps / (time.time() - start)
+
+
+
+def main(columnCounts, numSequences, sequenceLength, numRepeats):
+  print "%8s %8s %14s %14s %8s" % ("columns", "learn", "cpp (steps/s)",
+                                   "numpy (steps/s)", "ratio")
+  for columnCount in columnCounts:
+    sequences = generateSequences(columnCount, numSequences, sequenceLength)
+    numActive = len(sequences[0][0])
+
+    results = {}
+    for implementation in ("cpp", "numpy"):
+      tm = ApicalTiebreakSequenceMemory(
+        columnCount=columnCount,
+        cellsPerColumn=16,
+        activationThreshold=max(numActive * 13 / 20, 1),
+        reducedBasalThreshold=max(numActive * 13 / 20, 1),
+        minThreshold=max(numActive / 2, 1),
+        sampleSize=numActive,
+        connectionsImplementation=implementation)
+      results[implementation] = (run(tm, sequences, numRepeats, True),
+                                 run(tm, sequences, numRepeats, False))
+
+    for i, learn in enumerate((True, False)):
+      cpp = results["cpp"][i]
+      numpy = results["numpy"][i]
+      print "%8d %8s %14.1f %14.1f %7.2fx" % (columnCount, learn, cpp, numpy,
+                                              numpy / cpp)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--columns", type=int, nargs="+",
+                      default=[1024, 2048, 4096, 8192, 16384])
+  parser.add_argument("--sequences", type=int, default=5)
+  parser.add_argument("--sequenceLength", type=int, default=10)
+  parser.add_argument("--repeats", type=int, default=3)
+  args = parser.parse_args()
+
+  main(args.columns, args.sequences, args.sequenceLength, args.repeats)
@@ -0,0 +1,120 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the time to aggregate the histories of every tag over all repetitions
+of an ExpSuite experiment with the previous get_history, which parsed the
+whole log again for every tag and repetition.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy
+
+from htmresearch.support.expsuite import PyExperimentSuite
+
+
+
+class PreviousExperimentSuite(PyExperimentSuite):
+
+  def get_history(self, exp, rep, tags):
+    if not hasattr(tags, "__iter__"):
+      tags = [tags]
+
+    results = dict((tag, []) for tag in tags)
+    with open(os.path.join(exp, "%i.log" % rep)) as f:
+      for line in f:
+        dic = json.loads(line)
+        for tag in tags:
+          results[tag].append(dic.get(tag))
+
+    if len(tags) == 1:
+      return results[tags[0]]
+    return results
+
+
+
+def createExperiment(path, numRepetitions, numIterations, numTags):
+  params = {"name": "exp", "path": path, "iterations": numIterations,
+            "repetitions": numRepetitions}
+  exp = os.path.join(path, "exp")
+  os.makedirs(exp)
+  PyExperimentSuite().write_config_file(params, exp)
+
+  rng = numpy.random.RandomState(42)
+  for rep in xrange(numRepetitions):
+    with open(os.path.join(exp, "%i.log" % rep), "w") as f:
+      for iteration in xrange(numIterations):
+        dic = dict(("tag%d" % i, rng.rand()) for i in xrange(numTags))
+        dic["iteration"] = iteration
+        f.write(json.dumps(dic) + "\n")
+  return exp
+
+
+
+def timeAggregation(suite, exp, tags):
+  start = time.time()
+  suite.get_histories_over_repetitions(exp, tags, numpy.mean)
+  return time.time() - start
+
+
+
+def main(numRepetitions, numIterations, numTags):
+  path = tempfile.mkdtemp()
+  try:
+    exp = createExperiment(path, numRepetitions, numIterations, numTags)
+    tags = ["tag%d" % i for i in xrange(numTags)]
+
+    previous = timeAggregation(PreviousExperimentSuite(), exp, tags)
+    current = timeAggregation(PyExperimentSuite(), exp, tags)
+
+    suite = PyExperimentSuite()
+    suite.history_files = True
+    timeAggregation(suite, exp, tags)
+    suite = PyExperimentSuite()
+    suite.history_files = True
+    reloaded = timeAggregation(suite, exp, tags)
+  finally:
+    shutil.rmtree(path)
+
+  print "%d repetitions, %d iterations, %d tags" % (
+    numRepetitions, numIterations, numTags)
+  print "%24s %10s %8s" % ("", "seconds", "speedup")
+  for name, seconds in (("previous", previous),
+                        ("parsed once", current),
+                        ("from history files", reloaded)):
+    print "%24s %10.3f %7.1fx" % (name, seconds, previous / seconds)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--repetitions", type=int, default=20)
+  parser.add_argument("--iterations", type=int, default=1000)
+  parser.add_argument("--tags", type=int, default=10)
+  args = parser.parse_args()
+
+  main(args.repetitions, args.iterations, args.tags)
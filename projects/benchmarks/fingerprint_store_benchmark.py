@@ -0,0 +1,138 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the time to look up Cortical.io fingerprints in a FingerprintStore
+with the cortipy cache, which keeps one JSON file per API response.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy
+
+from htmresearch.support.fingerprint_store import FingerprintStore
+
+
+
+class JSONFileCache(object):
+  """
+  One JSON file per fingerprint, like the cortipy client's cache.
+  """
+
+  def __init__(self, directory):
+    self.directory = directory
+
+
+  def _path(self, retina, kind, key):
+    return os.path.join(self.directory, hashlib.sha1(
+      "%s-%s-%s" % (retina, kind, key)).hexdigest() + ".json")
+
+
+  def get(self, retina, kind, key):
+    path = self._path(retina, kind, key)
+    if not os.path.exists(path):
+      return None
+    with open(path) as f:
+      return json.load(f)
+
+
+  def put(self, retina, kind, key, fingerprint):
+    with open(self._path(retina, kind, key), "w") as f:
+      json.dump(fingerprint, f)
+
+
+
+def timeLookups(lookup, keys):
+  start = time.time()
+  lookup(keys)
+  return (time.time() - start) / len(keys)
+
+
+
+def main(numTerms, numPositions, numLookups):
+  rng = numpy.random.RandomState(42)
+  fingerprints = dict(
+    ("term%d" % i,
+     {"term": "term%d" % i, "df": rng.rand(), "score": 0.0,
+      "fingerprint": {"positions": sorted(
+        rng.choice(16384, numPositions, replace=False).tolist())}})
+    for i in xrange(numTerms))
+  keys = ["term%d" % i for i in rng.randint(numTerms, size=numLookups)]
+
+  directory = tempfile.mkdtemp()
+  try:
+    jsonCache = JSONFileCache(os.path.join(directory, "json"))
+    os.makedirs(jsonCache.directory)
+    start = time.time()
+    for key, fingerprint in fingerprints.iteritems():
+      jsonCache.put("en_synonymous", "term", key, fingerprint)
+    jsonWrite = (time.time() - start) / numTerms
+
+    path = os.path.join(directory, "fingerprints.sqlite")
+    start = time.time()
+    FingerprintStore(path).putMany("en_synonymous", "term", fingerprints)
+    storeWrite = (time.time() - start) / numTerms
+
+    def getEach(cache):
+      return lambda keys: [cache.get("en_synonymous", "term", key)
+                           for key in keys]
+
+    coldStore = FingerprintStore(path)
+    coldManyStore = FingerprintStore(path)
+    warmStore = FingerprintStore(path)
+    warmStore.getMany("en_synonymous", "term", keys)
+
+    results = [
+      ("write", jsonWrite, storeWrite),
+      ("get, cold", timeLookups(getEach(jsonCache), keys),
+       timeLookups(getEach(coldStore), keys)),
+      ("getMany, cold", timeLookups(getEach(jsonCache), keys),
+       timeLookups(lambda keys: coldManyStore.getMany("en_synonymous", "term",
+                                                      keys), keys)),
+      ("get, in memory", timeLookups(getEach(jsonCache), keys),
+       timeLookups(getEach(warmStore), keys)),
+    ]
+  finally:
+    shutil.rmtree(directory)
+
+  print "%d fingerprints of %d positions, %d lookups" % (
+    numTerms, numPositions, numLookups)
+  print "%16s %14s %14s %8s" % ("", "JSON files us", "store us", "speedup")
+  for name, previous, current in results:
+    print "%16s %14.1f %14.1f %7.1fx" % (name, previous * 1e6, current * 1e6,
+                                         previous / current)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--terms", type=int, default=20000)
+  parser.add_argument("--positions", type=int, default=328)
+  parser.add_argument("--lookups", type=int, default=20000)
+  args = parser.parse_args()
+
+  main(args.terms, args.positions, args.lookups)
@@ -0,0 +1,97 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the time to compute the condensed pairwise overlaps of random SDRs
+with HierarchicalClustering._computeOverlaps and with the previous
+implementation, which multiplied one row at a time against the rest.
+"""
+
+import argparse
+import time
+
+import numpy
+import scipy.sparse
+
+from htmresearch.algorithms.hierarchical_clustering import (
+  HierarchicalClustering
+)
+
+
+
+def previousComputeOverlaps(data, dtype="int16"):
+  nVectors = data.shape[0]
+  overlaps = numpy.ndarray(nVectors*(nVectors-1)/2, dtype=dtype)
+  pos = 0
+
+  for i in xrange(nVectors):
+    newOverlaps = data[i].multiply(data[i+1:]).getnnz(1)
+    run = newOverlaps.shape[0]
+    overlaps[pos:pos+run] = newOverlaps
+    pos += run
+  return overlaps
+
+
+
+def randomSDRs(numVectors, numBits, numActive, seed=42):
+  rng = numpy.random.RandomState(seed)
+  indices = numpy.concatenate([rng.choice(numBits, numActive, replace=False)
+                               for _ in xrange(numVectors)])
+  indptr = numpy.arange(0, numVectors*numActive + 1, numActive)
+  return scipy.sparse.csr_matrix(
+    (numpy.ones(len(indices), dtype=bool), indices, indptr),
+    shape=(numVectors, numBits))
+
+
+
+def main(numVectors, numBits, numActive, blockSize, numWorkers):
+  data = randomSDRs(numVectors, numBits, numActive)
+
+  start = time.time()
+  expected = previousComputeOverlaps(data)
+  previous = time.time() - start
+
+  print "%d vectors, %d pairs" % (numVectors, len(expected))
+  print "%28s %10s %8s" % ("", "time (s)", "speedup")
+  print "%28s %10.2f" % ("previous", previous)
+
+  for workers in sorted(set([1, numWorkers])):
+    start = time.time()
+    overlaps = HierarchicalClustering._computeOverlaps(
+      data, blockSize=blockSize, numWorkers=workers)
+    elapsed = time.time() - start
+    assert (overlaps == expected).all()
+
+    print "%28s %10.2f %7.1fx" % (
+      "blocked, %d worker(s)" % workers, elapsed, previous / elapsed)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--vectors", type=int, default=3000)
+  parser.add_argument("--bits", type=int, default=16384)
+  parser.add_argument("--active", type=int, default=328)
+  parser.add_argument("--blockSize", type=int, default=256)
+  parser.add_argument("--workers", type=int, default=4)
+  args = parser.parse_args()
+
+  main(args.vectors, args.bits, args.active, args.blockSize, args.workers)
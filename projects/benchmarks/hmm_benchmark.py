@@ -0,0 +1,185 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the observations per second of one Baum-Welch iteration of the HMM
+with the previous implementation, which looped over states in Python and
+stored the states x states x T eps tensor.
+
+The previous implementation is timed on a shorter sequence, since it takes
+minutes per iteration on the long one. Its alpha and beta also underflow on
+long sequences, so the two are compared on a short one.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from htmresearch.algorithms.hidden_markov_model import HMM, divide
+
+
+
+class PreviousHMM(HMM):
+  """
+  The forward-backward pass and update of the previous HMM.
+  """
+
+  def _initializeTrial(self, sequences):
+    self.observations = sequences[0]
+    self.T = len(self.observations)
+    self.seenValues = set(self.observations)
+    self.alpha = numpy.zeros((self.numStates,self.T), dtype="float")
+    self.beta = numpy.zeros((self.numStates,self.T), dtype="float")
+    self.gamma = numpy.zeros((self.numStates,self.T), dtype="float")
+    self.eps = numpy.zeros((self.numStates,self.numStates,self.T),
+                           dtype="float")
+
+
+  def _forward(self):
+    y1 = self.observations[0]
+    for i in xrange(self.numStates):
+      self.alpha[i,0] = self.pi[i] * self.B[i,y1]
+
+    for t in xrange(1, self.T):
+      yt = self.observations[t]
+      for j in xrange(self.numStates):
+        sumAlphaT1 = 0.0
+        for i in xrange(self.numStates):
+          sumAlphaT1 += self.alpha[i,t-1]*self.A[i,j]
+        self.alpha[j,t] = self.B[j, yt]*sumAlphaT1
+
+
+  def _backward(self):
+    for i in xrange(self.numStates):
+      self.beta[i,self.T-1] = 1.0
+
+    for t in xrange(self.T-1, 0, -1):
+      yt = self.observations[t]
+      for i in xrange(self.numStates):
+        newBetaiT1 = 0.0
+        for j in xrange(self.numStates):
+          newBetaiT1 += self.beta[j,t]*self.A[i,j]*self.B[j,yt]
+        self.beta[i,t-1] = newBetaiT1
+
+
+  def _update(self):
+    for t in xrange(self.T):
+      denom = 0.0
+      for i in xrange(self.numStates):
+        denom += self.alpha[i,t]*self.beta[i,t]
+      for i in xrange(self.numStates):
+        self.gamma[i,t] = divide(self.alpha[i,t]*self.beta[i,t], denom)
+
+    for t in xrange(self.T-1):
+      for i in xrange(self.numStates):
+        denom = sum([self.alpha[j,t]*self.beta[j,t]
+                     for j in xrange(self.numStates)])
+        yt1 = self.observations[t+1]
+        for j in xrange(self.numStates):
+          self.eps[i,j,t] = divide(self.alpha[i,t]*self.A[i,j]*
+                                   self.beta[j,t+1]*self.B[j,yt1], denom)
+
+    denoms = numpy.zeros(self.numStates, dtype="float")
+    for i in xrange(self.numStates):
+      self.pi[i] = self.gamma[i, 0]
+      for t in xrange(self.T-1):
+        denoms[i] += self.gamma[i,t]
+
+    for i in xrange(self.numStates):
+      for j in xrange(self.numStates):
+        numer = 0.0
+        for t in xrange(self.T-1):
+          numer += self.eps[i,j,t]
+        self.A[i,j] = divide(numer, denoms[i])
+
+    for i in xrange(self.numStates):
+      for v in self.seenValues:
+        numer = 0.0
+        denom = 0.0
+        for t in xrange(self.T):
+          denom += self.gamma[i,t]
+          if self.observations[t] == v:
+            numer += self.gamma[i,t]
+        self.B[i,v] = divide(numer, denom)
+
+
+
+def createHMM(hmmClass, numCats, numStates, seed=42):
+  rng = numpy.random.RandomState(seed)
+  hmm = hmmClass(numCats=numCats, numStates=numStates)
+  hmm.pi = rng.rand(numStates)
+  hmm.pi /= hmm.pi.sum()
+  hmm.A = rng.rand(numStates, numStates)
+  hmm.A /= hmm.A.sum(axis=1)[:, numpy.newaxis]
+  hmm.B = rng.rand(numStates, numCats)
+  hmm.B /= hmm.B.sum(axis=1)[:, numpy.newaxis]
+  return hmm
+
+
+
+def timeIteration(hmm, observations):
+  start = time.time()
+  hmm._initializeTrial([observations])
+  hmm._forward()
+  hmm._backward()
+  hmm._update()
+  return len(observations) / (time.time() - start)
+
+
+
+def main(numStates, numCats, length, previousLength, checkLength):
+  rng = numpy.random.RandomState(42)
+  observations = rng.randint(numCats, size=length)
+
+  previous = timeIteration(createHMM(PreviousHMM, numCats, numStates),
+                           observations[:previousLength])
+  current = timeIteration(createHMM(HMM, numCats, numStates), observations)
+
+  previousHMM = createHMM(PreviousHMM, numCats, numStates)
+  currentHMM = createHMM(HMM, numCats, numStates)
+  for hmm in (previousHMM, currentHMM):
+    timeIteration(hmm, observations[:checkLength])
+  maxError = max(numpy.abs(previousHMM.A - currentHMM.A).max(),
+                 numpy.abs(previousHMM.B - currentHMM.B).max(),
+                 numpy.abs(previousHMM.pi - currentHMM.pi).max())
+
+  print "%d states, %d categories" % (numStates, numCats)
+  print "%10s %12s %14s" % ("", "observations", "observations/s")
+  print "%10s %12d %14.1f" % ("previous", previousLength, previous)
+  print "%10s %12d %14.1f" % ("current", length, current)
+  print "speedup: %.1fx" % (current / previous)
+  print "max parameter difference after %d observations: %g" % (checkLength,
+                                                               maxError)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--states", type=int, default=50)
+  parser.add_argument("--categories", type=int, default=20)
+  parser.add_argument("--length", type=int, default=100000)
+  parser.add_argument("--previousLength", type=int, default=200)
+  parser.add_argument("--checkLength", type=int, default=30)
+  args = parser.parse_args()
+
+  main(args.states, args.categories, args.length, args.previousLength,
+       args.checkLength)
@@ -0,0 +1,126 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the wall time of a shift + anchor step of N SuperficialLocationModule2D
+modules called one by one with one LocationModuleBank holding N modules.
+"""
+
+import argparse
+import math
+import time
+
+import numpy
+
+from htmresearch.algorithms.location_module_bank import LocationModuleBank
+from htmresearch.algorithms.superficial_location_module import (
+  SuperficialLocationModule2D)
+
+
+ANCHOR_INPUT_SIZE = 150 * 32
+
+
+
+def moduleConfigs(numModules, connectionsImplementation):
+  rng = numpy.random.RandomState(42)
+  return [{"cellDimensions": (10, 10),
+           "moduleMapDimensions": (20.0 * (1.1 ** i), 20.0 * (1.1 ** i)),
+           "orientation": rng.rand() * math.pi / 3,
+           "initialPermanence": 1.0,
+           "connectionsImplementation": connectionsImplementation,
+           "seed": 42 + i}
+          for i in xrange(numModules)]
+
+
+
+class SeparateModules(object):
+
+  def __init__(self, configs):
+    self.modules = [SuperficialLocationModule2D(
+                      anchorInputSize=ANCHOR_INPUT_SIZE, **config)
+                    for config in configs]
+
+
+  def activateRandomLocation(self):
+    for module in self.modules:
+      module.activateRandomLocation()
+
+
+  def shift(self, deltaLocation):
+    for module in self.modules:
+      module.shift(deltaLocation)
+
+
+  def anchor(self, anchorInput):
+    for module in self.modules:
+      module.anchor(anchorInput)
+
+
+  def learn(self, anchorInput):
+    for module in self.modules:
+      module.learn(anchorInput)
+
+
+
+def run(model, numSteps):
+  rng = numpy.random.RandomState(42)
+  inputs = [numpy.sort(rng.choice(ANCHOR_INPUT_SIZE, 40,
+                                  replace=False)).astype("uint32")
+            for _ in xrange(10)]
+  moves = rng.rand(10, 2) * 10 - 5
+
+  # Learn a loop of 10 locations, then walk it again and anchor.
+  numpy.random.seed(42)
+  model.activateRandomLocation()
+  for deltaLocation, anchorInput in zip(moves, inputs):
+    model.shift(deltaLocation)
+    model.learn(anchorInput)
+
+  start = time.time()
+  for step in xrange(numSteps):
+    model.shift(moves[step % 10])
+    model.anchor(inputs[step % 10])
+  return (time.time() - start) / numSteps
+
+
+
+def main(moduleCounts, numSteps, connectionsImplementation):
+  print "%8s %16s %16s %8s" % ("modules", "separate (ms)", "bank (ms)",
+                               "speedup")
+  for numModules in moduleCounts:
+    configs = moduleConfigs(numModules, connectionsImplementation)
+    separate = run(SeparateModules(configs), numSteps)
+    bank = run(LocationModuleBank(configs, ANCHOR_INPUT_SIZE), numSteps)
+    print "%8d %16.2f %16.2f %7.2fx" % (numModules, separate * 1000,
+                                        bank * 1000, separate / bank)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--modules", type=int, nargs="+",
+                      default=[1, 10, 50, 100, 200])
+  parser.add_argument("--steps", type=int, default=200)
+  parser.add_argument("--connections", default="cpp",
+                      choices=["cpp", "numpy"])
+  args = parser.parse_args()
+
+  main(args.modules, args.steps, args.connections)
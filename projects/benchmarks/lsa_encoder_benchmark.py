@@ -0,0 +1,98 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the time to encode a corpus with LSAEncoder.encodeCorpus with
+encoding one text at a time. The models are trained on a random corpus.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import gensim
+import numpy
+
+from htmresearch.encoders.lsa_encoder import LSAEncoder
+
+
+
+def createEncoder(directory, docs, numTopics):
+  dictionary = gensim.corpora.Dictionary(docs)
+  bows = [dictionary.doc2bow(doc) for doc in docs]
+  tfidf = gensim.models.TfidfModel(bows)
+  lsa = gensim.models.lsimodel.LsiModel(tfidf[bows], id2word=dictionary,
+                                        num_topics=numTopics)
+
+  dictionaryPath = os.path.join(directory, "wordids.txt")
+  tfidfPath = os.path.join(directory, "tfidf.model")
+  lsaPath = os.path.join(directory, "lsa.model")
+  dictionary.save_as_text(dictionaryPath)
+  tfidf.save(tfidfPath)
+  lsa.save(lsaPath)
+
+  return LSAEncoder(tfidfPath, lsaPath, dictionaryPath)
+
+
+
+def main(numTexts, vocabularySize, numTopics, chunkSize):
+  rng = numpy.random.RandomState(42)
+  vocabulary = ["word%d" % i for i in xrange(vocabularySize)]
+  docs = [list(rng.choice(vocabulary, rng.randint(10, 100)))
+          for _ in xrange(numTexts)]
+  texts = [" ".join(doc) for doc in docs]
+
+  directory = tempfile.mkdtemp()
+  try:
+    encoder = createEncoder(directory, docs, numTopics)
+  finally:
+    shutil.rmtree(directory)
+
+  start = time.time()
+  encodings = numpy.array([encoder.encode(text) for text in texts])
+  previous = time.time() - start
+
+  start = time.time()
+  corpusEncodings = encoder.encodeCorpus(texts, chunkSize=chunkSize)
+  current = time.time() - start
+
+  numDifferent = (corpusEncodings.toarray() != encodings).any(axis=1).sum()
+
+  print "%d texts, %d terms, %d topics, w=%d" % (
+    numTexts, vocabularySize, numTopics, encoder.w)
+  print "%14s %14s %8s %10s" % ("encode s", "encodeCorpus s", "speedup",
+                                "different")
+  print "%14.2f %14.2f %7.1fx %10d" % (previous, current, previous / current,
+                                       numDifferent)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--texts", type=int, default=20000)
+  parser.add_argument("--vocabulary", type=int, default=10000)
+  parser.add_argument("--topics", type=int, default=400)
+  parser.add_argument("--chunkSize", type=int, default=1000)
+  args = parser.parse_args()
+
+  main(args.texts, args.vocabulary, args.topics, args.chunkSize)
@@ -0,0 +1,122 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the wall time of a step of N laterally connected ColumnPoolers with one
+MultiColumnPooler holding N columns.
+
+Every column learns a set of objects, then the columns infer the objects. Each
+ColumnPooler computes its lateral support with one sparse matrix call per other
+column, while the MultiColumnPooler uses one call for all columns.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from htmresearch.algorithms.column_pooler import ColumnPooler
+from htmresearch.algorithms.multi_column_pooler import MultiColumnPooler
+
+
+PARAMS = {
+  "inputWidth": 1024 * 16,
+  "cellCount": 4096,
+  "sdrSize": 40,
+}
+
+
+
+def generateObjects(numColumns, numObjects, numFeatures, seed=42):
+  rng = numpy.random.RandomState(seed)
+  return [[[numpy.sort(rng.choice(PARAMS["inputWidth"], 40,
+                                  replace=False)).astype("uint32")
+            for _ in xrange(numColumns)]
+           for _ in xrange(numFeatures)]
+          for _ in xrange(numObjects)]
+
+
+
+class SeparatePoolers(object):
+
+  def __init__(self, numColumns):
+    self.poolers = [
+      ColumnPooler(lateralInputWidths=[PARAMS["cellCount"]] * (numColumns - 1),
+                   seed=42 + i, **PARAMS)
+      for i in xrange(numColumns)]
+
+
+  def compute(self, feedforwardInputs, learn):
+    prevActiveCells = [pooler.getActiveCells() for pooler in self.poolers]
+    for i, pooler in enumerate(self.poolers):
+      lateralInputs = [cells for j, cells in enumerate(prevActiveCells)
+                       if j != i]
+      pooler.compute(feedforwardInputs[i], lateralInputs, learn=learn)
+
+
+  def reset(self):
+    for pooler in self.poolers:
+      pooler.reset()
+
+
+
+def run(model, objects, numRepeats):
+  for sensations in objects:
+    for _ in xrange(3):
+      for feedforwardInputs in sensations:
+        model.compute(feedforwardInputs, learn=True)
+    model.reset()
+
+  start = time.time()
+  numSteps = 0
+  for _ in xrange(numRepeats):
+    for sensations in objects:
+      for feedforwardInputs in sensations:
+        model.compute(feedforwardInputs, learn=False)
+        numSteps += 1
+      model.reset()
+  return (time.time() - start) / numSteps
+
+
+
+def main(columnCounts, numObjects, numFeatures, numRepeats):
+  print "%8s %16s %16s %8s" % ("columns", "separate (ms)", "multi (ms)",
+                               "speedup")
+  for numColumns in columnCounts:
+    objects = generateObjects(numColumns, numObjects, numFeatures)
+    separate = run(SeparatePoolers(numColumns), objects, numRepeats)
+    multi = run(MultiColumnPooler(numColumns=numColumns, **PARAMS), objects,
+                numRepeats)
+    print "%8d %16.2f %16.2f %7.2fx" % (numColumns, separate * 1000,
+                                        multi * 1000, separate / multi)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--columns", type=int, nargs="+",
+                      default=[1, 2, 4, 8, 16, 32])
+  parser.add_argument("--objects", type=int, default=10)
+  parser.add_argument("--features", type=int, default=10)
+  parser.add_argument("--repeats", type=int, default=3)
+  args = parser.parse_args()
+
+  main(args.columns, args.objects, args.features, args.repeats)
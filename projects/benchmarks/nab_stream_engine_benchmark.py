@@ -0,0 +1,185 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the records per second of the NAB 'numentaTMLowLevel' model run with
+the previous handleRecord, which concatenated the encodings and derived the
+predicted columns one cell at a time, versus a MultiStreamEngine in this
+process and sharded across worker processes.
+
+The streams are the CSV files of a NAB data directory (see
+projects/nab_experiments/README.md), fed one timestep of every stream at a
+time.
+"""
+
+import argparse
+import csv
+import datetime
+import math
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from htmresearch.algorithms.anomaly_detection.multi_stream_engine import (
+  MultiStreamEngine, NumentaTMModel)
+
+
+
+def readCorpus(dataDir, maxStreams, maxRecords):
+  """
+  @return (dict) For each data file, relative to dataDir, its timestamps and
+  values.
+  """
+  paths = []
+  for root, _, fileNames in os.walk(dataDir):
+    paths.extend(os.path.join(root, fileName) for fileName in fileNames
+                 if fileName.endswith(".csv"))
+  paths = sorted(paths)[:maxStreams]
+
+  corpus = {}
+  for path in paths:
+    with open(path, "r") as f:
+      reader = csv.reader(f)
+      reader.next()
+      rows = [(datetime.datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S"),
+               float(row[1]))
+              for row in reader]
+    corpus[os.path.relpath(path, dataDir)] = rows[:maxRecords]
+  return corpus
+
+
+
+def modelParams(rows):
+  """
+  The parameters NAB would give a detector for this data file, with the
+  default probationary percent of 0.15.
+  """
+  values = [value for _, value in rows]
+  return {
+    "inputMin": min(values),
+    "inputMax": max(values),
+    "probationaryPeriod": int(min(math.floor(0.15 * len(rows)), 0.15 * 5000)),
+  }
+
+
+
+def interleave(corpus):
+  """
+  Batches of records with one timestep of every stream.
+  """
+  numSteps = max(len(rows) for rows in corpus.itervalues())
+  return [[(streamId, rows[t][0], rows[t][1])
+           for streamId, rows in sorted(corpus.iteritems())
+           if t < len(rows)]
+          for t in xrange(numSteps)]
+
+
+
+def previousHandleRecord(model, timestamp, value):
+  model.valueEncoder.encodeIntoArray(value, model.encodedValue)
+  model.timestampEncoder.encodeIntoArray(timestamp, model.encodedTimestamp)
+
+  model.sp.compute(np.concatenate((model.encodedTimestamp,
+                                   model.encodedValue,)),
+                   True, model.spOutput)
+
+  activeColumns = set(model.spOutput.nonzero()[0].tolist())
+  prevPredictedColumns = set(model.tm.columnForCell(cell)
+                             for cell in model.tm.getPredictiveCells())
+  rawScore = (len(activeColumns - prevPredictedColumns) /
+              float(len(activeColumns)))
+
+  model.tm.compute(activeColumns)
+
+  anomalyScore = model.anomalyLikelihood.anomalyProbability(
+    value, rawScore, timestamp)
+  logScore = model.anomalyLikelihood.computeLogLikelihood(anomalyScore)
+  return (logScore, rawScore)
+
+
+
+def runPrevious(corpus, batches):
+  models = dict((streamId, NumentaTMModel(**modelParams(rows)))
+                for streamId, rows in corpus.iteritems())
+  start = time.time()
+  for batch in batches:
+    for streamId, timestamp, value in batch:
+      previousHandleRecord(models[streamId], timestamp, value)
+  return time.time() - start
+
+
+
+def runEngine(corpus, batches, numWorkers):
+  with MultiStreamEngine(numWorkers=numWorkers) as engine:
+    for streamId, rows in sorted(corpus.iteritems()):
+      engine.addStream(streamId, **modelParams(rows))
+
+    start = time.time()
+    for batch in batches:
+      engine.handleRecords(batch)
+    elapsed = time.time() - start
+
+    directory = tempfile.mkdtemp()
+    checkpointStart = time.time()
+    engine.checkpoint(directory)
+    checkpointTime = time.time() - checkpointStart
+    shutil.rmtree(directory)
+
+  return elapsed, checkpointTime
+
+
+
+def run(dataDir, maxStreams, maxRecords, workerCounts):
+  corpus = readCorpus(dataDir, maxStreams, maxRecords)
+  batches = interleave(corpus)
+  numRecords = sum(len(batch) for batch in batches)
+  print "{} streams, {} records".format(len(corpus), numRecords)
+
+  print "{:>20} {:>8} {:>14} {:>18} {:>12}".format(
+    "implementation", "cores", "records/sec", "records/sec/core",
+    "checkpoint")
+
+  elapsed = runPrevious(corpus, batches)
+  print "{:>20} {:>8} {:>14.1f} {:>18.1f} {:>12}".format(
+    "previous", 1, numRecords / elapsed, numRecords / elapsed, "-")
+
+  for numWorkers in workerCounts:
+    elapsed, checkpointTime = runEngine(corpus, batches, numWorkers)
+    numCores = max(numWorkers, 1)
+    print "{:>20} {:>8} {:>14.1f} {:>18.1f} {:>11.2f}s".format(
+      "engine", numCores, numRecords / elapsed,
+      numRecords / elapsed / numCores, checkpointTime)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--dataDir",
+                      default=os.path.expanduser("~/nta/NAB/data"))
+  parser.add_argument("--streams", type=int, default=20)
+  parser.add_argument("--records", type=int, default=1000)
+  parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+  args = parser.parse_args()
+
+  run(args.dataDir, args.streams, args.records, args.workers)
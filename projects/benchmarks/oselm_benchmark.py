@@ -0,0 +1,170 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the throughput and accuracy of OSELM on the NYC taxi data with the
+previous implementation, which added the bias one hidden neuron at a time and
+took a pseudoinverse at every sequential update.
+
+The setup follows projects/sequence_prediction/continuous_sequence/run_elm.py:
+100 lags plus time of day and day of week, standardized, 50 hidden neurons,
+500 initialization records, then train and predict one record at a time.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from numpy.linalg import pinv
+
+from htmresearch.algorithms.online_extreme_learning_machine import OSELM
+
+
+
+DATA_PATH = "projects/sequence_prediction/continuous_sequence/data/nyc_taxi.csv"
+
+
+
+class PreviousOSELM(OSELM):
+  """
+  The activation and sequential learning step of the previous OSELM.
+  """
+
+  def calculateHiddenLayerActivation(self, features, out=None):
+    (numSamples, numInputs) = features.shape
+    V = np.dot(features, np.transpose(self.inputWeights))
+    for i in range(self.numHiddenNeurons):
+      V[:, i] += self.bias[0, i]
+    H = 1 / (1+np.exp(-V))
+    return H
+
+
+  def train(self, features, targets):
+    (numSamples, numOutputs) = targets.shape
+    H = self.calculateHiddenLayerActivation(features)
+    Ht = np.transpose(H)
+    self.M -= np.dot(self.M,
+                     np.dot(Ht, np.dot(
+        pinv(np.eye(numSamples) + np.dot(H, np.dot(self.M, Ht))),
+        np.dot(H, self.M))))
+
+    self.beta += np.dot(self.M, np.dot(Ht, targets - np.dot(H, self.beta)))
+
+
+
+def readTaxiData(path, numLags):
+  """
+  @return (tuple) features, targets and the standard deviation and mean of the
+  passenger counts. Record i predicts the passenger count of record i + 1.
+  """
+  data = np.loadtxt(path, delimiter=",", skiprows=3, usecols=(1, 2, 3))
+  mean = data.mean(axis=0)
+  std = data.std(axis=0)
+  data = (data - mean) / std
+
+  numRecords = len(data) - numLags
+  lags = np.lib.stride_tricks.as_strided(
+    data[:, 0], shape=(numRecords, numLags),
+    strides=(data.strides[0], data.strides[0]))
+  features = np.hstack((lags, data[numLags-1:-1, 1:]))
+  targets = data[numLags:, :1]
+  return features, targets, std[0], mean[0]
+
+
+
+def run(net, features, targets, numInit):
+  """
+  Train and predict one record at a time, like run_elm.py.
+
+  @return (tuple) records per second and predictions
+  """
+  net.initializePhase(features[:numInit], targets[:numInit])
+  predictions = np.zeros(len(features) - numInit)
+
+  start = time.time()
+  for i in xrange(numInit, len(features)):
+    net.train(features[[i]], targets[[i]])
+    predictions[i - numInit] = net.predict(features[[i]])[0, 0]
+  return (len(features) - numInit) / (time.time() - start), predictions
+
+
+
+def runStream(net, features, targets, numInit, chunkSize):
+  """
+  @return (float) records per second of trainStream, without predictions
+  """
+  net.initializePhase(features[:numInit], targets[:numInit])
+  start = time.time()
+  net.trainStream(zip(features[numInit:], targets[numInit:]), chunkSize)
+  return (len(features) - numInit) / (time.time() - start)
+
+
+
+def createNet(netClass, features, numHidden, dtype="float64"):
+  np.random.seed(6)
+  return netClass(features.shape[1], 1, numHiddenNeurons=numHidden,
+                  activationFunction="sig", dtype=dtype)
+
+
+
+def nrmse(predictions, targets, skip):
+  return (np.sqrt(np.mean((predictions[skip:] - targets[skip:]) ** 2)) /
+          np.std(targets[skip:]))
+
+
+
+def main(path, numLags, numHidden, numInit, skip, chunkSizes):
+  features, targets, std, mean = readTaxiData(path, numLags)
+  actual = targets[numInit:, 0] * std + mean
+
+  print "%d records, %d hidden neurons" % (len(features), numHidden)
+  print "%22s %10s %8s" % ("", "records/s", "NRMSE")
+
+  for name, netClass, dtype in (("previous", PreviousOSELM, "float64"),
+                                ("current", OSELM, "float64"),
+                                ("current float32", OSELM, "float32")):
+    net = createNet(netClass, features, numHidden, dtype)
+    throughput, predictions = run(net, features, targets, numInit)
+    error = nrmse(predictions * std + mean, actual, skip)
+    print "%22s %10.0f %8.4f" % (name, throughput, error)
+
+  for chunkSize in chunkSizes:
+    net = createNet(OSELM, features, numHidden)
+    throughput = runStream(net, features, targets, numInit, chunkSize)
+    print "%22s %10.0f %8s" % ("trainStream chunk %d" % chunkSize,
+                               throughput, "")
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--data", default=DATA_PATH)
+  parser.add_argument("--lags", type=int, default=100)
+  parser.add_argument("--hidden", type=int, default=50)
+  parser.add_argument("--init", type=int, default=500)
+  parser.add_argument("--skip", type=int, default=6000,
+                      help="Predictions to leave out of the NRMSE")
+  parser.add_argument("--chunkSizes", type=int, nargs="+",
+                      default=[1, 10, 100])
+  args = parser.parse_args()
+
+  main(args.data, args.lags, args.hidden, args.init, args.skip,
+       args.chunkSizes)
@@ -0,0 +1,101 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare Matrix_Neuron with CSR_Neuron on a false positive style workload:
+create the neuron, initialize its dendrites on positive examples, compute the
+activations of a dataset, and train on it.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from htmresearch.frameworks.poirazi_neuron_model import csr_neuron_model
+from htmresearch.frameworks.poirazi_neuron_model import neuron_model
+from htmresearch.frameworks.poirazi_neuron_model.data_tools import (
+  generate_evenly_distributed_data_sparse)
+
+
+
+def run(module, neuronClass, data, labels, numDendrites, dendriteLength, dim,
+        batchSize):
+  times = []
+
+  start = time.time()
+  neuron = neuronClass(num_dendrites=numDendrites,
+                       dendrite_length=dendriteLength, dim=dim,
+                       nonlinearity=module.threshold_nonlinearity(
+                         dendriteLength / 2))
+  times.append(time.time() - start)
+
+  start = time.time()
+  neuron.HTM_style_initialize_on_data(data, labels)
+  times.append(time.time() - start)
+
+  start = time.time()
+  neuron.calculate_on_entire_dataset(data)
+  times.append(time.time() - start)
+
+  start = time.time()
+  if batchSize is None:
+    neuron.HTM_style_train_on_data(data, labels)
+  else:
+    neuron.HTM_style_train_on_data(data, labels, batch_size=batchSize)
+  times.append(time.time() - start)
+
+  return times
+
+
+
+def main(numDendrites, dendriteLength, dim, numActive, numSamples,
+         batchSizes):
+  numpy.random.seed(42)
+  data = generate_evenly_distributed_data_sparse(dim=dim, num_active=numActive,
+                                                 num_samples=numSamples)
+  labels = numpy.where(numpy.random.rand(numSamples) < 0.5, 1, -1)
+
+  print "%-16s %10s %10s %10s %10s" % ("neuron", "create", "initialize",
+                                       "activate", "train")
+  rows = [("Matrix_Neuron", neuron_model, neuron_model.Matrix_Neuron, None)]
+  rows += [("CSR_Neuron/%d" % batchSize, csr_neuron_model,
+            csr_neuron_model.CSR_Neuron, batchSize)
+           for batchSize in batchSizes]
+  for name, module, neuronClass, batchSize in rows:
+    times = run(module, neuronClass, data, labels, numDendrites,
+                dendriteLength, dim, batchSize)
+    print "%-16s %9.3fs %9.3fs %9.3fs %9.3fs" % tuple([name] + times)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--dendrites", type=int, default=10000)
+  parser.add_argument("--dendriteLength", type=int, default=20)
+  parser.add_argument("--dim", type=int, default=16000)
+  parser.add_argument("--active", type=int, default=512)
+  parser.add_argument("--samples", type=int, default=2000)
+  parser.add_argument("--batchSizes", type=int, nargs="+", default=[1, 100])
+  args = parser.parse_args()
+
+  main(args.dendrites, args.dendriteLength, args.dim, args.active,
+       args.samples, args.batchSizes)
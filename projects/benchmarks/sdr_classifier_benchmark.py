@@ -0,0 +1,207 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare SDRClassifier records per second with the previous implementation,
+which updated the weights one bit at a time and grew them by concatenation.
+
+The classifiers learn a stream of random patterns, then score another stream,
+with compute() and with computeBatch().
+"""
+
+import argparse
+from collections import deque
+import time
+
+import numpy
+
+from htmresearch.algorithms.sdr_classifier import SDRClassifier
+
+
+
+class PreviousSDRClassifier(object):
+  """
+  The learning and inference of the previous SDRClassifier.
+  """
+
+  def __init__(self, steps=(1,), alpha=0.001, actValueAlpha=0.3):
+    self.steps = steps
+    self.alpha = alpha
+    self.actValueAlpha = actValueAlpha
+    self._learnIteration = 0
+    self._recordNumMinusLearnIteration = None
+    self._patternNZHistory = deque(maxlen=max(self.steps) + 1)
+    self._maxInputIdx = 0
+    self._maxBucketIdx = 0
+    self._weightMatrix = dict((step, numpy.zeros((1, 1)))
+                              for step in self.steps)
+    self._actualValues = [None]
+
+
+  def compute(self, recordNum, patternNZ, classification, learn, infer):
+    if self._recordNumMinusLearnIteration is None:
+      self._recordNumMinusLearnIteration = recordNum - self._learnIteration
+    self._learnIteration = recordNum - self._recordNumMinusLearnIteration
+    self._patternNZHistory.append((self._learnIteration, patternNZ))
+
+    retval = None
+
+    if max(patternNZ) > self._maxInputIdx:
+      newMaxInputIdx = max(patternNZ)
+      for nSteps in self.steps:
+        self._weightMatrix[nSteps] = numpy.concatenate((
+          self._weightMatrix[nSteps],
+          numpy.zeros(shape=(newMaxInputIdx-self._maxInputIdx,
+                             self._maxBucketIdx+1))), axis=0)
+      self._maxInputIdx = newMaxInputIdx
+
+    if infer:
+      retval = self.infer(patternNZ, classification)
+
+    if learn and classification["bucketIdx"] is not None:
+      bucketIdx = classification["bucketIdx"]
+      actValue = classification["actValue"]
+
+      if bucketIdx > self._maxBucketIdx:
+        for nSteps in self.steps:
+          self._weightMatrix[nSteps] = numpy.concatenate((
+            self._weightMatrix[nSteps],
+            numpy.zeros(shape=(self._maxInputIdx+1,
+                               bucketIdx-self._maxBucketIdx))), axis=1)
+        self._maxBucketIdx = bucketIdx
+
+      while self._maxBucketIdx > len(self._actualValues) - 1:
+        self._actualValues.append(None)
+      if self._actualValues[bucketIdx] is None:
+        self._actualValues[bucketIdx] = actValue
+      else:
+        self._actualValues[bucketIdx] = ((1.0 - self.actValueAlpha)
+                                         * self._actualValues[bucketIdx]
+                                         + self.actValueAlpha * actValue)
+
+      for (iteration, learnPatternNZ) in self._patternNZHistory:
+        error = self.calculateError(classification)
+        nSteps = self._learnIteration - iteration
+        if nSteps in self.steps:
+          for bit in learnPatternNZ:
+            self._weightMatrix[nSteps][bit, :] += self.alpha * error[nSteps]
+
+    return retval
+
+
+  def infer(self, patternNZ, classification):
+    defaultValue = 0 if self.steps[0] == 0 else classification["actValue"]
+    retval = {"actualValues": [x if x is not None else defaultValue
+                               for x in self._actualValues]}
+    for nSteps in self.steps:
+      retval[nSteps] = self.inferSingleStep(patternNZ,
+                                            self._weightMatrix[nSteps])
+    return retval
+
+
+  def inferSingleStep(self, patternNZ, weightMatrix):
+    outputActivation = numpy.zeros(self._maxBucketIdx + 1)
+    for bit in patternNZ:
+      outputActivation += weightMatrix[bit, :]
+    expOutputActivation = numpy.exp(outputActivation)
+    return expOutputActivation / numpy.sum(expOutputActivation)
+
+
+  def calculateError(self, classification):
+    error = dict()
+    targetDist = numpy.zeros(self._maxBucketIdx + 1)
+    targetDist[classification["bucketIdx"]] = 1.0
+    for (iteration, learnPatternNZ) in self._patternNZHistory:
+      nSteps = self._learnIteration - iteration
+      if nSteps in self.steps:
+        error[nSteps] = targetDist - self.inferSingleStep(
+          learnPatternNZ, self._weightMatrix[nSteps])
+    return error
+
+
+
+def generateRecords(numRecords, numInputs, numActive, numBuckets, start=0,
+                    seed=42):
+  rng = numpy.random.RandomState(seed)
+  records = []
+  for recordNum in xrange(start, start + numRecords):
+    bucketIdx = int(rng.randint(numBuckets))
+    patternNZ = numpy.sort(rng.choice(numInputs, numActive,
+                                      replace=False)).tolist()
+    records.append((recordNum, patternNZ,
+                    {"bucketIdx": bucketIdx, "actValue": float(bucketIdx)}))
+  return records
+
+
+
+def timeCompute(classifier, records, learn, infer):
+  start = time.time()
+  results = [classifier.compute(recordNum, patternNZ, classification, learn,
+                                infer)
+             for recordNum, patternNZ, classification in records]
+  return len(records) / (time.time() - start), results
+
+
+
+def main(numRecords, numInputs, numActive, numBuckets, steps):
+  training = generateRecords(numRecords, numInputs, numActive, numBuckets)
+  scoring = generateRecords(numRecords, numInputs, numActive, numBuckets,
+                            start=numRecords, seed=43)
+
+  previous = PreviousSDRClassifier(steps=steps, alpha=0.01)
+  current = SDRClassifier(steps=steps, alpha=0.01)
+
+  previousLearn, expected = timeCompute(previous, training, True, True)
+  currentLearn, results = timeCompute(current, training, True, True)
+  previousInfer, _ = timeCompute(previous, scoring, False, True)
+
+  start = time.time()
+  batchResults = current.computeBatch(scoring)
+  currentInfer = len(scoring) / (time.time() - start)
+
+  _, expectedScores = timeCompute(previous, scoring, False, True)
+  maxError = max(numpy.abs(result[nSteps] - expectedResult[nSteps]).max()
+                 for result, expectedResult
+                 in zip(results + batchResults, expected + expectedScores)
+                 for nSteps in steps)
+
+  print "%20s %18s %18s %8s" % ("", "previous (rec/s)", "current (rec/s)",
+                                "speedup")
+  print "%20s %18.1f %18.1f %7.2fx" % ("learn + infer", previousLearn,
+                                       currentLearn,
+                                       currentLearn / previousLearn)
+  print "%20s %18.1f %18.1f %7.2fx" % ("computeBatch infer", previousInfer,
+                                       currentInfer,
+                                       currentInfer / previousInfer)
+  print "max likelihood difference: %g" % maxError
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--records", type=int, default=2000)
+  parser.add_argument("--inputs", type=int, default=2048*32)
+  parser.add_argument("--active", type=int, default=40)
+  parser.add_argument("--buckets", type=int, default=50)
+  parser.add_argument("--steps", type=int, nargs="+", default=[1, 5])
+  args = parser.parse_args()
+
+  main(args.records, args.inputs, args.active, args.buckets, args.steps)
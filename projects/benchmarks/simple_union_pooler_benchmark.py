@@ -0,0 +1,94 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the time per step of SimpleUnionPooler.unionIntoArray with the
+previous implementation, which rebuilt the dense union from the whole history
+at every step.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from htmresearch.algorithms.simple_union_pooler import SimpleUnionPooler
+
+
+
+class PreviousSimpleUnionPooler(SimpleUnionPooler):
+
+  def reset(self):
+    self._unionSDR = numpy.zeros(shape=(self._numInputs,))
+    self._activeCellsHistory = []
+
+
+  def _updateHistory(self, activeCells, forceOutput):
+    self._activeCellsHistory.append(activeCells)
+    if len(self._activeCellsHistory) > self._historyLength:
+      self._activeCellsHistory.pop(0)
+
+    self._unionSDR = numpy.zeros(shape=(self._numInputs,))
+    if (len(self._activeCellsHistory) >= self._minHistory) or forceOutput:
+      for i in self._activeCellsHistory:
+        self._unionSDR[i] = 1
+
+    return self._unionSDR
+
+
+
+def timeSteps(pooler, inputs, numInputs):
+  outputVector = numpy.zeros(numInputs)
+  start = time.time()
+  for activeCells in inputs:
+    pooler.unionIntoArray(activeCells, outputVector)
+  return (time.time() - start) / len(inputs)
+
+
+
+def main(numInputs, numActive, historyLengths, numSteps):
+  rng = numpy.random.RandomState(42)
+  inputs = [list(rng.choice(numInputs, numActive, replace=False))
+            for _ in xrange(numSteps)]
+
+  print "%d inputs, %d active" % (numInputs, numActive)
+  print "%8s %14s %14s %8s" % ("history", "previous us", "current us",
+                               "speedup")
+  for historyLength in historyLengths:
+    times = [timeSteps(poolerClass(inputDimensions=[numInputs],
+                                   historyLength=historyLength),
+                       inputs, numInputs)
+             for poolerClass in (PreviousSimpleUnionPooler, SimpleUnionPooler)]
+    print "%8d %14.1f %14.1f %7.1fx" % (historyLength, times[0] * 1e6,
+                                        times[1] * 1e6, times[0] / times[1])
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--inputs", type=int, default=65536)
+  parser.add_argument("--active", type=int, default=40)
+  parser.add_argument("--historyLengths", type=int, nargs="+",
+                      default=[10, 100, 1000])
+  parser.add_argument("--steps", type=int, default=2000)
+  args = parser.parse_args()
+
+  main(args.inputs, args.active, args.historyLengths, args.steps)
@@ -0,0 +1,122 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the learning steps per second of TemporalPooler.computeSparse with
+the previous implementation, which updated the permanences of one active
+column at a time through dense rows and rebuilt the pooling mask every step.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from htmresearch.algorithms.temporal_pooler import TemporalPooler
+
+
+
+class PreviousTemporalPooler(TemporalPooler):
+
+  def _adaptSynapsesSparse(self, activeInput, activeColumns, predictedInput):
+    permChanges = numpy.zeros(self._numInputs)
+    permChanges.fill(-1 * self._synPermInactiveDec)
+    permChanges[activeInput] = self._synPermActiveInc
+    permChanges[predictedInput] = self._synPredictedInc
+
+    for i in activeColumns:
+      perm = self._permanences.getRow(i)
+      maskPotential = numpy.where(self._potentialPools.getRow(i) > 0)[0]
+      perm[maskPotential] += permChanges[maskPotential]
+      self._updatePermanencesForColumn(perm, i, raisePerm=False)
+
+
+  def _calculatePoolingActivity(self, predictedActiveCells, learn):
+    overlaps = numpy.zeros(self._numColumns).astype("float32")
+    if (sum(self._poolingActivation) == 0 or
+       len(predictedActiveCells.nonzero()[0]) == 0):
+      return overlaps
+
+    if learn:
+      self._potentialPools.rightVecSumAtNZ_fast(predictedActiveCells, overlaps)
+    else:
+      self._connectedSynapses.rightVecSumAtNZ_fast(predictedActiveCells,
+                                                   overlaps)
+
+    mask = numpy.zeros(self._numColumns).astype("float32")
+    mask[self._poolingColumns] = 1
+    overlaps = overlaps * mask
+    return self._boostStrength * self._numInputs * overlaps
+
+
+
+def createPooler(poolerClass, numInputs, numColumns, potentialPct):
+  return poolerClass(inputDimensions=[numInputs],
+                     columnDimensions=[numColumns],
+                     potentialRadius=numInputs,
+                     potentialPct=potentialPct,
+                     globalInhibition=True,
+                     numActiveColumnsPerInhArea=40,
+                     synPermInactiveDec=0.01,
+                     synPermActiveInc=0.03,
+                     synPredictedInc=0.5,
+                     boostStrength=1.0,
+                     seed=42)
+
+
+
+def main(numColumns, numInputs, potentialPct, numActive, numSteps):
+  rng = numpy.random.RandomState(42)
+  inputs = []
+  for _ in xrange(numSteps):
+    activeInput = numpy.sort(rng.choice(numInputs, numActive, replace=False))
+    predictedInput = activeInput[rng.rand(numActive) < 0.8]
+    inputs.append((activeInput, predictedInput))
+  burstingColumns = numpy.zeros(numColumns, dtype="uint32")
+  activeArray = numpy.zeros(numColumns, dtype="uint32")
+
+  print "%d columns, %d inputs, potentialPct %.2f, %d active inputs" % (
+    numColumns, numInputs, potentialPct, numActive)
+  print "%16s %16s %8s" % ("previous steps/s", "current steps/s", "speedup")
+
+  rates = []
+  for poolerClass in (PreviousTemporalPooler, TemporalPooler):
+    pooler = createPooler(poolerClass, numInputs, numColumns, potentialPct)
+    start = time.time()
+    for activeInput, predictedInput in inputs:
+      pooler.computeSparse(activeInput, True, activeArray, burstingColumns,
+                           predictedInput)
+    rates.append(numSteps / (time.time() - start))
+
+  print "%16.1f %16.1f %7.1fx" % (rates[0], rates[1], rates[1] / rates[0])
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--columns", type=int, default=2048)
+  parser.add_argument("--inputs", type=int, default=2048 * 32)
+  parser.add_argument("--potentialPct", type=float, default=0.05)
+  parser.add_argument("--active", type=int, default=1280)
+  parser.add_argument("--steps", type=int, default=200)
+  args = parser.parse_args()
+
+  main(args.columns, args.inputs, args.potentialPct, args.active, args.steps)
@@ -0,0 +1,117 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the time to load capybara SDR sequences and compute their embeddings
+from a binary trace file versus the CSV trace file it was converted from,
+where each sequence is a JSON list of active indices per step that is turned
+into dense SDRs. Also prints the time to convert the CSV file and the size of
+both files.
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from htmresearch.frameworks.capybara.embedding import convert_to_embeddings
+from htmresearch.frameworks.capybara.sdr import load_sdrs
+from htmresearch.support.trace_file import convertCsvTraces
+
+SP_WIDTH = 2048
+TM_WIDTH = 2048 * 32
+
+
+
+def write_csv_trace(path, nb_sequences, sequence_length):
+  with open(path, 'wb') as f:
+    writer = csv.writer(f)
+    writer.writerow(['label', 'spActiveColumns', 'tmPredictedActiveCells'])
+    for i in range(nb_sequences):
+      sp = [np.random.choice(SP_WIDTH, 40, replace=False).tolist()
+            for _ in range(sequence_length)]
+      tm = [np.random.choice(TM_WIDTH, 40, replace=False).tolist()
+            for _ in range(sequence_length)]
+      writer.writerow([json.dumps(i % 6), json.dumps(sp), json.dumps(tm)])
+
+
+
+def directory_size(path):
+  return sum(os.path.getsize(os.path.join(path, name))
+             for name in os.listdir(path))
+
+
+
+def timed(f):
+  start = time.time()
+  result = f()
+  return result, time.time() - start
+
+
+
+def run(sequence_counts, sequence_length, nb_chunks):
+  print "{:>10} {:>10} {:>10} {:>10} {:>10} {:>12} {:>16}".format(
+    "sequences", "csv MB", "trace MB", "convert", "csv load", "trace load",
+    "embed csv/trace")
+
+  directory = tempfile.mkdtemp()
+  try:
+    for nb_sequences in sequence_counts:
+      csv_path = os.path.join(directory, 'trace_%d.csv' % nb_sequences)
+      trace_path = os.path.join(directory, 'trace_%d' % nb_sequences)
+      write_csv_trace(csv_path, nb_sequences, sequence_length)
+
+      _, convert_time = timed(lambda: convertCsvTraces(csv_path, trace_path))
+      csv_sequences, csv_time = timed(
+        lambda: load_sdrs(csv_path, SP_WIDTH, TM_WIDTH))
+      _, csv_embedding_time = timed(
+        lambda: convert_to_embeddings(csv_sequences, 'or', nb_chunks))
+      csv_sequences = None
+      trace_sequences, trace_time = timed(
+        lambda: load_sdrs(trace_path, SP_WIDTH, TM_WIDTH))
+      _, trace_embedding_time = timed(
+        lambda: convert_to_embeddings(trace_sequences, 'or', nb_chunks))
+
+      print ("{:>10} {:>10.1f} {:>10.1f} {:>9.2f}s {:>9.2f}s {:>11.2f}s "
+             "{:>10.2f}s/{:.2f}s").format(
+        nb_sequences, os.path.getsize(csv_path) / 1e6,
+        directory_size(trace_path) / 1e6, convert_time, csv_time,
+        trace_time, csv_embedding_time, trace_embedding_time)
+  finally:
+    shutil.rmtree(directory)
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--sequences", type=int, nargs="+", default=[10, 50])
+  parser.add_argument("--length", type=int, default=128,
+                      help="Number of steps per sequence")
+  parser.add_argument("--chunks", type=int, default=4)
+  args = parser.parse_args()
+
+  np.random.seed(42)
+  run(args.sequences, args.length, args.chunks)
@@ -0,0 +1,123 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the time per learning step of UnionTemporalPooler.compute with the
+previous implementation, which called _adaptSynapses 2 + historyLength times
+per step, reading and writing the permanences of every column each time.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from htmresearch.algorithms.union_temporal_pooler import UnionTemporalPooler
+
+
+
+class PreviousUnionTemporalPooler(UnionTemporalPooler):
+  """
+  The learning step of the previous UnionTemporalPooler.
+  """
+
+  def _adaptSynapsesForStep(self, predictedActiveInput, activeCells):
+    self._adaptSynapses(predictedActiveInput, activeCells,
+                        self.getSynPermActiveInc(),
+                        self.getSynPermInactiveDec())
+    self._adaptSynapses(predictedActiveInput, self._unionSDR,
+                        self._synPermPredActiveInc, 0.0)
+    for i in xrange(self._historyLength):
+      self._adaptSynapses(self._prePredictedActiveInput[:,i], activeCells,
+                          self._synPermPreviousPredActiveInc, 0.0)
+
+
+
+def createPooler(poolerClass, numInputs, numColumns, historyLength,
+                 foldHistoryLearning=False):
+  return poolerClass(inputDimensions=(numInputs,),
+                     columnDimensions=(numColumns,),
+                     potentialRadius=numInputs,
+                     potentialPct=0.5,
+                     globalInhibition=True,
+                     numActiveColumnsPerInhArea=int(0.02 * numColumns),
+                     synPermInactiveDec=0.01,
+                     synPermActiveInc=0.1,
+                     synPermConnected=0.1,
+                     boostStrength=0.0,
+                     seed=42,
+                     activeOverlapWeight=1.0,
+                     predictedActiveOverlapWeight=10.0,
+                     maxUnionActivity=0.2,
+                     synPermPredActiveInc=0.1,
+                     synPermPreviousPredActiveInc=0.1,
+                     historyLength=historyLength,
+                     foldHistoryLearning=foldHistoryLearning)
+
+
+
+def timeSteps(pooler, inputs):
+  start = time.time()
+  for activeInput, predictedActiveInput in inputs:
+    pooler.compute(activeInput, predictedActiveInput, True)
+  return (time.time() - start) / len(inputs)
+
+
+
+def main(numInputs, numColumns, numActive, historyLengths, numSteps):
+  rng = numpy.random.RandomState(42)
+  inputs = []
+  for _ in xrange(numSteps):
+    activeInput = numpy.zeros(numInputs, dtype="uint32")
+    activeInput[rng.choice(numInputs, numActive, replace=False)] = 1
+    predictedActiveInput = activeInput * (rng.rand(numInputs) < 0.8)
+    inputs.append((activeInput, predictedActiveInput.astype("uint32")))
+
+  print "%d inputs, %d columns, %d active inputs" % (numInputs, numColumns,
+                                                     numActive)
+  print "%8s %12s %12s %12s" % ("history", "previous ms", "current ms",
+                                "folded ms")
+  for historyLength in historyLengths:
+    times = [
+      timeSteps(createPooler(PreviousUnionTemporalPooler, numInputs,
+                             numColumns, historyLength), inputs),
+      timeSteps(createPooler(UnionTemporalPooler, numInputs, numColumns,
+                             historyLength), inputs),
+      timeSteps(createPooler(UnionTemporalPooler, numInputs, numColumns,
+                             historyLength, foldHistoryLearning=True),
+                inputs)]
+    print "%8d %12.2f %12.2f %12.2f" % tuple(
+      [historyLength] + [t * 1000 for t in times])
+
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--inputs", type=int, default=2048 * 8)
+  parser.add_argument("--columns", type=int, default=2048)
+  parser.add_argument("--active", type=int, default=400)
+  parser.add_argument("--historyLengths", type=int, nargs="+",
+                      default=[0, 5, 20])
+  parser.add_argument("--steps", type=int, default=100)
+  args = parser.parse_args()
+
+  main(args.inputs, args.columns, args.active, args.historyLengths,
+       args.steps)
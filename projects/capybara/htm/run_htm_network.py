@@ -29,6 +29,7 @@ import yaml
 import numpy as np
 
 from htmresearch.frameworks.capybara.htm.network import BaseNetwork
+from htmresearch.support.trace_file import TraceWriter
 
 logging.basicConfig()
 _LOGGER = logging.getLogger('NetworkRunner')
@@ -48,6 +49,7 @@ def _getConfig(configFilePath):
   inputMin = config['inputs']['metricMin']
   inputMax = config['inputs']['metricMax']
   outputDir = config['outputs']['outputDir']
+  traceFormat = config['outputs'].get('traceFormat', 'csv')
   chunkSize = config['params']['chunkSize']
   runSanity = config['params']['runSanity']
 
@@ -59,6 +61,7 @@ def _getConfig(configFilePath):
           inputMin,
           inputMax,
           outputDir,
+          traceFormat,
           chunkSize,
           runSanity)
 
@@ -90,14 +93,47 @@ def _updateTrace(traceNZ, **kwargs):
 
 
 
-def _writeTraceBatch(traceNZ, traceWriter, timeIndexed):
-  if timeIndexed:
+def _writeTraceHeaders(traceHeaders, traceWriter):
+  # Binary trace files get their columns from the first row.
+  if not isinstance(traceWriter, TraceWriter):
+    traceWriter.writerow(traceHeaders)
+
+
+
+def _writeTraceBatch(traceNZ, traceWriter, timeIndexed, firstSequence=0):
+  if isinstance(traceWriter, TraceWriter):
+    _writeBinaryTrace(traceNZ, traceWriter, timeIndexed, firstSequence)
+  elif timeIndexed:
     _writeTimeIndexedTrace(traceNZ, traceWriter)
   else:
     _writeSequenceIndexedTrace(traceNZ, traceWriter)
 
 
 
+def _writeBinaryTrace(traceNZ, traceWriter, timeIndexed, firstSequence):
+  """
+  Append the traces to a binary trace file, one row per time step. The SDRs
+  of each sequence are written as one row per time step, with the number of
+  the sequence and its label. The first sequence of the batch is numbered
+  firstSequence.
+  """
+  if timeIndexed:
+    for i in range(len(traceNZ['t'])):
+      traceWriter.append(dict((traceName, trace[i])
+                              for traceName, trace in traceNZ.items()))
+  else:
+    for i in range(len(traceNZ['label'])):
+      numSteps = len(traceNZ['spActiveColumns'][i])
+      for step in range(numSteps):
+        traceWriter.append({
+          'sequence': firstSequence + i,
+          'label': traceNZ['label'][i],
+          'spActiveColumns': traceNZ['spActiveColumns'][i][step],
+          'tmPredictedActiveCells': traceNZ['tmPredictedActiveCells'][i][step]
+        })
+
+
+
 def _writeTimeIndexedTrace(traceNZ, traceWriter):
   numPoints = len(traceNZ['t'])
   for i in range(numPoints):
@@ -131,7 +167,7 @@ def _runOnTimeIndexedData(network, learningMode, traceCsvWriter, writeChunkSize,
 
   traceNZ = _newTrace(timeIndexed)
   traceHeaders = traceNZ.keys()
-  traceCsvWriter.writerow(traceHeaders)
+  _writeTraceHeaders(traceHeaders, traceCsvWriter)
 
   inputHeaders = inputCsvReader.next()
   for row in inputCsvReader:
@@ -177,8 +213,9 @@ def _runOnSequenceIndexedData(network, learningMode, traceCsvWriter,
 
   traceNZ = _newTrace(timeIndexed)
   traceHeaders = traceNZ.keys()
-  traceCsvWriter.writerow(traceHeaders)
+  _writeTraceHeaders(traceHeaders, traceCsvWriter)
 
+  numSequencesWritten = 0
   for row in inputCsvReader:
     label = int(float(row[0]))
     sequence_values = row[1:]
@@ -201,7 +238,9 @@ def _runOnSequenceIndexedData(network, learningMode, traceCsvWriter,
     # Write and reset trace periodically to optimize memory usage.
     sequenceNumber = int(inputCsvReader.line_num)
     if sequenceNumber % writeChunkSize == 0:
-      _writeTraceBatch(traceNZ, traceCsvWriter, timeIndexed)
+      _writeTraceBatch(traceNZ, traceCsvWriter, timeIndexed,
+                       numSequencesWritten)
+      numSequencesWritten += len(traceNZ['label'])
       traceNZ = _newTrace(timeIndexed)
       _LOGGER.info('Wrote to file (label=%s, sequenceNumber=%s)'
                    % (label, sequenceNumber))
@@ -212,12 +251,13 @@ def _runOnSequenceIndexedData(network, learningMode, traceCsvWriter,
 
   # Once we are done reading, write and reset remaining traces.
   if len(traceNZ) > 0:
-    _writeTraceBatch(traceNZ, traceCsvWriter, timeIndexed)
+    _writeTraceBatch(traceNZ, traceCsvWriter, timeIndexed,
+                     numSequencesWritten)
 
 
 
 def run(network, inputDir, inputFileName, inputMetricName, outputDir,
-        learningMode, chunkSize, timeIndexed):
+        learningMode, chunkSize, timeIndexed, traceFormat='csv'):
   # Make sure the output dir exists
   if not os.path.exists(outputDir):
     os.makedirs(outputDir)
@@ -228,24 +268,35 @@ def run(network, inputDir, inputFileName, inputMetricName, outputDir,
   traceFileName = '%s_%s' % (traceFileName, inputFileName)
   traceFilePath = os.path.join(outputDir, traceFileName)
   print traceFilePath
-  if os.path.exists(traceFilePath):
+  if os.path.isfile(traceFilePath):
     os.remove(traceFilePath)
 
-  # Open trace file in append mode to write traces in chunks.
-  with open(traceFilePath, 'a') as traceFile:
-    traceCsvWriter = csv.writer(traceFile)
-
-    # Run network on input data.
-    inputFilePath = os.path.join(inputDir, inputFileName)
-    with open(inputFilePath, 'r') as inputFile:
-      inputCsvReader = csv.reader(inputFile)
-      if timeIndexed:
-        _runOnTimeIndexedData(network, learningMode, traceCsvWriter, chunkSize,
-                              inputCsvReader, inputMetricName)
-      else:
-        _runOnSequenceIndexedData(network, learningMode, traceCsvWriter,
-                                  chunkSize, inputCsvReader)
-      _LOGGER.info('Traces saved in: %s/' % outputDir)
+  if traceFormat == 'binary':
+    # The trace file is a directory of arrays, appended to in chunks.
+    traceWriter = TraceWriter(traceFilePath, chunkSize=chunkSize)
+  elif traceFormat == 'csv':
+    # Open trace file in append mode to write traces in chunks.
+    traceFile = open(traceFilePath, 'a')
+    traceWriter = csv.writer(traceFile)
+  else:
+    raise ValueError('Invalid trace format: %s' % traceFormat)
+
+  # Run network on input data.
+  inputFilePath = os.path.join(inputDir, inputFileName)
+  with open(inputFilePath, 'r') as inputFile:
+    inputCsvReader = csv.reader(inputFile)
+    if timeIndexed:
+      _runOnTimeIndexedData(network, learningMode, traceWriter, chunkSize,
+                            inputCsvReader, inputMetricName)
+    else:
+      _runOnSequenceIndexedData(network, learningMode, traceWriter,
+                                chunkSize, inputCsvReader)
+
+  if traceFormat == 'binary':
+    traceWriter.close()
+  else:
+    traceFile.close()
+  _LOGGER.info('Traces saved in: %s/' % outputDir)
 
 
 
@@ -268,6 +319,7 @@ def main():
    inputMin,
    inputMax,
    outputDir,
+   traceFormat,
    chunkSize,
    runSanity) = _getConfig(configFile)
 
@@ -280,13 +332,13 @@ def main():
   learningMode = True
   _LOGGER.info('Input file: %s' % trainFileName)
   run(network, inputDir, trainFileName, metricName, outputDir,
-      learningMode, chunkSize, timeIndexed)
+      learningMode, chunkSize, timeIndexed, traceFormat)
 
   # Run HTM on test set (learning disabled)
   learningMode = False
   _LOGGER.info('Input file: %s' % testFileName)
   run(network, inputDir, testFileName, metricName, outputDir,
-      learningMode, chunkSize, timeIndexed)
+      learningMode, chunkSize, timeIndexed, traceFormat)
 
 
 
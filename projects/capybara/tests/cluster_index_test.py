@@ -0,0 +1,184 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import itertools
+import unittest
+import numpy as np
+
+from htmresearch.frameworks.capybara.distance import \
+  euclidian_distance, percent_overlap_distance
+from htmresearch.frameworks.capybara.unsupervised.cluster_index import \
+  ClusterIndex, LatencyStats
+from htmresearch.frameworks.capybara.unsupervised.clustering import \
+  OnlineClustering, Point
+from htmresearch.frameworks.capybara.unsupervised.online_agglomerative_clustering \
+  import OnlineAgglomerativeClustering
+
+
+
+def manhattan_distance(x1, x2):
+  return np.abs(x1 - x2).sum()
+
+
+
+class ClusterIndexTest(unittest.TestCase):
+  """
+  Compare the cluster index with distances computed one pair at a time.
+  """
+
+
+  def setUp(self):
+    np.random.seed(42)
+
+
+  def assertIndexMatches(self, index, centers, distance_func):
+    self.assertEqual(sorted(index.keys), sorted(centers.keys()))
+
+    point = np.random.rand(20)
+    expected = [distance_func(centers[key], point) for key in index.keys]
+    np.testing.assert_allclose(index.distances(point), expected, atol=1e-10)
+
+    key, dist = index.nearest(point)
+    self.assertAlmostEqual(dist, min(expected))
+    self.assertAlmostEqual(distance_func(centers[key], point), min(expected))
+
+    pair_dists = [distance_func(centers[k1], centers[k2])
+                  for k1, k2 in itertools.combinations(index.keys, 2)]
+    key1, key2, dist = index.closest_pair()
+    if len(pair_dists) > 0:
+      self.assertAlmostEqual(dist, min(pair_dists))
+      self.assertAlmostEqual(distance_func(centers[key1], centers[key2]),
+                             min(pair_dists))
+      self.assertAlmostEqual(index.average_distance(), np.mean(pair_dists))
+    else:
+      self.assertEqual(key1, None)
+      self.assertEqual(index.average_distance(), 0.0)
+
+
+  def testAddUpdateRemove(self):
+    for distance_func in [euclidian_distance, manhattan_distance]:
+      index = ClusterIndex(distance_func, capacity=2)
+      centers = {}
+      for step in range(60):
+        action = np.random.randint(3)
+        if action == 0 or len(centers) < 2:
+          key = 'c%d' % step
+          centers[key] = np.random.rand(20)
+          index.add(key, centers[key])
+        elif action == 1:
+          key = index.keys[np.random.randint(len(index))]
+          centers[key] = np.random.rand(20)
+          index.update(key, centers[key])
+        else:
+          key = index.keys[np.random.randint(len(index))]
+          del centers[key]
+          index.remove(key)
+        self.assertIndexMatches(index, centers, distance_func)
+
+      self.assertRaises(ValueError, index.add, index.keys[0], np.zeros(20))
+
+
+  def testPercentOverlap(self):
+    index = ClusterIndex(percent_overlap_distance)
+    sdrs = (np.random.rand(10, 100) < 0.1).astype(np.float64)
+    for i, sdr in enumerate(sdrs):
+      index.add(i, sdr)
+    point = sdrs[3]
+    key, dist = index.nearest(point)
+    self.assertEqual(key, 3)
+    self.assertAlmostEqual(dist, 0.0)
+
+
+  def testWiderPoints(self):
+    index = ClusterIndex(euclidian_distance)
+    index.add(1, np.ones(3))
+    index.add(2, np.ones(5))
+    np.testing.assert_allclose(index.distances(np.ones(5)),
+                               [np.sqrt(2), 0])
+    self.assertAlmostEqual(index.closest_pair()[2], np.sqrt(2))
+
+
+  def testLatencyStats(self):
+    stats = LatencyStats(history_size=2)
+    for seconds in [0.1, 0.3, 0.2]:
+      stats.add(seconds)
+    self.assertEqual(stats.count, 3)
+    self.assertAlmostEqual(stats.mean(), 0.2)
+    self.assertAlmostEqual(stats.max, 0.3)
+    self.assertAlmostEqual(stats.percentile(100), 0.3)
+    self.assertAlmostEqual(stats.percentile(0), 0.2)
+
+
+
+class OnlineClusteringTest(unittest.TestCase):
+
+
+  def testClosestClusterAndMerge(self):
+    np.random.seed(42)
+    model = OnlineClustering(euclidian_distance, merge_threshold=0.1)
+    for _ in range(8):
+      cluster = model.create_cluster()
+      for _ in range(3):
+        cluster.add(Point(np.random.rand(20)))
+      model.learn(cluster)
+    self.assertEqual(len(model.clusters), 8)
+    self.assertEqual(model.latencies['learn'].count, 8)
+
+    point = Point(np.random.rand(20))
+    dists = dict((c.id, euclidian_distance(c.center.value, point.value))
+                 for c in model.clusters.values())
+    average, distance_to_closest, closest = model._find_closest_cluster(point)
+    self.assertAlmostEqual(average, np.mean(dists.values()))
+    self.assertAlmostEqual(distance_to_closest, min(dists.values()))
+    self.assertAlmostEqual(dists[closest.id], min(dists.values()))
+
+    pairs = [(euclidian_distance(c1.center.value, c2.center.value), c1, c2)
+             for c1, c2 in itertools.combinations(model.clusters.values(), 2)]
+    _, c1, c2 = min(pairs, key=lambda pair: pair[0])
+    expected_ids = set([c1.id, c2.id])
+    model.merge_closest_clusters()
+    self.assertEqual(len(model.clusters), 7)
+    self.assertEqual(len(expected_ids & set(model.clusters.keys())), 1)
+    for cluster in model.clusters.values():
+      np.testing.assert_allclose(
+        model.index.distances(cluster.center.value)[
+          model.index.keys.index(cluster.id)], 0, atol=1e-6)
+
+
+  def testAgglomerativeClustering(self):
+    np.random.seed(42)
+    model = OnlineAgglomerativeClustering(5, euclidian_distance)
+    for i in range(50):
+      clusters, closest = model.cluster(np.random.rand(20), i % 2 == 0,
+                                        label=i % 3)
+      self.assertLessEqual(len(model._clusters), 5)
+      self.assertEqual(set(model._index.keys), set(model._clusters))
+
+    for c1, c2 in itertools.combinations(model._clusters, 2):
+      self.assertAlmostEqual(
+        model._index.distances(c1.center)[model._index.keys.index(c2)],
+        euclidian_distance(c1.center, c2.center))
+    self.assertEqual(model.latencies['cluster'].count, 50)
+
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,145 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import unittest
+import numpy as np
+
+from htmresearch.frameworks.capybara.distance import \
+  distance_matrix, sequence_distance_matrices, \
+  sequence_distance_matrix, cluster_distance_matrix, cluster_distance_factory, \
+  euclidian_distance, percent_overlap_distance, min_distances, \
+  aligned_distances
+
+
+
+def previous_min_distances(sequence_embeddings_1, sequence_embeddings_2):
+  return [min(np.linalg.norm(e2 - e1) for e2 in sequence_embeddings_2)
+          for e1 in sequence_embeddings_1]
+
+
+
+def previous_sequence_distance(a, b, assume_sequence_alignment):
+  a = a.astype(np.float64)
+  b = b.astype(np.float64)
+  if assume_sequence_alignment:
+    dists = [np.linalg.norm(a[i] - b[i]) for i in range(len(a))]
+  else:
+    dists = previous_min_distances(a, b)
+  return np.mean(dists)
+
+
+
+def overlap_sequence_distance(a, b, assume_sequence_alignment):
+  if assume_sequence_alignment:
+    dists = [percent_overlap_distance(a[i], b[i]) for i in range(len(a))]
+  else:
+    dists = [min(percent_overlap_distance(e1, e2) for e2 in b) for e1 in a]
+  return np.mean(dists)
+
+
+
+class DistanceTest(unittest.TestCase):
+  """
+  Compare the vectorized distances with the pair by pair computation.
+  """
+
+
+  def setUp(self):
+    np.random.seed(42)
+    self.nb_sequences = 11
+    self.nb_chunks = 3
+    self.sp = (np.random.rand(self.nb_sequences, self.nb_chunks, 64)
+               < 0.2).astype(np.int64)
+    self.tm = (np.random.rand(self.nb_sequences, self.nb_chunks, 300)
+               < 0.05).astype(np.int64)
+    # One sequence with no active cells.
+    self.tm[3] = 0
+
+
+  def testMinAndAlignedDistances(self):
+    a = np.random.rand(4, 10)
+    b = np.random.rand(4, 10)
+    np.testing.assert_allclose(min_distances(a, b),
+                               previous_min_distances(a, b))
+    np.testing.assert_allclose(aligned_distances(a, b),
+                               [np.linalg.norm(a[i] - b[i]) for i in range(4)])
+    self.assertRaises(ValueError, aligned_distances, a, b[:3])
+
+
+  def testEuclidianMatrices(self):
+    for assume_sequence_alignment in [True, False]:
+      distance = lambda a, b: previous_sequence_distance(
+        a, b, assume_sequence_alignment)
+      expected = distance_matrix(self.sp, self.tm, distance, sp_w=2.0)
+      for tile_size in [1, 4, 64]:
+        mats = sequence_distance_matrices(self.sp, self.tm,
+                                          assume_sequence_alignment,
+                                          sp_w=2.0, tile_size=tile_size)
+        for mat, expected_mat in zip(mats, expected):
+          np.testing.assert_allclose(mat, expected_mat, atol=1e-10)
+
+
+  def testPercentOverlapMatrices(self):
+    for assume_sequence_alignment in [True, False]:
+      distance = lambda a, b: overlap_sequence_distance(
+        a, b, assume_sequence_alignment)
+      expected = distance_matrix(self.sp, self.tm, distance)
+      mats = sequence_distance_matrices(self.sp, self.tm,
+                                        assume_sequence_alignment,
+                                        metric='percent_overlap', tile_size=4)
+      for mat, expected_mat in zip(mats, expected):
+        np.testing.assert_allclose(mat, expected_mat, atol=1e-10)
+
+
+  def testNonBinaryFloat32AndProcesses(self):
+    embeddings = np.random.rand(self.nb_sequences, self.nb_chunks, 20)
+    distance = lambda a, b: previous_sequence_distance(a, b, False)
+    expected, _, _ = distance_matrix(embeddings, embeddings, distance)
+
+    mat = sequence_distance_matrix(embeddings, False, tile_size=3,
+                                   dtype=np.float32)
+    self.assertEqual(mat.dtype, np.float32)
+    np.testing.assert_allclose(mat, expected, atol=1e-4)
+
+    mat = sequence_distance_matrix(embeddings, False, tile_size=3,
+                                   processes=2)
+    np.testing.assert_allclose(mat, expected, atol=1e-10)
+
+    self.assertRaises(ValueError, sequence_distance_matrix, embeddings, False,
+                      metric='cosine')
+
+
+  def testClusterDistanceMatrix(self):
+    clusters = [list(self.sp[i]) for i in range(self.nb_sequences)]
+    clusters.append([])
+    for distance_func in [euclidian_distance, percent_overlap_distance,
+                          lambda a, b: np.abs(a - b).sum()]:
+      cluster_dist = cluster_distance_factory(distance_func)
+      expected = np.array([[cluster_dist(c1, c2) for c2 in clusters]
+                           for c1 in clusters])
+      np.testing.assert_allclose(
+        cluster_distance_matrix(clusters, distance_func), expected,
+        atol=1e-10)
+
+
+
+if __name__ == '__main__':
+  unittest.main()
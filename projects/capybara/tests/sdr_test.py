@@ -0,0 +1,90 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from htmresearch.frameworks.capybara.embedding import convert_to_embeddings
+from htmresearch.frameworks.capybara.sdr import load_sdrs
+from htmresearch.support.trace_file import convertCsvTraces
+
+
+
+class SdrTest(unittest.TestCase):
+  """
+  Make sure that the SDR sequences of a binary trace file give the same
+  embeddings as the CSV trace file they were converted from.
+  """
+
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.csv_path = os.path.join(self.directory, 'trace.csv')
+    self.trace_path = os.path.join(self.directory, 'trace')
+    self.sp_width = 64
+    self.tm_width = 256
+
+    np.random.seed(42)
+    with open(self.csv_path, 'wb') as f:
+      writer = csv.writer(f)
+      writer.writerow(['label', 'spActiveColumns', 'tmPredictedActiveCells'])
+      for label in [2, 0, 1, 0]:
+        sp = [np.random.choice(self.sp_width, 5, replace=False).tolist()
+              for _ in range(6)]
+        tm = [np.random.choice(self.tm_width, np.random.randint(0, 10),
+                               replace=False).tolist()
+              for _ in range(6)]
+        writer.writerow([json.dumps(label), json.dumps(sp), json.dumps(tm)])
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def testBinaryTraceEmbeddings(self):
+    convertCsvTraces(self.csv_path, self.trace_path)
+    csv_sequences = load_sdrs(self.csv_path, self.sp_width, self.tm_width)
+    trace_sequences = load_sdrs(self.trace_path, self.sp_width, self.tm_width)
+
+    self.assertEqual(len(trace_sequences), 4)
+    np.testing.assert_equal(trace_sequences.label.values,
+                            csv_sequences.label.values)
+    self.assertEqual(trace_sequences.tmPredictedActiveCells.values[0].shape,
+                     (6, self.tm_width))
+
+    for aggregation in ['or', 'and', 'mean']:
+      expected = convert_to_embeddings(csv_sequences.sort_values('label'),
+                                       aggregation, 3)
+      embeddings = convert_to_embeddings(trace_sequences.sort_values('label'),
+                                         aggregation, 3)
+      for e, expected_e in zip(embeddings, expected):
+        self.assertEqual(e.shape, expected_e.shape)
+        np.testing.assert_allclose(e.astype(float), expected_e.astype(float))
+
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -79,6 +79,7 @@ def run(args):
                                trainingReps=args.trainingReps,
                                seed=args.seed,
                                concatenationMethod=args.combineMethod,
+                               numWorkers=args.numWorkers,
                                classifierMetric = args.classifierMetric,
                                numClasses=0)
       runner.initModel(0)
@@ -96,6 +97,7 @@ def run(args):
                             orderedSplit=args.orderedSplit,
                             verbosity=args.verbosity,
                             concatenationMethod=args.combineMethod,
+                            numWorkers=args.numWorkers,
                             classifierMetric = args.classifierMetric,
                             numClasses=1)
       runner.initModel(args.modelName)
@@ -241,6 +243,11 @@ if __name__ == "__main__":
                       help="Distance metric (see classifier for the options).",
                       type=str,
                       default="pctOverlapOfInput")
+  parser.add_argument("--numWorkers",
+                      help="Number of processes for testing the buckets after "
+                           "training.",
+                      type=int,
+                      default=1)
 
   args = parser.parse_args()
 
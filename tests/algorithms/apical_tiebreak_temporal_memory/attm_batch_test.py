@@ -0,0 +1,192 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Check that the ApicalTiebreakBatchMemory matches separate
+ApicalTiebreakPairMemory instances.
+"""
+
+import unittest
+
+import numpy as np
+
+from htmresearch.algorithms.apical_tiebreak_batch_memory import (
+  ApicalTiebreakBatchMemory)
+from htmresearch.algorithms.apical_tiebreak_temporal_memory import (
+  ApicalTiebreakPairMemory)
+
+
+PARAMS = {
+  "columnCount": 64,
+  "basalInputSize": 256,
+  "apicalInputSize": 128,
+  "cellsPerColumn": 4,
+  "activationThreshold": 5,
+  "reducedBasalThreshold": 5,
+  "minThreshold": 3,
+  "sampleSize": 8,
+  "initialPermanence": 0.41,
+  "connectedPermanence": 0.50,
+  "permanenceIncrement": 0.1,
+  "permanenceDecrement": 0.05,
+  "basalPredictedSegmentDecrement": 0.02,
+  "apicalPredictedSegmentDecrement": 0.01,
+}
+
+
+
+class ApicalTiebreakBatchMemoryTest(unittest.TestCase):
+
+  def _randomSDRs(self, rng, count, size, active):
+    return [np.sort(rng.choice(size, active, replace=False)).astype("uint32")
+            for _ in xrange(count)]
+
+
+  def _checkParity(self, numStreams, seeds, numSteps=60, **kwargs):
+    params = dict(PARAMS)
+    params.update(kwargs)
+
+    batch = ApicalTiebreakBatchMemory(numStreams=numStreams, seed=seeds,
+                                      **params)
+    if isinstance(seeds, int):
+      seeds = [seeds] * numStreams
+    tms = [ApicalTiebreakPairMemory(seed=seed, **params) for seed in seeds]
+
+    # Each stream repeats its own short set of patterns so that segments form,
+    # become active, and get punished.
+    rng = np.random.RandomState(7)
+    streamColumns = [self._randomSDRs(rng, 5, params["columnCount"], 6)
+                     for _ in xrange(numStreams)]
+    streamBasal = [self._randomSDRs(rng, 5, params["basalInputSize"], 12)
+                   for _ in xrange(numStreams)]
+    streamApical = [self._randomSDRs(rng, 5, params["apicalInputSize"], 10)
+                    for _ in xrange(numStreams)]
+
+    for step in xrange(numSteps):
+      learn = (step % 10) != 9
+      activeColumns = []
+      basalInput = []
+      apicalInput = []
+      for i in xrange(numStreams):
+        j = rng.randint(5)
+        activeColumns.append(streamColumns[i][j])
+        basalInput.append(streamBasal[i][j])
+        # Give some streams no apical input on some steps.
+        apicalInput.append(streamApical[i][j] if (step + i) % 4
+                           else np.empty(0, dtype="uint32"))
+
+      batch.compute(activeColumns, basalInput, apicalInput, learn=learn)
+      for i, tm in enumerate(tms):
+        tm.compute(activeColumns[i], basalInput[i], apicalInput[i],
+                   learn=learn)
+
+      batchActive = batch.getActiveCells()
+      batchWinners = batch.getWinnerCells()
+      batchPredicted = batch.getPredictedCells()
+      batchPredictedActive = batch.getPredictedActiveCells()
+      for i, tm in enumerate(tms):
+        np.testing.assert_array_equal(batchActive[i], tm.getActiveCells())
+        np.testing.assert_array_equal(batchWinners[i], tm.getWinnerCells())
+        np.testing.assert_array_equal(batchPredicted[i],
+                                      np.sort(tm.getPredictedCells()))
+        np.testing.assert_array_equal(
+          batchPredictedActive[i], np.sort(tm.getPredictedActiveCells()))
+
+    # Make sure the test exercised predictions.
+    self.assertGreater(sum(len(cells) for cells in batchPredicted), 0)
+
+    # Synapse counts per stream should also match.
+    for i, tm in enumerate(tms):
+      cells = np.arange(batch.streamCellCount, dtype="uint32")
+      np.testing.assert_array_equal(
+        batch.basalConnections.getSegmentCounts(cells +
+                                                i*batch.streamCellCount),
+        tm.basalConnections.getSegmentCounts(cells))
+
+
+  def testSingleStream(self):
+    self._checkParity(1, 42)
+
+
+  def testSameSeed(self):
+    self._checkParity(4, 42)
+
+
+  def testDifferentSeeds(self):
+    self._checkParity(5, [1, 2, 3, 4, 5])
+
+
+  def testMaxSynapsesPerSegment(self):
+    self._checkParity(3, [11, 12, 13], maxSynapsesPerSegment=10)
+
+
+  def testUnlimitedSampleSize(self):
+    self._checkParity(3, [21, 22, 23], sampleSize=-1)
+
+
+  def testUnsortedInput(self):
+    sortedBatch = ApicalTiebreakBatchMemory(numStreams=3, seed=42, **PARAMS)
+    unsortedBatch = ApicalTiebreakBatchMemory(numStreams=3, seed=42, **PARAMS)
+
+    rng = np.random.RandomState(7)
+    streamColumns = self._randomSDRs(rng, 3, PARAMS["columnCount"], 6)
+    streamBasal = self._randomSDRs(rng, 3, PARAMS["basalInputSize"], 12)
+    streamApical = self._randomSDRs(rng, 3, PARAMS["apicalInputSize"], 10)
+
+    for _ in xrange(10):
+      sortedBatch.compute(streamColumns, streamBasal, streamApical)
+      unsortedBatch.compute([rng.permutation(a) for a in streamColumns],
+                            [rng.permutation(a) for a in streamBasal],
+                            [rng.permutation(a) for a in streamApical])
+
+      for cells1, cells2 in zip(sortedBatch.getActiveCells(),
+                                unsortedBatch.getActiveCells()):
+        np.testing.assert_array_equal(cells1, cells2)
+      for cells1, cells2 in zip(sortedBatch.getPredictedCells(),
+                                unsortedBatch.getPredictedCells()):
+        np.testing.assert_array_equal(cells1, cells2)
+
+    self.assertGreater(
+      sum(len(cells) for cells in unsortedBatch.getPredictedCells()), 0)
+
+
+  def testToBatchSortsEachStream(self):
+    batch = ApicalTiebreakBatchMemory(numStreams=3, **PARAMS)
+    np.testing.assert_array_equal(
+      batch._toBatch([[5, 1, 3], [], [2, 0]], 10),
+      [1, 3, 5, 20, 22])
+
+
+  def testIndexOutOfRange(self):
+    batch = ApicalTiebreakBatchMemory(numStreams=2, **PARAMS)
+    with self.assertRaises(ValueError):
+      batch.compute([[1, 2], [3, PARAMS["columnCount"]]], [[4, 5], [6, 7]])
+
+
+  def testWrongStreamCount(self):
+    batch = ApicalTiebreakBatchMemory(numStreams=2, **PARAMS)
+    with self.assertRaises(ValueError):
+      batch.compute([[1, 2, 3]], [[4, 5, 6]])
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -22,7 +22,8 @@
 import unittest
 import numpy
 
-from htmresearch.algorithms.column_pooler import ColumnPooler
+from htmresearch.algorithms.column_pooler import (ColumnPooler,
+                                                  _selectByLateralSupport)
 from htmresearch.support.column_pooler_mixin import ColumnPoolerMonitorMixin
 
 
@@ -788,6 +789,30 @@ class ColumnPoolerTest(unittest.TestCase):
            "Incorrect object representations - expecting single object")
 
 
+  def testSelectByLateralSupport(self):
+    """
+    _selectByLateralSupport matches the level-by-level selection loop.
+    """
+    rng = numpy.random.RandomState(42)
+    for _ in xrange(500):
+      numCells = rng.randint(0, 60)
+      cells = numpy.sort(rng.choice(4096, numCells,
+                                    replace=False)).astype("uint32")
+      support = rng.randint(0, rng.randint(1, 5), size=numCells)
+      minSupport = rng.randint(1, 3)
+      quota = rng.randint(1, 50)
+
+      expected = numpy.empty(0, dtype="uint32")
+      if numCells > 0:
+        ttop = numpy.max(support)
+        while ttop >= minSupport - 1 and len(expected) < quota:
+          expected = numpy.union1d(expected, cells[support > ttop])
+          ttop -= 1
+
+      numpy.testing.assert_array_equal(
+        _selectByLateralSupport(cells, support, minSupport, quota), expected)
+
+
 
 if __name__ == "__main__":
   unittest.main()
@@ -0,0 +1,156 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import unittest
+
+import numpy
+
+from htmresearch.algorithms.hidden_markov_model import HMM
+
+
+
+def randomHMM(rng, numCats, numStates, **kwargs):
+  hmm = HMM(numCats=numCats, numStates=numStates, **kwargs)
+  hmm.pi = rng.rand(numStates)
+  hmm.pi /= hmm.pi.sum()
+  hmm.A = rng.rand(numStates, numStates)
+  hmm.A /= hmm.A.sum(axis=1)[:, numpy.newaxis]
+  hmm.B = rng.rand(numStates, numCats)
+  hmm.B /= hmm.B.sum(axis=1)[:, numpy.newaxis]
+  return hmm
+
+
+
+def unscaledUpdate(pi, A, B, observations):
+  """
+  One Baum-Welch step with unscaled alpha and beta and the full eps tensor.
+  """
+  T = len(observations)
+  alpha = numpy.zeros((T, len(pi)))
+  beta = numpy.ones((T, len(pi)))
+  alpha[0] = pi * B[:, observations[0]]
+  for t in xrange(1, T):
+    alpha[t] = alpha[t-1].dot(A) * B[:, observations[t]]
+  for t in xrange(T-2, -1, -1):
+    beta[t] = A.dot(B[:, observations[t+1]] * beta[t+1])
+
+  gamma = alpha * beta
+  gamma /= gamma.sum(axis=1)[:, numpy.newaxis]
+  eps = (alpha[:-1, :, numpy.newaxis] * A[numpy.newaxis] *
+         (B[:, observations[1:]].T * beta[1:])[:, numpy.newaxis, :])
+  eps /= (alpha * beta).sum(axis=1)[:-1, numpy.newaxis, numpy.newaxis]
+
+  newA = eps.sum(axis=0) / gamma[:-1].sum(axis=0)[:, numpy.newaxis]
+  newB = B.copy()
+  for v in set(observations):
+    newB[:, v] = gamma[observations == v].sum(axis=0) / gamma.sum(axis=0)
+  return gamma[0], newA, newB, gamma, eps
+
+
+
+class HMMTest(unittest.TestCase):
+
+  def testUpdateMatchesUnscaled(self):
+    rng = numpy.random.RandomState(42)
+    for _ in xrange(10):
+      hmm = randomHMM(rng, numCats=6, numStates=4, keepEps=True)
+      observations = rng.randint(0, 5, size=12)
+      expected = unscaledUpdate(hmm.pi, hmm.A, hmm.B, observations)
+
+      hmm._initializeTrial([observations])
+      hmm._forward()
+      hmm._backward()
+      hmm._update()
+
+      numpy.testing.assert_allclose(hmm.pi, expected[0])
+      numpy.testing.assert_allclose(hmm.A, expected[1])
+      numpy.testing.assert_allclose(hmm.B, expected[2])
+      numpy.testing.assert_allclose(hmm.gamma, expected[3].T)
+      numpy.testing.assert_allclose(hmm.eps[:, :, :-1],
+                                    expected[4].transpose(1, 2, 0))
+
+
+  def testLongSequenceDoesNotUnderflow(self):
+    rng = numpy.random.RandomState(42)
+    hmm = randomHMM(rng, numCats=10, numStates=8)
+    hmm._initializeTrial([rng.randint(0, 10, size=5000)])
+    hmm._forward()
+    hmm._backward()
+    hmm._update()
+
+    self.assertIsNone(hmm.eps)
+    numpy.testing.assert_allclose(hmm.pi.sum(), 1.0)
+    numpy.testing.assert_allclose(hmm.A.sum(axis=1), 1.0)
+    numpy.testing.assert_allclose(hmm.B.sum(axis=1), 1.0)
+
+
+  def testTrainSequencesWithOneSequence(self):
+    rng = numpy.random.RandomState(42)
+    observations = rng.randint(0, 5, size=20)
+    hmm1 = randomHMM(numpy.random.RandomState(1), numCats=5, numStates=3)
+    hmm2 = randomHMM(numpy.random.RandomState(1), numCats=5, numStates=3)
+
+    hmm1.train(observations)
+    hmm2.trainSequences([observations])
+
+    numpy.testing.assert_allclose(hmm1.pi, hmm2.pi)
+    numpy.testing.assert_allclose(hmm1.A, hmm2.A)
+    numpy.testing.assert_allclose(hmm1.B, hmm2.B)
+
+
+  def testTrainSequencesSkipsBoundaries(self):
+    """
+    No transition is counted from the end of one sequence to the start of
+    the next, and pi averages the first timestep of each sequence.
+    """
+    hmm = HMM(numCats=2, numStates=2, keepEps=True)
+    hmm.pi = numpy.array([0.5, 0.5])
+    hmm.A = numpy.array([[0.9, 0.1],
+                         [0.1, 0.9]])
+    hmm.B = numpy.array([[1.0, 0.0],
+                         [0.0, 1.0]])
+
+    hmm._initializeTrial([[0, 0], [1, 1]])
+    hmm._forward()
+    hmm._backward()
+    hmm._update()
+
+    numpy.testing.assert_allclose(hmm.pi, [0.5, 0.5])
+    numpy.testing.assert_allclose(hmm.A, numpy.eye(2))
+    numpy.testing.assert_allclose(hmm.eps[:, :, 1], 0.0)
+
+
+  def testPredictNextInputs(self):
+    hmm = HMM(numCats=3, numStates=3)
+    hmm.pi = numpy.array([1.0, 0.0, 0.0])
+    hmm.A = numpy.array([[0.0, 1.0, 0.0],
+                         [0.0, 0.0, 1.0],
+                         [1.0, 0.0, 0.0]])
+    hmm.B = numpy.eye(3)
+
+    # The previous formula, sum_j B[j,k] A[j,i] P(X_t = i), is kept.
+    self.assertEqual(hmm.predict_next_inputs(0), set([2]))
+    self.assertEqual(hmm.predict_next_inputs(1), set([0]))
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,125 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import math
+import unittest
+
+import numpy as np
+
+from htmresearch.algorithms.location_module_bank import LocationModuleBank
+from htmresearch.algorithms.superficial_location_module import (
+  SuperficialLocationModule2D)
+
+
+
+class LocationModuleBankTest(unittest.TestCase):
+  """
+  A LocationModuleBank should match separate SuperficialLocationModule2D
+  modules exactly.
+  """
+
+  ANCHOR_INPUT_SIZE = 1000
+
+  def setUp(self):
+    self.rng = np.random.RandomState(42)
+
+    self.configs = [{
+      "cellDimensions": (5 + i % 3, 5 + i % 4),
+      "moduleMapDimensions": (20.0 + i, 20.0 + i),
+      "orientation": self.rng.rand() * math.pi / 3,
+      "pointOffsets": (0.5,) if i % 2 else (0.25, 0.75),
+      "activationThreshold": 8,
+      "learningThreshold": 8,
+      "sampleSize": 10,
+      "initialPermanence": 0.6,
+      "seed": 42 + i,
+    } for i in xrange(7)]
+
+    self.modules = [
+      SuperficialLocationModule2D(anchorInputSize=self.ANCHOR_INPUT_SIZE,
+                                  **config)
+      for config in self.configs]
+    self.bank = LocationModuleBank(self.configs, self.ANCHOR_INPUT_SIZE)
+
+    np.random.seed(42)
+    for module in self.modules:
+      module.activateRandomLocation()
+    np.random.seed(42)
+    self.bank.activateRandomLocation()
+
+
+  def assertMatchesModules(self):
+    for i, module in enumerate(self.modules):
+      np.testing.assert_array_equal(self.bank.getActivePointsForModule(i),
+                                    module.activePoints)
+      np.testing.assert_array_equal(self.bank.getActiveCellsForModule(i),
+                                    module.getActiveCells())
+
+    expected = np.concatenate([module.getActiveCells() + offset
+                               for module, offset in zip(self.modules,
+                                                         self.bank.cellOffsets)])
+    np.testing.assert_array_equal(self.bank.getActiveCells(), expected)
+
+
+  def testCellNumbering(self):
+    self.assertEqual(self.bank.numberOfCells(),
+                     sum(module.numberOfCells() for module in self.modules))
+    self.assertMatchesModules()
+
+
+  def testShiftLearnAnchor(self):
+    inputs = [np.sort(self.rng.choice(self.ANCHOR_INPUT_SIZE, 30,
+                                      replace=False)).astype("uint32")
+              for _ in xrange(5)]
+    moves = self.rng.rand(5, 2) * 10 - 5
+
+    # Learn a loop of locations.
+    for deltaLocation, anchorInput in zip(moves, inputs):
+      for module in self.modules:
+        module.shift(deltaLocation)
+        module.learn(anchorInput)
+      self.bank.shift(deltaLocation)
+      self.bank.learn(anchorInput)
+      self.assertMatchesModules()
+
+    # Walk it again, sometimes with the wrong input.
+    for step in xrange(20):
+      deltaLocation = moves[step % 5]
+      anchorInput = inputs[(step + (step / 7)) % 5]
+      for module in self.modules:
+        module.shift(deltaLocation)
+        module.anchor(anchorInput)
+      self.bank.shift(deltaLocation)
+      self.bank.anchor(anchorInput)
+      self.assertMatchesModules()
+
+    self.assertGreater(len(self.bank.getActiveCells()), 0)
+
+
+  def testReset(self):
+    self.bank.reset()
+    self.assertEqual(len(self.bank.getActiveCells()), 0)
+    self.assertEqual(len(self.bank.activePoints), 0)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,171 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Compare the MultiColumnPooler with separate, laterally connected
+ColumnPoolers.
+"""
+
+import unittest
+
+import numpy
+
+from htmresearch.algorithms.column_pooler import ColumnPooler
+from htmresearch.algorithms.multi_column_pooler import MultiColumnPooler
+
+
+
+class MultiColumnPoolerTest(unittest.TestCase):
+
+  PARAMS = {
+    "inputWidth": 1024,
+    "cellCount": 512,
+    "sdrSize": 20,
+    "minThresholdProximal": 5,
+    "sampleSizeProximal": 10,
+    "sampleSizeDistal": 10,
+    "activationThresholdDistal": 6,
+    "initialDistalPermanence": 0.41,
+    "connectedPermanenceDistal": 0.5,
+    "synPermDistalDec": 0.02,
+  }
+
+
+  def _createPoolers(self, numColumns, **kwargs):
+    params = dict(self.PARAMS, **kwargs)
+    separate = [ColumnPooler(
+                  lateralInputWidths=[params["cellCount"]] * (numColumns - 1),
+                  seed=42 + i, **params)
+                for i in xrange(numColumns)]
+    multi = MultiColumnPooler(numColumns=numColumns, seed=42, **params)
+    return separate, multi
+
+
+  def _computeSeparate(self, poolers, feedforwardInputs, learn):
+    prevActiveCells = [pooler.getActiveCells() for pooler in poolers]
+    for i, pooler in enumerate(poolers):
+      lateralInputs = [cells for j, cells in enumerate(prevActiveCells)
+                       if j != i]
+      pooler.compute(feedforwardInputs[i], lateralInputs, learn=learn)
+
+
+  def _generateObjects(self, rng, numColumns, numObjects, numFeatures):
+    return [[[numpy.sort(rng.choice(self.PARAMS["inputWidth"], 20,
+                                    replace=False)).astype("uint32")
+              for _ in xrange(numColumns)]
+             for _ in xrange(numFeatures)]
+            for _ in xrange(numObjects)]
+
+
+  def _assertSameActiveCells(self, separate, multi):
+    for i, pooler in enumerate(separate):
+      numpy.testing.assert_array_equal(pooler.getActiveCells(),
+                                       multi.getActiveCells()[i])
+      numpy.testing.assert_array_equal(pooler.getActiveCells(),
+                                       multi.column(i).getActiveCells())
+
+
+  def testMatchesSeparatePoolers(self):
+    """
+    Learn objects, then infer them with noisy feedforward input.
+    """
+    rng = numpy.random.RandomState(42)
+    separate, multi = self._createPoolers(3)
+    objects = self._generateObjects(rng, 3, 4, 5)
+
+    for sensations in objects:
+      for _ in xrange(3):
+        for feedforwardInputs in sensations:
+          self._computeSeparate(separate, feedforwardInputs, True)
+          multi.compute(feedforwardInputs, learn=True)
+          self._assertSameActiveCells(separate, multi)
+      for pooler in separate:
+        pooler.reset()
+      multi.reset()
+
+    for i, pooler in enumerate(separate):
+      self.assertEqual(pooler.numberOfDistalSynapses(),
+                       multi.column(i).numberOfDistalSynapses())
+      self.assertEqual(pooler.numberOfProximalSynapses(),
+                       multi.column(i).numberOfProximalSynapses())
+
+    for sensations in objects:
+      for feedforwardInputs in sensations:
+        noisyInputs = [numpy.union1d(
+                         cells[2:],
+                         rng.choice(self.PARAMS["inputWidth"], 2)
+                       ).astype("uint32")
+                       for cells in feedforwardInputs]
+        self._computeSeparate(separate, noisyInputs, False)
+        multi.compute(noisyInputs, learn=False)
+        self._assertSameActiveCells(separate, multi)
+      for pooler in separate:
+        pooler.reset()
+      multi.reset()
+
+
+  def testColumnsComputedOneAtATime(self):
+    """
+    Computing the columns one at a time, as the ColumnPoolerRegions do, gives
+    the same result as compute().
+    """
+    rng = numpy.random.RandomState(7)
+    _, multi = self._createPoolers(4)
+    _, multiByColumn = self._createPoolers(4)
+    columns = [multiByColumn.column(i) for i in xrange(4)]
+    objects = self._generateObjects(rng, 4, 3, 4)
+
+    for learn in (True, False):
+      for sensations in objects:
+        for feedforwardInputs in sensations:
+          multi.compute(feedforwardInputs, learn=learn)
+          for column, feedforwardInput in zip(columns, feedforwardInputs):
+            column.compute(feedforwardInput, learn=learn)
+
+          for i, column in enumerate(columns):
+            numpy.testing.assert_array_equal(multi.getActiveCells()[i],
+                                             column.getActiveCells())
+
+        for column in columns:
+          column.reset()
+        multi.reset()
+
+
+  def testOnlineLearning(self):
+    rng = numpy.random.RandomState(3)
+    separate, multi = self._createPoolers(2, onlineLearning=True,
+                                          maxSdrSize=30, minSdrSize=15)
+    objects = self._generateObjects(rng, 2, 3, 4)
+
+    for _ in xrange(2):
+      for sensations in objects:
+        for feedforwardInputs in sensations:
+          self._computeSeparate(separate, feedforwardInputs, True)
+          multi.compute(feedforwardInputs, learn=True)
+          self._assertSameActiveCells(separate, multi)
+        for pooler in separate:
+          pooler.reset()
+        multi.reset()
+
+
+
+if __name__ == "__main__":
+  unittest.main()
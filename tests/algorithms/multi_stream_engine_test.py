@@ -0,0 +1,148 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import datetime
+import math
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from htmresearch.algorithms.anomaly_detection.multi_stream_engine import (
+  MultiStreamEngine, NumentaTMModel, computeRawAnomalyScore)
+
+
+
+def _streamRecords(streamIds, numRecords):
+  """
+  Interleaved records of sine waves with a different period per stream.
+  """
+  start = datetime.datetime(2017, 1, 1)
+  records = []
+  for t in xrange(numRecords):
+    timestamp = start + datetime.timedelta(minutes=5 * t)
+    for i, streamId in enumerate(streamIds):
+      value = 50.0 + 40.0 * math.sin(2 * math.pi * t / (10 + i))
+      records.append((streamId, timestamp, value))
+  return records
+
+
+
+class MultiStreamEngineTest(unittest.TestCase):
+
+  def setUp(self):
+    self.streamIds = ["stream%d" % i for i in xrange(5)]
+    self.records = _streamRecords(self.streamIds, 30)
+    self.directory = tempfile.mkdtemp()
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def _addStreams(self, engine):
+    for streamId in self.streamIds:
+      engine.addStream(streamId, inputMin=10.0, inputMax=90.0,
+                       probationaryPeriod=20)
+
+
+  def testRawAnomalyScore(self):
+    rng = numpy.random.RandomState(42)
+    predictedColumns = numpy.zeros(100, dtype="bool")
+    for _ in xrange(20):
+      activeColumns = numpy.sort(rng.choice(100, size=10, replace=False))
+      predictiveCells = rng.choice(400, size=rng.randint(0, 40),
+                                   replace=False)
+      expected = (len(set(activeColumns) - set(predictiveCells // 4)) /
+                  float(len(activeColumns)))
+      self.assertAlmostEqual(
+        computeRawAnomalyScore(activeColumns, predictiveCells, 4,
+                               predictedColumns),
+        expected)
+
+
+  def testMatchesSeparateModels(self):
+    models = dict((streamId, NumentaTMModel(10.0, 90.0, 20))
+                  for streamId in self.streamIds)
+    expected = [models[streamId].handleRecord(timestamp, value)
+                for streamId, timestamp, value in self.records]
+
+    for numWorkers in (0, 2):
+      with MultiStreamEngine(numWorkers=numWorkers) as engine:
+        self._addStreams(engine)
+        self.assertEqual(engine.handleRecords(self.records), expected)
+
+
+  def testCheckpointRestore(self):
+    half = len(self.records) / 2
+
+    with MultiStreamEngine() as engine:
+      self._addStreams(engine)
+      expected = engine.handleRecords(self.records)
+
+    with MultiStreamEngine() as engine:
+      self._addStreams(engine)
+      scores = engine.handleRecords(self.records[:half])
+      engine.checkpoint(self.directory)
+
+    # Restore into a different number of workers.
+    with MultiStreamEngine(numWorkers=2) as engine:
+      engine.restore(self.directory)
+      self.assertEqual(engine.getStreamIds(), self.streamIds)
+      scores += engine.handleRecords(self.records[half:])
+
+    self.assertEqual(scores, expected)
+
+
+  def testRemoveStream(self):
+    with MultiStreamEngine(numWorkers=2) as engine:
+      self._addStreams(engine)
+      engine.removeStream("stream0")
+      self.assertEqual(engine.getStreamIds(), self.streamIds[1:])
+      self.assertRaises(KeyError, engine.handleRecord, "stream0",
+                        datetime.datetime(2017, 1, 1), 1.0)
+
+
+  def testUnknownStreamUpdatesNothing(self):
+    half = len(self.records) / 2
+
+    with MultiStreamEngine(numWorkers=2) as engine:
+      self._addStreams(engine)
+      expected = engine.handleRecords(self.records)
+
+    with MultiStreamEngine(numWorkers=2) as engine:
+      self._addStreams(engine)
+      scores = engine.handleRecords(self.records[:half])
+
+      unknownRecord = ("unknown", datetime.datetime(2017, 1, 1), 1.0)
+      self.assertRaises(KeyError, engine.handleRecords,
+                        self.records[half:] + [unknownRecord])
+
+      # None of the records of the failed batch were handled.
+      scores += engine.handleRecords(self.records[half:])
+
+    self.assertEqual(scores, expected)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
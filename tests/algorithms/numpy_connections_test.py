@@ -0,0 +1,370 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+"""
+Parity tests between NumpyConnections and nupic's SparseMatrixConnections.
+"""
+
+import unittest
+
+import numpy as np
+
+from htmresearch.algorithms.apical_dependent_temporal_memory import (
+  ApicalDependentSequenceMemory)
+from htmresearch.algorithms.apical_tiebreak_temporal_memory import (
+  ApicalTiebreakPairMemory, ApicalTiebreakSequenceMemory)
+from htmresearch.algorithms.superficial_location_module import (
+  SuperficialLocationModule2D)
+from htmresearch.support.numpy_connections import (
+  NumpyConnections, NumpyRandom, createConnections)
+from htmresearch.support.shared_tests.apical_tiebreak_test_base import (
+  ApicalTiebreakTestBase)
+
+
+
+class NumpyConnectionsParityTest(unittest.TestCase):
+  """
+  Apply the same random operations to both implementations and compare every
+  result.
+  """
+
+  CELL_COUNT = 50
+  INPUT_SIZE = 200
+
+  def setUp(self):
+    from nupic.bindings.math import Random, SparseMatrixConnections
+
+    self.cpp = SparseMatrixConnections(self.CELL_COUNT, self.INPUT_SIZE)
+    self.numpy = NumpyConnections(self.CELL_COUNT, self.INPUT_SIZE)
+    self.cppRng = Random(42)
+    self.numpyRng = Random(42)
+    self.rng = np.random.RandomState(1)
+
+
+  def _randomSubset(self, size, count):
+    return np.sort(self.rng.choice(size, count,
+                                   replace=False)).astype("uint32")
+
+
+  def _assertSameArrays(self, a, b):
+    np.testing.assert_array_equal(a, b)
+    self.assertEqual(np.asarray(a).dtype, np.asarray(b).dtype)
+
+
+  def _assertSameMatrix(self):
+    self.assertEqual(self.cpp.nSegments(), self.numpy.nSegments())
+    for segment in xrange(self.cpp.nSegments()):
+      np.testing.assert_array_equal(self.cpp.matrix.getRow(segment),
+                                    self.numpy.matrix.getRow(segment))
+
+
+  def _randomSegments(self):
+    n = self.cpp.nSegments()
+    if n == 0:
+      return np.empty(0, dtype="uint32")
+    segments = self.rng.choice(n, min(n, self.rng.randint(1, 10)),
+                               replace=False)
+    return segments.astype("uint32")
+
+
+  def testRandomOperations(self):
+    for _ in xrange(300):
+      op = self.rng.randint(7)
+      segments = self._randomSegments()
+      activeInput = self._randomSubset(self.INPUT_SIZE,
+                                       self.rng.randint(0, 40))
+
+      if op == 0:
+        cells = self.rng.randint(self.CELL_COUNT,
+                                 size=self.rng.randint(0, 5)).astype("uint32")
+        self._assertSameArrays(self.cpp.createSegments(cells),
+                               self.numpy.createSegments(cells))
+      elif op == 1:
+        if self.rng.randint(2):
+          sampleSize = int(self.rng.randint(-2, 15))
+        else:
+          sampleSize = self.rng.randint(-2, 15,
+                                        size=len(segments)).astype("int32")
+        self.cpp.growSynapsesToSample(segments, activeInput, sampleSize,
+                                      0.21, self.cppRng)
+        self.numpy.growSynapsesToSample(segments, activeInput, sampleSize,
+                                        0.21, self.numpyRng)
+      elif op == 2:
+        inc, dec = self.rng.choice([0.0, 0.05, 0.1, 0.3], size=2)
+        self.cpp.adjustSynapses(segments, activeInput, inc, -dec)
+        self.numpy.adjustSynapses(segments, activeInput, inc, -dec)
+      elif op == 3:
+        delta = self.rng.choice([-0.3, -0.1, 0.02, 0.1])
+        self.cpp.adjustActiveSynapses(segments, activeInput, delta)
+        self.numpy.adjustActiveSynapses(segments, activeInput, delta)
+      elif op == 4:
+        self.cpp.growSynapses(segments, activeInput, 0.3)
+        self.numpy.growSynapses(segments, activeInput, 0.3)
+      elif op == 5:
+        cells = self._randomSubset(self.CELL_COUNT, 10)
+        shuffled = self.rng.permutation(segments).astype("uint32")
+        self._assertSameArrays(
+          self.cpp.filterSegmentsByCell(shuffled, cells),
+          self.numpy.filterSegmentsByCell(shuffled, cells))
+        cppSorted = shuffled.copy()
+        numpySorted = shuffled.copy()
+        self.cpp.sortSegmentsByCell(cppSorted)
+        self.numpy.sortSegmentsByCell(numpySorted)
+        self._assertSameArrays(cppSorted, numpySorted)
+      elif op == 6:
+        delta = self.rng.choice([-0.1, 0.1])
+        self.cpp.adjustInactiveSynapses(segments, activeInput, delta)
+        self.numpy.adjustInactiveSynapses(segments, activeInput, delta)
+
+      # Check every query after every operation.
+      for threshold in (None, 0.21, 0.5):
+        if threshold is None:
+          args = (activeInput,)
+        else:
+          args = (activeInput, threshold)
+        self._assertSameArrays(self.cpp.computeActivity(*args),
+                               self.numpy.computeActivity(*args))
+
+      allSegments = np.arange(self.cpp.nSegments(), dtype="uint32")
+      self._assertSameArrays(self.cpp.mapSegmentsToCells(allSegments),
+                             self.numpy.mapSegmentsToCells(allSegments))
+      self._assertSameArrays(
+        self.cpp.mapSegmentsToSynapseCounts(allSegments),
+        self.numpy.mapSegmentsToSynapseCounts(allSegments))
+
+      allCells = np.arange(self.CELL_COUNT, dtype="uint32")
+      self._assertSameArrays(self.cpp.getSegmentCounts(allCells),
+                             self.numpy.getSegmentCounts(allCells))
+
+    self._assertSameMatrix()
+    self.assertEqual(self.cppRng.getUInt32(), self.numpyRng.getUInt32())
+
+
+
+class NumpyConnectionsTest(unittest.TestCase):
+  """
+  Tests of NumpyConnections on its own, without nupic.bindings.
+  """
+
+  CELL_COUNT = 50
+  INPUT_SIZE = 200
+
+  def _randomSubset(self, rng, size, count):
+    return np.sort(rng.choice(size, count, replace=False)).astype("uint32")
+
+
+  def testIndexesMatchScan(self):
+    """
+    After random structural changes, the segment and input indexes give the
+    same synapses as a scan of every segment's row.
+    """
+    c = NumpyConnections(self.CELL_COUNT, self.INPUT_SIZE)
+    rng = np.random.RandomState(42)
+    growthRng = NumpyRandom(3)
+
+    for _ in xrange(300):
+      op = rng.randint(5)
+      live = np.flatnonzero(
+        c.mapSegmentsToCells(np.arange(c.nSegments())) < self.CELL_COUNT)
+      segments = np.sort(rng.permutation(live)[:rng.randint(1, 10)]).astype(
+        "uint32")
+      activeInput = self._randomSubset(rng, self.INPUT_SIZE,
+                                       rng.randint(0, 40))
+
+      if op == 0:
+        c.createSegments(rng.randint(self.CELL_COUNT,
+                                     size=rng.randint(0, 5)))
+      elif op == 1:
+        c.growSynapsesToSample(segments, activeInput, rng.randint(0, 15),
+                               0.21, growthRng)
+      elif op == 2:
+        c.adjustSynapses(segments, activeInput, 0.05,
+                         -rng.choice([0.0, 0.1, 0.3]))
+      elif op == 3:
+        c.growSynapses(segments, activeInput, 0.3)
+      elif op == 4 and rng.randint(4) == 0:
+        c.destroySegments(segments[:2])
+
+      rows = np.array([c.matrix.getRow(segment)
+                       for segment in xrange(c.nSegments())],
+                      dtype="float32").reshape(c.nSegments(), self.INPUT_SIZE)
+      np.testing.assert_array_equal(
+        c.mapSegmentsToSynapseCounts(np.arange(c.nSegments())),
+        np.count_nonzero(rows, axis=1))
+      self.assertEqual(c.matrix.nNonZeros(), np.count_nonzero(rows))
+      for threshold in (None, 0.3):
+        connected = (rows > 0) if threshold is None else (rows >= threshold)
+        np.testing.assert_array_equal(
+          c.computeActivity(activeInput, threshold),
+          np.count_nonzero(connected[:, activeInput], axis=1))
+
+
+  def testUnknownImplementation(self):
+    with self.assertRaises(ValueError):
+      createConnections("fortran", 10, 10)
+
+
+
+class NumpyConnectionsModelParityTest(unittest.TestCase):
+  """
+  Run the models with both implementations and compare their outputs.
+  """
+
+  def _sdrs(self, rng, count, size, active):
+    return [np.sort(rng.choice(size, active, replace=False)).astype("uint32")
+            for _ in xrange(count)]
+
+
+  def testApicalTiebreakPairMemory(self):
+    params = {
+      "columnCount": 128,
+      "basalInputSize": 512,
+      "apicalInputSize": 256,
+      "cellsPerColumn": 6,
+      "activationThreshold": 6,
+      "minThreshold": 4,
+      "sampleSize": 10,
+      "basalPredictedSegmentDecrement": 0.02,
+      "maxSynapsesPerSegment": 16,
+    }
+    tms = [ApicalTiebreakPairMemory(connectionsImplementation=impl, **params)
+           for impl in ("cpp", "numpy")]
+
+    rng = np.random.RandomState(42)
+    columns = self._sdrs(rng, 8, 128, 8)
+    basal = self._sdrs(rng, 8, 512, 16)
+    apical = self._sdrs(rng, 8, 256, 12)
+
+    for step in xrange(100):
+      i = rng.randint(8)
+      for tm in tms:
+        tm.compute(columns[i], basal[i], apical[i], learn=(step < 80))
+      for getter in ("getActiveCells", "getWinnerCells", "getPredictedCells"):
+        np.testing.assert_array_equal(getattr(tms[0], getter)(),
+                                      getattr(tms[1], getter)())
+
+
+  def testSequenceMemories(self):
+    for cls in (ApicalTiebreakSequenceMemory, ApicalDependentSequenceMemory):
+      tms = [cls(columnCount=128, cellsPerColumn=4, apicalInputSize=128,
+                 activationThreshold=6, minThreshold=4, sampleSize=10,
+                 connectionsImplementation=impl)
+             for impl in ("cpp", "numpy")]
+
+      rng = np.random.RandomState(7)
+      columns = self._sdrs(rng, 10, 128, 8)
+      apical = self._sdrs(rng, 10, 128, 10)
+
+      for _ in xrange(5):
+        for i in xrange(10):
+          for tm in tms:
+            tm.compute(columns[i], apical[i], learn=True)
+          np.testing.assert_array_equal(tms[0].getActiveCells(),
+                                        tms[1].getActiveCells())
+          np.testing.assert_array_equal(tms[0].getNextPredictedCells(),
+                                        tms[1].getNextPredictedCells())
+        for tm in tms:
+          tm.reset()
+
+
+  def testSuperficialLocationModule(self):
+    modules = [SuperficialLocationModule2D(
+                 cellDimensions=(8, 8), moduleMapDimensions=(20.0, 20.0),
+                 orientation=0.3, anchorInputSize=300,
+                 connectionsImplementation=impl)
+               for impl in ("cpp", "numpy")]
+
+    rng = np.random.RandomState(3)
+    anchors = self._sdrs(rng, 6, 300, 20)
+    np.random.seed(11)
+    start = np.array([np.random.random(2) * modules[0].cellDimensions])
+
+    for learn in (True, False):
+      for module in modules:
+        module.activePoints = start.copy()
+        module._computeActiveCells()
+      for i in xrange(6):
+        for module in modules:
+          module.shift([1.5, -0.5])
+          if learn:
+            module.learn(anchors[i])
+          else:
+            module.anchor(anchors[i])
+        np.testing.assert_array_equal(modules[0].getActiveCells(),
+                                      modules[1].getActiveCells())
+
+
+
+class NumpyConnectionsApicalTiebreakTest(ApicalTiebreakTestBase,
+                                         unittest.TestCase):
+  """
+  Run the "apical tiebreak" tests on the ApicalTiebreakTemporalMemory with
+  NumpyConnections.
+  """
+
+  def constructTM(self, columnCount, basalInputSize, apicalInputSize,
+                  cellsPerColumn, initialPermanence, connectedPermanence,
+                  minThreshold, sampleSize, permanenceIncrement,
+                  permanenceDecrement, predictedSegmentDecrement,
+                  activationThreshold, seed):
+
+    self.tm = ApicalTiebreakPairMemory(
+      columnCount=columnCount,
+      cellsPerColumn=cellsPerColumn,
+      initialPermanence=initialPermanence,
+      connectedPermanence=connectedPermanence,
+      minThreshold=minThreshold,
+      sampleSize=sampleSize,
+      permanenceIncrement=permanenceIncrement,
+      permanenceDecrement=permanenceDecrement,
+      basalPredictedSegmentDecrement=predictedSegmentDecrement,
+      apicalPredictedSegmentDecrement=0.0,
+      activationThreshold=activationThreshold,
+      seed=seed,
+      basalInputSize=basalInputSize,
+      apicalInputSize=apicalInputSize,
+      connectionsImplementation="numpy")
+
+
+  def compute(self, activeColumns, basalInput, apicalInput, learn):
+    activeColumns = np.array(sorted(activeColumns), dtype="uint32")
+    basalInput = np.array(sorted(basalInput), dtype="uint32")
+    apicalInput = np.array(sorted(apicalInput), dtype="uint32")
+
+    self.tm.compute(activeColumns,
+                    basalInput=basalInput,
+                    basalGrowthCandidates=basalInput,
+                    apicalInput=apicalInput,
+                    apicalGrowthCandidates=apicalInput,
+                    learn=learn)
+
+
+  def getActiveCells(self):
+    return self.tm.getActiveCells()
+
+
+  def getPredictedCells(self):
+    return self.tm.getPredictedCells()
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,154 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import unittest
+
+import numpy as np
+from numpy.linalg import pinv
+
+from htmresearch.algorithms.online_extreme_learning_machine import (
+  OSELM, sigmoidActFunc)
+
+
+
+def pinvTrain(net, features, targets):
+  """
+  The sequential learning step as written in the OS-ELM paper.
+  """
+  H = net.calculateHiddenLayerActivation(features)
+  Ht = np.transpose(H)
+  net.M -= np.dot(net.M,
+                  np.dot(Ht, np.dot(
+                    pinv(np.eye(H.shape[0]) + np.dot(H, np.dot(net.M, Ht))),
+                    np.dot(H, net.M))))
+  net.beta += np.dot(net.M, np.dot(Ht, targets - np.dot(H, net.beta)))
+
+
+
+class OSELMTest(unittest.TestCase):
+
+  NUM_INPUTS = 12
+  NUM_HIDDEN = 20
+  NUM_INIT = 60
+
+
+  def setUp(self):
+    rng = np.random.RandomState(42)
+    self.features = rng.randn(300, self.NUM_INPUTS)
+    self.targets = (np.sin(self.features[:, :3].sum(axis=1)) +
+                    0.05 * rng.randn(300))[:, np.newaxis]
+
+
+  def _createNet(self, dtype="float64"):
+    np.random.seed(6)
+    net = OSELM(self.NUM_INPUTS, 1, numHiddenNeurons=self.NUM_HIDDEN,
+                activationFunction="sig", dtype=dtype)
+    net.initializePhase(self.features[:self.NUM_INIT],
+                        self.targets[:self.NUM_INIT])
+    return net
+
+
+  def testSigmoidActivation(self):
+    """
+    The broadcast bias gives the same activation as adding it per neuron.
+    """
+    features = self.features[:5]
+    weights = np.random.RandomState(1).rand(self.NUM_HIDDEN, self.NUM_INPUTS)
+    bias = np.random.RandomState(2).rand(1, self.NUM_HIDDEN)
+
+    V = np.dot(features, np.transpose(weights))
+    for i in range(self.NUM_HIDDEN):
+      V[:, i] += bias[0, i]
+    expected = 1 / (1 + np.exp(-V))
+
+    np.testing.assert_array_equal(sigmoidActFunc(features, weights, bias),
+                                  expected)
+
+
+  def testSingleSampleMatchesPinvUpdate(self):
+    """
+    The Sherman-Morrison update matches the update with the pseudoinverse.
+    """
+    net = self._createNet()
+    reference = self._createNet()
+
+    for i in range(self.NUM_INIT, 200):
+      net.train(self.features[[i]], self.targets[[i]])
+      pinvTrain(reference, self.features[[i]], self.targets[[i]])
+
+    np.testing.assert_allclose(net.beta, reference.beta, atol=1e-8)
+    np.testing.assert_allclose(net.M, reference.M,
+                               atol=1e-8 * np.abs(reference.M).max())
+
+
+  def testChunkMatchesPinvUpdate(self):
+    """
+    The Cholesky update of a chunk matches the update with the pseudoinverse.
+    """
+    net = self._createNet()
+    reference = self._createNet()
+
+    for start in range(self.NUM_INIT, 200, 20):
+      chunk = slice(start, start + 20)
+      net.train(self.features[chunk], self.targets[chunk])
+      pinvTrain(reference, self.features[chunk], self.targets[chunk])
+
+    np.testing.assert_allclose(net.beta, reference.beta, atol=1e-8)
+
+
+  def testTrainStream(self):
+    """
+    Training a stream in chunks matches training one sample at a time.
+    """
+    streamNet = self._createNet()
+    net = self._createNet()
+
+    numSamples = streamNet.trainStream(
+      zip(self.features[self.NUM_INIT:], self.targets[self.NUM_INIT:]),
+      chunkSize=32)
+    self.assertEqual(numSamples, 300 - self.NUM_INIT)
+
+    for i in range(self.NUM_INIT, 300):
+      net.train(self.features[[i]], self.targets[[i]])
+
+    np.testing.assert_allclose(streamNet.predict(self.features),
+                               net.predict(self.features), atol=1e-8)
+
+
+  def testFloat32(self):
+    """
+    A float32 network stays float32 and predicts close to a float64 one.
+    """
+    net32 = self._createNet("float32")
+    net64 = self._createNet()
+    for net in (net32, net64):
+      net.trainStream(zip(self.features[self.NUM_INIT:],
+                          self.targets[self.NUM_INIT:]))
+
+    self.assertEqual(net32.M.dtype, np.float32)
+    self.assertEqual(net32.beta.dtype, np.float32)
+    np.testing.assert_allclose(net32.predict(self.features),
+                               net64.predict(self.features), atol=1e-2)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,200 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import copy
+import cPickle as pickle
+import unittest
+
+import numpy
+
+from htmresearch.algorithms.sdr_classifier import SDRClassifier
+
+
+
+class SDRClassifierTest(unittest.TestCase):
+
+  def _records(self, rng, numRecords, numInputs, numBuckets):
+    records = []
+    for recordNum in xrange(numRecords):
+      bucketIdx = rng.randint(numBuckets)
+      patternNZ = numpy.sort(rng.choice(numInputs, 20,
+                                        replace=False)).tolist()
+      records.append((recordNum, patternNZ,
+                      {"bucketIdx": bucketIdx, "actValue": 1.5 * bucketIdx}))
+    return records
+
+
+  def testFirstLearningStep(self):
+    """
+    The first update moves the weights of the previous pattern's bits by
+    alpha * (target - uniform distribution).
+    """
+    c = SDRClassifier(steps=[1], alpha=0.1)
+    c.compute(0, [1, 5], {"bucketIdx": 0, "actValue": 0.0}, learn=True,
+              infer=False)
+    c.compute(1, [2], {"bucketIdx": 2, "actValue": 2.0}, learn=True,
+              infer=False)
+
+    expected = numpy.zeros((6, 3))
+    expected[[1, 5], :] = 0.1 * numpy.array([-1./3, -1./3, 2./3])
+    numpy.testing.assert_allclose(c._weightMatrix[1], expected)
+
+
+  def testRepeatedBitsCountTwice(self):
+    c = SDRClassifier(steps=[0], alpha=0.1)
+    c.compute(0, [3, 3], {"bucketIdx": 1, "actValue": 1.0}, learn=True,
+              infer=False)
+    numpy.testing.assert_allclose(c._weightMatrix[0][3],
+                                  [-0.1, 0.1])
+
+
+  def testLearnSequence(self):
+    c = SDRClassifier(steps=[1], alpha=0.5)
+    patterns = [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+    for recordNum in xrange(60):
+      i = recordNum % 3
+      c.compute(recordNum, patterns[i],
+                {"bucketIdx": i, "actValue": float(i)}, learn=True,
+                infer=False)
+
+    result = c.compute(60, patterns[0], {"bucketIdx": 0, "actValue": 0.0},
+                       learn=False, infer=True)
+    self.assertEqual(result[1].argmax(), 1)
+    self.assertGreater(result[1][1], 0.9)
+    self.assertEqual(result["actualValues"], [0.0, 1.0, 2.0])
+
+
+  def testLargeActivations(self):
+    """
+    Inference doesn't overflow when activations are large.
+    """
+    c = SDRClassifier(steps=[1])
+    c.compute(0, [0, 1], {"bucketIdx": 2, "actValue": 2.0}, learn=True,
+              infer=False)
+    c._weightMatrix[1][:] = [1000.0, 2000.0, 0.0]
+    dist = c.inferSingleStep([0, 1], c._weightMatrix[1])
+    self.assertFalse(numpy.any(numpy.isnan(dist)))
+    numpy.testing.assert_allclose(dist, [0.0, 1.0, 0.0])
+
+
+  def testComputeBatchMatchesCompute(self):
+    rng = numpy.random.RandomState(42)
+    records = self._records(rng, 300, 500, 8)
+
+    c1 = SDRClassifier(steps=[0, 1, 3], alpha=0.05)
+    c2 = SDRClassifier(steps=[0, 1, 3], alpha=0.05)
+
+    expected = [c1.compute(recordNum, patternNZ, classification, True, True)
+                for recordNum, patternNZ, classification in records[:200]]
+    results = c2.computeBatch(records[:200], learn=True)
+    for result, expectedResult in zip(results, expected):
+      self.assertEqual(set(result.keys()), set(expectedResult.keys()))
+      for key in expectedResult:
+        numpy.testing.assert_allclose(result[key], expectedResult[key])
+
+    # Include inputs that haven't been seen.
+    scoring = [(recordNum, [b + 100 for b in patternNZ], classification)
+               for recordNum, patternNZ, classification in records[200:]]
+    expected = [c1.compute(recordNum, patternNZ, classification, False, True)
+                for recordNum, patternNZ, classification in scoring]
+    results = c2.computeBatch(scoring)
+    for result, expectedResult in zip(results, expected):
+      for key in expectedResult:
+        numpy.testing.assert_allclose(result[key], expectedResult[key])
+
+    for nSteps in (0, 1, 3):
+      numpy.testing.assert_allclose(c1._weightMatrix[nSteps],
+                                    c2._weightMatrix[nSteps])
+
+
+  def testWeightMatrixIsKeptUntilWeightsGrow(self):
+    c = SDRClassifier(steps=[1], alpha=0.1)
+    c.compute(0, [1, 5], {"bucketIdx": 0, "actValue": 0.0}, learn=True,
+              infer=False)
+    weightMatrix = c._weightMatrix
+    self.assertIs(c._weightMatrix, weightMatrix)
+
+    c.compute(1, [7], {"bucketIdx": 2, "actValue": 2.0}, learn=True,
+              infer=False)
+    self.assertIsNot(c._weightMatrix, weightMatrix)
+    self.assertEqual(c._weightMatrix[1].shape, (8, 3))
+
+
+  def testSetWeightMatrix(self):
+    c = SDRClassifier(steps=[1])
+    c.compute(0, [0, 1], {"bucketIdx": 1, "actValue": 1.0}, learn=True,
+              infer=False)
+    c._weightMatrix = {1: [[0.0, 0.0, 2.0],
+                           [0.0, 0.0, 3.0],
+                           [4.0, 0.0, 0.0]]}
+    self.assertEqual((c._maxInputIdx, c._maxBucketIdx), (2, 2))
+
+    dist = c.inferSingleStep([0, 1], c._weightMatrix[1])
+    self.assertEqual(dist.argmax(), 2)
+
+    # Inputs and buckets past the new weights still grow them.
+    c.compute(1, [4], {"bucketIdx": 3, "actValue": 3.0}, learn=True,
+              infer=False)
+    self.assertEqual(c._weightMatrix[1].shape, (5, 4))
+    numpy.testing.assert_equal(c._weightMatrix[1][2], [4.0, 0.0, 0.0, 0.0])
+
+    with self.assertRaises(ValueError):
+      c._weightMatrix = {1: numpy.zeros((2, 2)), 2: numpy.zeros((3, 2))}
+
+
+  def testPickle(self):
+    rng = numpy.random.RandomState(42)
+    records = self._records(rng, 40, 100, 5)
+    # Later, new inputs and buckets grow the weights.
+    records += [(40 + recordNum, patternNZ, classification)
+                for recordNum, patternNZ, classification
+                in self._records(rng, 20, 200, 8)]
+    c1 = SDRClassifier(steps=[0, 1], alpha=0.05)
+    for recordNum, patternNZ, classification in records[:30]:
+      c1.compute(recordNum, patternNZ, classification, True, False)
+    c2 = pickle.loads(pickle.dumps(c1, pickle.HIGHEST_PROTOCOL))
+
+    # A classifier pickled when the weights were a plain attribute.
+    state = copy.deepcopy(c1.__getstate__())
+    state["_weightMatrix"] = dict((nSteps, weights.copy())
+                                  for nSteps, weights
+                                  in c1._weightMatrix.iteritems())
+    del state["_weights"]
+    del state["_weightMatrixViews"]
+    c3 = SDRClassifier.__new__(SDRClassifier)
+    c3.__setstate__(state)
+
+    for recordNum, patternNZ, classification in records[30:]:
+      expected = c1.compute(recordNum, patternNZ, classification, True, True)
+      for c in (c2, c3):
+        result = c.compute(recordNum, patternNZ, classification, True, True)
+        for nSteps in (0, 1):
+          numpy.testing.assert_allclose(result[nSteps], expected[nSteps])
+
+    for c in (c2, c3):
+      for nSteps in (0, 1):
+        numpy.testing.assert_allclose(c._weightMatrix[nSteps],
+                                      c1._weightMatrix[nSteps])
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,163 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import copy
+import unittest
+
+import numpy
+
+from htmresearch.algorithms.temporal_pooler import TemporalPooler
+
+
+
+def adaptSynapsesOneColumnAtATime(tp, inputVector, activeColumns,
+                                  predictedActiveCells):
+  """
+  The previous TemporalPooler._adaptSynapses.
+  """
+  permChanges = numpy.zeros(tp._numInputs)
+  permChanges.fill(-1 * tp._synPermInactiveDec)
+  permChanges[numpy.where(inputVector > 0)[0]] = tp._synPermActiveInc
+  permChanges[numpy.where(predictedActiveCells > 0)[0]] = tp._synPredictedInc
+
+  for i in activeColumns:
+    perm = tp._permanences.getRow(i)
+    maskPotential = numpy.where(tp._potentialPools.getRow(i) > 0)[0]
+    perm[maskPotential] += permChanges[maskPotential]
+    tp._updatePermanencesForColumn(perm, i, raisePerm=False)
+
+
+
+class TemporalPoolerTest(unittest.TestCase):
+
+  def setUp(self):
+    self.tp = TemporalPooler(inputDimensions=[400],
+                             columnDimensions=[50],
+                             potentialRadius=400,
+                             potentialPct=0.7,
+                             globalInhibition=True,
+                             numActiveColumnsPerInhArea=10,
+                             synPermInactiveDec=0.01,
+                             synPermActiveInc=0.03,
+                             synPredictedInc=0.5,
+                             boostStrength=1.0,
+                             seed=42)
+    self.rng = numpy.random.RandomState(42)
+
+
+  def randomInput(self):
+    activeInput = numpy.sort(self.rng.choice(400, 40, replace=False))
+    predictedInput = numpy.sort(self.rng.choice(activeInput, 15,
+                                                replace=False))
+    inputVector = numpy.zeros(400, dtype="float32")
+    inputVector[activeInput] = 1
+    predictedCells = numpy.zeros(400, dtype="float32")
+    predictedCells[predictedInput] = 1
+    return activeInput, predictedInput, inputVector, predictedCells
+
+
+  def assertSamePermanences(self, tp1, tp2):
+    for column in xrange(tp1.getNumColumns()):
+      permanences = tp1._permanences.getRow(column)
+      numpy.testing.assert_allclose(permanences,
+                                    tp2._permanences.getRow(column),
+                                    atol=1e-5)
+      # A synapse within float32 rounding of the connected permanence can be
+      # connected in one pooler only.
+      clear = numpy.abs(permanences - tp1._synPermConnected) > 1e-5
+      numpy.testing.assert_equal(tp1._connectedSynapses.getRow(column)[clear],
+                                 tp2._connectedSynapses.getRow(column)[clear])
+    for tp in (tp1, tp2):
+      numpy.testing.assert_equal(tp._connectedCounts,
+                                 tp._connectedSynapses.rowSums())
+
+
+  def testAdaptSynapsesMatchesOneColumnAtATime(self):
+    reference = copy.deepcopy(self.tp)
+
+    for _ in xrange(50):
+      _, _, inputVector, predictedCells = self.randomInput()
+      activeColumns = self.rng.choice(50, 10, replace=False)
+
+      self.tp._adaptSynapses(inputVector, activeColumns, predictedCells)
+      adaptSynapsesOneColumnAtATime(reference, inputVector, activeColumns,
+                                    predictedCells)
+
+    self.assertSamePermanences(self.tp, reference)
+
+
+  def testSynapsesStayInPotentialPools(self):
+    for _ in xrange(20):
+      activeInput, predictedInput, _, _ = self.randomInput()
+      self.tp._adaptSynapsesSparse(activeInput, numpy.arange(50),
+                                   predictedInput)
+
+    for column in xrange(50):
+      potential = self.tp._potentialPools.getRow(column) > 0
+      self.assertFalse(self.tp._permanences.getRow(column)[~potential].any())
+
+
+  def testComputeSparseMatchesCompute(self):
+    tp2 = copy.deepcopy(self.tp)
+    activeArray1 = numpy.zeros(50, dtype="uint32")
+    activeArray2 = numpy.zeros(50, dtype="uint32")
+    burstingColumns = numpy.zeros(50, dtype="uint32")
+
+    for _ in xrange(30):
+      activeInput, predictedInput, inputVector, predictedCells = (
+        self.randomInput())
+
+      active1 = self.tp.compute(inputVector, True, activeArray1,
+                                burstingColumns, predictedCells)
+      active2 = tp2.computeSparse(activeInput, True, activeArray2,
+                                  burstingColumns, predictedInput)
+
+      self.assertEqual(sorted(active1), sorted(active2))
+      numpy.testing.assert_equal(activeArray1, activeArray2)
+      numpy.testing.assert_equal(self.tp._poolingMask,
+                                 self.tp._poolingActivation > 0)
+
+    self.assertSamePermanences(self.tp, tp2)
+
+
+  def testSetStateRebuildsPoolingMaskAndPotentialBits(self):
+    activeArray = numpy.zeros(50, dtype="uint32")
+    burstingColumns = numpy.zeros(50, dtype="uint32")
+    for _ in xrange(5):
+      activeInput, predictedInput, _, _ = self.randomInput()
+      self.tp.computeSparse(activeInput, True, activeArray, burstingColumns,
+                            predictedInput)
+    self.assertTrue(self.tp._poolingMask.any())
+
+    # The state of a pooler pickled before these attributes existed.
+    state = copy.deepcopy(self.tp.__dict__)
+    del state["_poolingMask"]
+    del state["_potentialBits"]
+    tp2 = TemporalPooler.__new__(TemporalPooler)
+    tp2.__setstate__(state)
+
+    numpy.testing.assert_equal(tp2._poolingMask, self.tp._poolingMask)
+    numpy.testing.assert_equal(tp2._potentialBits, self.tp._potentialBits)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
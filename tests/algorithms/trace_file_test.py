@@ -0,0 +1,176 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from htmresearch.support.trace_file import (TraceWriter, TraceFile,
+                                            convertCsvTraces)
+
+
+
+class TraceFileTest(unittest.TestCase):
+
+  def setUp(self):
+    self.rng = numpy.random.RandomState(42)
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, "trace")
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def _randomRows(self, n):
+    return [{"t": i,
+             "score": float(self.rng.rand()),
+             "reset": bool(i % 3 == 0),
+             "activeCells": self.rng.choice(1000, size=self.rng.randint(0, 20),
+                                            replace=False)}
+            for i in xrange(n)]
+
+
+  def _writeCsv(self, headers, rows):
+    csvPath = os.path.join(self.directory, "trace.csv")
+    with open(csvPath, "wb") as f:
+      writer = csv.writer(f)
+      writer.writerow(headers)
+      for row in rows:
+        writer.writerow([json.dumps(value) if value is not None else None
+                         for value in row])
+    return csvPath
+
+
+  def testWriteAndLoad(self):
+    rows = self._randomRows(23)
+    with TraceWriter(self.path, sdrWidths={"activeCells": 1000},
+                     chunkSize=5) as writer:
+      for row in rows:
+        writer.append(row)
+      writer.append({"t": 23})
+
+    for mmap in [True, False]:
+      trace = TraceFile(self.path, mmap=mmap)
+      self.assertEqual(len(trace), 24)
+      self.assertEqual(sorted(trace.keys()),
+                       ["activeCells", "reset", "score", "t"])
+      self.assertEqual(trace["t"].dtype, numpy.int64)
+      self.assertEqual(trace["reset"].dtype, numpy.bool_)
+      numpy.testing.assert_equal(trace["t"], range(24))
+      numpy.testing.assert_equal(trace["score"][:23],
+                                 [row["score"] for row in rows])
+      self.assertTrue(numpy.isnan(trace["score"][23]))
+
+      cells = trace["activeCells"]
+      self.assertEqual(len(cells), 24)
+      self.assertEqual(cells.width, 1000)
+      for i, row in enumerate(rows):
+        numpy.testing.assert_equal(cells[i], row["activeCells"])
+      self.assertEqual(len(cells[-1]), 0)
+      self.assertRaises(IndexError, cells.__getitem__, 24)
+
+      sliced = cells[5:12]
+      self.assertEqual(len(sliced), 7)
+      numpy.testing.assert_equal(sliced[0], rows[5]["activeCells"])
+      dense = sliced.toSparse().toarray()
+      self.assertEqual(dense.shape, (7, 1000))
+      for i in xrange(7):
+        numpy.testing.assert_equal(numpy.flatnonzero(dense[i]),
+                                   numpy.sort(rows[5 + i]["activeCells"]))
+
+
+  def testInterruptedRun(self):
+    writer = TraceWriter(self.path, chunkSize=5)
+    for row in self._randomRows(10):
+      writer.append(row)
+    writer.flush()
+
+    # The last chunk of the "score" column is missing.
+    valuesPath = os.path.join(self.path, "column2-values.bin")
+    with open(valuesPath, "r+b") as f:
+      f.truncate(5 * 8)
+
+    trace = TraceFile(self.path)
+    self.assertEqual(len(trace), 5)
+    self.assertEqual(len(trace["activeCells"]), 5)
+    numpy.testing.assert_equal(trace["t"], range(5))
+
+
+  def testMixedIntAndFloatColumn(self):
+    values = [5, 6, 7, 5.5, 0.37, None, 8]
+    with TraceWriter(self.path, chunkSize=3) as writer:
+      for t, value in enumerate(values):
+        writer.append({"t": t, "score": value})
+
+    trace = TraceFile(self.path)
+    self.assertEqual(trace["t"].dtype, numpy.int64)
+    self.assertEqual(trace["score"].dtype, numpy.float64)
+    numpy.testing.assert_equal(trace["score"],
+                               [5.0, 6.0, 7.0, 5.5, 0.37, numpy.nan, 8.0])
+
+    csvPath = self._writeCsv(["score"], [[value] for value in values])
+    convertCsvTraces(csvPath, self.path, chunkSize=2)
+    numpy.testing.assert_equal(TraceFile(self.path)["score"],
+                               [5.0, 6.0, 7.0, 5.5, 0.37, numpy.nan, 8.0])
+
+
+  def testConvertTimeIndexedCsv(self):
+    rows = self._randomRows(12)
+    csvPath = self._writeCsv(
+      ["t", "score", "activeCells"],
+      [[row["t"], row["score"] if row["t"] != 4 else None,
+        row["activeCells"].tolist()] for row in rows])
+
+    self.assertEqual(convertCsvTraces(csvPath, self.path, chunkSize=5), 12)
+    trace = TraceFile(self.path)
+    numpy.testing.assert_equal(trace["t"], range(12))
+    self.assertTrue(numpy.isnan(trace["score"][4]))
+    self.assertEqual(trace["score"][5], rows[5]["score"])
+    for i, row in enumerate(rows):
+      numpy.testing.assert_equal(trace["activeCells"][i], row["activeCells"])
+
+
+  def testConvertSequenceIndexedCsv(self):
+    sequences = [[self.rng.choice(100, size=5, replace=False).tolist()
+                  for _ in xrange(4)]
+                 for _ in xrange(3)]
+    csvPath = self._writeCsv(["label", "activeColumns"],
+                             [[7 + i, sequence]
+                              for i, sequence in enumerate(sequences)])
+
+    self.assertEqual(convertCsvTraces(csvPath, self.path), 12)
+    trace = TraceFile(self.path)
+    numpy.testing.assert_equal(trace["sequence"], numpy.repeat(range(3), 4))
+    numpy.testing.assert_equal(trace["label"], numpy.repeat([7, 8, 9], 4))
+    for i in xrange(12):
+      numpy.testing.assert_equal(trace["activeColumns"][i],
+                                 sequences[i / 4][i % 4])
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,281 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from nupic.algorithms.monitor_mixin.metric import Metric
+from nupic.algorithms.monitor_mixin.trace import CountsTrace, BoolsTrace
+
+from htmresearch.algorithms.column_pooler import ColumnPooler
+from htmresearch.support.column_pooler_mixin import ColumnPoolerMonitorMixin
+from htmresearch.support.trace_store import (TraceStore, ChunkedIndices,
+                                             ChunkedValues, createMetric)
+
+
+
+class MonitoredColumnPooler(ColumnPoolerMonitorMixin, ColumnPooler):
+  pass
+
+
+
+class TraceStoreTest(unittest.TestCase):
+
+  def setUp(self):
+    self.rng = numpy.random.RandomState(42)
+    self.directory = tempfile.mkdtemp()
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def _randomSets(self, n):
+    return [set(self.rng.choice(100, size=self.rng.randint(0, 10),
+                                replace=False).tolist())
+            for _ in xrange(n)]
+
+
+  def testIndicesActLikeList(self):
+    sets = self._randomSets(23)
+    data = ChunkedIndices(5, None, None)
+    data.extend(sets)
+
+    self.assertEqual(len(data), 23)
+    self.assertEqual(list(data), sets)
+    self.assertEqual(data[0], sets[0])
+    self.assertEqual(data[7], sets[7])
+    self.assertEqual(data[-1], sets[-1])
+    self.assertEqual(data[3:18:2], sets[3:18:2])
+    self.assertRaises(IndexError, data.__getitem__, 23)
+
+    counts = numpy.concatenate(list(data.counts()))
+    numpy.testing.assert_equal(counts, [len(s) for s in sets])
+
+
+  def testValuesActLikeList(self):
+    labels = ["A", None, "B"] * 5
+    data = ChunkedValues(4, None, None, "object")
+    data.extend(labels)
+    self.assertEqual(list(data), labels)
+    self.assertEqual(data[-2], labels[-2])
+
+    counts = range(15)
+    data = ChunkedValues(4, None, None, "int64")
+    data.extend(counts)
+    self.assertEqual(list(data), counts)
+    self.assertEqual(data[5:], counts[5:])
+
+
+  def testRetention(self):
+    sets = self._randomSets(23)
+    data = ChunkedIndices(5, 2, None)
+    data.extend(sets)
+
+    # Two full chunks plus the three timesteps being filled.
+    self.assertEqual(len(data), 13)
+    self.assertEqual(data.numDropped, 10)
+    self.assertEqual(list(data), sets[10:])
+
+
+  def testReleaseResetsDroppedCount(self):
+    data = ChunkedIndices(5, 2, None)
+    data.extend(self._randomSets(23))
+    data.release()
+
+    self.assertEqual(len(data), 0)
+    self.assertEqual(data.numDropped, 0)
+    sets = self._randomSets(3)
+    data.extend(sets)
+    self.assertEqual(list(data), sets)
+    self.assertEqual(data.numDropped, 0)
+
+
+  def testSpillToDisk(self):
+    store = TraceStore(chunkSize=5, maxChunks=2, directory=self.directory)
+    trace = store.indicesTrace(None, "cells")
+    sets = self._randomSets(23)
+    for s in sets:
+      trace.data.append(s)
+
+    self.assertEqual(list(trace.data), sets[10:])
+
+    # Only the files of the retained chunks remain.
+    self.assertEqual(len(os.listdir(self.directory)), 4)
+
+    store.release()
+    self.assertEqual(os.listdir(self.directory), [])
+
+
+  def testMakeCountsTrace(self):
+    store = TraceStore(chunkSize=4)
+    trace = store.indicesTrace(None, "cells")
+    sets = self._randomSets(10)
+    for s in sets:
+      trace.data.append(s)
+
+    countsTrace = trace.makeCountsTrace()
+    self.assertEqual(countsTrace.title, "# cells")
+    self.assertEqual(list(countsTrace.data), [len(s) for s in sets])
+
+
+  def testCreateMetric(self):
+    counts = self.rng.randint(0, 50, size=37).tolist()
+    resets = (self.rng.rand(37) < 0.2).tolist()
+
+    listCounts = CountsTrace(None, "counts")
+    listCounts.data = counts
+    listResets = BoolsTrace(None, "resets")
+    listResets.data = resets
+
+    store = TraceStore(chunkSize=8)
+    chunkedCounts = store.countsTrace(None, "counts")
+    chunkedCounts.data.extend(counts)
+    chunkedResets = store.boolsTrace(None, "resets")
+    chunkedResets.data.extend(resets)
+
+    for excludeResets in (None, (listResets, chunkedResets)):
+      expected = Metric.createFromTrace(
+        listCounts,
+        excludeResets=excludeResets[0] if excludeResets else None)
+      actual = createMetric(
+        chunkedCounts,
+        excludeResets=excludeResets[1] if excludeResets else None)
+
+      self.assertEqual(actual.min, expected.min)
+      self.assertEqual(actual.max, expected.max)
+      self.assertEqual(actual.sum, expected.sum)
+      self.assertAlmostEqual(actual.mean, expected.mean)
+      self.assertAlmostEqual(actual.standardDeviation,
+                             expected.standardDeviation)
+
+
+  def testCreateMetricAfterDroppingChunks(self):
+    """
+    The resets are lined up with the trace by absolute timestep, whether or not
+    they have dropped the same chunks.
+    """
+    counts = self.rng.randint(0, 50, size=37).tolist()
+    resets = (self.rng.rand(37) < 0.2).tolist()
+
+    store = TraceStore(chunkSize=8, maxChunks=2)
+    chunkedCounts = store.countsTrace(None, "counts")
+    chunkedCounts.data.extend(counts)
+    chunkedResets = store.boolsTrace(None, "resets")
+    chunkedResets.data.extend(resets)
+    self.assertEqual(chunkedCounts.data.numDropped, 16)
+
+    listCounts = CountsTrace(None, "counts")
+    listCounts.data = counts[16:]
+    listResets = BoolsTrace(None, "resets")
+    listResets.data = resets[16:]
+    expected = Metric.createFromTrace(listCounts, excludeResets=listResets)
+
+    allResets = BoolsTrace(None, "resets")
+    allResets.data = resets
+    for excludeResets in (chunkedResets, allResets):
+      actual = createMetric(chunkedCounts, excludeResets=excludeResets)
+      self.assertEqual(actual.min, expected.min)
+      self.assertEqual(actual.max, expected.max)
+      self.assertEqual(actual.sum, expected.sum)
+      self.assertAlmostEqual(actual.mean, expected.mean)
+      self.assertAlmostEqual(actual.standardDeviation,
+                             expected.standardDeviation)
+
+    # Resets that don't reach the trace's last timestep can't be lined up.
+    shortResets = BoolsTrace(None, "resets")
+    shortResets.data = resets[:-1]
+    self.assertRaises(AssertionError, createMetric, chunkedCounts,
+                      excludeResets=shortResets)
+
+
+  def testMonitorMixin(self):
+    """
+    A monitored pooler records the same history with either kind of trace.
+    """
+    params = {"inputWidth": 1024, "cellCount": 512, "seed": 42}
+    listPooler = MonitoredColumnPooler(**params)
+    storePooler = MonitoredColumnPooler(
+      mmTraceStore=TraceStore(chunkSize=3, directory=self.directory),
+      **params)
+
+    for i in xrange(10):
+      if i % 4 == 0:
+        listPooler.reset()
+        storePooler.reset()
+      feedforwardInput = sorted(self.rng.choice(1024, size=20, replace=False))
+      listPooler.compute(feedforwardInput, learn=True, sequenceLabel=str(i % 4))
+      storePooler.compute(feedforwardInput, learn=True,
+                          sequenceLabel=str(i % 4))
+
+    for name in ("activeCells", "numProximalSynapses", "sequenceLabels",
+                 "resets"):
+      self.assertEqual(list(storePooler._mmTraces[name].data),
+                       list(listPooler._mmTraces[name].data))
+
+    expected = listPooler.mmGetMetricFromTrace(
+      listPooler.mmGetTraceActiveCells())
+    actual = storePooler.mmGetMetricFromTrace(
+      storePooler.mmGetTraceActiveCells())
+    self.assertEqual(actual.sum, expected.sum)
+    self.assertAlmostEqual(actual.mean, expected.mean)
+
+    storePooler.mmClearHistory()
+    self.assertEqual(len(storePooler.mmGetTraceActiveCells().data), 0)
+    self.assertEqual(os.listdir(self.directory), [])
+
+
+  def testSharedStore(self):
+    """
+    Clearing the history of one monitor keeps the traces of the others that
+    share its store.
+    """
+    store = TraceStore(chunkSize=3, directory=self.directory)
+    params = {"inputWidth": 1024, "cellCount": 512, "seed": 42}
+    pooler1 = MonitoredColumnPooler(mmTraceStore=store, **params)
+    pooler2 = MonitoredColumnPooler(mmTraceStore=store, **params)
+
+    for _ in xrange(7):
+      feedforwardInput = sorted(self.rng.choice(1024, size=20, replace=False))
+      pooler1.compute(feedforwardInput, learn=True)
+      pooler2.compute(feedforwardInput, learn=True)
+    expected = list(pooler2.mmGetTraceActiveCells().data)
+    numFiles = len(os.listdir(self.directory))
+
+    pooler1.mmClearHistory()
+    self.assertEqual(len(pooler1.mmGetTraceActiveCells().data), 0)
+    self.assertEqual(list(pooler2.mmGetTraceActiveCells().data), expected)
+    self.assertEqual(len(os.listdir(self.directory)), numFiles / 2)
+
+    # New chunks of pooler1 don't overwrite the files of pooler2.
+    for _ in xrange(7):
+      feedforwardInput = sorted(self.rng.choice(1024, size=20, replace=False))
+      pooler1.compute(feedforwardInput, learn=True)
+    self.assertEqual(list(pooler2.mmGetTraceActiveCells().data), expected)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
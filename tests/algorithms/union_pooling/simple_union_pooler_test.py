@@ -129,6 +129,59 @@ class SimpleUnionPoolerTest(unittest.TestCase):
     self.assertEqual(sum(self.unionPooler._unionSDR), 0)
 
 
+  def testMatchesUnionOfWindow(self):
+    historyLength = 5
+    unionPooler = SimpleUnionPooler(numInputs=2048, historyLength=historyLength,
+                                    minHistory=3)
+    rng = numpy.random.RandomState(42)
+    history = []
+    outputVector = numpy.zeros(shape=(2048,))
+    for i in xrange(50):
+      # Overlapping inputs, with a repeated index
+      activeCells = list(rng.randint(200, size=20)) + [7, 7]
+      forceOutput = (i % 11 == 1)
+      unionPooler.unionIntoArray(activeCells, outputVector,
+                                 forceOutput=forceOutput)
+      history = (history + [activeCells])[-historyLength:]
+
+      if len(history) >= 3 or forceOutput:
+        expected = set(c for cells in history for c in cells)
+      else:
+        expected = set()
+      self.assertSetEqual(set(numpy.where(outputVector)[0]), expected)
+      self.assertSetEqual(set(unionPooler.getUnionSDR()), expected)
+      self.assertAlmostEqual(unionPooler.getSparsity(),
+                             len(expected) / 2048.0)
+
+
+  def testZeroHistoryLength(self):
+    unionPooler = SimpleUnionPooler(numInputs=2048, historyLength=0)
+    outputVector = numpy.ones(shape=(2048,))
+    unionPooler.unionIntoArray([1, 3, 4], outputVector)
+    self.assertEqual(numpy.count_nonzero(outputVector), 0)
+    self.assertEqual(len(unionPooler.getUnionSDR()), 0)
+
+    unionPooler.unionIntoArray([3, 5], outputVector, forceOutput=True)
+    self.assertEqual(numpy.count_nonzero(outputVector), 0)
+    self.assertEqual(len(unionPooler.getUnionSDR()), 0)
+    self.assertAlmostEqual(unionPooler.getSparsity(), 0.0)
+
+
+  def testUpdateHistoryReturnsCopy(self):
+    first = self.unionPooler.updateHistory([1, 3])
+    self.unionPooler.updateHistory([5])
+    self.assertSetEqual(set(numpy.flatnonzero(first)), set([1, 3]))
+
+
+  def testGetUnionSDR(self):
+    self.unionPooler.unionIntoArray([405, 3, 1], numpy.zeros(2048))
+    self.unionPooler.unionIntoArray([101, 3], numpy.zeros(2048))
+    self.assertEqual(list(self.unionPooler.getUnionSDR()), [1, 3, 101, 405])
+
+    self.unionPooler.reset()
+    self.assertEqual(len(self.unionPooler.getUnionSDR()), 0)
+
+
 
 if __name__ == "__main__":
   unittest.main()
\ No newline at end of file
@@ -124,5 +124,124 @@ class UnionTemporalPoolerTest(unittest.TestCase):
     self.assertEquals(result[1], 4)
 
 
+  def _createLearningPooler(self, historyLength, foldHistoryLearning=False):
+    return UnionTemporalPooler(inputDimensions=(200, ),
+                               columnDimensions=(40, ),
+                               potentialRadius=200,
+                               potentialPct=0.7,
+                               globalInhibition=True,
+                               numActiveColumnsPerInhArea=8.0,
+                               synPermInactiveDec=0.01,
+                               synPermActiveInc=0.03,
+                               synPermConnected=0.3,
+                               boostStrength=0.0,
+                               seed=42,
+                               synPermPredActiveInc=0.05,
+                               synPermPreviousPredActiveInc=0.04,
+                               historyLength=historyLength,
+                               foldHistoryLearning=foldHistoryLearning)
+
+
+  def _getPermanences(self, pooler):
+    perms = numpy.zeros((40, 200), dtype=REAL_DTYPE)
+    for column in xrange(40):
+      pooler.getPermanence(column, perms[column])
+    return perms
+
+
+  def _checkAdaptSynapsesForStep(self, historyLength, foldHistoryLearning):
+    """
+    Run _adaptSynapsesForStep and the separate _adaptSynapses calls it
+    replaces from the same state, and check the permanences are identical.
+    """
+    pooler = self._createLearningPooler(historyLength, foldHistoryLearning)
+    reference = self._createLearningPooler(historyLength)
+    rng = numpy.random.RandomState(42)
+
+    for _ in xrange(10):
+      predictedActiveInput = (rng.rand(200) < 0.15).astype(REAL_DTYPE)
+      history = (rng.rand(200, historyLength) < 0.15).astype(REAL_DTYPE)
+      activeCells = numpy.sort(rng.choice(40, 8, replace=False))
+      unionSDR = numpy.sort(rng.choice(40, 10, replace=False)).astype("uint32")
+      for p in (pooler, reference):
+        p._unionSDR = unionSDR
+        p._prePredictedActiveInput = history
+
+      pooler._adaptSynapsesForStep(predictedActiveInput, activeCells)
+
+      reference._adaptSynapses(predictedActiveInput, activeCells,
+                               reference.getSynPermActiveInc(),
+                               reference.getSynPermInactiveDec())
+      reference._adaptSynapses(predictedActiveInput, unionSDR, 0.05, 0.0)
+      for i in xrange(historyLength):
+        reference._adaptSynapses(history[:, i], activeCells, 0.04, 0.0)
+
+    numpy.testing.assert_array_equal(self._getPermanences(pooler),
+                                     self._getPermanences(reference))
+
+
+  def testAdaptSynapsesForStep(self):
+    self._checkAdaptSynapsesForStep(0, False)
+    self._checkAdaptSynapsesForStep(5, False)
+
+
+  def testFoldedHistoryLearningOneStep(self):
+    # With one previous step there is nothing to fold
+    self._checkAdaptSynapsesForStep(1, True)
+
+
+  def testFoldedHistoryLearningMatchesStepByStep(self):
+    historyLength = 4
+    folded = self._createLearningPooler(historyLength, foldHistoryLearning=True)
+    stepByStep = self._createLearningPooler(historyLength)
+    rng = numpy.random.RandomState(42)
+
+    for _ in xrange(10):
+      predictedActiveInput = (rng.rand(200) < 0.15).astype(REAL_DTYPE)
+      history = (rng.rand(200, historyLength) < 0.3).astype(REAL_DTYPE)
+      self.assertTrue(((history > 0).sum(axis=1) >= 3).any())
+      activeCells = numpy.sort(rng.choice(40, 8, replace=False))
+      unionSDR = numpy.sort(rng.choice(40, 10, replace=False)).astype("uint32")
+      for p in (folded, stepByStep):
+        p._unionSDR = unionSDR
+        p._prePredictedActiveInput = history
+        p._adaptSynapsesForStep(predictedActiveInput, activeCells)
+
+    # Every increment is above the trim threshold, so summing them first only
+    # changes the float32 rounding.
+    numpy.testing.assert_allclose(self._getPermanences(folded),
+                                  self._getPermanences(stepByStep), atol=1e-6)
+
+
+  def testFoldedHistoryLearningGrowsIncrementsBelowTrimThreshold(self):
+    historyLength = 3
+    folded = self._createLearningPooler(historyLength, foldHistoryLearning=True)
+    stepByStep = self._createLearningPooler(historyLength)
+
+    potentials = numpy.zeros((40, 200), dtype=REAL_DTYPE)
+    for column in xrange(40):
+      folded.getPotential(column, potentials[column])
+    column, inputIndex = numpy.argwhere(
+      (potentials > 0) & (self._getPermanences(folded) == 0))[0]
+
+    # The input was predicted in each of the previous steps.
+    history = numpy.zeros((200, historyLength), dtype=REAL_DTYPE)
+    history[inputIndex] = 1
+    increment = 0.01
+    self.assertLess(increment, folded.getSynPermTrimThreshold())
+    for p in (folded, stepByStep):
+      p._synPermPreviousPredActiveInc = increment
+      p._unionSDR = numpy.array([], dtype="uint32")
+      p._prePredictedActiveInput = history
+      p._adaptSynapsesForStep(numpy.zeros(200, dtype=REAL_DTYPE),
+                              numpy.array([column]))
+
+    # Step by step, each increment is trimmed away.
+    self.assertAlmostEqual(
+      self._getPermanences(folded)[column, inputIndex],
+      historyLength * increment, places=6)
+    self.assertEqual(self._getPermanences(stepByStep)[column, inputIndex], 0)
+
+
 if __name__ == "__main__":
   unittest.main()
@@ -19,6 +19,7 @@
 # http://numenta.org/licenses/
 # ----------------------------------------------------------------------
 
+import copy
 import unittest
 import random
 
@@ -377,6 +378,84 @@ class LaminarNetworkTest(unittest.TestCase):
     self.assertSetEqual(desired_links, links, error_message)
 
 
+  def testMultipleL4L2ColumnsWithMultiColumnPooler(self):
+    """
+    A network whose L2 columns share one MultiColumnPooler has no lateral L2
+    links and gives the same L2 outputs as the network of separate
+    ColumnPoolers.
+    """
+    multiColumnConfig = copy.deepcopy(networkConfig2)
+    multiColumnConfig["multiColumnL2"] = True
+    nets = [createNetwork(networkConfig2), createNetwork(multiColumnConfig)]
+
+    links = set([link.second.getMoniker() for link in nets[1].getLinks()])
+    self.assertFalse([link for link in links if "lateralInput" in link])
+
+    # Each column senses (feature, location) pairs from a pool of four, and
+    # each object is made of three of them, so that one sensation is shared
+    # by several objects and the columns need each other to recognize it.
+    rng = random.Random(42)
+    def randomSDR():
+      return sorted(rng.sample(xrange(1024), 30))
+    pools = [[(randomSDR(), randomSDR()) for _ in xrange(4)]
+             for _ in xrange(3)]
+    objects = [[k for k in xrange(4) if k != omitted] for omitted in xrange(4)]
+
+    def runSensations(sensations):
+      """
+      Run a sequence of sensations, each a list of pool indices, one per column,
+      through both networks and then reset them. Return the active L2 cells of
+      each column of each network after each sensation.
+      """
+      outputs = []
+      for sensation in sensations:
+        for net in nets:
+          for i, k in enumerate(sensation):
+            feature, location = pools[i][k]
+            net.regions["sensorInput_%d" % i].getSelf().addDataToQueue(
+              feature, 0, 0)
+            net.regions["externalInput_%d" % i].getSelf().addDataToQueue(
+              location, 0, 0)
+          net.run(1)
+        outputs.append(
+          [[net.regions["L2Column_%d" % i].getOutputData(
+            "feedForwardOutput").nonzero()[0].tolist() for i in xrange(3)]
+           for net in nets])
+
+      for net in nets:
+        for i in xrange(3):
+          net.regions["sensorInput_%d" % i].getSelf().addResetToQueue(0)
+          net.regions["externalInput_%d" % i].getSelf().addResetToQueue(0)
+        net.run(1)
+
+      return outputs
+
+    for _ in xrange(3):
+      for obj in objects:
+        for outputs, multiColumnOutputs in runSensations(
+            [[k] * 3 for k in obj]):
+          self.assertEqual(outputs, multiColumnOutputs)
+
+    for net in nets:
+      for i in xrange(3):
+        net.regions["L4Column_%d" % i].setParameter("learn", False)
+        net.regions["L2Column_%d" % i].setParameter("learningMode", False)
+
+    # Every column senses the object in a different order. The first sensation
+    # is ambiguous, and the representations narrow as the columns see more.
+    for obj in objects:
+      sensations = [[obj[(step + i) % 3] for i in xrange(3)]
+                    for step in xrange(3)]
+      sizes = []
+      for outputs, multiColumnOutputs in runSensations(sensations):
+        self.assertEqual(outputs, multiColumnOutputs)
+        sizes.append([len(cells) for cells in outputs])
+
+      for i in xrange(3):
+        self.assertGreater(sizes[0][i], 40)
+        self.assertLess(sizes[-1][i], sizes[0][i])
+
+
   def testMultipleL4L2ColumnsWithTopologyCreate(self):
     """
     In this simplistic test we create a network with 5 L4L2Columns and
@@ -1115,6 +1194,55 @@ class LaminarNetworkTest(unittest.TestCase):
     self.assertGreaterEqual(len(self.getL4BurstingCells(L4Column1)), 20 * 7)
 
 
+  def testSparseLinks(self):
+    """
+    A network with sparse links computes the same representations as one
+    with ordinary links, and keeps its dense outputs up to date.
+    """
+    sparseConfig = copy.deepcopy(networkConfig1)
+    sparseConfig["sparseLinks"] = True
+
+    nets = [createNetwork(networkConfig1), createNetwork(sparseConfig)]
+
+    L4Column = nets[1].regions["L4Column_0"].getSelf()
+    L2Column = nets[1].regions["L2Column_0"].getSelf()
+    self.assertIn("activeColumns", L4Column.sparseInputs.sources)
+    self.assertIn("basalInput", L4Column.sparseInputs.sources)
+    self.assertIn("feedforwardInput", L2Column.sparseInputs.sources)
+    self.assertNotIn("apicalInput", L4Column.sparseInputs.sources)
+
+    features = [self.generatePattern(1024, 20) for _ in xrange(2)]
+    locations = [self.generatePattern(1024, 20) for _ in xrange(3)]
+    pairs = ([(features[0], locations[0]), (features[1], locations[1])] * 3 +
+             [None] +
+             [(features[0], locations[2]), (features[1], locations[1])] * 3)
+
+    for pair in pairs:
+      for net in nets:
+        sensorInput = net.regions["sensorInput_0"].getSelf()
+        externalInput = net.regions["externalInput_0"].getSelf()
+        if pair is None:
+          sensorInput.addResetToQueue(0)
+          externalInput.addResetToQueue(0)
+        else:
+          sensorInput.addDataToQueue(pair[0], 0, 0)
+          externalInput.addDataToQueue(pair[1], 0, 0)
+        net.run(1)
+
+      for regionName, outputName in (("L4Column_0", "activeCells"),
+                                     ("L4Column_0", "predictedActiveCells"),
+                                     ("L2Column_0", "feedForwardOutput")):
+        denseOutput, sparseOutput = [
+          net.regions[regionName].getOutputData(outputName).nonzero()[0]
+          for net in nets]
+        self.assertEqual(denseOutput.tolist(), sparseOutput.tolist())
+
+      self.assertEqual(
+        self.getCurrentL2Representation(
+          nets[0].regions["L2Column_0"].getSelf()),
+        self.getCurrentL2Representation(L2Column))
+
+
   def generatePattern(self, max, size):
     """Generates a random feedback pattern."""
     cellsIndices = range(max)
@@ -0,0 +1,155 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import unittest
+
+import numpy
+
+from collections import OrderedDict
+
+from htmresearch.frameworks.nlp.bucket_runner import BucketRunner
+
+
+
+def _setupDistancesReference(concatenationMethod, distances, protoIDs):
+  """The original loop over every query, for comparison."""
+  numProtos = sum(len(val) for val in protoIDs.values())
+  if concatenationMethod == "mean":
+    summedDist = numpy.zeros(numProtos)
+  elif concatenationMethod == "min":
+    tempDist = numpy.ones(numProtos)
+
+  accumulatedDistances = []
+  for n, (ID, dist) in enumerate(distances.iteritems()):
+    if concatenationMethod == "mean":
+      summedDist += dist
+      tempDist = summedDist / (n+1.0)
+    elif concatenationMethod == "min":
+      tempDist = numpy.minimum(tempDist, dist)
+    tempDist[protoIDs[ID]] = 1.1
+    accumulatedDistances.append(tempDist)
+
+  return accumulatedDistances
+
+
+def _calcMetricsReference(accumulatedDistances, protoIDs, rankIDs):
+  """The original loop over every sample, for comparison."""
+  metrics = BucketRunner._emptyMetrics()
+  for iteration, distances in enumerate(accumulatedDistances):
+    protoMappings = OrderedDict(protoIDs)
+    if isinstance(protoIDs[protoIDs.keys()[0]], list):
+      for pID, prototypes in protoIDs.iteritems():
+        distForThisID = [distances[proto] for proto in prototypes]
+        protoMappings[pID] = prototypes[numpy.argsort(distForThisID)[0]]
+
+    eligibleDistances = numpy.zeros(len(protoMappings))
+    mapDistances = OrderedDict()
+    for eligibleDIdx, allDIdx in enumerate(protoMappings.values()):
+      eligibleDistances[eligibleDIdx] = distances[allDIdx]
+      mapDistances[allDIdx] = eligibleDIdx
+
+    sortedDistances = numpy.argsort(eligibleDistances)
+    rankPrototypes = [protoMappings[ID] for ID in rankIDs]
+    ranks = sortedDistances[[mapDistances[rP] for rP in rankPrototypes]]
+    metrics["firstTP"][iteration].append(ranks.min())
+    metrics["numTop10"][iteration].append(
+      len([r for r in ranks if r < 10]))
+
+  return metrics
+
+
+
+class BucketRunnerTest(unittest.TestCase):
+
+  def setUp(self):
+    self.rng = numpy.random.RandomState(42)
+
+
+  def _createRunner(self, concatenationMethod):
+    # The Runner constructor loads the data and the model, which these methods
+    # don't use.
+    runner = BucketRunner.__new__(BucketRunner)
+    runner.concatenationMethod = concatenationMethod
+    runner.metrics = BucketRunner._emptyMetrics()
+    return runner
+
+
+  def _randomPrototypes(self, numSamples):
+    """Map sample IDs to consecutive prototype numbers, several per sample."""
+    protoIDs = OrderedDict()
+    prototypeNum = 0
+    for i in self.rng.permutation(numSamples):
+      # Some samples have enough windows for argsort to use quicksort.
+      count = self.rng.choice([1, 2, 3, 5, 40])
+      protoIDs["sample%d" % i] = range(prototypeNum, prototypeNum + count)
+      prototypeNum += count
+    return protoIDs, prototypeNum
+
+
+  def testSetupDistances(self):
+    protoIDs, numProtos = self._randomPrototypes(60)
+    queryIDs = self.rng.choice(protoIDs.keys(), 10, replace=False)
+
+    distances = OrderedDict()
+    for ID in queryIDs:
+      distances[ID] = self.rng.rand(numProtos) * 1.2
+
+    for concatenationMethod in ("min", "mean"):
+      runner = self._createRunner(concatenationMethod)
+      actual = runner.setupDistances(distances, protoIDs)
+      expected = _setupDistancesReference(concatenationMethod, distances,
+                                          protoIDs)
+      self.assertEqual(len(actual), len(expected))
+      for actualDistances, expectedDistances in zip(actual, expected):
+        numpy.testing.assert_array_equal(actualDistances, expectedDistances)
+
+    self.assertEqual(runner.setupDistances(OrderedDict(), protoIDs), [])
+
+
+  def testCalcMetrics(self):
+    protoIDs, numProtos = self._randomPrototypes(60)
+    rankIDs = self.rng.choice(protoIDs.keys(), 8, replace=False).tolist()
+
+    # Few distinct values, so that there are many ties.
+    accumulatedDistances = [self.rng.randint(0, 4, size=numProtos) / 4.0
+                            for _ in xrange(10)]
+
+    runner = self._createRunner("min")
+    runner.calcMetrics(accumulatedDistances, protoIDs, rankIDs)
+    expected = _calcMetricsReference(accumulatedDistances, protoIDs, rankIDs)
+    self.assertEqual(runner.metrics, expected)
+
+
+  def testCalcMetricsOnePrototypePerSample(self):
+    protoIDs = OrderedDict(("sample%d" % i, i) for i in xrange(30))
+    rankIDs = ["sample3", "sample17", "sample29"]
+    accumulatedDistances = [self.rng.randint(0, 4, size=30) / 4.0
+                            for _ in xrange(5)]
+
+    runner = self._createRunner("mean")
+    runner.calcMetrics(accumulatedDistances, protoIDs, rankIDs)
+    expected = _calcMetricsReference(accumulatedDistances, protoIDs, rankIDs)
+    self.assertEqual(runner.metrics, expected)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
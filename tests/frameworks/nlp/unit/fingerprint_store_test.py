@@ -0,0 +1,123 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from htmresearch.support.fingerprint_store import FingerprintStore
+
+
+
+def _fingerprint(positions, df=0.5):
+  return {"term": "x", "df": df, "score": 1.0,
+          "fingerprint": {"positions": positions}}
+
+
+
+class FingerprintStoreTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, "fingerprints.sqlite")
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def testPutAndGet(self):
+    store = FingerprintStore(self.path)
+    store.put("en_synonymous", "term", "cat", _fingerprint([1, 5, 9]))
+
+    fingerprint = store.get("en_synonymous", "term", "cat")
+    self.assertEqual(fingerprint, _fingerprint([1, 5, 9]))
+    self.assertIsNone(store.get("en_synonymous", "term", "dog"))
+    self.assertIsNone(store.get("en_synonymous", "text", "cat"))
+    self.assertIsNone(store.get("en_associative", "term", "cat"))
+
+    # The returned dict is a copy.
+    fingerprint["fingerprint"]["positions"].append(10)
+    self.assertEqual(store.get("en_synonymous", "term", "cat"),
+                     _fingerprint([1, 5, 9]))
+
+
+  def testPersistence(self):
+    store = FingerprintStore(self.path)
+    store.put("en_synonymous", "term", "cat", _fingerprint([1, 5, 9]))
+    store.close()
+
+    store = FingerprintStore(self.path, cacheSize=0)
+    self.assertEqual(len(store), 1)
+    self.assertEqual(store.get("en_synonymous", "term", "cat"),
+                     _fingerprint([1, 5, 9]))
+
+
+  def testGetMany(self):
+    store = FingerprintStore(self.path, cacheSize=10)
+    store.putMany("en_synonymous", "term",
+                  dict(("word%d" % i, _fingerprint([i, i + 1]))
+                       for i in xrange(1000)))
+    self.assertEqual(len(store), 1000)
+
+    keys = ["word%d" % i for i in xrange(0, 1200, 2)]
+    fingerprints = store.getMany("en_synonymous", "term", keys)
+    self.assertEqual(len(fingerprints), 500)
+    for i in xrange(0, 1000, 2):
+      self.assertEqual(fingerprints["word%d" % i], _fingerprint([i, i + 1]))
+
+
+  def testUnicodeKeys(self):
+    store = FingerprintStore(self.path)
+    store.put("en_synonymous", "term", u"caf\xe9", _fingerprint([3]))
+
+    self.assertEqual(store.get("en_synonymous", "term", "caf\xc3\xa9"),
+                     _fingerprint([3]))
+    self.assertEqual(
+      store.getMany("en_synonymous", "term", ["caf\xc3\xa9"]).keys(),
+      ["caf\xc3\xa9"])
+
+
+  def testCacheEviction(self):
+    store = FingerprintStore(self.path, cacheSize=2)
+    for key in ("a", "b", "c"):
+      store.put("en_synonymous", "term", key, _fingerprint([1]))
+    self.assertEqual(len(store._cache), 2)
+
+    store.get("en_synonymous", "term", "a")
+    self.assertEqual([key for _, _, key in store._cache], ["c", "a"])
+
+
+  def testPickle(self):
+    store = FingerprintStore(self.path)
+    store.put("en_synonymous", "term", "cat", _fingerprint([1, 5, 9]))
+
+    store2 = pickle.loads(pickle.dumps(store))
+    self.assertEqual(len(store2._cache), 0)
+    self.assertEqual(store2.get("en_synonymous", "term", "cat"),
+                     _fingerprint([1, 5, 9]))
+
+
+
+if __name__ == "__main__":
+  unittest.main()
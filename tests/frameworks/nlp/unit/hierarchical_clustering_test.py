@@ -23,6 +23,8 @@
 import numpy
 import os
 import scipy.sparse
+import shutil
+import tempfile
 import unittest
 
 from mock import patch
@@ -57,6 +59,48 @@ class TestHierarchicalClustering(unittest.TestCase):
     self.assertEqual(dists.tolist(), [3, 1, 3, 2, 2, 4])
 
 
+  def testComputeOverlapsInBlocks(self):
+    data = scipy.sparse.csr_matrix(numpy.random.rand(50, 40) < 0.2)
+    dense = data.toarray().astype(int)
+    overlapMatrix = dense.dot(dense.T)
+    expected = overlapMatrix[numpy.triu_indices(50, 1)]
+    expectedWithDiagonal = overlapMatrix[numpy.triu_indices(50)]
+
+    for blockSize in (1, 7, 50, 256):
+      dists = HierarchicalClustering._computeOverlaps(data, blockSize=blockSize)
+      self.assertEqual(dists.tolist(), expected.tolist())
+
+      dists = HierarchicalClustering._computeOverlaps(data, selfOverlaps=True,
+                                                      blockSize=blockSize)
+      self.assertEqual(dists.tolist(), expectedWithDiagonal.tolist())
+
+    dists = HierarchicalClustering._computeOverlaps(data, blockSize=7,
+                                                    numWorkers=2)
+    self.assertEqual(dists.tolist(), expected.tolist())
+
+
+  def testComputeOverlapsToFile(self):
+    data = scipy.sparse.csr_matrix([
+      [1, 1, 0, 1],
+      [0, 1, 1, 0],
+      [1, 1, 1, 1]
+    ])
+    tempDir = tempfile.mkdtemp()
+    try:
+      filename = os.path.join(tempDir, "overlaps.dat")
+      dists = HierarchicalClustering._computeOverlaps(data, blockSize=2,
+                                                      outputFile=filename)
+      self.assertIsInstance(dists, numpy.memmap)
+      self.assertEqual(dists.tolist(), [1, 3, 2])
+
+      del dists
+      stored = numpy.memmap(filename, dtype="int16", mode="r")
+      self.assertEqual(stored.tolist(), [1, 3, 2])
+      del stored
+    finally:
+      shutil.rmtree(tempDir)
+
+
   def testExtractVectorsFromKNN(self):
     vectors = numpy.random.rand(10, 25) < 0.1
 
@@ -0,0 +1,133 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import gensim
+import numpy
+
+from htmresearch.encoders.lsa_encoder import LSAEncoder
+
+
+
+CORPUS = [
+  "the cat sat on the mat",
+  "the dog sat on the log",
+  "a cat and a dog played in the garden",
+  "birds fly over the garden wall",
+  "the mat was under the cat",
+  "dogs and cats are pets",
+  "the bird sang on the wall",
+  "a log lay in the garden",
+  "pets sleep on the mat",
+  "the dog chased the bird over the log",
+  "cats watch birds in the garden",
+  "a wall of logs",
+]
+
+
+
+class LSAEncoderTest(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.directory = tempfile.mkdtemp()
+    cls.dictionaryPath = os.path.join(cls.directory, "wordids.txt")
+    cls.tfidfPath = os.path.join(cls.directory, "tfidf.model")
+    cls.lsaPath = os.path.join(cls.directory, "lsa.model")
+
+    texts = [text.split() for text in CORPUS]
+    dictionary = gensim.corpora.Dictionary(texts)
+    dictionary.save_as_text(cls.dictionaryPath)
+    bows = [dictionary.doc2bow(text) for text in texts]
+    tfidf = gensim.models.TfidfModel(bows)
+    tfidf.save(cls.tfidfPath)
+    lsa = gensim.models.lsimodel.LsiModel(tfidf[bows], id2word=dictionary,
+                                          num_topics=8)
+    lsa.save(cls.lsaPath)
+
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.directory)
+
+
+  def _createEncoder(self, w=None):
+    return LSAEncoder(self.tfidfPath, self.lsaPath,
+                      dictionaryPath=self.dictionaryPath, w=w)
+
+
+  def testWidth(self):
+    encoder = self._createEncoder(w=3)
+    self.assertEqual(encoder.getWidth(), encoder.lsa.num_topics)
+    self.assertEqual(encoder.w, 3)
+
+    # 5% of fewer than 20 topics rounds down to 0 bits.
+    self.assertEqual(self._createEncoder().w, 1)
+
+
+  def testEncode(self):
+    encoder = self._createEncoder(w=3)
+    encoded = encoder.encode("The cat sat on the mat!")
+    self.assertEqual(encoded.shape, (encoder.n,))
+    self.assertEqual(encoded.sum(), 3)
+
+    # Tokens are looked up like a tokenized string.
+    numpy.testing.assert_equal(
+      encoder.encode(["The", "cat", "sat", "on", "the", "mat"]), encoded)
+
+
+  def testEncodeIntoArray(self):
+    encoder = self._createEncoder(w=3)
+    output = numpy.zeros(encoder.getWidth(), dtype="uint8")
+    encoder.encodeIntoArray("a dog in the garden", output)
+    numpy.testing.assert_equal(output,
+                               encoder.encode("a dog in the garden"))
+
+    self.assertRaises(TypeError, encoder.encodeIntoArray,
+                      ["a", "dog"], output)
+
+
+  def testEncodeCorpusMatchesEncode(self):
+    texts = CORPUS + ["The CAT, the dog and the bird.",
+                      ["birds", "and", "logs"]]
+
+    for w in (None, 3):
+      encoder = self._createEncoder(w=w)
+      expected = numpy.array([encoder.encode(text) for text in texts])
+
+      # Chunks that don't divide the corpus evenly.
+      encoded = encoder.encodeCorpus(iter(texts), chunkSize=5)
+      self.assertEqual(encoded.shape, (len(texts), encoder.n))
+      numpy.testing.assert_equal(encoded.toarray(), expected)
+
+
+  def testEncodeEmptyCorpus(self):
+    encoder = self._createEncoder(w=3)
+    self.assertEqual(encoder.encodeCorpus([]).shape, (0, encoder.n))
+
+
+
+if __name__ == "__main__":
+  unittest.main()
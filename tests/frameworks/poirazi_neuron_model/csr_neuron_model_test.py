@@ -0,0 +1,123 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import unittest
+
+import numpy
+
+from htmresearch.frameworks.poirazi_neuron_model import csr_neuron_model
+from htmresearch.frameworks.poirazi_neuron_model import neuron_model
+from htmresearch.frameworks.poirazi_neuron_model.csr_neuron_model import (
+  CSR_Neuron, run_sweep)
+from htmresearch.frameworks.poirazi_neuron_model.data_tools import (
+  generate_evenly_distributed_data_sparse)
+
+
+
+def _square(x):
+  return x * x
+
+
+
+class CSRNeuronTest(unittest.TestCase):
+
+  PARAMS = {
+    "num_dendrites": 50,
+    "dendrite_length": 10,
+    "dim": 200,
+  }
+
+  def setUp(self):
+    numpy.random.seed(42)
+    self.data = generate_evenly_distributed_data_sparse(dim=200, num_active=30,
+                                                        num_samples=100)
+    self.labels = numpy.where(numpy.random.rand(100) < 0.5, 1, -1)
+
+
+  def _createPair(self, **kwargs):
+    """
+    Create a Matrix_Neuron and a CSR_Neuron with the same synapses.
+    """
+    matrixNeuron = neuron_model.Matrix_Neuron(
+      nonlinearity=neuron_model.threshold_nonlinearity(3), **dict(self.PARAMS,
+                                                                  **kwargs))
+    csrNeuron = CSR_Neuron(
+      nonlinearity=csr_neuron_model.threshold_nonlinearity(3),
+      **dict(self.PARAMS, **kwargs))
+    csrNeuron.synapses = numpy.array(
+      [sorted(matrixNeuron.dendrites.colNonZeros(i)[0])
+       for i in xrange(self.PARAMS["num_dendrites"])], dtype="int64")
+    csrNeuron.initialize_permanences()
+    return matrixNeuron, csrNeuron
+
+
+  def _permanences(self, csrNeuron):
+    permanences = numpy.zeros((csrNeuron.dim, csrNeuron.num_dendrites))
+    for dendrite, (synapses, scores) in enumerate(zip(csrNeuron.synapses,
+                                                      csrNeuron.permanences)):
+      permanences[synapses[synapses >= 0], dendrite] = scores[synapses >= 0]
+    return permanences
+
+
+  def testActivations(self):
+    matrixNeuron, csrNeuron = self._createPair()
+    numpy.testing.assert_allclose(
+      csrNeuron.calculate_on_entire_dataset(self.data),
+      matrixNeuron.calculate_on_entire_dataset(self.data))
+
+
+  def testTraining(self):
+    """
+    Without synapse replacement, training one datapoint at a time gives the
+    same permanences as Matrix_Neuron.
+    """
+    matrixNeuron, csrNeuron = self._createPair(permanence_threshold=-100.)
+    matrixNeuron.HTM_style_train_on_data(self.data, self.labels)
+    csrNeuron.HTM_style_train_on_data(self.data, self.labels)
+
+    numpy.testing.assert_allclose(self._permanences(csrNeuron),
+                                  matrixNeuron.permanences.toDense(),
+                                  atol=1e-6)
+
+
+  def testBatchTraining(self):
+    csrNeuron = CSR_Neuron(
+      nonlinearity=csr_neuron_model.threshold_nonlinearity(3), **self.PARAMS)
+    csrNeuron.HTM_style_initialize_on_data(self.data, self.labels)
+    for _ in xrange(10):
+      csrNeuron.HTM_style_train_on_data(self.data, self.labels, batch_size=10)
+
+    for synapses in csrNeuron.synapses:
+      synapses = synapses[synapses >= 0]
+      self.assertEqual(len(set(synapses)), len(synapses))
+      self.assertTrue(((synapses >= 0) & (synapses < 200)).all())
+
+
+  def testRunSweep(self):
+    self.assertEqual(run_sweep(_square, range(5), num_workers=1),
+                     [0, 1, 4, 9, 16])
+    self.assertEqual(run_sweep(_square, range(5), num_workers=2),
+                     [0, 1, 4, 9, 16])
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,158 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import unittest
+
+import numpy
+
+from htmresearch.frameworks.sensorimotor.behavior_memory import BehaviorMemory
+
+
+
+class LoopBehaviorMemory(BehaviorMemory):
+  """
+  Reinforces one weight row at a time, like the previous implementation.
+  """
+
+  def _reinforceGoalToBehavior(self, goal, behavior):
+    goalToBehaviorFlat = self.goalToBehaviorFlat()
+    for cell in numpy.flatnonzero(behavior):
+      idx = numpy.unravel_index(cell, behavior.shape)
+      learningRate = self.goalToBehaviorLearningRate * behavior[idx]
+      self._reinforce(goalToBehaviorFlat[cell], goal, learningRate)
+
+
+  def _reinforceBehaviorToMotor(self, behavior, motor):
+    for cell in motor.nonzero()[0]:
+      self._reinforce(self.behaviorToMotor[cell], behavior,
+                      self.behaviorToMotorLearningRate)
+
+
+  def _reinforceMotorToBehavior(self, motor, behavior):
+    for cell in numpy.transpose(behavior.nonzero()):
+      self._reinforce(self.motorToBehavior[cell[0], cell[1]], motor,
+                      self.motorToBehaviorLearningRate)
+
+
+
+class BehaviorMemoryTest(unittest.TestCase):
+
+  NUM_MOTOR_COLUMNS = 32
+  NUM_SENSOR_COLUMNS = 40
+  NUM_CELLS_PER_SENSOR_COLUMN = 6
+
+
+  def setUp(self):
+    self.rng = numpy.random.RandomState(42)
+
+
+  def _createMemory(self, cls, **kwargs):
+    numpy.random.seed(7)
+    return cls(numMotorColumns=self.NUM_MOTOR_COLUMNS,
+               numSensorColumns=self.NUM_SENSOR_COLUMNS,
+               numCellsPerSensorColumn=self.NUM_CELLS_PER_SENSOR_COLUMN,
+               **kwargs)
+
+
+  def _randomColumns(self, numColumns, numActive):
+    return set(self.rng.choice(numColumns, numActive, replace=False).tolist())
+
+
+  def _randomTrajectory(self, numSteps, goalEvery=None):
+    motorSequence = []
+    sensorSequence = []
+    goalSequence = []
+    for i in xrange(numSteps):
+      motorSequence.append(self._randomColumns(self.NUM_MOTOR_COLUMNS, 4))
+      sensorSequence.append(self._randomColumns(self.NUM_SENSOR_COLUMNS, 5))
+      if goalEvery is not None and i % goalEvery != 0:
+        goalSequence.append(self._randomColumns(self.NUM_SENSOR_COLUMNS, 5))
+      else:
+        goalSequence.append(set())
+    return motorSequence, sensorSequence, goalSequence
+
+
+  def testLearningMatchesRowByRow(self):
+    """
+    Reinforcing all rows at once gives the same weights as one row at a time.
+    """
+    memory = self._createMemory(BehaviorMemory)
+    loopMemory = self._createMemory(LoopBehaviorMemory)
+
+    for motor, sensor, goal in zip(*self._randomTrajectory(30)):
+      memory.compute(motor, sensor, goal)
+      loopMemory.compute(motor, sensor, goal)
+
+    numpy.testing.assert_array_equal(memory.goalToBehavior,
+                                     loopMemory.goalToBehavior)
+    numpy.testing.assert_array_equal(memory.behaviorToMotor,
+                                     loopMemory.behaviorToMotor)
+    numpy.testing.assert_array_equal(memory.motorToBehavior,
+                                     loopMemory.motorToBehavior)
+    numpy.testing.assert_array_equal(memory.learningBehavior,
+                                     loopMemory.learningBehavior)
+
+
+  def testComputeSequenceMatchesCompute(self):
+    """
+    computeSequence gives the same motor outputs and final state as calling
+    compute at each timestep, with and without goals.
+    """
+    memory = self._createMemory(BehaviorMemory)
+    stepMemory = self._createMemory(BehaviorMemory)
+
+    motorSequence, sensorSequence, goalSequence = self._randomTrajectory(
+      40, goalEvery=5)
+
+    motors = memory.computeSequence(motorSequence, sensorSequence,
+                                    goalSequence)
+
+    for i, (motor, sensor, goal) in enumerate(zip(motorSequence,
+                                                  sensorSequence,
+                                                  goalSequence)):
+      stepMemory.compute(motor, sensor, goal)
+      numpy.testing.assert_allclose(motors[i], stepMemory.motor)
+
+    numpy.testing.assert_array_equal(memory.goalToBehavior,
+                                     stepMemory.goalToBehavior)
+    numpy.testing.assert_allclose(memory.activeBehavior,
+                                  stepMemory.activeBehavior)
+    numpy.testing.assert_allclose(memory.reconstructedMotor,
+                                  stepMemory.reconstructedMotor)
+    self.assertEqual(memory.prevActiveSensorColumns,
+                     stepMemory.prevActiveSensorColumns)
+
+
+  def testFloat32Weights(self):
+    """
+    The weights can be stored as float32, and stay float32 while learning.
+    """
+    memory = self._createMemory(BehaviorMemory, weightDtype="float32")
+    memory.computeSequence(*self._randomTrajectory(10))
+
+    self.assertEqual(memory.goalToBehavior.dtype, numpy.float32)
+    self.assertEqual(memory.behaviorToMotor.dtype, numpy.float32)
+    self.assertEqual(memory.motorToBehavior.dtype, numpy.float32)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,106 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import pickle
+import unittest
+
+import numpy
+
+from htmresearch.support.sparse_links import SparseInputs, SparseOutputs
+
+
+
+class SparseLinksTest(unittest.TestCase):
+
+  def testClearPrevious(self):
+    outputs = {"activeCells": numpy.zeros(10, dtype="float32")}
+    sparseOutputs = SparseOutputs(clearPrevious=True)
+
+    sparseOutputs.write(outputs, "activeCells", [1, 4])
+    self.assertEqual(outputs["activeCells"].nonzero()[0].tolist(), [1, 4])
+
+    # Only the previously active bits are cleared.
+    outputs["activeCells"][7] = 1
+    sparseOutputs.write(outputs, "activeCells", [2])
+    self.assertEqual(outputs["activeCells"].nonzero()[0].tolist(), [2, 7])
+
+    sparseOutputs.clear(outputs, "activeCells")
+    self.assertEqual(outputs["activeCells"].nonzero()[0].tolist(), [7])
+    self.assertEqual(sparseOutputs.indices["activeCells"].tolist(), [])
+
+
+  def testClearAll(self):
+    outputs = {"activeCells": numpy.zeros(10, dtype="float32")}
+    sparseOutputs = SparseOutputs(clearPrevious=False)
+
+    sparseOutputs.write(outputs, "activeCells", [1, 4])
+    outputs["activeCells"][7] = 1
+    sparseOutputs.write(outputs, "activeCells", [2])
+    self.assertEqual(outputs["activeCells"].nonzero()[0].tolist(), [2])
+    self.assertEqual(sparseOutputs.indices["activeCells"].tolist(), [2])
+
+
+  def testGetIndices(self):
+    inputs = {"a": numpy.array([0, 1, 0, 1], dtype="float32"),
+              "b": numpy.array([1, 0, 0, 0], dtype="float32")}
+    sparseOutputs = SparseOutputs()
+    sparseInputs = SparseInputs()
+    sparseInputs.link("b", sparseOutputs, "dataOut")
+
+    self.assertEqual(sparseInputs.getIndices(inputs, "a").tolist(), [1, 3])
+    self.assertEqual(sparseInputs.getIndices(inputs, "a").dtype, "uint32")
+
+    # Before the source computes, the linked input is empty.
+    self.assertEqual(sparseInputs.getIndices(inputs, "b").tolist(), [])
+
+    sparseOutputs.write({"dataOut": numpy.zeros(4)}, "dataOut", [2, 3])
+    self.assertEqual(sparseInputs.getIndices(inputs, "b").tolist(), [2, 3])
+
+    with self.assertRaises(ValueError):
+      sparseInputs.link("b", sparseOutputs, "dataOut")
+
+
+  def testPickleForgetsLinks(self):
+    sparseOutputs = SparseOutputs(clearPrevious=True)
+    sparseOutputs.write({"dataOut": numpy.zeros(4)}, "dataOut", [2, 3])
+    sparseInputs = SparseInputs()
+    sparseInputs.link("b", sparseOutputs, "dataOut")
+
+    for protocol in xrange(pickle.HIGHEST_PROTOCOL + 1):
+      sparseOutputs2 = pickle.loads(pickle.dumps(sparseOutputs, protocol))
+      sparseInputs2 = pickle.loads(pickle.dumps(sparseInputs, protocol))
+
+      self.assertTrue(sparseOutputs2.clearPrevious)
+      self.assertEqual(sparseOutputs2.indices, {})
+      self.assertEqual(sparseInputs2.sources, {})
+      self.assertEqual(
+        sparseInputs2.getIndices({"b": numpy.array([0, 1, 0, 1])},
+                                 "b").tolist(), [1, 3])
+
+      # The first write after loading clears the whole output.
+      outputs = {"dataOut": numpy.ones(4)}
+      sparseOutputs2.write(outputs, "dataOut", [0])
+      self.assertEqual(outputs["dataOut"].nonzero()[0].tolist(), [0])
+
+
+
+if __name__ == "__main__":
+  unittest.main()
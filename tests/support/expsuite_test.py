@@ -0,0 +1,309 @@
+# ----------------------------------------------------------------------
+# Numenta Platform for Intelligent Computing (NuPIC)
+# Copyright (C) 2017, Numenta, Inc.  Unless you have an agreement
+# with Numenta, Inc., for a separate license for this software code, the
+# following terms and conditions apply:
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero Public License for more details.
+#
+# You should have received a copy of the GNU Affero Public License
+# along with this program.  If not, see http://www.gnu.org/licenses.
+#
+# http://numenta.org/licenses/
+# ----------------------------------------------------------------------
+
+import json
+import multiprocessing
+import optparse
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from htmresearch.support.expsuite import (PyExperimentSuite, count_iterations,
+                                          index_name)
+
+
+
+class CountingSuite(PyExperimentSuite):
+
+  restore_supported = True
+
+  def reset(self, params, rep):
+    self.restored = None
+    self.resets.append((params["name"], rep))
+
+
+  def iterate(self, params, rep, n):
+    return {"value": float(self.get_shared("data")[n])}
+
+
+  def restore_state(self, params, rep, n):
+    self.restored = n
+
+
+
+class FailingSuite(CountingSuite):
+
+  def iterate(self, params, rep, n):
+    if rep == 1:
+      raise ValueError("repetition %d failed" % rep)
+    return super(FailingSuite, self).iterate(params, rep, n)
+
+
+
+class ExpSuiteTest(unittest.TestCase):
+
+  def setUp(self):
+    self.path = tempfile.mkdtemp()
+    self.suite = CountingSuite()
+    self.suite.options = optparse.Values({"ncores": 1, "delete": False})
+    self.suite.resets = []
+    self.suite.share_array("data", numpy.arange(100) * 2)
+
+
+  def tearDown(self):
+    shutil.rmtree(self.path)
+
+
+  def params(self, name="exp", iterations=5, repetitions=1):
+    return {"name": name, "path": self.path, "iterations": iterations,
+            "repetitions": repetitions}
+
+
+  def logName(self, name="exp", rep=0):
+    return os.path.join(self.path, name, "%i.log" % rep)
+
+
+  def testLogAndIndex(self):
+    self.suite.do_experiment(self.params())
+
+    logName = self.logName()
+    self.assertEqual(count_iterations(logName), 5)
+    self.assertEqual(os.path.getsize(index_name(logName)), 5 * 8)
+    self.assertEqual(self.suite.get_history(os.path.dirname(logName), 0,
+                                            "value"),
+                     [0.0, 2.0, 4.0, 6.0, 8.0])
+
+
+  def testResumeDropsUnindexedIteration(self):
+    self.suite.do_experiment(self.params())
+
+    # Interrupt after 3 iterations, with a 4th line written but not indexed.
+    logName = self.logName()
+    with open(index_name(logName), "r+b") as indexFile:
+      indexFile.truncate(3 * 8)
+    with open(logName, "ab") as logFile:
+      logFile.write('{"value": -1')
+
+    self.suite.resets = []
+    self.suite.do_experiment(self.params())
+
+    self.assertEqual(self.suite.resets, [("exp", 0)])
+    self.assertEqual(self.suite.restored, 3)
+    with open(logName) as logFile:
+      lines = [json.loads(line) for line in logFile]
+    self.assertEqual([line["iteration"] for line in lines], range(5))
+    self.assertEqual(count_iterations(logName), 5)
+
+
+  def testResumeLogWithoutIndex(self):
+    logName = self.logName()
+    os.makedirs(os.path.dirname(logName))
+    with open(logName, "w") as logFile:
+      logFile.write('{"value": 0.0, "iteration": 0}\n'
+                    '{"value": 2.0, "iteration": 1}\n')
+
+    self.suite.do_experiment(self.params())
+
+    self.assertEqual(self.suite.restored, 2)
+    self.assertEqual(count_iterations(logName), 5)
+    self.assertEqual(self.suite.get_history(os.path.dirname(logName), 0,
+                                            "value"),
+                     [0.0, 2.0, 4.0, 6.0, 8.0])
+
+
+  def testCompletedRepetitionsAreSkipped(self):
+    self.suite.do_experiment(self.params(repetitions=2))
+    self.suite.resets = []
+    self.suite.do_experiment(self.params(repetitions=3))
+    self.assertEqual(self.suite.resets, [("exp", 2)])
+
+
+  def testMostExpensiveFirst(self):
+    self.suite.do_experiment([self.params("short", iterations=2),
+                              self.params("long", iterations=8)])
+    self.assertEqual(self.suite.resets, [("long", 0), ("short", 0)])
+
+
+  def testMultipleProcesses(self):
+    self.suite.options.ncores = 2
+    self.suite.do_experiment(self.params(repetitions=4))
+
+    for rep in xrange(4):
+      self.assertEqual(
+        self.suite.get_history(os.path.join(self.path, "exp"), rep, "value"),
+        [0.0, 2.0, 4.0, 6.0, 8.0])
+
+
+  def testFailedRepetitionStopsWorkers(self):
+    suite = FailingSuite()
+    suite.options = optparse.Values({"ncores": 2, "delete": False})
+    suite.resets = []
+    suite.share_array("data", numpy.arange(100) * 2)
+
+    self.assertRaises(ValueError, suite.do_experiment,
+                      self.params(repetitions=4))
+    self.assertEqual(multiprocessing.active_children(), [])
+
+
+
+class HistoryTest(unittest.TestCase):
+
+  def setUp(self):
+    self.path = tempfile.mkdtemp()
+    self.exp = os.path.join(self.path, "exp")
+    os.makedirs(self.exp)
+    PyExperimentSuite().write_config_file(
+      {"name": "exp", "path": self.path, "iterations": 3, "repetitions": 1},
+      self.exp)
+    self.writeLog([{"iteration": 0, "error": 0.5, "label": "a"},
+                   {"iteration": 1, "error": 1, "cells": [1, 2]},
+                   {"iteration": 2, "error": 0.25, "label": "c"}])
+
+    self.suite = self.createSuite()
+
+
+  def tearDown(self):
+    shutil.rmtree(self.path)
+
+
+  def createSuite(self, historyFiles=False):
+    suite = PyExperimentSuite()
+    suite.history_files = historyFiles
+    suite.numParses = 0
+    parse = suite._parse_history
+
+    def countingParse(*args):
+      suite.numParses += 1
+      return parse(*args)
+
+    suite._parse_history = countingParse
+    return suite
+
+
+  def writeLog(self, dics, mode="w"):
+    with open(os.path.join(self.exp, "0.log"), mode) as logFile:
+      for dic in dics:
+        logFile.write(json.dumps(dic) + "\n")
+
+
+  def testHistory(self):
+    self.assertEqual(self.suite.get_history(self.exp, 0, "error"),
+                     [0.5, 1, 0.25])
+    self.assertEqual(self.suite.get_history(self.exp, 0, "iteration"),
+                     [0, 1, 2])
+    self.assertEqual(self.suite.get_history(self.exp, 0, ["label", "cells"]),
+                     {"label": ["a", None, "c"],
+                      "cells": [None, [1, 2], None]})
+    self.assertEqual(self.suite.get_history(self.exp, 0, "unknown"),
+                     [None, None, None])
+    self.assertEqual(sorted(self.suite.get_history_tags(self.exp)),
+                     ["cells", "error", "iteration", "label"])
+    self.assertEqual(self.suite.get_history(self.exp, 1, "error"), [])
+
+
+  def testColumns(self):
+    columns = self.suite.get_history_columns(
+      os.path.join(self.exp, "0.log"), ["iteration", "error", "label"])
+
+    self.assertEqual(columns["iteration"][0].dtype, numpy.int64)
+    numpy.testing.assert_equal(columns["label"][1], [True, False, True])
+
+    # Integers mixed with floats keep their types.
+    self.assertEqual(columns["error"][0].dtype, object)
+    self.assertEqual(columns["error"][0].tolist(), [0.5, 1, 0.25])
+    self.assertIsInstance(columns["error"][0][1], int)
+
+    self.writeLog([{"error": 0.5}, {"error": 1.0}, {}])
+    values, present = self.suite.get_history_columns(
+      os.path.join(self.exp, "0.log"), ["error"])["error"]
+    self.assertEqual(values.dtype, numpy.float64)
+    numpy.testing.assert_equal(values[:2], [0.5, 1.0])
+    numpy.testing.assert_equal(present, [True, True, False])
+
+
+  def testLogIsParsedOnce(self):
+    logName = os.path.join(self.exp, "0.log")
+    self.suite.get_history(self.exp, 0, "error")
+    self.suite.get_history(self.exp, 0, "error")
+    self.suite.get_value(self.exp, 0, "error", "max")
+    self.assertEqual(self.suite.numParses, 1)
+
+    # Only the requested tags are kept.
+    self.assertEqual(self.suite._histories[logName]["columns"].keys(),
+                     ["error"])
+    self.suite.get_history(self.exp, 0, "label")
+    self.suite.get_history(self.exp, 0, ["cells", "iteration", "label"])
+    self.assertEqual(self.suite.numParses, 3)
+    self.assertEqual(sorted(self.suite._histories[logName]["columns"]),
+                     ["cells", "error", "iteration", "label"])
+
+    # Tags that aren't in the log don't need another parse.
+    self.assertEqual(self.suite.get_history(self.exp, 0, "unknown"),
+                     [None, None, None])
+    self.assertEqual(self.suite.numParses, 3)
+
+    self.writeLog([{"iteration": 3, "error": 0.125}], mode="a")
+    self.assertEqual(self.suite.get_history(self.exp, 0, "error"),
+                     [0.5, 1, 0.25, 0.125])
+    self.assertEqual(self.suite.numParses, 4)
+
+
+  def testHistoriesOverRepetitionsParseEachLogOnce(self):
+    self.suite.get_histories_over_repetitions(self.exp, ["iteration", "error"],
+                                              numpy.mean)
+    self.assertEqual(self.suite.numParses, 1)
+
+
+  def testCacheSize(self):
+    self.suite.history_cache_size = 2
+    logNames = [os.path.join(self.exp, "%d.log" % i) for i in xrange(3)]
+    for logName in logNames[1:]:
+      shutil.copy(logNames[0], logName)
+    for logName in logNames + logNames[1:2]:
+      self.suite.get_history_columns(logName, ["error"])
+
+    self.assertEqual(self.suite._histories.keys(),
+                     [logNames[2], logNames[1]])
+    self.assertEqual(self.suite.numParses, 3)
+
+
+  def testHistoryFiles(self):
+    suite = self.createSuite(historyFiles=True)
+    expected = suite.get_history(self.exp, 0, "all")
+    self.assertTrue(os.path.exists(os.path.join(self.exp, "0.log.npz")))
+
+    suite = self.createSuite(historyFiles=True)
+    self.assertEqual(suite.get_history(self.exp, 0, "all"), expected)
+    self.assertEqual(suite.numParses, 0)
+
+    self.writeLog([{"iteration": 3, "error": 0.125}], mode="a")
+    suite = self.createSuite(historyFiles=True)
+    self.assertEqual(suite.get_history(self.exp, 0, "error"),
+                     [0.5, 1, 0.25, 0.125])
+    self.assertEqual(suite.numParses, 1)
+
+
+
+if __name__ == "__main__":
+  unittest.main()